@@ -8,6 +8,7 @@
 import os
 import sys
 import shutil
+import threading
 from pathlib import Path
 
 # 设置标准输出编码为UTF-8（Windows兼容）
@@ -144,18 +145,11 @@ except Exception as e:
     # 继续启动，因为可能是首次运行
 
 # ==================== 检查并安装Playwright浏览器 ====================
-def _check_and_install_playwright():
-    """检查Playwright浏览器是否存在，如果不存在则自动安装"""
-    print("检查Playwright浏览器...")
-    
-    # 检查是否安装了playwright模块
-    try:
-        import playwright
-    except ImportError:
-        print(f"{_WARN} Playwright模块未安装，跳过浏览器检查")
-        return False
-    
-    # 检查Playwright浏览器是否存在
+def _resolve_playwright_browsers_path():
+    """在已知目录中查找已安装的Playwright浏览器并设置 PLAYWRIGHT_BROWSERS_PATH
+
+    只做文件检查，耗时很短，在导入其他模块、启动任何浏览器之前同步执行
+    """
     playwright_installed = False
     possible_paths = []
     
@@ -219,8 +213,14 @@ def _check_and_install_playwright():
                         break
                 if playwright_installed:
                     break
-    
-    # 如果没找到，尝试使用playwright命令检查
+
+    return playwright_installed
+
+def _check_and_install_playwright():
+    """已知目录中没有Playwright浏览器时，通过API检测、从打包目录提取或自动安装（耗时较长，在后台线程执行）"""
+    playwright_installed = False
+
+    # 尝试使用playwright命令检查
     if not playwright_installed:
         try:
             from playwright.sync_api import sync_playwright
@@ -412,17 +412,38 @@ def _check_and_install_playwright():
     
     return playwright_installed
 
-# 检查并安装Playwright浏览器
+def _run_playwright_check():
+    from utils.browser_governor import playwright_ready
+    try:
+        _check_and_install_playwright()
+    except Exception as e:
+        print(f"{_WARN} Playwright浏览器检查失败: {e}")
+        print("   程序将继续启动，但Playwright功能可能不可用")
+        # 继续启动，不影响主程序运行
+    finally:
+        # 无论成败都放行，浏览器启动失败时由各流程自行处理
+        playwright_ready.set()
+
+
+# 检查Playwright浏览器：先同步查找已安装的浏览器并设置 PLAYWRIGHT_BROWSERS_PATH；
+# 未找到时在后台线程中检测/提取/安装（可能需要几分钟），不阻塞启动，
+# 期间浏览器调度器暂停放行，避免用错误路径或未安装完成的浏览器启动
+print("检查Playwright浏览器...")
 try:
-    _check_and_install_playwright()
-except Exception as e:
-    print(f"{_WARN} Playwright浏览器检查失败: {e}")
-    print("   程序将继续启动，但Playwright功能可能不可用")
-    # 继续启动，不影响主程序运行
+    import playwright  # noqa: F401
+    _playwright_module_available = True
+except ImportError:
+    print(f"{_WARN} Playwright模块未安装，跳过浏览器检查")
+    _playwright_module_available = False
+
+if _playwright_module_available and not _resolve_playwright_browsers_path():
+    from utils.browser_governor import playwright_ready
+    playwright_ready.clear()
+    threading.Thread(target=_run_playwright_check, name='playwright-check', daemon=True).start()
 
 # ==================== 现在可以安全地导入其他模块 ====================
 import asyncio
-import threading
+import functools
 import uvicorn
 from urllib.parse import urlparse
 from loguru import logger
@@ -526,7 +547,8 @@ async def main():
     print("CookieManager 创建完成")
 
     # 1) 从数据库加载的 Cookie 已经在 CookieManager 初始化时完成
-    # 为每个启用的 Cookie 启动任务
+    # 为每个启用的 Cookie 排队启动任务（由启动编排器按优先级分批启动）
+    startup_accounts = []
     for cid, val in manager.cookies.items():
         # 检查账号是否启用
         if not manager.get_cookie_status(cid):
@@ -541,16 +563,15 @@ async def main():
             user_id = cookie_info.get('user_id') if cookie_info else None
             logger.info(f"Cookie详细信息获取成功: {cid}, user_id: {user_id}")
 
-            logger.info(f"正在创建异步任务: {cid}")
-            task = loop.create_task(manager._run_xianyu(cid, val, user_id))
-            manager.tasks[cid] = task
-            logger.info(f"启动数据库中的 Cookie 任务: {cid} (用户ID: {user_id})")
-            logger.info(f"任务已添加到管理器，当前任务数: {len(manager.tasks)}")
+            startup_accounts.append((cid, functools.partial(manager._launch_startup_task, cid, val, user_id)))
         except Exception as e:
             logger.error(f"启动 Cookie 任务失败: {cid}, {e}")
             import traceback
             logger.error(f"详细错误信息: {traceback.format_exc()}")
-    
+
+    from utils.startup_orchestrator import startup_orchestrator
+    startup_orchestrator.start(startup_accounts)
+
     # 2) 如果配置文件中有新的 Cookie，也加载它们
     for entry in COOKIES_LIST:
         cid = entry.get('id')
@@ -16,11 +16,20 @@ from config import (
     WEBSOCKET_URL, HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT,
     TOKEN_REFRESH_INTERVAL, TOKEN_RETRY_INTERVAL, COOKIES_STR,
     LOG_CONFIG, AUTO_REPLY, DEFAULT_HEADERS, WEBSOCKET_HEADERS,
-    APP_CONFIG, API_ENDPOINTS
+    APP_CONFIG, API_ENDPOINTS, ITEM_DETAIL
 )
 import sys
 import aiohttp
-from collections import defaultdict
+from contextlib import AsyncExitStack
+from utils.mtop_detail import MtopDetailFetcher
+from utils.single_flight import SingleFlight
+from utils.delivery_queue import DeliveryWorkerPool, DeliveryJobError
+from utils.api_card_client import api_card_client
+from utils.refresh_scheduler import refresh_scheduler
+from utils.token_cache import token_cache
+from utils.cookie_jar import cookie_jars
+from utils.startup_orchestrator import startup_orchestrator
+from utils.item_detail_cache import item_detail_cache, extract_description
 from db_manager import db_manager
 
 # 滑块验证补丁已废弃，使用集成的 Playwright 登录方法
@@ -156,23 +165,9 @@ logger.add(
 )
 
 class XianyuLive:
-    # 类级别的锁字典，为每个order_id维护一个锁（用于自动发货）
-    _order_locks = defaultdict(lambda: asyncio.Lock())
-    # 记录锁的最后使用时间，用于清理
-    _lock_usage_times = {}
-    # 记录锁的持有状态和释放时间 {lock_key: {'locked': bool, 'release_time': float, 'task': asyncio.Task}}
-    _lock_hold_info = {}
-
-    # 独立的锁字典，用于订单详情获取（不使用延迟锁机制）
-    _order_detail_locks = defaultdict(lambda: asyncio.Lock())
-    # 记录订单详情锁的使用时间
-    _order_detail_lock_times = {}
-
-    # 商品详情缓存（24小时有效）
-    _item_detail_cache = {}  # {item_id: {'detail': str, 'timestamp': float, 'access_time': float}}
-    _item_detail_cache_lock = asyncio.Lock()
-    _item_detail_cache_max_size = 1000  # 最大缓存1000个商品
-    _item_detail_cache_ttl = 24 * 60 * 60  # 24小时TTL
+    # 订单详情获取去重（同一订单的并发请求共享一次获取，完成后自动移除，无需清理）
+    _order_detail_flight = SingleFlight('order_detail_info')
+
 
     # 类级别的实例管理字典，用于API调用
     _instances = {}  # {cookie_id: XianyuLive实例}
@@ -214,6 +209,12 @@ class XianyuLive:
             else:
                 logger.info(state_msg)
 
+            # 同步账号启动进度
+            if new_state == ConnectionState.CONNECTED:
+                startup_orchestrator.mark_ready(self.cookie_id)
+            elif new_state == ConnectionState.FAILED:
+                startup_orchestrator.mark_failed(self.cookie_id, reason)
+
     async def _interruptible_sleep(self, duration: float):
         """可中断的sleep，将长时间sleep拆分成多个短时间sleep，以便及时响应取消信号
         
@@ -482,18 +483,6 @@ class XianyuLive:
                 cleaned_total += len(expired_notifications)
                 logger.warning(f"【{self.cookie_id}】清理了 {len(expired_notifications)} 个过期通知记录")
             
-            # 清理过期的发货记录（保留30分钟内的）
-            max_delivery_age = 1800  # 30分钟
-            expired_deliveries = [
-                order_id for order_id, last_time in self.last_delivery_time.items()
-                if current_time - last_time > max_delivery_age
-            ]
-            for order_id in expired_deliveries:
-                del self.last_delivery_time[order_id]
-            if expired_deliveries:
-                cleaned_total += len(expired_deliveries)
-                logger.warning(f"【{self.cookie_id}】清理了 {len(expired_deliveries)} 个过期发货记录")
-            
             # 清理过期的订单确认记录（保留30分钟内的）
             max_confirm_age = 1800  # 30分钟
             expired_confirms = [
@@ -509,7 +498,7 @@ class XianyuLive:
             # 只有实际清理了内容才记录总数日志
             if cleaned_total > 0:
                 logger.info(f"【{self.cookie_id}】实例缓存清理完成，共清理 {cleaned_total} 条记录")
-                logger.warning(f"【{self.cookie_id}】当前缓存数量 - 通知: {len(self.last_notification_time)}, 发货: {len(self.last_delivery_time)}, 确认: {len(self.confirmed_orders)}")
+                logger.warning(f"【{self.cookie_id}】当前缓存数量 - 通知: {len(self.last_notification_time)}, 确认: {len(self.confirmed_orders)}")
         
         except Exception as e:
             logger.error(f"【{self.cookie_id}】清理实例缓存时出错: {self._safe_str(e)}")
@@ -634,13 +623,16 @@ class XianyuLive:
         if not cookies_str:
             raise ValueError("未提供cookies，请在global_config.yml中配置COOKIES_STR或通过参数传入")
 
+        self.cookie_id = cookie_id  # 唯一账号标识
+        self.user_id = user_id  # 保存用户ID，用于token刷新时保持正确的所有者关系
+
         logger.info(f"【{cookie_id}】解析cookies...")
-        self.cookies = trans_cookies(cookies_str)
+        # 账号内各组件共享同一个CookieJar，self.cookies / self.cookies_str 均由它提供
+        self.cookie_jar = cookie_jars.get(cookie_id)
+        self.cookie_jar.user_id = user_id
+        self.cookie_jar.load(cookies_str)
         logger.info(f"【{cookie_id}】cookies解析完成，包含字段: {list(self.cookies.keys())}")
 
-        self.cookie_id = cookie_id  # 唯一账号标识
-        self.cookies_str = cookies_str  # 保存原始cookie字符串
-        self.user_id = user_id  # 保存用户ID，用于token刷新时保持正确的所有者关系
         self.base_url = WEBSOCKET_URL
 
         if 'unb' not in self.cookies:
@@ -663,6 +655,7 @@ class XianyuLive:
         self.token_retry_interval = TOKEN_RETRY_INTERVAL
         self.last_token_refresh_time = 0
         self.current_token = None
+        self.token_source = None  # 当前Token来源：cache（启动时复用的缓存）或 refresh（本次刷新获取）
         self.token_refresh_task = None
         self.connection_restart_flag = False  # 连接重启标志
 
@@ -672,18 +665,16 @@ class XianyuLive:
         self.token_refresh_notification_cooldown = 18000  # Token刷新异常通知冷却时间：3小时
         self.notification_lock = asyncio.Lock()  # 通知防重复机制的异步锁
 
-        # 自动发货防重复机制
-        self.last_delivery_time = {}  # 记录每个商品的最后发货时间
-        self.delivery_cooldown = 600  # 10分钟内不重复发货
-
         # 自动确认发货防重复机制
         self.confirmed_orders = {}  # 记录已确认发货的订单，防止重复确认
         self.order_confirm_cooldown = 600  # 10分钟内不重复确认同一订单
 
-        # 自动发货已发送订单记录
-        self.delivery_sent_orders = set()  # 记录已发货的订单ID，防止重复发货
+        # 自动发货任务队列（任务持久化在数据库中，按订单幂等键去重，重启后继续执行）
+        self.delivery_pool = DeliveryWorkerPool(self.cookie_id, self._run_delivery_job, self._on_delivery_job_finished)
+        self.pending_deliveries = 0  # 正在处理的自动发货任务数量（有待发货时滑块验证优先排队）
 
         self.session = None  # 用于API调用的aiohttp session
+        self.mtop_detail = MtopDetailFetcher(self)  # 无浏览器的商品/订单详情获取
 
         # 启动定期清理过期暂停记录的任务
         self.cleanup_task = None
@@ -718,6 +709,8 @@ class XianyuLive:
         self.max_connection_failures = 5  # 最大连续失败次数
         self.last_successful_connection = 0  # 上次成功连接时间
         self.last_state_change_time = time.time()  # 上次状态变化时间
+        self.instance_started_at = time.time()  # 实例创建时间，用于统计启动到连接就绪的耗时
+        self.time_to_connected = None  # 启动到首次连接就绪的耗时（秒）
 
         # 后台任务追踪（用于清理未等待的任务）
         self.background_tasks = set()  # 追踪所有后台任务
@@ -806,24 +799,8 @@ class XianyuLive:
 
 
 
-    def can_auto_delivery(self, order_id: str) -> bool:
-        """检查是否可以进行自动发货（防重复发货）- 基于订单ID"""
-        if not order_id:
-            # 如果没有订单ID，则不进行冷却检查，允许发货
-            return True
-
-        current_time = time.time()
-        last_delivery = self.last_delivery_time.get(order_id, 0)
-
-        if current_time - last_delivery < self.delivery_cooldown:
-            logger.info(f"【{self.cookie_id}】订单 {order_id} 在冷却期内，跳过自动发货")
-            return False
-
-        return True
-
-    def mark_delivery_sent(self, order_id: str):
+    async def mark_delivery_sent(self, order_id: str):
         """标记订单已发货"""
-        self.delivery_sent_orders.add(order_id)
         logger.info(f"【{self.cookie_id}】订单 {order_id} 已标记为发货")
         
         # 更新订单状态为已发货
@@ -831,7 +808,7 @@ class XianyuLive:
         if self.order_status_handler:
             logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.handle_auto_delivery_order_status: {order_id}")
             try:
-                success = self.order_status_handler.handle_auto_delivery_order_status(
+                success = await self.order_status_handler.handle_auto_delivery_order_status(
                     order_id=order_id,
                     cookie_id=self.cookie_id,
                     context="自动发货完成"
@@ -848,109 +825,6 @@ class XianyuLive:
         else:
             logger.warning(f"【{self.cookie_id}】订单状态处理器为None，跳过自动发货状态更新: {order_id}")
 
-    async def _delayed_lock_release(self, lock_key: str, delay_minutes: int = 10):
-        """
-        延迟释放锁的异步任务
-
-        Args:
-            lock_key: 锁的键
-            delay_minutes: 延迟时间（分钟），默认10分钟
-        """
-        try:
-            delay_seconds = delay_minutes * 60
-            logger.info(f"【{self.cookie_id}】订单锁 {lock_key} 将在 {delay_minutes} 分钟后释放")
-
-            # 等待指定时间
-            await asyncio.sleep(delay_seconds)
-
-            # 检查锁是否仍然存在且需要释放
-            if lock_key in self._lock_hold_info:
-                lock_info = self._lock_hold_info[lock_key]
-                if lock_info.get('locked', False):
-                    # 释放锁
-                    lock_info['locked'] = False
-                    lock_info['release_time'] = time.time()
-                    logger.info(f"【{self.cookie_id}】订单锁 {lock_key} 延迟释放完成")
-
-                    # 清理锁信息（可选，也可以保留用于统计）
-                    # del self._lock_hold_info[lock_key]
-
-        except asyncio.CancelledError:
-            logger.info(f"【{self.cookie_id}】订单锁 {lock_key} 延迟释放任务被取消")
-            raise
-        except Exception as e:
-            logger.error(f"【{self.cookie_id}】订单锁 {lock_key} 延迟释放失败: {self._safe_str(e)}")
-
-    def is_lock_held(self, lock_key: str) -> bool:
-        """
-        检查指定的锁是否仍在持有状态
-
-        Args:
-            lock_key: 锁的键
-
-        Returns:
-            bool: True表示锁仍在持有，False表示锁已释放或不存在
-        """
-        if lock_key not in self._lock_hold_info:
-            return False
-
-        lock_info = self._lock_hold_info[lock_key]
-        return lock_info.get('locked', False)
-
-    def cleanup_expired_locks(self, max_age_hours: int = 24):
-        """
-        清理过期的锁（包括自动发货锁和订单详情锁）
-
-        Args:
-            max_age_hours: 锁的最大保留时间（小时），默认24小时
-        """
-        try:
-            current_time = time.time()
-            max_age_seconds = max_age_hours * 3600
-
-            # 清理自动发货锁
-            expired_delivery_locks = []
-            for order_id, last_used in self._lock_usage_times.items():
-                if current_time - last_used > max_age_seconds:
-                    expired_delivery_locks.append(order_id)
-
-            # 清理过期的自动发货锁
-            for order_id in expired_delivery_locks:
-                if order_id in self._order_locks:
-                    del self._order_locks[order_id]
-                if order_id in self._lock_usage_times:
-                    del self._lock_usage_times[order_id]
-                # 清理锁持有信息
-                if order_id in self._lock_hold_info:
-                    lock_info = self._lock_hold_info[order_id]
-                    # 取消延迟释放任务
-                    if 'task' in lock_info and lock_info['task']:
-                        lock_info['task'].cancel()
-                    del self._lock_hold_info[order_id]
-
-            # 清理订单详情锁
-            expired_detail_locks = []
-            for order_id, last_used in self._order_detail_lock_times.items():
-                if current_time - last_used > max_age_seconds:
-                    expired_detail_locks.append(order_id)
-
-            # 清理过期的订单详情锁
-            for order_id in expired_detail_locks:
-                if order_id in self._order_detail_locks:
-                    del self._order_detail_locks[order_id]
-                if order_id in self._order_detail_lock_times:
-                    del self._order_detail_lock_times[order_id]
-
-            total_expired = len(expired_delivery_locks) + len(expired_detail_locks)
-            if total_expired > 0:
-                logger.info(f"【{self.cookie_id}】清理了 {total_expired} 个过期锁 (发货锁: {len(expired_delivery_locks)}, 详情锁: {len(expired_detail_locks)})")
-                logger.warning(f"【{self.cookie_id}】当前锁数量 - 发货锁: {len(self._order_locks)}, 详情锁: {len(self._order_detail_locks)}")
-
-        except Exception as e:
-            logger.error(f"【{self.cookie_id}】清理过期锁时发生错误: {self._safe_str(e)}")
-
-    
-
     def _is_auto_delivery_trigger(self, message: str) -> bool:
         """检查消息是否为自动发货触发关键字"""
         # 定义所有自动发货触发关键字
@@ -1080,15 +954,21 @@ class XianyuLive:
             logger.error(f"【{self.cookie_id}】提取订单ID失败: {self._safe_str(e)}")
             return None
 
-    async def _handle_auto_delivery(self, websocket, message: dict, send_user_name: str, send_user_id: str,
+    def _slider_priority(self) -> int:
+        """滑块验证排队优先级：WebSocket已断开或有待发货订单时优先于例行刷新"""
+        from utils.xianyu_slider_stealth import SLIDER_PRIORITY_URGENT, SLIDER_PRIORITY_ROUTINE
+        if self.connection_state != ConnectionState.CONNECTED or self.pending_deliveries > 0:
+            return SLIDER_PRIORITY_URGENT
+        return SLIDER_PRIORITY_ROUTINE
+
+    async def _handle_auto_delivery(self, message: dict, send_user_name: str, send_user_id: str,
                                    item_id: str, chat_id: str, msg_time: str):
-        """统一处理自动发货逻辑"""
+        """自动发货入口：商品归属校验、提取订单ID后写入发货任务队列（同一订单只入队一次）"""
         try:
             # 检查商品是否属于当前cookies
             if item_id and item_id != "未知商品":
                 try:
-                    from db_manager import db_manager
-                    item_info = db_manager.get_item_info(self.cookie_id, item_id)
+                    item_info = await asyncio.to_thread(db_manager.get_item_info, self.cookie_id, item_id)
                     if not item_info:
                         logger.warning(f'[{msg_time}] 【{self.cookie_id}】❌ 商品 {item_id} 不属于当前账号，跳过自动发货')
                         return
@@ -1105,182 +985,226 @@ class XianyuLive:
                 logger.warning(f'[{msg_time}] 【{self.cookie_id}】❌ 未能提取到订单ID，跳过自动发货')
                 return
 
-            # 订单ID已提取，将在自动发货时进行确认发货处理
-            logger.info(f'[{msg_time}] 【{self.cookie_id}】提取到订单ID: {order_id}，将在自动发货时处理确认发货')
-
-            # 使用订单ID作为锁的键
-            lock_key = order_id
-
-            # 第一重检查：延迟锁状态（在获取锁之前检查，避免不必要的等待）
-            if self.is_lock_held(lock_key):
-                logger.info(f'[{msg_time}] 【{self.cookie_id}】🔒【提前检查】订单 {lock_key} 延迟锁仍在持有状态，跳过发货')
-                return
-
-            # 第二重检查：基于时间的冷却机制
-            if not self.can_auto_delivery(order_id):
-                logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {order_id} 在冷却期内，跳过发货')
+            # 以订单ID作为幂等键入队；已失败的任务（包括订单下失败的卡券、通知任务）在买家再次触发时重新排队
+            payload = {
+                'item_id': item_id,
+                'send_user_name': send_user_name,
+                'send_user_id': send_user_id,
+                'chat_id': chat_id,
+                'msg_time': msg_time,
+            }
+            job_id = await asyncio.to_thread(
+                db_manager.enqueue_delivery_job, f"delivery:{order_id}", self.cookie_id, order_id,
+                'order', payload, time.time(), True
+            )
+            if job_id is None:
+                rearmed = await asyncio.to_thread(db_manager.rearm_failed_delivery_children, order_id, time.time())
+                if rearmed:
+                    logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {order_id} 有 {rearmed} 个失败的发货任务，已重新排队')
+                    self.delivery_pool.notify()
+                else:
+                    logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {order_id} 已在发货队列中或已处理，跳过重复发货')
                 return
 
-            # 获取或创建该订单的锁
-            order_lock = self._order_locks[lock_key]
-
-            # 更新锁的使用时间
-            self._lock_usage_times[lock_key] = time.time()
+            logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {order_id} 已加入自动发货队列（任务ID: {job_id}）')
+            self.delivery_pool.notify()
 
-            # 使用异步锁防止同一订单的并发处理
-            async with order_lock:
-                logger.info(f'[{msg_time}] 【{self.cookie_id}】获取订单锁成功: {lock_key}，开始处理自动发货')
-
-                # 第三重检查：获取锁后再次检查延迟锁状态（双重检查，防止在等待锁期间状态发生变化）
-                if self.is_lock_held(lock_key):
-                    logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {lock_key} 在获取锁后检查发现延迟锁仍持有，跳过发货')
-                    return
-
-                # 第四重检查：获取锁后再次检查冷却状态
-                if not self.can_auto_delivery(order_id):
-                    logger.info(f'[{msg_time}] 【{self.cookie_id}】订单 {order_id} 在获取锁后检查发现仍在冷却期，跳过发货')
-                    return
+        except Exception as e:
+            logger.error(f"统一自动发货处理异常: {self._safe_str(e)}")
 
-                # 构造用户URL
-                user_url = f'https://www.goofish.com/personal?userId={send_user_id}'
+    async def _run_delivery_job(self, job: dict):
+        """执行发货任务：order 规划卡券任务，card 获取内容并发送，notify 更新状态并通知"""
+        if job['kind'] == 'notify':
+            await self._notify_delivery_result(job)
+            return
 
-                # 自动发货逻辑
+        # 处理期间计入待发货数量
+        self.pending_deliveries += 1
+        try:
+            if job['kind'] == 'order':
+                await self._plan_order_delivery(job)
+            else:
+                await self._deliver_card(job)
+        finally:
+            self.pending_deliveries -= 1
+
+    async def _on_delivery_job_finished(self, job: dict, status: str, error: str = None):
+        """发货任务结束回调：规划失败直接通知，卡券任务全部结束后入队结果通知"""
+        payload = job['payload']
+        if job['kind'] == 'order' and status == 'failed':
+            await self.send_delivery_failure_notification(payload['send_user_name'], payload['send_user_id'],
+                                                          payload['item_id'], error, payload['chat_id'])
+        elif job['kind'] == 'card':
+            cards = await asyncio.to_thread(db_manager.get_order_delivery_jobs, job['order_id'], 'card')
+            if all(card['status'] in ('done', 'failed', 'uncertain') for card in cards):
+                await asyncio.to_thread(
+                    db_manager.enqueue_delivery_job, f"delivery:{job['order_id']}:notify", self.cookie_id,
+                    job['order_id'], 'notify', payload, time.time()
+                )
+                self.delivery_pool.notify()
+
+    async def _plan_order_delivery(self, job: dict):
+        """匹配发货规则并按购买数量生成卡券发货任务（按卡券延时设置定时执行）"""
+        payload = job['payload']
+        order_id = job['order_id']
+        item_id = payload['item_id']
+        send_user_id = payload['send_user_id']
+
+        logger.info(f"【{self.cookie_id}】准备自动发货: order_id={order_id}, item_id={item_id}")
+
+        quantity_to_send = await self._get_delivery_quantity(order_id, item_id, send_user_id)
+
+        matched = await self._match_delivery_rule(item_id, order_id=order_id, send_user_id=send_user_id)
+        if not matched:
+            logger.warning(f"【{self.cookie_id}】【自动发货】未找到匹配的发货规则: 订单 {order_id}")
+            raise DeliveryJobError("未找到匹配的发货规则或获取发货内容失败", retry=False)
+        rule, spec_name, spec_value = matched
+
+        await self._save_basic_order_info(order_id, item_id, send_user_id)
+
+        # 延时发货由任务的执行时间实现，不占用消息处理协程
+        delay_seconds = rule.get('card_delay_seconds', 0) or 0
+        if delay_seconds > 0:
+            logger.info(f"检测到发货延时设置: {delay_seconds}秒，卡券任务将延时执行")
+
+        run_at = time.time() + delay_seconds
+        for index in range(1, quantity_to_send + 1):
+            card_payload = {
+                **payload,
+                'rule': rule,
+                'spec_name': spec_name,
+                'spec_value': spec_value,
+                'index': index,
+                'total': quantity_to_send,
+                'confirm': index == 1,  # 第一张卡券发送前确认发货
+            }
+            # 多数量发货时，消息间隔1秒
+            await asyncio.to_thread(
+                db_manager.enqueue_delivery_job, f"delivery:{order_id}:{rule['card_id']}:{index}", self.cookie_id,
+                order_id, 'card', card_payload, run_at + index - 1, True
+            )
+        logger.info(f"【{self.cookie_id}】订单 {order_id} 已生成 {quantity_to_send} 个卡券发货任务")
+        self.delivery_pool.notify()
+
+    async def _deliver_card(self, job: dict):
+        """获取卡券内容并发送（内容在发送前持久化，重试时不会重复消费批量数据）"""
+        payload = job['payload']
+        order_id = job['order_id']
+        rule = payload['rule']
+        item_id = payload['item_id']
+        send_user_id = payload['send_user_id']
+        index, total = payload['index'], payload['total']
+
+        if payload.get('confirm'):
+            await self._auto_confirm_order(order_id, item_id)
+
+        delivery_content = job.get('content')
+        if not delivery_content:
+            delivery_content = await self._fetch_delivery_content(
+                rule, order_id, item_id, send_user_id, payload.get('spec_name'), payload.get('spec_value')
+            )
+            if not delivery_content:
+                raise DeliveryJobError(f"获取发货内容失败: 规则ID={rule['id']}")
+            await asyncio.to_thread(db_manager.update_delivery_job, job['id'], content=delivery_content)
+
+        websocket = self.ws
+        if not websocket or self.connection_state != ConnectionState.CONNECTED:
+            raise DeliveryJobError("WebSocket未连接，等待重连后发送")
+
+        # 标记为发送中：进程在发送过程中中断时不再重发，避免重复发货
+        await asyncio.to_thread(db_manager.update_delivery_job, job['id'], status='sending')
+
+        msg_time = payload['msg_time']
+        user_url = f'https://www.goofish.com/personal?userId={send_user_id}'
+        chat_id = payload['chat_id']
+        # 检查是否是图片发送标记
+        if delivery_content.startswith("__IMAGE_SEND__"):
+            # 提取卡券ID和图片URL
+            image_data = delivery_content.replace("__IMAGE_SEND__", "")
+            if "|" in image_data:
+                card_id_str, image_url = image_data.split("|", 1)
                 try:
-                    # 设置默认标题（将通过API获取真实商品信息）
-                    item_title = "待获取商品信息"
-
-                    logger.info(f"【{self.cookie_id}】准备自动发货: item_id={item_id}, item_title={item_title}")
-
-                    # 检查是否需要多数量发货
-                    from db_manager import db_manager
-                    quantity_to_send = 1  # 默认发送1个
-
-                    # 检查商品是否开启了多数量发货
-                    multi_quantity_delivery = db_manager.get_item_multi_quantity_delivery_status(self.cookie_id, item_id)
-
-                    if multi_quantity_delivery and order_id:
-                        logger.info(f"商品 {item_id} 开启了多数量发货，获取订单详情...")
-                        try:
-                            # 使用现有方法获取订单详情
-                            order_detail = await self.fetch_order_detail_info(order_id, item_id, send_user_id)
-                            if order_detail and order_detail.get('quantity'):
-                                try:
-                                    order_quantity = int(order_detail['quantity'])
-                                    if order_quantity > 1:
-                                        quantity_to_send = order_quantity
-                                        logger.info(f"从订单详情获取数量: {order_quantity}，将发送 {quantity_to_send} 个卡券")
-                                    else:
-                                        logger.info(f"订单数量为 {order_quantity}，发送单个卡券")
-                                except (ValueError, TypeError):
-                                    logger.warning(f"订单数量格式无效: {order_detail.get('quantity')}，发送单个卡券")
-                            else:
-                                logger.info(f"未获取到订单数量信息，发送单个卡券")
-                        except Exception as e:
-                            logger.error(f"获取订单详情失败: {self._safe_str(e)}，发送单个卡券")
-                    elif not multi_quantity_delivery:
-                        logger.info(f"商品 {item_id} 未开启多数量发货，发送单个卡券")
-                    else:
-                        logger.info(f"无订单ID，发送单个卡券")
-
-                    # 多次调用自动发货方法，每次获取不同的内容
-                    delivery_contents = []
-                    success_count = 0
-
-                    for i in range(quantity_to_send):
-                        try:
-                            # 每次调用都可能获取不同的内容（API卡券、批量数据等）
-                            delivery_content = await self._auto_delivery(item_id, item_title, order_id, send_user_id)
-                            if delivery_content:
-                                delivery_contents.append(delivery_content)
-                                success_count += 1
-                                if quantity_to_send > 1:
-                                    logger.info(f"第 {i+1}/{quantity_to_send} 个卡券内容获取成功")
-                            else:
-                                logger.warning(f"第 {i+1}/{quantity_to_send} 个卡券内容获取失败")
-                        except Exception as e:
-                            logger.error(f"第 {i+1}/{quantity_to_send} 个卡券获取异常: {self._safe_str(e)}")
-
-                    if delivery_contents:
-                        # 标记已发货（防重复）- 基于订单ID
-                        self.mark_delivery_sent(order_id)
-
-                        # 标记锁为持有状态，并启动延迟释放任务
-                        self._lock_hold_info[lock_key] = {
-                            'locked': True,
-                            'lock_time': time.time(),
-                            'release_time': None,
-                            'task': None
-                        }
-
-                        # 启动延迟释放锁的异步任务（10分钟后释放）
-                        delay_task = asyncio.create_task(self._delayed_lock_release(lock_key, delay_minutes=10))
-                        self._lock_hold_info[lock_key]['task'] = delay_task
-
-                        # 发送所有获取到的发货内容
-                        for i, delivery_content in enumerate(delivery_contents):
-                            try:
-                                # 检查是否是图片发送标记
-                                if delivery_content.startswith("__IMAGE_SEND__"):
-                                    # 提取卡券ID和图片URL
-                                    image_data = delivery_content.replace("__IMAGE_SEND__", "")
-                                    if "|" in image_data:
-                                        card_id_str, image_url = image_data.split("|", 1)
-                                        try:
-                                            card_id = int(card_id_str)
-                                        except ValueError:
-                                            logger.error(f"无效的卡券ID: {card_id_str}")
-                                            card_id = None
-                                    else:
-                                        # 兼容旧格式（没有卡券ID）
-                                        card_id = None
-                                        image_url = image_data
-
-                                    # 发送图片消息
-                                    await self.send_image_msg(websocket, chat_id, send_user_id, image_url, card_id=card_id)
-                                    if len(delivery_contents) > 1:
-                                        logger.info(f'[{msg_time}] 【多数量自动发货图片】第 {i+1}/{len(delivery_contents)} 张已向 {user_url} 发送图片: {image_url}')
-                                    else:
-                                        logger.info(f'[{msg_time}] 【自动发货图片】已向 {user_url} 发送图片: {image_url}')
+                    card_id = int(card_id_str)
+                except ValueError:
+                    logger.error(f"无效的卡券ID: {card_id_str}")
+                    card_id = None
+            else:
+                # 兼容旧格式（没有卡券ID）
+                card_id = None
+                image_url = image_data
 
-                                    # 多数量发货时，消息间隔1秒
-                                    if len(delivery_contents) > 1 and i < len(delivery_contents) - 1:
-                                        await asyncio.sleep(1)
+            await self.send_image_msg(websocket, chat_id, send_user_id, image_url, card_id=card_id)
+            if total > 1:
+                logger.info(f'[{msg_time}] 【多数量自动发货图片】第 {index}/{total} 张已向 {user_url} 发送图片: {image_url}')
+            else:
+                logger.info(f'[{msg_time}] 【自动发货图片】已向 {user_url} 发送图片: {image_url}')
+        else:
+            await self.send_msg(websocket, chat_id, send_user_id, delivery_content)
+            if total > 1:
+                logger.info(f'[{msg_time}] 【多数量自动发货】第 {index}/{total} 条已向 {user_url} 发送发货内容')
+            else:
+                logger.info(f'[{msg_time}] 【自动发货】已向 {user_url} 发送发货内容')
+
+    async def _notify_delivery_result(self, job: dict):
+        """所有卡券任务结束后更新订单状态并发送发货结果通知"""
+        payload = job['payload']
+        order_id = job['order_id']
+        cards = await asyncio.to_thread(db_manager.get_order_delivery_jobs, order_id, 'card')
+        sent = sum(1 for card in cards if card['status'] == 'done')
+        uncertain = sum(1 for card in cards if card['status'] == 'uncertain')
+        failed = len(cards) - sent - uncertain
+
+        if sent:
+            await self.mark_delivery_sent(order_id)
+
+        if sent and len(cards) == 1:
+            message = "发货成功"
+        elif sent:
+            message = f"多数量发货成功，共发送 {sent} 个卡券"
+        elif not uncertain:
+            message = "未找到匹配的发货规则或获取发货内容失败"
+        else:
+            message = "自动发货结果未知"
+        if failed and sent:
+            message += f"，{failed} 个卡券发送失败"
+        if uncertain:
+            message += f"，{uncertain} 个卡券在进程中断时正在发送，请人工确认是否已送达"
 
-                                else:
-                                    # 普通文本发货内容
-                                    await self.send_msg(websocket, chat_id, send_user_id, delivery_content)
-                                    if len(delivery_contents) > 1:
-                                        logger.info(f'[{msg_time}] 【多数量自动发货】第 {i+1}/{len(delivery_contents)} 条已向 {user_url} 发送发货内容')
-                                    else:
-                                        logger.info(f'[{msg_time}] 【自动发货】已向 {user_url} 发送发货内容')
+        await self.send_delivery_failure_notification(payload['send_user_name'], payload['send_user_id'],
+                                                      payload['item_id'], message, payload['chat_id'])
 
-                                    # 多数量发货时，消息间隔1秒
-                                    if len(delivery_contents) > 1 and i < len(delivery_contents) - 1:
-                                        await asyncio.sleep(1)
+    async def _get_delivery_quantity(self, order_id: str, item_id: str, send_user_id: str) -> int:
+        """获取需要发送的卡券数量（商品开启多数量发货时按订单购买数量发送）"""
+        quantity_to_send = 1  # 默认发送1个
 
-                            except Exception as e:
-                                logger.error(f"发送第 {i+1} 条消息失败: {self._safe_str(e)}")
+        # 检查商品是否开启了多数量发货
+        multi_quantity_delivery = await asyncio.to_thread(db_manager.get_item_multi_quantity_delivery_status, self.cookie_id, item_id)
 
-                        # 发送成功通知
-                        if len(delivery_contents) > 1:
-                            await self.send_delivery_failure_notification(send_user_name, send_user_id, item_id, f"多数量发货成功，共发送 {len(delivery_contents)} 个卡券", chat_id)
+        if multi_quantity_delivery and order_id:
+            logger.info(f"商品 {item_id} 开启了多数量发货，获取订单详情...")
+            try:
+                # 使用现有方法获取订单详情
+                order_detail = await self.fetch_order_detail_info(order_id, item_id, send_user_id)
+                if order_detail and order_detail.get('quantity'):
+                    try:
+                        order_quantity = int(order_detail['quantity'])
+                        if order_quantity > 1:
+                            quantity_to_send = order_quantity
+                            logger.info(f"从订单详情获取数量: {order_quantity}，将发送 {quantity_to_send} 个卡券")
                         else:
-                            await self.send_delivery_failure_notification(send_user_name, send_user_id, item_id, "发货成功", chat_id)
-                    else:
-                        logger.warning(f'[{msg_time}] 【自动发货】未找到匹配的发货规则或获取发货内容失败')
-                        # 发送自动发货失败通知
-                        await self.send_delivery_failure_notification(send_user_name, send_user_id, item_id, "未找到匹配的发货规则或获取发货内容失败", chat_id)
-
-                except Exception as e:
-                    logger.error(f"自动发货处理异常: {self._safe_str(e)}")
-                    # 发送自动发货异常通知
-                    await self.send_delivery_failure_notification(send_user_name, send_user_id, item_id, f"自动发货处理异常: {str(e)}", chat_id)
-
-                logger.info(f'[{msg_time}] 【{self.cookie_id}】订单锁释放: {lock_key}，自动发货处理完成')
-
-        except Exception as e:
-            logger.error(f"统一自动发货处理异常: {self._safe_str(e)}")
+                            logger.info(f"订单数量为 {order_quantity}，发送单个卡券")
+                    except (ValueError, TypeError):
+                        logger.warning(f"订单数量格式无效: {order_detail.get('quantity')}，发送单个卡券")
+                else:
+                    logger.info(f"未获取到订单数量信息，发送单个卡券")
+            except Exception as e:
+                logger.error(f"获取订单详情失败: {self._safe_str(e)}，发送单个卡券")
+        elif not multi_quantity_delivery:
+            logger.info(f"商品 {item_id} 未开启多数量发货，发送单个卡券")
+        else:
+            logger.info(f"无订单ID，发送单个卡券")
 
+        return quantity_to_send
 
 
     async def refresh_token(self, captcha_retry_count: int = 0):
@@ -1330,12 +1254,9 @@ class XianyuLive:
                 account_info = db_manager.get_cookie_details(self.cookie_id)
                 if account_info and account_info.get('cookie_value'):
                     new_cookies_str = account_info.get('cookie_value')
-                    if new_cookies_str != self.cookies_str:
-                        logger.info(f"【{self.cookie_id}】检测到数据库中的cookie已更新，重新加载cookie")
-                        self.cookies_str = new_cookies_str
-                        # 更新cookies字典
-                        self.cookies = trans_cookies(self.cookies_str)
-                        logger.warning(f"【{self.cookie_id}】Cookie已从数据库重新加载")
+                    # 与上次加载/写入的值相同时保留本地尚未写入的Set-Cookie更新
+                    if self.cookie_jar.load(new_cookies_str):
+                        logger.warning(f"【{self.cookie_id}】检测到数据库中的cookie已更新，Cookie已从数据库重新加载")
             except Exception as reload_e:
                 logger.warning(f"【{self.cookie_id}】从数据库重新加载cookie失败，继续使用当前cookie: {self._safe_str(reload_e)}")
 
@@ -1369,7 +1290,7 @@ class XianyuLive:
 
             # 获取token
             token = None
-            token = trans_cookies(self.cookies_str).get('_m_h5_tk', '').split('_')[0] if trans_cookies(self.cookies_str).get('_m_h5_tk') else ''
+            token = self.cookie_jar.h5_token
 
             sign = generate_sign(params['t'], token, data_val)
             params['sign'] = sign
@@ -1423,7 +1344,7 @@ class XianyuLive:
             for key, value in sorted(headers.items()):
                 if key == 'cookie':
                     # Cookie很长，只显示关键信息
-                    cookie_dict = trans_cookies(self.cookies_str)
+                    cookie_dict = self.cookies
                     logger.info(f"【{self.cookie_id}】  {key}: [Cookie字符串，长度: {len(value)}]")
                     logger.info(f"【{self.cookie_id}】    Cookie字段数: {len(cookie_dict)}")
                     logger.info(f"【{self.cookie_id}】    关键字段:")
@@ -1461,22 +1382,9 @@ class XianyuLive:
                     logger.info(f"【{self.cookie_id}】  响应内容: {json.dumps(res_json, ensure_ascii=False, indent=2)}")
                     logger.info(f"【{self.cookie_id}】================================")
 
-                    # 检查并更新Cookie
-                    if 'set-cookie' in response.headers:
-                        new_cookies = {}
-                        for cookie in response.headers.getall('set-cookie', []):
-                            if '=' in cookie:
-                                name, value = cookie.split(';')[0].split('=', 1)
-                                new_cookies[name.strip()] = value.strip()
-
-                        # 更新cookies
-                        if new_cookies:
-                            self.cookies.update(new_cookies)
-                            # 生成新的cookie字符串
-                            self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
-                            # 更新数据库中的Cookie
-                            await self.update_config_cookies()
-                            logger.warning("已更新Cookie到数据库")
+                    # 合并响应中的Set-Cookie，有变化时延迟写入数据库（短时间内的多次更新合并为一次写入）
+                    if self.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                        self.cookie_jar.schedule_persist()
 
                     if isinstance(res_json, dict):
                         ret_value = res_json.get('ret', [])
@@ -1486,6 +1394,8 @@ class XianyuLive:
                                 new_token = res_json['data']['accessToken']
                                 self.current_token = new_token
                                 self.last_token_refresh_time = time.time()
+                                self.token_source = 'refresh'
+                                await self._save_cached_token()
 
                                 # 【消息接收时间重置】Token刷新成功后重置消息接收标志，与 cookie_refresh_loop 保持一致
                                 self.last_message_received_time = 0
@@ -1726,29 +1636,19 @@ class XianyuLive:
             # 使用滑块验证器（独立实例，解决并发冲突）
             try:
                 # 使用集成的滑块验证方法（无需猴子补丁）
-                from utils.xianyu_slider_stealth import XianyuSliderStealth
+                from utils.xianyu_slider_async import AsyncXianyuSliderStealth
                 logger.info(f"【{self.cookie_id}】XianyuSliderStealth导入成功，使用滑块验证")
 
                 # 创建独立的滑块验证实例（每个用户独立实例，避免并发冲突）
-                slider_stealth = XianyuSliderStealth(
-                    # user_id=f"{self.cookie_id}_{int(time.time() * 1000)}",  # 使用唯一ID避免冲突
-                    user_id=f"{self.cookie_id}",  # 使用唯一ID避免冲突
+                slider_stealth = AsyncXianyuSliderStealth(
+                    user_id=f"{self.cookie_id}",
                     enable_learning=True,  # 启用学习功能
-                    headless=True  # 使用无头模式
+                    headless=True,  # 使用无头模式
+                    priority=self._slider_priority()  # 连接断开/有待发货时优先排队
                 )
 
-                # 在线程池中执行滑块验证
-                import asyncio
-                import concurrent.futures
-
-                loop = asyncio.get_event_loop()
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    # 执行滑块验证
-                    success, cookies = await loop.run_in_executor(
-                        executor,
-                        slider_stealth.run,
-                        verification_url
-                    )
+                # 在当前事件循环中执行滑块验证（排队等待槽位时不占用线程）
+                success, cookies = await slider_stealth.run(verification_url)
 
                 if success and cookies:
                     logger.info(f"【{self.cookie_id}】滑块验证成功，获取到新的cookies")
@@ -1926,7 +1826,7 @@ class XianyuLive:
             # 合并cookies：保留原有cookies，只更新新获取到的字段
             try:
                 # 获取当前的cookies字典
-                current_cookies_dict = trans_cookies(self.cookies_str)
+                current_cookies_dict = dict(self.cookies)
                 logger.info(f"【{self.cookie_id}】当前cookies包含 {len(current_cookies_dict)} 个字段")
 
                 # 合并cookies：新cookies覆盖旧cookies中的相同字段
@@ -2021,6 +1921,24 @@ class XianyuLive:
             logger.error(f"【{self.cookie_id}】更新cookies并重启任务时出错: {self._safe_str(e)}")
             return False
 
+    @property
+    def cookies(self):
+        """当前账号的Cookie字典（与账号内其他组件共享）"""
+        return self.cookie_jar.cookies
+
+    @cookies.setter
+    def cookies(self, value):
+        self.cookie_jar.replace(value)
+
+    @property
+    def cookies_str(self):
+        """当前账号的Cookie字符串（内容变化后才重新生成）"""
+        return self.cookie_jar.cookies_str
+
+    @cookies_str.setter
+    def cookies_str(self, value):
+        self.cookie_jar.replace_str(value)
+
     async def update_config_cookies(self):
         """更新数据库中的cookies（不会覆盖账号密码等其他字段）"""
         try:
@@ -2029,18 +1947,12 @@ class XianyuLive:
             # 更新数据库中的Cookie
             if hasattr(self, 'cookie_id') and self.cookie_id:
                 try:
-                    # 获取当前Cookie的用户ID，避免在刷新时改变所有者
-                    current_user_id = None
-                    if hasattr(self, 'user_id') and self.user_id:
-                        current_user_id = self.user_id
-
-                    # 使用 update_cookie_account_info 避免覆盖其他字段（如 username, password, pause_duration, remark 等）
-                    # 这个方法会自动处理新账号和现有账号的情况，不会覆盖账号密码
-                    success = db_manager.update_cookie_account_info(
-                        self.cookie_id, 
-                        cookie_value=self.cookies_str,
-                        user_id=current_user_id  # 如果是新账号，需要提供user_id
-                    )
+                    # 保持正确的所有者关系，避免在刷新时改变所有者
+                    self.cookie_jar.user_id = self.user_id or None
+
+                    # 立即写入并取消待执行的延迟写入，内部使用 update_cookie_account_info，
+                    # 不会覆盖其他字段（如 username, password, pause_duration, remark 等）
+                    success = await self.cookie_jar.flush(force=True)
                     if not success:
                         # 如果更新失败，记录错误但不使用 save_cookie（避免覆盖账号密码）
                         logger.warning(f"更新Cookie到数据库失败: {self.cookie_id}，但不使用save_cookie避免覆盖账号密码")
@@ -2098,10 +2010,8 @@ class XianyuLive:
             # 【重要】先检查数据库中的cookie是否已经更新
             # 如果用户已经手动更新了cookie，就不需要触发密码登录刷新
             db_cookie_value = account_info.get('cookie_value', '')
-            if db_cookie_value and db_cookie_value != self.cookies_str:
-                logger.info(f"【{self.cookie_id}】检测到数据库中的cookie已更新，重新加载cookie")
-                self.cookies_str = db_cookie_value
-                self.cookies = trans_cookies(self.cookies_str)
+            if db_cookie_value and self.cookie_jar.load(db_cookie_value):
+                logger.info(f"【{self.cookie_id}】检测到数据库中的cookie已更新，已重新加载cookie")
                 logger.info(f"【{self.cookie_id}】Cookie已从数据库重新加载，跳过密码登录刷新")
                 return True
             
@@ -2119,7 +2029,7 @@ class XianyuLive:
                 return False
             
             # 使用集成的 Playwright 登录方法（无需猴子补丁）
-            from utils.xianyu_slider_stealth import XianyuSliderStealth
+            from utils.xianyu_slider_async import AsyncXianyuSliderStealth
             browser_mode = "有头" if show_browser else "无头"
             logger.info(f"【{self.cookie_id}】开始使用{browser_mode}浏览器进行密码登录刷新Cookie...")
             logger.info(f"【{self.cookie_id}】使用账号: {username}")
@@ -2135,11 +2045,11 @@ class XianyuLive:
                     verification_url=verification_url
                 )
             
-            # 在单独的线程中运行同步的登录方法
-            import asyncio
-            slider = XianyuSliderStealth(user_id=self.cookie_id, enable_learning=False, headless=not show_browser)
-            result = await asyncio.to_thread(
-                slider.login_with_password_playwright,
+            # 异步执行登录流程，结束时自动关闭浏览器并归还并发槽位
+            slider = AsyncXianyuSliderStealth(user_id=self.cookie_id, enable_learning=False,
+                                              headless=not show_browser, purpose='login',
+                                              priority=self._slider_priority())
+            result = await slider.login_with_password_playwright(
                 account=username,
                 password=password,
                 show_browser=show_browser,
@@ -2326,7 +2236,7 @@ class XianyuLive:
                 
                 # 创建图片上传实例
                 from utils.image_uploader import ImageUploader
-                uploader = ImageUploader(cookies_str=self.cookies_str)
+                uploader = ImageUploader(self.cookie_jar)
                 
                 # 创建session
                 await uploader.create_session()
@@ -2497,249 +2407,110 @@ class XianyuLive:
             logger.error(f"更新商品详情异常: {self._safe_str(e)}")
             return False
 
-    async def fetch_item_detail_from_api(self, item_id: str) -> str:
-        """获取商品详情（使用浏览器获取，支持24小时缓存）
+    async def fetch_item_detail_from_api(self, item_id: str) -> tuple:
+        """获取商品详情（LRU+TTL缓存 -> 数据库 -> 签名接口 -> 浏览器，获取结果写回数据库）
 
         Args:
             item_id: 商品ID
 
         Returns:
-            str: 商品详情文本，获取失败返回空字符串
+            tuple: (商品详情文本, 本次调用是否写入了数据库)，获取失败返回 ("", False)；
+                缓存/数据库命中或由并发的其他调用加载时不写入
         """
+        saved = False
+
+        async def load():
+            nonlocal saved
+            detail, saved = await self._load_item_detail(item_id)
+            return detail
+
         try:
             # 检查是否启用自动获取功能
-            from config import config
-            auto_fetch_config = config.get('ITEM_DETAIL', {}).get('auto_fetch', {})
-
-            if not auto_fetch_config.get('enabled', True):
+            if not ITEM_DETAIL.get('auto_fetch', {}).get('enabled', True):
                 logger.warning(f"自动获取商品详情功能已禁用: {item_id}")
-                return ""
+                return "", False
 
-            # 1. 首先检查缓存（24小时有效）
-            async with self._item_detail_cache_lock:
-                if item_id in self._item_detail_cache:
-                    cache_data = self._item_detail_cache[item_id]
-                    cache_time = cache_data['timestamp']
-                    current_time = time.time()
-
-                    # 检查缓存是否在24小时内
-                    if current_time - cache_time < self._item_detail_cache_ttl:
-                        # 更新访问时间（用于LRU）
-                        cache_data['access_time'] = current_time
-                        logger.info(f"从缓存获取商品详情: {item_id}")
-                        return cache_data['detail']
-                    else:
-                        # 缓存过期，删除
-                        del self._item_detail_cache[item_id]
-                        logger.warning(f"缓存已过期，删除: {item_id}")
-
-            # 2. 尝试使用浏览器获取商品详情
-            detail_from_browser = await self._fetch_item_detail_from_browser(item_id)
-            if detail_from_browser:
-                # 保存到缓存（带大小限制）
-                await self._add_to_item_cache(item_id, detail_from_browser)
-                logger.info(f"成功通过浏览器获取商品详情: {item_id}, 长度: {len(detail_from_browser)}")
-                return detail_from_browser
-
-            # 浏览器获取失败
-            logger.warning(f"浏览器获取商品详情失败: {item_id}")
-            return ""
+            # 首次使用时从数据库预热，重启后无需重新抓取所有商品
+            item_detail_cache.warm_from_db()
+            detail = await item_detail_cache.get_or_load(item_id, load)
+            return detail or "", saved
 
         except Exception as e:
             logger.error(f"获取商品详情异常: {item_id}, 错误: {self._safe_str(e)}")
-            return ""
+            return "", False
 
-    async def _add_to_item_cache(self, item_id: str, detail: str):
-        """添加商品详情到缓存，实现LRU策略和大小限制
-        
-        Args:
-            item_id: 商品ID
-            detail: 商品详情
+    async def _load_item_detail(self, item_id: str) -> tuple:
+        """缓存未命中时加载商品详情，网络获取的结果写回 item_info.item_detail
+
+        Returns:
+            tuple: (商品详情文本, 是否写入了数据库)
         """
-        async with self._item_detail_cache_lock:
-            current_time = time.time()
-            
-            # 检查缓存大小，如果超过限制则清理
-            if len(self._item_detail_cache) >= self._item_detail_cache_max_size:
-                # 使用LRU策略删除最久未访问的项
-                if self._item_detail_cache:
-                    # 找到最久未访问的项
-                    oldest_item = min(
-                        self._item_detail_cache.items(),
-                        key=lambda x: x[1].get('access_time', x[1]['timestamp'])
-                    )
-                    oldest_item_id = oldest_item[0]
-                    del self._item_detail_cache[oldest_item_id]
-                    logger.warning(f"缓存已满，删除最旧项: {oldest_item_id}")
-            
-            # 添加新项到缓存
-            self._item_detail_cache[item_id] = {
-                'detail': detail,
-                'timestamp': current_time,
-                'access_time': current_time
-            }
-            logger.warning(f"添加商品详情到缓存: {item_id}, 当前缓存大小: {len(self._item_detail_cache)}")
+        from db_manager import db_manager
+
+        # 1. 数据库中已有描述（缓存过期或被淘汰）直接使用
+        item_info = db_manager.get_item_info(self.cookie_id, item_id)
+        detail = extract_description(item_info.get('item_detail') if item_info else None)
+        if detail:
+            logger.info(f"从数据库加载商品详情: {item_id}")
+            return detail, False
+
+        # 2. 优先通过签名mtop接口获取（无需浏览器）
+        detail = await self.mtop_detail.fetch_item_detail(item_id)
+        if detail:
+            logger.info(f"成功通过接口获取商品详情: {item_id}, 长度: {len(detail)}")
+        else:
+            # 3. 接口失败（如需要验证）时回退到浏览器获取商品详情
+            detail = await self._fetch_item_detail_from_browser(item_id)
+            if not detail:
+                logger.warning(f"浏览器获取商品详情失败: {item_id}")
+                return "", False
+            logger.info(f"成功通过浏览器获取商品详情: {item_id}, 长度: {len(detail)}")
 
-    @classmethod
-    async def _cleanup_item_cache(cls):
-        """清理过期的商品详情缓存"""
-        try:
-            async with cls._item_detail_cache_lock:
-                # 在持有锁时也要能响应取消信号
-                await asyncio.sleep(0)
-                
-                current_time = time.time()
-                expired_items = []
-                
-                # 找出所有过期的项
-                for item_id, cache_data in cls._item_detail_cache.items():
-                    # 在循环中也要能响应取消信号
-                    await asyncio.sleep(0)
-                    if current_time - cache_data['timestamp'] >= cls._item_detail_cache_ttl:
-                        expired_items.append(item_id)
-                
-                # 删除过期项
-                for item_id in expired_items:
-                    await asyncio.sleep(0)  # 让出控制权
-                    del cls._item_detail_cache[item_id]
-                
-                if expired_items:
-                    logger.info(f"清理了 {len(expired_items)} 个过期的商品详情缓存")
-                
-                return len(expired_items)
-        except asyncio.CancelledError:
-            # 如果被取消，确保锁能正确释放
-            raise
+        # 写回数据库，作为缓存的持久层
+        saved = bool(item_info) and await self.save_item_detail_only(item_id, detail)
+        return detail, saved
 
     async def _fetch_item_detail_from_browser(self, item_id: str) -> str:
-        """使用浏览器获取商品详情"""
-        playwright = None
-        browser = None
+        """使用浏览器获取商品详情（从共享浏览器池租用页面）"""
         try:
-            from playwright.async_api import async_playwright
+            from utils.browser_pool import browser_pool
 
             logger.info(f"开始使用浏览器获取商品详情: {item_id}")
 
-            playwright = await async_playwright().start()
-
-            # 启动浏览器（参照order_detail_fetcher的配置）
-            browser_args = [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI',
-                '--disable-ipc-flooding-protection',
-                '--disable-extensions',
-                '--disable-default-apps',
-                '--disable-sync',
-                '--disable-translate',
-                '--hide-scrollbars',
-                '--mute-audio',
-                '--no-default-browser-check',
-                '--no-pings'
-            ]
-
-            # 在Docker环境中添加额外参数
-            if os.getenv('DOCKER_ENV'):
-                browser_args.extend([
-                    # '--single-process',  # 注释掉，避免多用户并发时的进程冲突和资源泄漏
-                    '--disable-background-networking',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-hang-monitor',
-                    '--disable-popup-blocking',
-                    '--disable-prompt-on-repost',
-                    '--disable-web-resources',
-                    '--metrics-recording-only',
-                    '--safebrowsing-disable-auto-update',
-                    '--enable-automation',
-                    '--password-store=basic',
-                    '--use-mock-keychain'
-                ])
-
-            browser = await playwright.chromium.launch(
-                headless=True,
-                args=browser_args
-            )
-
-            # 创建浏览器上下文
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
-            )
-
-            # 设置Cookie
-            cookies = []
-            for cookie_pair in self.cookies_str.split('; '):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.split('=', 1)
-                    cookies.append({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.goofish.com',
-                        'path': '/'
-                    })
-
-            await context.add_cookies(cookies)
-            logger.warning(f"已设置 {len(cookies)} 个Cookie")
+            async with browser_pool.page(self.cookie_id, self.cookies_str, purpose='item_detail') as page:
+                # 构造商品详情页面URL
+                item_url = f"https://www.goofish.com/item?id={item_id}"
+                logger.info(f"访问商品页面: {item_url}")
 
-            # 创建页面
-            page = await context.new_page()
-
-            # 构造商品详情页面URL
-            item_url = f"https://www.goofish.com/item?id={item_id}"
-            logger.info(f"访问商品页面: {item_url}")
-
-            # 访问页面
-            await page.goto(item_url, wait_until='networkidle', timeout=30000)
+                # 访问页面
+                await page.goto(item_url, wait_until='networkidle', timeout=30000)
 
-            # 等待页面完全加载
-            await asyncio.sleep(3)
+                # 等待页面完全加载
+                await asyncio.sleep(3)
 
-            # 获取商品详情内容
-            detail_text = ""
-            try:
-                # 等待目标元素出现
-                await page.wait_for_selector('.desc--GaIUKUQY', timeout=10000)
-
-                # 获取商品详情文本
-                detail_element = await page.query_selector('.desc--GaIUKUQY')
-                if detail_element:
-                    detail_text = await detail_element.inner_text()
-                    logger.info(f"成功获取商品详情: {item_id}, 长度: {len(detail_text)}")
-                    return detail_text.strip()
-                else:
-                    logger.warning(f"未找到商品详情元素: {item_id}")
+                # 获取商品详情内容
+                detail_text = ""
+                try:
+                    # 等待目标元素出现
+                    await page.wait_for_selector('.desc--GaIUKUQY', timeout=10000)
+
+                    # 获取商品详情文本
+                    detail_element = await page.query_selector('.desc--GaIUKUQY')
+                    if detail_element:
+                        detail_text = await detail_element.inner_text()
+                        logger.info(f"成功获取商品详情: {item_id}, 长度: {len(detail_text)}")
+                        return detail_text.strip()
+                    else:
+                        logger.warning(f"未找到商品详情元素: {item_id}")
 
-            except Exception as e:
-                logger.warning(f"获取商品详情元素失败: {item_id}, 错误: {self._safe_str(e)}")
+                except Exception as e:
+                    logger.warning(f"获取商品详情元素失败: {item_id}, 错误: {self._safe_str(e)}")
 
-            return ""
+                return ""
 
         except Exception as e:
             logger.error(f"浏览器获取商品详情异常: {item_id}, 错误: {self._safe_str(e)}")
             return ""
-        finally:
-            # 确保资源被正确清理
-            try:
-                if browser:
-                    await browser.close()
-                    logger.warning(f"Browser已关闭: {item_id}")
-            except Exception as e:
-                logger.warning(f"关闭browser时出错: {self._safe_str(e)}")
-            
-            try:
-                if playwright:
-                    await playwright.stop()
-                    logger.warning(f"Playwright已停止: {item_id}")
-            except Exception as e:
-                logger.warning(f"停止playwright时出错: {self._safe_str(e)}")
 
 
     async def save_items_list_to_db(self, items_list):
@@ -2813,7 +2584,7 @@ class XianyuLive:
                 if auto_fetch_config.get('enabled', True):
                     logger.info(f"发现 {len(items_need_detail)} 个商品缺少详情，开始获取...")
                     detail_success_count = await self._fetch_missing_item_details(items_need_detail)
-                    logger.info(f"成功获取 {detail_success_count}/{len(items_need_detail)} 个商品的详情")
+                    logger.info(f"成功获取并保存 {detail_success_count}/{len(items_need_detail)} 个商品的详情")
                 else:
                     logger.info(f"发现 {len(items_need_detail)} 个商品缺少详情，但自动获取功能已禁用")
 
@@ -2830,7 +2601,7 @@ class XianyuLive:
             items_need_detail: 需要获取详情的商品列表
 
         Returns:
-            int: 成功获取详情的商品数量
+            int: 获取并写入数据库的商品数量（详情已存在而未写入的不计入）
         """
         success_count = 0
 
@@ -2853,16 +2624,15 @@ class XianyuLive:
                         item_title = item_info['item_title']
 
                         # 获取商品详情
-                        item_detail_text = await self.fetch_item_detail_from_api(item_id)
-
-                        if item_detail_text:
-                            # 保存详情到数据库
-                            success = await self.save_item_detail_only(item_id, item_detail_text)
-                            if success:
-                                logger.info(f"✅ 成功获取并保存商品详情: {item_id} - {item_title}")
-                                return 1
-                            else:
-                                logger.warning(f"❌ 获取详情成功但保存失败: {item_id}")
+                        item_detail_text, saved = await self.fetch_item_detail_from_api(item_id)
+
+                        if saved:
+                            # 获取结果已由缓存加载流程写回数据库
+                            logger.info(f"✅ 成功获取并保存商品详情: {item_id} - {item_title}")
+                            return 1
+                        elif item_detail_text:
+                            logger.info(f"商品详情已存在，无需保存: {item_id} - {item_title}")
+                            return 0
                         else:
                             logger.warning(f"❌ 未能获取商品详情: {item_id} - {item_title}")
 
@@ -2922,7 +2692,7 @@ class XianyuLive:
         }
 
         # 始终从最新的cookies中获取_m_h5_tk token（刷新后cookies会被更新）
-        token = trans_cookies(self.cookies_str).get('_m_h5_tk', '').split('_')[0] if trans_cookies(self.cookies_str).get('_m_h5_tk') else ''
+        token = self.cookie_jar.h5_token
 
         if token:
             logger.warning(f"使用cookies中的_m_h5_tk token: {token}")
@@ -2941,22 +2711,9 @@ class XianyuLive:
             ) as response:
                 res_json = await response.json()
 
-                # 检查并更新Cookie
-                if 'set-cookie' in response.headers:
-                    new_cookies = {}
-                    for cookie in response.headers.getall('set-cookie', []):
-                        if '=' in cookie:
-                            name, value = cookie.split(';')[0].split('=', 1)
-                            new_cookies[name.strip()] = value.strip()
-
-                    # 更新cookies
-                    if new_cookies:
-                        self.cookies.update(new_cookies)
-                        # 生成新的cookie字符串
-                        self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
-                        # 更新数据库中的Cookie
-                        await self.update_config_cookies()
-                        logger.warning("已更新Cookie到数据库")
+                # 合并响应中的Set-Cookie，有变化时延迟写入数据库（短时间内的多次更新合并为一次写入）
+                if self.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                    self.cookie_jar.schedule_persist()
 
                 logger.warning(f"商品信息获取成功: {res_json}")
                 # 检查返回状态
@@ -3282,7 +3039,7 @@ class XianyuLive:
 
                     # 使用图片上传器上传到闲鱼CDN
                     from utils.image_uploader import ImageUploader
-                    uploader = ImageUploader(self.cookies_str)
+                    uploader = ImageUploader(self.cookie_jar)
 
                     async with uploader:
                         cdn_url = await uploader.upload_image(local_image_path)
@@ -3443,9 +3200,9 @@ class XianyuLive:
                     'desc': item_info_raw.get('item_detail', '暂无商品描述')
                 }
 
-            # 生成AI回复
+            # 生成AI回复（经AI请求调度器排队，不阻塞事件循环）
             # 由于外部已实现防抖机制，跳过内部等待（skip_wait=True）
-            reply = ai_reply_engine.generate_reply(
+            reply = await ai_reply_engine.generate_reply_async(
                 message=send_message,
                 item_info=item_info,
                 chat_id=chat_id,
@@ -4320,7 +4077,7 @@ class XianyuLive:
             logger.error(f"发送自动发货通知异常: {self._safe_str(e)}")
 
     async def auto_confirm(self, order_id, item_id=None, retry_count=0):
-        """自动确认发货 - 使用加密模块，不包含延时处理（延时已在_auto_delivery中处理）"""
+        """自动确认发货 - 使用加密模块，不包含延时处理（延时由发货任务的执行时间处理）"""
         try:
             logger.warning(f"【{self.cookie_id}】开始确认发货，订单ID: {order_id}")
 
@@ -4338,12 +4095,7 @@ class XianyuLive:
             # 调用确认方法，传入item_id用于token刷新
             result = await secure_confirm.auto_confirm(order_id, item_id, retry_count)
 
-            # 同步更新后的cookies和token
-            if secure_confirm.cookies_str != self.cookies_str:
-                self.cookies_str = secure_confirm.cookies_str
-                self.cookies = secure_confirm.cookies
-                logger.warning(f"【{self.cookie_id}】已同步确认发货模块更新的cookies")
-
+            # cookies 与确认发货模块共享同一个CookieJar，只需同步token
             if secure_confirm.current_token != self.current_token:
                 self.current_token = secure_confirm.current_token
                 self.last_token_refresh_time = secure_confirm.last_token_refresh_time
@@ -4379,118 +4131,120 @@ class XianyuLive:
             return {"error": f"免拼发货模块调用失败: {self._safe_str(e)}", "order_id": order_id}
 
     async def fetch_order_detail_info(self, order_id: str, item_id: str = None, buyer_id: str = None, debug_headless: bool = None):
-        """获取订单详情信息（使用独立的锁机制，不受延迟锁影响）"""
-        # 使用独立的订单详情锁，不与自动发货锁冲突
-        order_detail_lock = self._order_detail_locks[order_id]
-
-        # 记录订单详情锁的使用时间
-        self._order_detail_lock_times[order_id] = time.time()
+        """获取订单详情信息（同一订单的并发请求共享一次获取和保存，不受延迟锁影响）"""
+        return await self._order_detail_flight.do(
+            order_id,
+            lambda: self._fetch_and_save_order_detail(order_id, item_id, buyer_id, debug_headless)
+        )
+
+    async def _fetch_and_save_order_detail(self, order_id: str, item_id: str = None, buyer_id: str = None, debug_headless: bool = None):
+        """获取订单详情并保存到数据库、更新订单状态"""
+        logger.info(f"🔍 【{self.cookie_id}】开始处理订单详情 {order_id}...")
+        
+        try:
+            logger.info(f"【{self.cookie_id}】开始获取订单详情: {order_id}")
 
-        async with order_detail_lock:
-            logger.info(f"🔍 【{self.cookie_id}】获取订单详情锁 {order_id}，开始处理...")
-            
-            try:
-                logger.info(f"【{self.cookie_id}】开始获取订单详情: {order_id}")
+            # 导入订单详情获取器
+            from utils.order_detail_fetcher import fetch_order_detail_simple
+            from db_manager import db_manager
 
-                # 导入订单详情获取器
-                from utils.order_detail_fetcher import fetch_order_detail_simple
-                from db_manager import db_manager
+            # 获取当前账号的cookie字符串
+            cookie_string = self.cookies_str
+            logger.warning(f"【{self.cookie_id}】使用Cookie长度: {len(cookie_string) if cookie_string else 0}")
 
-                # 获取当前账号的cookie字符串
-                cookie_string = self.cookies_str
-                logger.warning(f"【{self.cookie_id}】使用Cookie长度: {len(cookie_string) if cookie_string else 0}")
+            # 确定是否使用有头模式（调试用）
+            headless_mode = True if debug_headless is None else debug_headless
+            if not headless_mode:
+                logger.info(f"【{self.cookie_id}】🖥️ 启用有头模式进行调试")
 
-                # 确定是否使用有头模式（调试用）
-                headless_mode = True if debug_headless is None else debug_headless
-                if not headless_mode:
-                    logger.info(f"【{self.cookie_id}】🖥️ 启用有头模式进行调试")
+            # 异步获取订单详情（使用当前账号的cookie）
+            # 先走签名mtop接口（一次HTTP请求），需要验证或失败时才启动浏览器；有头调试模式直接用浏览器
+            result = await fetch_order_detail_simple(order_id, cookie_string, headless=headless_mode,
+                                                     cookie_id=self.cookie_id,
+                                                     api_fetcher=self.mtop_detail.fetch_order_detail if headless_mode else None)
 
-                # 异步获取订单详情（使用当前账号的cookie）
-                result = await fetch_order_detail_simple(order_id, cookie_string, headless=headless_mode)
+            if result:
+                logger.info(f"【{self.cookie_id}】订单详情获取成功: {order_id}")
+                logger.info(f"【{self.cookie_id}】页面标题: {result.get('title', '未知')}")
 
-                if result:
-                    logger.info(f"【{self.cookie_id}】订单详情获取成功: {order_id}")
-                    logger.info(f"【{self.cookie_id}】页面标题: {result.get('title', '未知')}")
+                # 获取解析后的规格信息
+                spec_name = result.get('spec_name', '')
+                spec_value = result.get('spec_value', '')
+                quantity = result.get('quantity', '')
+                amount = result.get('amount', '')
 
-                    # 获取解析后的规格信息
-                    spec_name = result.get('spec_name', '')
-                    spec_value = result.get('spec_value', '')
-                    quantity = result.get('quantity', '')
-                    amount = result.get('amount', '')
+                if spec_name and spec_value:
+                    logger.info(f"【{self.cookie_id}】📋 规格名称: {spec_name}")
+                    logger.info(f"【{self.cookie_id}】📝 规格值: {spec_value}")
+                    print(f"🛍️ 【{self.cookie_id}】订单 {order_id} 规格信息: {spec_name} -> {spec_value}")
+                else:
+                    logger.warning(f"【{self.cookie_id}】未获取到有效的规格信息")
+                    print(f"⚠️ 【{self.cookie_id}】订单 {order_id} 规格信息获取失败")
 
-                    if spec_name and spec_value:
-                        logger.info(f"【{self.cookie_id}】📋 规格名称: {spec_name}")
-                        logger.info(f"【{self.cookie_id}】📝 规格值: {spec_value}")
-                        print(f"🛍️ 【{self.cookie_id}】订单 {order_id} 规格信息: {spec_name} -> {spec_value}")
+                # 插入或更新订单信息到数据库
+                try:
+                    # 检查cookie_id是否在cookies表中存在
+                    cookie_info = db_manager.get_cookie_by_id(self.cookie_id)
+                    if not cookie_info:
+                        logger.warning(f"Cookie ID {self.cookie_id} 不存在于cookies表中，丢弃订单 {order_id}")
                     else:
-                        logger.warning(f"【{self.cookie_id}】未获取到有效的规格信息")
-                        print(f"⚠️ 【{self.cookie_id}】订单 {order_id} 规格信息获取失败")
-
-                    # 插入或更新订单信息到数据库
-                    try:
-                        # 检查cookie_id是否在cookies表中存在
-                        cookie_info = db_manager.get_cookie_by_id(self.cookie_id)
-                        if not cookie_info:
-                            logger.warning(f"Cookie ID {self.cookie_id} 不存在于cookies表中，丢弃订单 {order_id}")
+                        # 先保存订单基本信息
+                        success = db_manager.insert_or_update_order(
+                            order_id=order_id,
+                            item_id=item_id,
+                            buyer_id=buyer_id,
+                            spec_name=spec_name,
+                            spec_value=spec_value,
+                            quantity=quantity,
+                            amount=amount,
+                            cookie_id=self.cookie_id,
+                            detail_fetched=not result.get('from_cache', False)
+                        )
+                        
+                        # 使用订单状态处理器设置状态
+                        logger.info(f"【{self.cookie_id}】检查订单状态处理器调用条件: success={success}, handler_exists={self.order_status_handler is not None}")
+                        if success and self.order_status_handler:
+                            logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.handle_order_detail_fetched_status: {order_id}")
+                            try:
+                                handler_result = self.order_status_handler.handle_order_detail_fetched_status(
+                                    order_id=order_id,
+                                    cookie_id=self.cookie_id,
+                                    context="订单详情已拉取"
+                                )
+                                logger.info(f"【{self.cookie_id}】订单状态处理器.handle_order_detail_fetched_status返回结果: {handler_result}")
+                                
+                                # 处理待处理队列
+                                logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.on_order_details_fetched: {order_id}")
+                                await self.order_status_handler.on_order_details_fetched(order_id)
+                                logger.info(f"【{self.cookie_id}】订单状态处理器.on_order_details_fetched调用成功: {order_id}")
+                            except Exception as e:
+                                logger.error(f"【{self.cookie_id}】订单状态处理器调用失败: {self._safe_str(e)}")
+                                import traceback
+                                logger.error(f"【{self.cookie_id}】详细错误信息: {traceback.format_exc()}")
                         else:
-                            # 先保存订单基本信息
-                            success = db_manager.insert_or_update_order(
-                                order_id=order_id,
-                                item_id=item_id,
-                                buyer_id=buyer_id,
-                                spec_name=spec_name,
-                                spec_value=spec_value,
-                                quantity=quantity,
-                                amount=amount,
-                                cookie_id=self.cookie_id
-                            )
-                            
-                            # 使用订单状态处理器设置状态
-                            logger.info(f"【{self.cookie_id}】检查订单状态处理器调用条件: success={success}, handler_exists={self.order_status_handler is not None}")
-                            if success and self.order_status_handler:
-                                logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.handle_order_detail_fetched_status: {order_id}")
-                                try:
-                                    handler_result = self.order_status_handler.handle_order_detail_fetched_status(
-                                        order_id=order_id,
-                                        cookie_id=self.cookie_id,
-                                        context="订单详情已拉取"
-                                    )
-                                    logger.info(f"【{self.cookie_id}】订单状态处理器.handle_order_detail_fetched_status返回结果: {handler_result}")
-                                    
-                                    # 处理待处理队列
-                                    logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.on_order_details_fetched: {order_id}")
-                                    self.order_status_handler.on_order_details_fetched(order_id)
-                                    logger.info(f"【{self.cookie_id}】订单状态处理器.on_order_details_fetched调用成功: {order_id}")
-                                except Exception as e:
-                                    logger.error(f"【{self.cookie_id}】订单状态处理器调用失败: {self._safe_str(e)}")
-                                    import traceback
-                                    logger.error(f"【{self.cookie_id}】详细错误信息: {traceback.format_exc()}")
-                            else:
-                                logger.warning(f"【{self.cookie_id}】订单状态处理器调用条件不满足: success={success}, handler_exists={self.order_status_handler is not None}")
+                            logger.warning(f"【{self.cookie_id}】订单状态处理器调用条件不满足: success={success}, handler_exists={self.order_status_handler is not None}")
 
-                            if success:
-                                logger.info(f"【{self.cookie_id}】订单信息已保存到数据库: {order_id}")
-                                print(f"💾 【{self.cookie_id}】订单 {order_id} 信息已保存到数据库")
-                            else:
-                                logger.warning(f"【{self.cookie_id}】订单信息保存失败: {order_id}")
-
-                    except Exception as db_e:
-                        logger.error(f"【{self.cookie_id}】保存订单信息到数据库失败: {self._safe_str(db_e)}")
+                        if success:
+                            logger.info(f"【{self.cookie_id}】订单信息已保存到数据库: {order_id}")
+                            print(f"💾 【{self.cookie_id}】订单 {order_id} 信息已保存到数据库")
+                        else:
+                            logger.warning(f"【{self.cookie_id}】订单信息保存失败: {order_id}")
 
-                    return result
-                else:
-                    logger.warning(f"【{self.cookie_id}】订单详情获取失败: {order_id}")
-                    return None
+                except Exception as db_e:
+                    logger.error(f"【{self.cookie_id}】保存订单信息到数据库失败: {self._safe_str(db_e)}")
 
-            except Exception as e:
-                logger.error(f"【{self.cookie_id}】获取订单详情异常: {self._safe_str(e)}")
+                return result
+            else:
+                logger.warning(f"【{self.cookie_id}】订单详情获取失败: {order_id}")
                 return None
 
-    async def _auto_delivery(self, item_id: str, item_title: str = None, order_id: str = None, send_user_id: str = None):
-        """自动发货功能 - 获取卡券规则，执行延时，确认发货，发送内容"""
-        try:
-            from db_manager import db_manager
+        except Exception as e:
+            logger.error(f"【{self.cookie_id}】获取订单详情异常: {self._safe_str(e)}")
+            return None
 
+    async def _match_delivery_rule(self, item_id: str, item_title: str = None, order_id: str = None, send_user_id: str = None):
+        """匹配商品的发货规则（多规格商品按订单规格匹配），只有唯一匹配时返回 (规则, 规格名, 规格值)，否则返回None"""
+        try:
             logger.info(f"开始自动发货检查: 商品ID={item_id}")
 
             # 获取商品详细信息
@@ -4515,12 +4269,13 @@ class XianyuLive:
                             if auto_fetch_config.get('enabled', True):
                                 logger.info(f"数据库中商品详情为空，尝试自动获取: {item_id}")
                                 try:
-                                    fetched_detail = await self.fetch_item_detail_from_api(item_id)
+                                    fetched_detail, saved = await self.fetch_item_detail_from_api(item_id)
                                     if fetched_detail:
-                                        # 保存获取到的详情
-                                        await self.save_item_detail_only(item_id, fetched_detail)
                                         item_detail_db = fetched_detail
-                                        logger.info(f"成功获取并保存商品详情: {item_id}")
+                                        if saved:
+                                            logger.info(f"成功获取并保存商品详情: {item_id}")
+                                        else:
+                                            logger.info(f"成功获取商品详情（未写入数据库）: {item_id}")
                                     else:
                                         logger.warning(f"未能获取到商品详情: {item_id}")
                                 except Exception as api_e:
@@ -4658,126 +4413,115 @@ class XianyuLive:
                 else:
                     logger.info(f"✅ 匹配普通发货规则: {rule['keyword']} -> {rule['card_name']} ({rule['card_type']})")
 
-            # 获取延时设置
-            delay_seconds = rule.get('card_delay_seconds', 0)
+            return rule, spec_name, spec_value
 
-            # 执行延时（不管是否确认发货，只要有延时设置就执行）
-            if delay_seconds and delay_seconds > 0:
-                logger.info(f"检测到发货延时设置: {delay_seconds}秒，开始延时...")
-                await asyncio.sleep(delay_seconds)
-                logger.info(f"延时完成")
+        except Exception as e:
+            logger.error(f"匹配发货规则失败: {self._safe_str(e)}")
+            return None
 
-            # 如果有订单ID，执行确认发货
-            if order_id:
-                # 检查是否启用自动确认发货
-                if not self.is_auto_confirm_enabled():
-                    logger.info(f"自动确认发货已关闭，跳过订单 {order_id}")
-                else:
-                    # 检查确认发货冷却时间
-                    current_time = time.time()
-                    should_confirm = True
-
-                    if order_id in self.confirmed_orders:
-                        last_confirm_time = self.confirmed_orders[order_id]
-                        if current_time - last_confirm_time < self.order_confirm_cooldown:
-                            logger.info(f"订单 {order_id} 已在 {self.order_confirm_cooldown} 秒内确认过，跳过重复确认")
-                            should_confirm = False
-
-                    if should_confirm:
-                        logger.info(f"开始自动确认发货: 订单ID={order_id}, 商品ID={item_id}")
-                        confirm_result = await self.auto_confirm(order_id, item_id)
-                        if confirm_result.get('success'):
-                            self.confirmed_orders[order_id] = current_time
-                            logger.info(f"🎉 自动确认发货成功！订单ID: {order_id}")
-                        else:
-                            logger.warning(f"⚠️ 自动确认发货失败: {confirm_result.get('error', '未知错误')}")
-                            # 即使确认发货失败，也继续发送发货内容
+    async def _auto_confirm_order(self, order_id: str, item_id: str):
+        """自动确认发货（未启用或冷却期内跳过，确认失败不影响发送发货内容）"""
+        # 检查是否启用自动确认发货
+        if not self.is_auto_confirm_enabled():
+            logger.info(f"自动确认发货已关闭，跳过订单 {order_id}")
+            return
 
-            # 检查是否存在订单ID，只有存在订单ID才处理发货内容
-            if order_id:
-                # 保存订单基本信息到数据库（如果还没有详细信息）
-                try:
-                    from db_manager import db_manager
+        # 检查确认发货冷却时间
+        current_time = time.time()
+        if order_id in self.confirmed_orders:
+            last_confirm_time = self.confirmed_orders[order_id]
+            if current_time - last_confirm_time < self.order_confirm_cooldown:
+                logger.info(f"订单 {order_id} 已在 {self.order_confirm_cooldown} 秒内确认过，跳过重复确认")
+                return
 
-                    # 检查cookie_id是否在cookies表中存在
-                    cookie_info = db_manager.get_cookie_by_id(self.cookie_id)
-                    if not cookie_info:
-                        logger.warning(f"Cookie ID {self.cookie_id} 不存在于cookies表中，丢弃订单 {order_id}")
-                    else:
-                        existing_order = db_manager.get_order_by_id(order_id)
-                        if not existing_order:
-                            # 插入基本订单信息
-                            success = db_manager.insert_or_update_order(
-                                order_id=order_id,
-                                item_id=item_id,
-                                buyer_id=send_user_id,
-                                cookie_id=self.cookie_id
-                            )
-                            
-                            # 使用订单状态处理器设置状态
-                            if success and self.order_status_handler:
-                                try:
-                                    self.order_status_handler.handle_order_basic_info_status(
-                                        order_id=order_id,
-                                        cookie_id=self.cookie_id,
-                                        context="自动发货-基本信息"
-                                    )
-                                except Exception as e:
-                                    logger.error(f"【{self.cookie_id}】订单状态处理器调用失败: {self._safe_str(e)}")
-                            
-                            if success:
-                                logger.info(f"保存基本订单信息到数据库: {order_id}")
-                except Exception as db_e:
-                    logger.error(f"保存基本订单信息失败: {self._safe_str(db_e)}")
+        logger.info(f"开始自动确认发货: 订单ID={order_id}, 商品ID={item_id}")
+        confirm_result = await self.auto_confirm(order_id, item_id)
+        if confirm_result.get('success'):
+            self.confirmed_orders[order_id] = current_time
+            logger.info(f"🎉 自动确认发货成功！订单ID: {order_id}")
+        else:
+            logger.warning(f"⚠️ 自动确认发货失败: {confirm_result.get('error', '未知错误')}")
+            # 即使确认发货失败，也继续发送发货内容
 
-                # 开始处理发货内容
-                logger.info(f"开始处理发货内容，规则: {rule['keyword']} -> {rule['card_name']} ({rule['card_type']})")
+    async def _save_basic_order_info(self, order_id: str, item_id: str, send_user_id: str):
+        """保存订单基本信息到数据库（如果还没有详细信息）"""
+        try:
+            # 检查cookie_id是否在cookies表中存在
+            cookie_info = db_manager.get_cookie_by_id(self.cookie_id)
+            if not cookie_info:
+                logger.warning(f"Cookie ID {self.cookie_id} 不存在于cookies表中，丢弃订单 {order_id}")
+                return
 
-                delivery_content = None
+            existing_order = db_manager.get_order_by_id(order_id)
+            if existing_order:
+                return
 
-                # 根据卡券类型处理发货内容
-                if rule['card_type'] == 'api':
-                    # API类型：调用API获取内容，传入订单和商品信息用于动态参数替换
-                    delivery_content = await self._get_api_card_content(rule, order_id, item_id, send_user_id, spec_name, spec_value)
-
-                elif rule['card_type'] == 'text':
-                    # 固定文字类型：直接使用文字内容
-                    delivery_content = rule['text_content']
-
-                elif rule['card_type'] == 'data':
-                    # 批量数据类型：获取并消费第一条数据
-                    delivery_content = db_manager.consume_batch_data(rule['card_id'])
-
-                elif rule['card_type'] == 'image':
-                    # 图片类型：返回图片发送标记，包含卡券ID
-                    image_url = rule.get('image_url')
-                    if image_url:
-                        delivery_content = f"__IMAGE_SEND__{rule['card_id']}|{image_url}"
-                        logger.info(f"准备发送图片: {image_url} (卡券ID: {rule['card_id']})")
-                    else:
-                        logger.error(f"图片卡券缺少图片URL: 卡券ID={rule['card_id']}")
-                        delivery_content = None
+            # 插入基本订单信息
+            success = db_manager.insert_or_update_order(
+                order_id=order_id,
+                item_id=item_id,
+                buyer_id=send_user_id,
+                cookie_id=self.cookie_id
+            )
 
-                if delivery_content:
-                    # 处理备注信息和变量替换
-                    final_content = self._process_delivery_content_with_description(delivery_content, rule.get('card_description', ''))
+            # 使用订单状态处理器设置状态
+            if success and self.order_status_handler:
+                try:
+                    await self.order_status_handler.handle_order_basic_info_status(
+                        order_id=order_id,
+                        cookie_id=self.cookie_id,
+                        context="自动发货-基本信息"
+                    )
+                except Exception as e:
+                    logger.error(f"【{self.cookie_id}】订单状态处理器调用失败: {self._safe_str(e)}")
 
-                    # 增加发货次数统计
-                    db_manager.increment_delivery_times(rule['id'])
-                    logger.info(f"自动发货成功: 规则ID={rule['id']}, 内容长度={len(final_content)}")
-                    return final_content
-                else:
-                    logger.warning(f"获取发货内容失败: 规则ID={rule['id']}")
-                    return None
+            if success:
+                logger.info(f"保存基本订单信息到数据库: {order_id}")
+        except Exception as db_e:
+            logger.error(f"保存基本订单信息失败: {self._safe_str(db_e)}")
+
+    async def _fetch_delivery_content(self, rule: dict, order_id: str, item_id: str, send_user_id: str,
+                                      spec_name: str = None, spec_value: str = None):
+        """按卡券类型获取一份发货内容（API卡券、固定文字、批量数据、图片），失败返回None"""
+        logger.info(f"开始处理发货内容，规则: {rule['keyword']} -> {rule['card_name']} ({rule['card_type']})")
+
+        delivery_content = None
+
+        # 根据卡券类型处理发货内容
+        if rule['card_type'] == 'api':
+            # API类型：调用API获取内容，传入订单和商品信息用于动态参数替换
+            delivery_content = await self._get_api_card_content(rule, order_id, item_id, send_user_id, spec_name, spec_value)
+
+        elif rule['card_type'] == 'text':
+            # 固定文字类型：直接使用文字内容
+            delivery_content = rule['text_content']
+
+        elif rule['card_type'] == 'data':
+            # 批量数据类型：获取并消费第一条数据
+            delivery_content = db_manager.consume_batch_data(rule['card_id'])
+
+        elif rule['card_type'] == 'image':
+            # 图片类型：返回图片发送标记，包含卡券ID
+            image_url = rule.get('image_url')
+            if image_url:
+                delivery_content = f"__IMAGE_SEND__{rule['card_id']}|{image_url}"
+                logger.info(f"准备发送图片: {image_url} (卡券ID: {rule['card_id']})")
             else:
-                # 没有订单ID，记录日志但不处理发货内容
-                logger.info(f"⚠️ 未检测到订单ID，跳过发货内容处理。规则: {rule['keyword']} -> {rule['card_name']} ({rule['card_type']})")
-                return None
+                logger.error(f"图片卡券缺少图片URL: 卡券ID={rule['card_id']}")
+                delivery_content = None
 
-        except Exception as e:
-            logger.error(f"自动发货失败: {self._safe_str(e)}")
+        if not delivery_content:
+            logger.warning(f"获取发货内容失败: 规则ID={rule['id']}")
             return None
 
+        # 处理备注信息和变量替换
+        final_content = self._process_delivery_content_with_description(delivery_content, rule.get('card_description', ''))
+
+        # 增加发货次数统计
+        db_manager.increment_delivery_times(rule['id'])
+        logger.info(f"自动发货内容获取成功: 规则ID={rule['id']}, 内容长度={len(final_content)}")
+        return final_content
+
 
 
     def _process_delivery_content_with_description(self, delivery_content: str, card_description: str) -> str:
@@ -4806,107 +4550,29 @@ class XianyuLive:
             # 出错时返回原始发货内容
             return delivery_content
 
-    async def _get_api_card_content(self, rule, order_id=None, item_id=None, buyer_id=None, spec_name=None, spec_value=None, retry_count=0):
-        """调用API获取卡券内容，支持动态参数替换和重试机制"""
-        max_retries = 4
-
-        if retry_count >= max_retries:
-            logger.error(f"API调用失败，已达到最大重试次数({max_retries})")
-            return None
-
+    async def _get_api_card_content(self, rule, order_id=None, item_id=None, buyer_id=None, spec_name=None, spec_value=None):
+        """调用API获取卡券内容，支持动态参数替换；参数不依赖订单且开启预取时优先使用预取内容"""
         try:
-            import aiohttp
-            import json
-
             api_config = rule.get('api_config')
             if not api_config:
                 logger.error(f"API配置为空，规则ID: {rule.get('id')}, 卡券名称: {rule.get('card_name')}")
                 logger.warning(f"规则详情: {rule}")
                 return None
 
-            # 解析API配置
-            if isinstance(api_config, str):
-                api_config = json.loads(api_config)
+            # 解析API配置（按配置内容缓存）
+            config = api_card_client.parse_config(api_config)
 
-            url = api_config.get('url')
-            method = api_config.get('method', 'GET').upper()
-            timeout = api_config.get('timeout', 10)
-            headers = api_config.get('headers', '{}')
-            params = api_config.get('params', '{}')
-
-            # 解析headers和params
-            if isinstance(headers, str):
-                headers = json.loads(headers)
-            if isinstance(params, str):
-                params = json.loads(params)
+            if config.prefetchable:
+                content = await api_card_client.take_prefetched(rule['card_id'], config)
+                if content:
+                    return content
 
+            params = config.params
             # 如果是POST请求且有动态参数，进行参数替换
-            if method == 'POST' and params:
+            if config.dynamic:
                 params = await self._replace_api_dynamic_params(params, order_id, item_id, buyer_id, spec_name, spec_value)
 
-            retry_info = f" (重试 {retry_count + 1}/{max_retries})" if retry_count > 0 else ""
-            logger.info(f"调用API获取卡券: {method} {url}{retry_info}")
-            if method == 'POST' and params:
-                logger.warning(f"POST请求参数: {json.dumps(params, ensure_ascii=False)}")
-
-            # 确保session存在
-            if not self.session:
-                await self.create_session()
-
-            # 发起HTTP请求
-            timeout_obj = aiohttp.ClientTimeout(total=timeout)
-
-            if method == 'GET':
-                async with self.session.get(url, headers=headers, params=params, timeout=timeout_obj) as response:
-                    status_code = response.status
-                    response_text = await response.text()
-            elif method == 'POST':
-                async with self.session.post(url, headers=headers, json=params, timeout=timeout_obj) as response:
-                    status_code = response.status
-                    response_text = await response.text()
-            else:
-                logger.error(f"不支持的HTTP方法: {method}")
-                return None
-
-            if status_code == 200:
-                # 尝试解析JSON响应，如果失败则使用原始文本
-                try:
-                    result = json.loads(response_text)
-                    # 如果返回的是对象，尝试提取常见的内容字段
-                    if isinstance(result, dict):
-                        content = result.get('data') or result.get('content') or result.get('card') or str(result)
-                    else:
-                        content = str(result)
-                except:
-                    content = response_text
-
-                logger.info(f"API调用成功，返回内容长度: {len(content)}")
-                return content
-            else:
-                logger.warning(f"API调用失败: {status_code} - {response_text[:200]}...")
-
-                # 如果是服务器错误(5xx)或请求超时，进行重试
-                if status_code >= 500 or status_code == 408:
-                    if retry_count < max_retries - 1:
-                        wait_time = (retry_count + 1) * 2  # 递增等待时间: 2s, 4s, 6s
-                        logger.info(f"等待 {wait_time} 秒后重试...")
-                        await asyncio.sleep(wait_time)
-                        return await self._get_api_card_content(rule, order_id, item_id, buyer_id, spec_name, spec_value, retry_count + 1)
-
-                return None
-
-        except (aiohttp.ClientTimeout, aiohttp.ClientError) as e:
-            logger.warning(f"API调用网络异常: {self._safe_str(e)}")
-
-            # 网络异常也进行重试
-            if retry_count < max_retries - 1:
-                wait_time = (retry_count + 1) * 2  # 递增等待时间
-                logger.info(f"等待 {wait_time} 秒后重试...")
-                await asyncio.sleep(wait_time)
-                return await self._get_api_card_content(rule, order_id, item_id, buyer_id, spec_name, spec_value, retry_count + 1)
-            else:
-                logger.error(f"API调用网络异常，已达到最大重试次数: {self._safe_str(e)}")
-                return None
+            return await api_card_client.fetch(config, params)
 
         except Exception as e:
             logger.error(f"API调用异常: {self._safe_str(e)}")
@@ -5029,75 +4695,63 @@ class XianyuLive:
             return obj
 
     async def token_refresh_loop(self):
-        """Token刷新循环"""
+        """Token刷新：注册到全局刷新调度器，由调度器按截止时间统一触发，任务取消时注销"""
+        first_delay = max(0.0, self.last_token_refresh_time + self.token_refresh_interval - time.time())
+        job = refresh_scheduler.register('token', self.cookie_id, self._scheduled_token_refresh, first_delay)
         try:
-            while True:
-                try:
-                    # 检查账号是否启用
-                    from cookie_manager import manager as cookie_manager
-                    if cookie_manager and not cookie_manager.get_cookie_status(self.cookie_id):
-                        logger.info(f"【{self.cookie_id}】账号已禁用，停止Token刷新循环")
-                        break
-
-                    current_time = time.time()
-                    if current_time - self.last_token_refresh_time >= self.token_refresh_interval:
-                        logger.info("Token即将过期，准备刷新...")
-                        new_token = await self.refresh_token()
-                        if new_token:
-                            logger.info(f"【{self.cookie_id}】Token刷新成功，将关闭WebSocket以使用新Token重连")
-                            
-                            # Token刷新成功后，需要关闭WebSocket连接，让它用新Token重新连接
-                            # 原因：WebSocket连接建立时使用的是旧Token，新Token需要重新建立连接才能生效
-                            # 注意：只关闭WebSocket，不重启整个实例（后台任务继续运行）
-                            
-                            # 关闭当前WebSocket连接
-                            if self.ws and not self.ws.closed:
-                                try:
-                                    logger.info(f"【{self.cookie_id}】关闭当前WebSocket连接以使用新Token重连...")
-                                    await self.ws.close()
-                                    logger.info(f"【{self.cookie_id}】WebSocket连接已关闭，将自动重连")
-                                except Exception as close_e:
-                                    logger.warning(f"【{self.cookie_id}】关闭WebSocket时出错: {self._safe_str(close_e)}")
-                            
-                            # 退出Token刷新循环，让main循环重新建立连接
-                            # 后台任务（心跳、清理等）继续运行
-                            logger.info(f"【{self.cookie_id}】Token刷新完成，WebSocket将使用新Token重新连接")
-                            break
-                        else:
-                            # 根据上一次刷新状态决定日志级别（冷却/已重启为正常情况）
-                            if getattr(self, 'last_token_refresh_status', None) in ("skipped_cooldown", "restarted_after_cookie_refresh"):
-                                logger.info(f"【{self.cookie_id}】Token刷新未执行或已重启（正常），将在{self.token_retry_interval // 60}分钟后重试")
-                            else:
-                                logger.error(f"【{self.cookie_id}】Token刷新失败，将在{self.token_retry_interval // 60}分钟后重试")
-
-                            # 清空当前token，确保下次重试时重新获取
-                            self.current_token = None
-
-                            # 发送Token刷新失败通知
-                            await self.send_token_refresh_notification("Token定时刷新失败，将自动重试", "token_scheduled_refresh_failed")
-                            await self._interruptible_sleep(self.token_retry_interval)
-                            continue
-                    await self._interruptible_sleep(60)
-                except asyncio.CancelledError:
-                    # 收到取消信号，立即退出循环
-                    logger.info(f"【{self.cookie_id}】Token刷新循环收到取消信号，准备退出")
-                    raise
-                except Exception as e:
-                    logger.error(f"Token刷新循环出错: {self._safe_str(e)}")
-                    # 出错后也等待1分钟再重试，使用可中断的sleep
-                    try:
-                        await self._interruptible_sleep(60)
-                    except asyncio.CancelledError:
-                        logger.info(f"【{self.cookie_id}】Token刷新循环在重试等待时收到取消信号，准备退出")
-                        raise
+            await job.wait_finished()
         except asyncio.CancelledError:
-            # 确保CancelledError被正确传播
             logger.info(f"【{self.cookie_id}】Token刷新循环已取消，正在退出...")
             raise
         finally:
-            # 确保任务能正常结束
+            refresh_scheduler.unregister(job)
             logger.info(f"【{self.cookie_id}】Token刷新循环已退出")
 
+    async def _scheduled_token_refresh(self):
+        """由刷新调度器调用：返回 (下次刷新间隔秒数, 是否成功)，账号禁用时返回None停止调度"""
+        # 检查账号是否启用
+        from cookie_manager import manager as cookie_manager
+        if cookie_manager and not cookie_manager.get_cookie_status(self.cookie_id):
+            logger.info(f"【{self.cookie_id}】账号已禁用，停止Token刷新循环")
+            return None
+
+        # 连接初始化等流程可能已经刷新过Token，按新的截止时间重新排期
+        remaining = self.last_token_refresh_time + self.token_refresh_interval - time.time()
+        if remaining > 0:
+            return remaining, True
+
+        logger.info("Token即将过期，准备刷新...")
+        new_token = await self.refresh_token()
+        if new_token:
+            logger.info(f"【{self.cookie_id}】Token刷新成功，将关闭WebSocket以使用新Token重连")
+
+            # Token刷新成功后，需要关闭WebSocket连接，让它用新Token重新连接
+            # 原因：WebSocket连接建立时使用的是旧Token，新Token需要重新建立连接才能生效
+            # 注意：只关闭WebSocket，不重启整个实例（后台任务继续运行）
+            if self.ws and not self.ws.closed:
+                try:
+                    logger.info(f"【{self.cookie_id}】关闭当前WebSocket连接以使用新Token重连...")
+                    await self.ws.close()
+                    logger.info(f"【{self.cookie_id}】WebSocket连接已关闭，将自动重连")
+                except Exception as close_e:
+                    logger.warning(f"【{self.cookie_id}】关闭WebSocket时出错: {self._safe_str(close_e)}")
+
+            logger.info(f"【{self.cookie_id}】Token刷新完成，WebSocket将使用新Token重新连接")
+            return self.token_refresh_interval, True
+
+        # 根据上一次刷新状态决定日志级别（冷却/已重启为正常情况）
+        if getattr(self, 'last_token_refresh_status', None) in ("skipped_cooldown", "restarted_after_cookie_refresh"):
+            logger.info(f"【{self.cookie_id}】Token刷新未执行或已重启（正常），将在{self.token_retry_interval // 60}分钟后重试")
+        else:
+            logger.error(f"【{self.cookie_id}】Token刷新失败，将在{self.token_retry_interval // 60}分钟后重试")
+
+        # 清空当前token，确保下次重试时重新获取
+        self.current_token = None
+
+        # 发送Token刷新失败通知
+        await self.send_token_refresh_notification("Token定时刷新失败，将自动重试", "token_scheduled_refresh_failed")
+        return self.token_retry_interval, False
+
     async def create_chat(self, ws, toid, item_id='891198795482'):
         msg = {
             "lwp": "/r/SingleChatConversation/create",
@@ -5167,14 +4821,52 @@ class XianyuLive:
         }
         await ws.send(json.dumps(msg))
 
+    async def _load_cached_token(self):
+        """启动时复用缓存中未过期的Token（连同获取时的device_id），连接初始化时跳过刷新"""
+        if self.current_token:
+            return
+        try:
+            cached = await asyncio.to_thread(token_cache.load, self.cookie_id, self.myid)
+        except Exception as e:
+            logger.warning(f"【{self.cookie_id}】读取Token缓存失败: {self._safe_str(e)}")
+            return
+        if not cached:
+            return
+        self.current_token = cached['token']
+        self.last_token_refresh_time = cached['refreshed_at']
+        self.device_id = cached['device_id']
+        self.token_source = 'cache'
+        remaining_minutes = int((cached['expires_at'] - time.time()) // 60)
+        logger.info(f"【{self.cookie_id}】已加载缓存Token，剩余有效期约 {remaining_minutes} 分钟")
+
+    async def _save_cached_token(self):
+        """加密保存刚刷新的Token，失败不影响刷新结果"""
+        try:
+            await asyncio.to_thread(token_cache.save, self.cookie_id, self.myid, self.device_id,
+                                    self.current_token, self.last_token_refresh_time)
+        except Exception as e:
+            logger.warning(f"【{self.cookie_id}】保存Token缓存失败: {self._safe_str(e)}")
+
+    def _record_time_to_connected(self):
+        """记录实例启动到首次连接就绪的耗时"""
+        if self.time_to_connected is not None:
+            return
+        self.time_to_connected = time.time() - self.instance_started_at
+        token_source = self.token_source or 'refresh'
+        token_cache.record_connected(self.cookie_id, self.time_to_connected, token_source)
+        source_text = '缓存' if token_source == 'cache' else '刷新'
+        logger.info(f"【{self.cookie_id}】启动到连接就绪耗时 {self.time_to_connected:.2f} 秒（Token来源: {source_text}）")
+
     async def init(self, ws):
-        # 如果没有token或者token过期，获取新token
+        # 如果没有token或者token过期，获取新token（启动时已加载未过期的缓存Token则跳过）
         token_refresh_attempted = False
         if not self.current_token or (time.time() - self.last_token_refresh_time) >= self.token_refresh_interval:
             logger.info(f"【{self.cookie_id}】获取初始token...")
             token_refresh_attempted = True
 
             await self.refresh_token()
+        elif self.token_source == 'cache':
+            logger.info(f"【{self.cookie_id}】使用缓存Token，跳过Token刷新")
 
         if not self.current_token:
             logger.error("无法获取有效token，初始化失败")
@@ -5321,20 +5013,31 @@ class XianyuLive:
                     pause_manager.cleanup_expired_pauses()
                     await asyncio.sleep(0)  # 让出控制权，允许检查取消信号
 
-                    # 清理过期的锁（每5分钟清理一次，保留24小时内的锁）
-                    self.cleanup_expired_locks(max_age_hours=24)
-                    await asyncio.sleep(0)  # 让出控制权，允许检查取消信号
-
                     # 清理过期的商品详情缓存
                     try:
-                        cleaned_count = await self._cleanup_item_cache()
+                        cleaned_count = item_detail_cache.cleanup_expired()
                         if cleaned_count > 0:
                             logger.info(f"【{self.cookie_id}】清理了 {cleaned_count} 个过期的商品详情缓存")
-                    except asyncio.CancelledError:
-                        raise
                     except Exception as cache_clean_e:
                         logger.warning(f"【{self.cookie_id}】清理商品详情缓存时出错: {cache_clean_e}")
 
+                    # 处理已到重试时间的待处理订单状态更新，并清理过期的待处理记录（索引范围查询/删除）
+                    if self.order_status_handler:
+                        try:
+                            await self.order_status_handler.process_all_pending_updates(cookie_id=self.cookie_id)
+                            await asyncio.to_thread(self.order_status_handler.clear_old_pending_updates)
+                        except Exception as pending_clean_e:
+                            logger.warning(f"【{self.cookie_id}】处理待处理订单状态更新时出错: {pending_clean_e}")
+
+                    # 清理长期未使用/超出总大小的浏览器用户数据目录（全局按间隔执行一次）
+                    try:
+                        from utils.browser_profiles import browser_profiles
+                        removed_profiles = await asyncio.to_thread(browser_profiles.maybe_cleanup)
+                        if removed_profiles > 0:
+                            logger.info(f"【{self.cookie_id}】清理了 {removed_profiles} 个浏览器用户数据目录")
+                    except Exception as profile_clean_e:
+                        logger.warning(f"【{self.cookie_id}】清理浏览器用户数据目录时出错: {profile_clean_e}")
+
                     # 清理过期的通知、发货和订单确认记录（防止内存泄漏）
                     self._cleanup_instance_caches()
                     await asyncio.sleep(0)  # 让出控制权，允许检查取消信号
@@ -5420,63 +5123,59 @@ class XianyuLive:
 
 
     async def cookie_refresh_loop(self):
-        """Cookie刷新定时任务 - 每小时执行一次"""
+        """Cookie刷新：注册到全局刷新调度器（首次刷新在分散窗口内随机排期），任务取消时注销"""
+        first_delay = max(0.0, self.last_cookie_refresh_time + self.cookie_refresh_interval - time.time())
+        if not self.last_cookie_refresh_time:
+            first_delay = random.uniform(0, refresh_scheduler.initial_spread)
+        job = refresh_scheduler.register('cookie', self.cookie_id, self._scheduled_cookie_refresh, first_delay)
         try:
-            while True:
-                try:
-                    # 检查账号是否启用
-                    from cookie_manager import manager as cookie_manager
-                    if cookie_manager and not cookie_manager.get_cookie_status(self.cookie_id):
-                        logger.info(f"【{self.cookie_id}】账号已禁用，停止Cookie刷新循环")
-                        break
-
-                    # 检查Cookie刷新功能是否启用
-                    if not self.cookie_refresh_enabled:
-                        logger.warning(f"【{self.cookie_id}】Cookie刷新功能已禁用，跳过执行")
-                        await self._interruptible_sleep(300)  # 5分钟后再检查
-                        continue
-
-                    current_time = time.time()
-                    if current_time - self.last_cookie_refresh_time >= self.cookie_refresh_interval:
-                        # 检查是否在消息接收后的冷却时间内
-                        time_since_last_message = current_time - self.last_message_received_time
-                        if time_since_last_message < self.message_cookie_refresh_cooldown:
-                            remaining_time = self.message_cookie_refresh_cooldown - time_since_last_message
-                            remaining_minutes = int(remaining_time // 60)
-                            remaining_seconds = int(remaining_time % 60)
-                            logger.warning(f"【{self.cookie_id}】收到消息后冷却中，还需等待 {remaining_minutes}分{remaining_seconds}秒 才能执行Cookie刷新")
-                        # 检查是否已有Cookie刷新任务在执行
-                        elif self.cookie_refresh_lock.locked():
-                            logger.warning(f"【{self.cookie_id}】Cookie刷新任务已在执行中，跳过本次触发")
-                        else:
-                            logger.info(f"【{self.cookie_id}】开始执行Cookie刷新任务...")
-                            # 在独立的任务中执行Cookie刷新，避免阻塞主循环
-                            asyncio.create_task(self._execute_cookie_refresh(current_time))
-
-                    # 每分钟检查一次是否需要执行
-                    await self._interruptible_sleep(60)
-                except asyncio.CancelledError:
-                    # 收到取消信号，立即退出循环
-                    logger.info(f"【{self.cookie_id}】Cookie刷新循环收到取消信号，准备退出")
-                    raise
-                except Exception as e:
-                    logger.error(f"【{self.cookie_id}】Cookie刷新循环失败: {self._safe_str(e)}")
-                    # 出错后也等待1分钟再重试，使用可中断的sleep
-                    try:
-                        await self._interruptible_sleep(60)
-                    except asyncio.CancelledError:
-                        logger.info(f"【{self.cookie_id}】Cookie刷新循环在重试等待时收到取消信号，准备退出")
-                        raise
+            await job.wait_finished()
         except asyncio.CancelledError:
-            # 确保CancelledError被正确传播
             logger.info(f"【{self.cookie_id}】Cookie刷新循环已取消，正在退出...")
             raise
         finally:
-            # 确保任务能正常结束
+            refresh_scheduler.unregister(job)
             logger.info(f"【{self.cookie_id}】Cookie刷新循环已退出")
 
-    async def _execute_cookie_refresh(self, current_time):
-        """独立执行Cookie刷新任务，避免阻塞主循环"""
+    async def _scheduled_cookie_refresh(self):
+        """由刷新调度器调用：返回 (下次检查间隔秒数, 是否成功)，账号禁用时返回None停止调度"""
+        # 检查账号是否启用
+        from cookie_manager import manager as cookie_manager
+        if cookie_manager and not cookie_manager.get_cookie_status(self.cookie_id):
+            logger.info(f"【{self.cookie_id}】账号已禁用，停止Cookie刷新循环")
+            return None
+
+        # 检查Cookie刷新功能是否启用
+        if not self.cookie_refresh_enabled:
+            logger.warning(f"【{self.cookie_id}】Cookie刷新功能已禁用，跳过执行")
+            return 300, True  # 5分钟后再检查
+
+        current_time = time.time()
+        remaining = self.last_cookie_refresh_time + self.cookie_refresh_interval - current_time
+        if remaining > 0:
+            return remaining, True
+
+        # 检查是否在消息接收后的冷却时间内
+        time_since_last_message = current_time - self.last_message_received_time
+        if time_since_last_message < self.message_cookie_refresh_cooldown:
+            remaining_time = self.message_cookie_refresh_cooldown - time_since_last_message
+            remaining_minutes = int(remaining_time // 60)
+            remaining_seconds = int(remaining_time % 60)
+            logger.warning(f"【{self.cookie_id}】收到消息后冷却中，还需等待 {remaining_minutes}分{remaining_seconds}秒 才能执行Cookie刷新")
+            return remaining_time, True
+
+        # 检查是否已有Cookie刷新任务在执行
+        if self.cookie_refresh_lock.locked():
+            logger.warning(f"【{self.cookie_id}】Cookie刷新任务已在执行中，跳过本次触发")
+            return 60, True
+
+        logger.info(f"【{self.cookie_id}】开始执行Cookie刷新任务...")
+        success = await self._execute_cookie_refresh(current_time)
+        return self.cookie_refresh_interval, success
+
+    async def _execute_cookie_refresh(self, current_time) -> bool:
+        """执行Cookie刷新任务，返回是否刷新成功"""
+        success = False
 
         # 使用Lock确保原子性，防止重复执行
         async with self.cookie_refresh_lock:
@@ -5556,6 +5255,8 @@ class XianyuLive:
                 self.last_message_received_time = 0
                 logger.warning(f"【{self.cookie_id}】Cookie刷新完成，已清空消息接收标志")
 
+        return bool(success)
+
 
 
     def enable_cookie_refresh(self, enabled: bool = True):
@@ -5576,14 +5277,13 @@ class XianyuLive:
         Returns:
             bool: 成功返回True，失败返回False
         """
-        playwright = None
-        browser = None
+        browser_lease = AsyncExitStack()
         target_cookie_id = cookie_id or self.cookie_id
         target_user_id = user_id or self.user_id
 
         try:
             import asyncio
-            from playwright.async_api import async_playwright
+            from utils.browser_pool import browser_pool, parse_cookie_string
             from utils.xianyu_utils import trans_cookies
 
             logger.info(f"【{target_cookie_id}】开始使用扫码登录cookie获取真实cookie...")
@@ -5593,134 +5293,11 @@ class XianyuLive:
             qr_cookies_dict = trans_cookies(qr_cookies_str)
             logger.info(f"【{target_cookie_id}】扫码cookie字段数: {len(qr_cookies_dict)}")
 
-            # Docker环境下修复asyncio子进程问题
-            is_docker = os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv')
-
-            if is_docker:
-                logger.warning(f"【{target_cookie_id}】检测到Docker环境，应用asyncio修复")
-
-                # 创建一个完整的虚拟子进程监视器
-                class DummyChildWatcher:
-                    def __enter__(self):
-                        return self
-                    def __exit__(self, *args):
-                        pass
-                    def is_active(self):
-                        return True
-                    def add_child_handler(self, *args, **kwargs):
-                        pass
-                    def remove_child_handler(self, *args, **kwargs):
-                        pass
-                    def attach_loop(self, *args, **kwargs):
-                        pass
-                    def close(self):
-                        pass
-                    def __del__(self):
-                        pass
-
-                # 创建自定义事件循环策略
-                class DockerEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
-                    def get_child_watcher(self):
-                        return DummyChildWatcher()
-
-                # 临时设置策略
-                old_policy = asyncio.get_event_loop_policy()
-                asyncio.set_event_loop_policy(DockerEventLoopPolicy())
-
-                try:
-                    # 添加超时机制，避免无限等待
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                    logger.warning(f"【{target_cookie_id}】Docker环境下Playwright启动成功")
-                except asyncio.TimeoutError:
-                    logger.error(f"【{target_cookie_id}】Docker环境下Playwright启动超时")
-                    return False
-                finally:
-                    # 恢复原策略
-                    asyncio.set_event_loop_policy(old_policy)
-            else:
-                # 非Docker环境，正常启动（也添加超时保护）
-                try:
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"【{target_cookie_id}】Playwright启动超时")
-                    return False
-
-            # 启动浏览器（参照商品搜索的配置）
-            browser_args = [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI',
-                '--disable-ipc-flooding-protection',
-                '--disable-extensions',
-                '--disable-default-apps',
-                '--disable-sync',
-                '--disable-translate',
-                '--hide-scrollbars',
-                '--mute-audio',
-                '--no-default-browser-check',
-                '--no-pings'
-            ]
-
-            # 在Docker环境中添加额外参数
-            if os.getenv('DOCKER_ENV'):
-                browser_args.extend([
-                    # '--single-process',  # 注释掉，避免多用户并发时的进程冲突和资源泄漏
-                    '--disable-background-networking',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-hang-monitor',
-                    '--disable-popup-blocking',
-                    '--disable-prompt-on-repost',
-                    '--disable-web-resources',
-                    '--metrics-recording-only',
-                    '--safebrowsing-disable-auto-update',
-                    '--enable-automation',
-                    '--password-store=basic',
-                    '--use-mock-keychain'
-                ])
-
-            # 使用无头浏览器
-            browser = await playwright.chromium.launch(
-                headless=True,  # 改回无头模式
-                args=browser_args
+            # 从共享浏览器池租用隔离的上下文（Cookie刷新需要干净的Cookie环境，用完即关闭）
+            context = await browser_lease.enter_async_context(
+                browser_pool.isolated_context(qr_cookies_str, purpose='cookie_refresh', owner=target_cookie_id)
             )
-
-            # 创建浏览器上下文
-            context_options = {
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
-            }
-
-            # 使用标准窗口大小
-            context_options['viewport'] = {'width': 1920, 'height': 1080}
-
-            context = await browser.new_context(**context_options)
-
-            # 设置扫码登录获取的Cookie
-            cookies = []
-            for cookie_pair in qr_cookies_str.split('; '):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.split('=', 1)
-                    cookies.append({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.goofish.com',
-                        'path': '/'
-                    })
-
-            await context.add_cookies(cookies)
+            cookies = parse_cookie_string(qr_cookies_str)
             logger.info(f"【{target_cookie_id}】已设置 {len(cookies)} 个扫码Cookie到浏览器")
 
             # 打印设置的扫码Cookie详情
@@ -5895,9 +5472,9 @@ class XianyuLive:
                 logger.info(f"【{target_cookie_id}】真实Cookie已成功保存到数据库")
 
                 # 如果当前实例的cookie_id匹配，更新实例的cookie信息
+                # 同步到该账号共享的CookieJar（当前实例的cookie_id匹配时即更新实例的cookie信息）
+                cookie_jars.load(target_cookie_id, real_cookies_str)
                 if target_cookie_id == self.cookie_id:
-                    self.cookies = real_cookies_dict
-                    self.cookies_str = real_cookies_str
                     logger.info(f"【{target_cookie_id}】已更新当前实例的Cookie信息")
 
                 # 更新扫码登录Cookie刷新时间标志
@@ -5913,44 +5490,11 @@ class XianyuLive:
             logger.error(f"【{target_cookie_id}】使用扫码cookie获取真实cookie失败: {self._safe_str(e)}")
             return False
         finally:
-            # 确保资源清理
+            # 归还浏览器池租约（关闭本次使用的上下文，浏览器进程继续常驻）
             try:
-                # 先关闭浏览器，再关闭Playwright（顺序很重要）
-                if browser:
-                    try:
-                        await asyncio.wait_for(browser.close(), timeout=5.0)
-                        logger.warning(f"【{target_cookie_id}】浏览器关闭完成")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"【{target_cookie_id}】浏览器关闭超时（5秒），资源可能未完全释放")
-                        # 尝试取消浏览器相关的任务
-                        try:
-                            if hasattr(browser, '_connection'):
-                                browser._connection = None
-                        except:
-                            pass
-                    except Exception as e:
-                        logger.warning(f"【{target_cookie_id}】关闭浏览器时出错: {self._safe_str(e)}")
-                
-                # Playwright关闭：使用更短的超时，超时后立即放弃
-                if playwright:
-                    try:
-                        logger.warning(f"【{target_cookie_id}】正在关闭Playwright...")
-                        await asyncio.wait_for(playwright.stop(), timeout=2.0)
-                        logger.warning(f"【{target_cookie_id}】Playwright关闭完成")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"【{target_cookie_id}】Playwright关闭超时（2秒），进程可能仍在运行")
-                        logger.warning(f"【{target_cookie_id}】提示：如果后续Playwright启动失败，可能需要手动清理残留进程")
-                        # 尝试清理Playwright的内部状态
-                        try:
-                            # 取消可能正在运行的Playwright任务
-                            if hasattr(playwright, '_transport'):
-                                playwright._transport = None
-                        except:
-                            pass
-                    except Exception as e:
-                        logger.warning(f"【{target_cookie_id}】关闭Playwright时出错: {self._safe_str(e)}")
+                await browser_lease.aclose()
             except Exception as cleanup_e:
-                logger.warning(f"【{target_cookie_id}】清理浏览器资源时出错: {self._safe_str(cleanup_e)}")
+                logger.warning(f"【{target_cookie_id}】释放浏览器资源时出错: {self._safe_str(cleanup_e)}")
 
     async def _refresh_cookies_via_browser_page(self, current_cookies_str: str):
         """使用当前cookie访问指定页面获取真实cookie并更新
@@ -5964,12 +5508,17 @@ class XianyuLive:
         Returns:
             bool: 成功返回True，失败返回False
         """
-        playwright = None
-        browser = None
+        browser_lease = AsyncExitStack()
+        refresh_start = time.perf_counter()
+        page = None
+        persistent = False
+        verification = False
+        refreshed = False
 
         try:
             import asyncio
-            from playwright.async_api import async_playwright
+            from utils.browser_pool import browser_pool, parse_cookie_string
+            from utils.browser_profiles import is_verification_page
             from utils.xianyu_utils import trans_cookies
 
             logger.info(f"【{self.cookie_id}】开始使用当前cookie访问指定页面获取真实cookie...")
@@ -5979,134 +5528,12 @@ class XianyuLive:
             current_cookies_dict = trans_cookies(current_cookies_str)
             logger.info(f"【{self.cookie_id}】当前cookie字段数: {len(current_cookies_dict)}")
 
-            # Docker环境下修复asyncio子进程问题
-            is_docker = os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv')
-
-            if is_docker:
-                logger.warning(f"【{self.cookie_id}】检测到Docker环境，应用asyncio修复")
-
-                # 创建一个完整的虚拟子进程监视器
-                class DummyChildWatcher:
-                    def __enter__(self):
-                        return self
-                    def __exit__(self, *args):
-                        pass
-                    def is_active(self):
-                        return True
-                    def add_child_handler(self, *args, **kwargs):
-                        pass
-                    def remove_child_handler(self, *args, **kwargs):
-                        pass
-                    def attach_loop(self, *args, **kwargs):
-                        pass
-                    def close(self):
-                        pass
-                    def __del__(self):
-                        pass
-
-                # 创建自定义事件循环策略
-                class DockerEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
-                    def get_child_watcher(self):
-                        return DummyChildWatcher()
-
-                # 临时设置策略
-                old_policy = asyncio.get_event_loop_policy()
-                asyncio.set_event_loop_policy(DockerEventLoopPolicy())
-
-                try:
-                    # 添加超时机制，避免无限等待
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                    logger.warning(f"【{self.cookie_id}】Docker环境下Playwright启动成功")
-                except asyncio.TimeoutError:
-                    logger.error(f"【{self.cookie_id}】Docker环境下Playwright启动超时")
-                    return False
-                finally:
-                    # 恢复原策略
-                    asyncio.set_event_loop_policy(old_policy)
-            else:
-                # 非Docker环境，正常启动（也添加超时保护）
-                try:
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"【{self.cookie_id}】Playwright启动超时")
-                    return False
-
-            # 启动浏览器（参照商品搜索的配置）
-            browser_args = [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI',
-                '--disable-ipc-flooding-protection',
-                '--disable-extensions',
-                '--disable-default-apps',
-                '--disable-sync',
-                '--disable-translate',
-                '--hide-scrollbars',
-                '--mute-audio',
-                '--no-default-browser-check',
-                '--no-pings'
-            ]
-
-            # 在Docker环境中添加额外参数
-            if os.getenv('DOCKER_ENV'):
-                browser_args.extend([
-                    '--disable-background-networking',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-hang-monitor',
-                    '--disable-popup-blocking',
-                    '--disable-prompt-on-repost',
-                    '--disable-web-resources',
-                    '--metrics-recording-only',
-                    '--safebrowsing-disable-auto-update',
-                    '--enable-automation',
-                    '--password-store=basic',
-                    '--use-mock-keychain'
-                ])
-
-            # 使用无头浏览器
-            browser = await playwright.chromium.launch(
-                headless=True,
-                args=browser_args
+            # 使用账号持久化的浏览器用户数据目录（未启用或被占用时为一次性隔离上下文），用完即关闭
+            context, persistent = await browser_lease.enter_async_context(
+                browser_pool.profile_context(self.cookie_id, current_cookies_str, purpose='cookie_refresh')
             )
-
-            # 创建浏览器上下文
-            context_options = {
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
-            }
-
-            # 使用标准窗口大小
-            context_options['viewport'] = {'width': 1920, 'height': 1080}
-
-            context = await browser.new_context(**context_options)
-
-            # 设置当前的Cookie
-            cookies = []
-            for cookie_pair in current_cookies_str.split('; '):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.split('=', 1)
-                    cookies.append({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.goofish.com',
-                        'path': '/'
-                    })
-
-            await context.add_cookies(cookies)
-            logger.info(f"【{self.cookie_id}】已设置 {len(cookies)} 个当前Cookie到浏览器")
+            cookies = parse_cookie_string(current_cookies_str)
+            logger.info(f"【{self.cookie_id}】已设置 {len(cookies)} 个当前Cookie到浏览器（{'持久化目录' if persistent else '临时环境'}）")
 
             # 创建页面
             page = await context.new_page()
@@ -6156,6 +5583,10 @@ class XianyuLive:
                     raise e
             await asyncio.sleep(1)
 
+            verification = is_verification_page(page.url, await page.title())
+            if verification:
+                logger.warning(f"【{self.cookie_id}】页面要求验证: {page.url}")
+
             # 获取更新后的真实Cookie
             logger.info(f"【{self.cookie_id}】获取真实Cookie...")
             updated_cookies = await context.cookies()
@@ -6204,6 +5635,7 @@ class XianyuLive:
 
             if update_success:
                 logger.info(f"【{self.cookie_id}】通过访问指定页面成功更新Cookie并重启任务")
+                refreshed = True
                 return True
             else:
                 logger.error(f"【{self.cookie_id}】更新Cookie或重启任务失败")
@@ -6213,30 +5645,13 @@ class XianyuLive:
             logger.error(f"【{self.cookie_id}】使用当前cookie访问指定页面获取真实cookie失败: {self._safe_str(e)}")
             return False
         finally:
-            # 确保资源清理
+            # 归还浏览器池租约（关闭本次使用的上下文，浏览器进程继续常驻）
             try:
-                # 先关闭浏览器，再关闭Playwright（顺序很重要）
-                if browser:
-                    try:
-                        await asyncio.wait_for(browser.close(), timeout=5.0)
-                        logger.warning(f"【{self.cookie_id}】浏览器关闭完成")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"【{self.cookie_id}】浏览器关闭超时（5秒），资源可能未完全释放")
-                    except Exception as e:
-                        logger.warning(f"【{self.cookie_id}】关闭浏览器时出错: {self._safe_str(e)}")
-                
-                # Playwright关闭：使用更短的超时，超时后立即放弃
-                if playwright:
-                    try:
-                        logger.warning(f"【{self.cookie_id}】正在关闭Playwright...")
-                        await asyncio.wait_for(playwright.stop(), timeout=2.0)
-                        logger.warning(f"【{self.cookie_id}】Playwright关闭完成")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"【{self.cookie_id}】Playwright关闭超时（2秒），进程可能仍在运行")
-                    except Exception as e:
-                        logger.warning(f"【{self.cookie_id}】关闭Playwright时出错: {self._safe_str(e)}")
+                await browser_lease.aclose()
             except Exception as cleanup_e:
-                logger.warning(f"【{self.cookie_id}】清理浏览器资源时出错: {self._safe_str(cleanup_e)}")
+                logger.warning(f"【{self.cookie_id}】释放浏览器资源时出错: {self._safe_str(cleanup_e)}")
+            if page is not None:
+                self._record_browser_refresh(refresh_start, persistent, verification, refreshed)
 
     def reset_qr_cookie_refresh_flag(self):
         """重置扫码登录Cookie刷新标志，允许立即执行_refresh_cookies_via_browser"""
@@ -6258,11 +5673,16 @@ class XianyuLive:
         """
 
 
-        playwright = None
-        browser = None
+        browser_lease = AsyncExitStack()
+        refresh_start = time.perf_counter()
+        page = None
+        persistent = False
+        verification = False
+        refreshed = False
         try:
             import asyncio
-            from playwright.async_api import async_playwright
+            from utils.browser_pool import browser_pool, parse_cookie_string
+            from utils.browser_profiles import is_verification_page
 
             # 检查是否需要等待扫码登录Cookie刷新的冷却时间
             current_time = time.time()
@@ -6281,135 +5701,12 @@ class XianyuLive:
             logger.info(f"【{self.cookie_id}】刷新前Cookie长度: {len(self.cookies_str)}")
             logger.info(f"【{self.cookie_id}】刷新前Cookie字段数: {len(self.cookies)}")
 
-            # Docker环境下修复asyncio子进程问题
-            is_docker = os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv')
-
-            if is_docker:
-                logger.warning(f"【{self.cookie_id}】检测到Docker环境，应用asyncio修复")
-
-                # 创建一个完整的虚拟子进程监视器
-                class DummyChildWatcher:
-                    def __enter__(self):
-                        return self
-                    def __exit__(self, *args):
-                        pass
-                    def is_active(self):
-                        return True
-                    def add_child_handler(self, *args, **kwargs):
-                        pass
-                    def remove_child_handler(self, *args, **kwargs):
-                        pass
-                    def attach_loop(self, *args, **kwargs):
-                        pass
-                    def close(self):
-                        pass
-                    def __del__(self):
-                        pass
-
-                # 创建自定义事件循环策略
-                class DockerEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
-                    def get_child_watcher(self):
-                        return DummyChildWatcher()
-
-                # 临时设置策略
-                old_policy = asyncio.get_event_loop_policy()
-                asyncio.set_event_loop_policy(DockerEventLoopPolicy())
-
-                try:
-                    # 添加超时机制，避免无限等待
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                    logger.warning(f"【{self.cookie_id}】Docker环境下Playwright启动成功")
-                except asyncio.TimeoutError:
-                    logger.error(f"【{self.cookie_id}】Docker环境下Playwright启动超时")
-                    return False
-                finally:
-                    # 恢复原策略
-                    asyncio.set_event_loop_policy(old_policy)
-            else:
-                # 非Docker环境，正常启动（也添加超时保护）
-                try:
-                    playwright = await asyncio.wait_for(
-                        async_playwright().start(),
-                        timeout=30.0  # 30秒超时
-                    )
-                except asyncio.TimeoutError:
-                    logger.error(f"【{self.cookie_id}】Playwright启动超时")
-                    return False
-
-            # 启动浏览器（参照商品搜索的配置）
-            browser_args = [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--no-first-run',
-                '--no-zygote',
-                '--disable-gpu',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI',
-                '--disable-ipc-flooding-protection',
-                '--disable-extensions',
-                '--disable-default-apps',
-                '--disable-sync',
-                '--disable-translate',
-                '--hide-scrollbars',
-                '--mute-audio',
-                '--no-default-browser-check',
-                '--no-pings'
-            ]
-
-            # 在Docker环境中添加额外参数
-            if os.getenv('DOCKER_ENV'):
-                browser_args.extend([
-                    # '--single-process',  # 注释掉，避免多用户并发时的进程冲突和资源泄漏
-                    '--disable-background-networking',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-hang-monitor',
-                    '--disable-popup-blocking',
-                    '--disable-prompt-on-repost',
-                    '--disable-web-resources',
-                    '--metrics-recording-only',
-                    '--safebrowsing-disable-auto-update',
-                    '--enable-automation',
-                    '--password-store=basic',
-                    '--use-mock-keychain'
-                ])
-
-            # Cookie刷新模式使用无头浏览器
-            browser = await playwright.chromium.launch(
-                headless=True,
-                args=browser_args
+            # 使用账号持久化的浏览器用户数据目录（未启用或被占用时为一次性隔离上下文），用完即关闭
+            context, persistent = await browser_lease.enter_async_context(
+                browser_pool.profile_context(self.cookie_id, self.cookies_str, purpose='cookie_refresh')
             )
-
-            # 创建浏览器上下文
-            context_options = {
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
-            }
-
-            # 使用标准窗口大小
-            context_options['viewport'] = {'width': 1920, 'height': 1080}
-
-            context = await browser.new_context(**context_options)
-
-            # 设置当前Cookie
-            cookies = []
-            for cookie_pair in self.cookies_str.split('; '):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.split('=', 1)
-                    cookies.append({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.goofish.com',
-                        'path': '/'
-                    })
-
-            await context.add_cookies(cookies)
-            logger.info(f"【{self.cookie_id}】已设置 {len(cookies)} 个Cookie到浏览器")
+            cookies = parse_cookie_string(self.cookies_str)
+            logger.info(f"【{self.cookie_id}】已设置 {len(cookies)} 个Cookie到浏览器（{'持久化目录' if persistent else '临时环境'}）")
 
             # 创建页面
             page = await context.new_page()
@@ -6480,6 +5777,9 @@ class XianyuLive:
             # 获取并打印当前页面标题
             page_title = await page.title()
             logger.info(f"【{self.cookie_id}】当前页面标题: {page_title}")
+            verification = is_verification_page(page.url, page_title)
+            if verification:
+                logger.warning(f"【{self.cookie_id}】页面要求验证: {page.url}")
 
             # 构造新的Cookie字典
             new_cookies_dict = {}
@@ -6496,9 +5796,8 @@ class XianyuLive:
                 elif old_value != new_value:
                     changed_cookies.append(name)
 
-            # 更新self.cookies和cookies_str
+            # 更新self.cookies（cookies_str 随之重新生成）
             self.cookies.update(new_cookies_dict)
-            self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
 
             logger.info(f"【{self.cookie_id}】Cookie已更新，包含 {len(new_cookies_dict)} 个字段")
 
@@ -6531,6 +5830,7 @@ class XianyuLive:
 
             # 更新数据库中的Cookie
             await self.update_config_cookies()
+            refreshed = True
 
             # 只有当由refresh_token触发时才设置浏览器Cookie刷新成功标志
             if triggered_by_refresh_token:
@@ -6563,145 +5863,21 @@ class XianyuLive:
             logger.error(f"【{self.cookie_id}】通过浏览器刷新Cookie失败: {self._safe_str(e)}")
             return False
         finally:
-            # 异步关闭浏览器：创建清理任务并等待完成，确保资源正确释放
-            close_task = None
+            # 归还浏览器池租约（关闭本次使用的上下文，浏览器进程继续常驻）
             try:
-                if browser or playwright:
-                    # 创建关闭任务
-                    close_task = asyncio.create_task(
-                        self._async_close_browser(browser, playwright)
-                    )
-                    logger.info(f"【{self.cookie_id}】浏览器异步关闭任务已启动")
-                    
-                    # 等待关闭任务完成，但设置超时避免阻塞太久
-                    try:
-                        await asyncio.wait_for(close_task, timeout=15.0)
-                        logger.info(f"【{self.cookie_id}】浏览器关闭任务已完成")
-                    except asyncio.TimeoutError:
-                        logger.warning(f"【{self.cookie_id}】浏览器关闭任务超时（15秒），强制继续")
-                        # 取消任务，避免资源泄漏
-                        if not close_task.done():
-                            close_task.cancel()
-                            try:
-                                await close_task
-                            except (asyncio.CancelledError, Exception):
-                                pass
-                    except Exception as wait_e:
-                        logger.warning(f"【{self.cookie_id}】等待浏览器关闭任务时出错: {self._safe_str(wait_e)}")
-                        # 确保任务被取消
-                        if close_task and not close_task.done():
-                            close_task.cancel()
-                            try:
-                                await close_task
-                            except (asyncio.CancelledError, Exception):
-                                pass
+                await browser_lease.aclose()
             except Exception as cleanup_e:
-                logger.warning(f"【{self.cookie_id}】创建浏览器关闭任务时出错: {self._safe_str(cleanup_e)}")
-                # 如果创建任务失败，尝试直接关闭
-                if browser or playwright:
-                    try:
-                        await self._force_close_resources(browser, playwright)
-                    except Exception:
-                        pass
-
-    async def _async_close_browser(self, browser, playwright):
-        """异步关闭：正常关闭，超时后强制关闭"""
-        try:
-            logger.info(f"【{self.cookie_id}】开始异步关闭浏览器...")  # 改为info级别
-            
-            # 正常关闭，设置超时
-            await asyncio.wait_for(
-                self._normal_close_resources(browser, playwright),
-                timeout=10.0
-            )
-            logger.info(f"【{self.cookie_id}】浏览器正常关闭完成")  # 改为info级别
-            
-        except asyncio.TimeoutError:
-            logger.warning(f"【{self.cookie_id}】正常关闭超时，开始强制关闭...")
-            await self._force_close_resources(browser, playwright)
-            
-        except Exception as e:
-            logger.warning(f"【{self.cookie_id}】异步关闭时出错，强制关闭: {self._safe_str(e)}")
-            await self._force_close_resources(browser, playwright)
-
-    async def _normal_close_resources(self, browser, playwright):
-        """正常关闭资源：浏览器+Playwright短超时关闭"""
-        try:
-            # 先关闭浏览器，再关闭Playwright
-            if browser:
-                try:
-                    # 关闭浏览器，设置超时
-                    await asyncio.wait_for(browser.close(), timeout=5.0)
-                    logger.info(f"【{self.cookie_id}】浏览器关闭完成")
-                except asyncio.TimeoutError:
-                    logger.warning(f"【{self.cookie_id}】浏览器关闭超时，尝试强制关闭")
-                    try:
-                        # 尝试强制关闭
-                        if hasattr(browser, '_connection'):
-                            browser._connection.dispose()
-                    except Exception:
-                        pass
-                except Exception as e:
-                    logger.warning(f"【{self.cookie_id}】关闭浏览器时出错: {e}")
-            
-            # 关闭Playwright：使用短超时，如果超时就放弃
-            if playwright:
-                try:
-                    logger.info(f"【{self.cookie_id}】正在关闭Playwright...")
-                    # 增加超时时间，确保Playwright有足够时间清理资源
-                    await asyncio.wait_for(playwright.stop(), timeout=5.0)
-                    logger.info(f"【{self.cookie_id}】Playwright关闭完成")
-                except asyncio.TimeoutError:
-                    logger.warning(f"【{self.cookie_id}】Playwright关闭超时，将自动清理")
-                    # 尝试强制清理Playwright的内部连接
-                    try:
-                        if hasattr(playwright, '_connection'):
-                            playwright._connection.dispose()
-                    except Exception:
-                        pass
-                except Exception as e:
-                    logger.warning(f"【{self.cookie_id}】关闭Playwright时出错: {e}")
-                
-        except Exception as e:
-            logger.error(f"【{self.cookie_id}】正常关闭时出现异常: {e}")
-            raise
-
-    
-    async def _force_close_resources(self, browser, playwright):
-        """强制关闭资源：强制关闭浏览器+Playwright超时等待"""
-        try:
-            logger.warning(f"【{self.cookie_id}】开始强制关闭资源...")
-            
-            # 强制关闭浏览器+Playwright，设置短超时
-            force_tasks = []
-            if browser:
-                force_tasks.append(asyncio.wait_for(browser.close(), timeout=3.0))
-            if playwright:
-                force_tasks.append(asyncio.wait_for(playwright.stop(), timeout=3.0))
-            
-            if force_tasks:
-                # 使用gather执行，所有失败都会被忽略
-                results = await asyncio.gather(*force_tasks, return_exceptions=True)
-                
-                # 检查是否有超时或异常，尝试强制清理
-                for i, result in enumerate(results):
-                    if isinstance(result, (asyncio.TimeoutError, Exception)):
-                        resource_name = "浏览器" if i == 0 and browser else "Playwright"
-                        logger.warning(f"【{self.cookie_id}】{resource_name}强制关闭失败，尝试直接清理连接")
-                        try:
-                            if i == 0 and browser and hasattr(browser, '_connection'):
-                                browser._connection.dispose()
-                            elif playwright and hasattr(playwright, '_connection'):
-                                playwright._connection.dispose()
-                        except Exception:
-                            pass
-                
-                logger.info(f"【{self.cookie_id}】强制关闭完成")
-            else:
-                logger.info(f"【{self.cookie_id}】没有需要强制关闭的资源")
-            
-        except Exception as e:
-            logger.warning(f"【{self.cookie_id}】强制关闭时出现异常（已忽略）: {e}")
+                logger.warning(f"【{self.cookie_id}】释放浏览器资源时出错: {self._safe_str(cleanup_e)}")
+            if page is not None:
+                self._record_browser_refresh(refresh_start, persistent, verification, refreshed)
+
+    def _record_browser_refresh(self, refresh_start: float, persistent: bool, verification: bool, refreshed: bool):
+        """记录浏览器Cookie刷新的耗时和验证情况（按是否使用持久化目录分别统计）"""
+        from utils.browser_profiles import browser_profiles
+        duration = time.perf_counter() - refresh_start
+        browser_profiles.record_run('cookie_refresh', persistent, duration, verification, refreshed)
+        logger.info(f"【{self.cookie_id}】浏览器Cookie刷新耗时 {duration:.1f}秒（{'持久化目录' if persistent else '临时环境'}，"
+                    f"{'触发验证' if verification else '未触发验证'}）")
 
     async def send_msg_once(self, toid, item_id, text):
         headers = {
@@ -7187,7 +6363,7 @@ class XianyuLive:
                                             logger.info(f"【{self.cookie_id}】准备上传默认回复本地图片到闲鱼CDN: {local_image_path}")
                                             
                                             from utils.image_uploader import ImageUploader
-                                            uploader = ImageUploader(self.cookies_str)
+                                            uploader = ImageUploader(self.cookie_jar)
                                             
                                             async with uploader:
                                                 cdn_url = await uploader.upload_image(local_image_path)
@@ -7374,7 +6550,7 @@ class XianyuLive:
                     if self.order_status_handler:
                         logger.info(f"【{self.cookie_id}】准备调用订单状态处理器.on_order_id_extracted: {order_id}")
                         try:
-                            self.order_status_handler.on_order_id_extracted(order_id, self.cookie_id, message)
+                            await self.order_status_handler.on_order_id_extracted(order_id, self.cookie_id, message)
                             logger.info(f"【{self.cookie_id}】订单状态处理器.on_order_id_extracted调用成功: {order_id}")
                         except Exception as e:
                             logger.error(f"【{self.cookie_id}】通知订单状态处理器订单ID提取失败: {self._safe_str(e)}")
@@ -7561,7 +6737,7 @@ class XianyuLive:
                 try:
                     # 处理系统消息的订单状态更新
                     try:
-                        handled = self.order_status_handler.handle_system_message(
+                        handled = await self.order_status_handler.handle_system_message(
                             message=message,
                             send_message=send_message,
                             cookie_id=self.cookie_id,
@@ -7580,7 +6756,7 @@ class XianyuLive:
                                 
                                 if red_reminder:
                                     try:
-                                        self.order_status_handler.handle_red_reminder_message(
+                                        await self.order_status_handler.handle_red_reminder_message(
                                             message=message,
                                             red_reminder=red_reminder,
                                             user_id=user_id,
@@ -7636,8 +6812,8 @@ class XianyuLive:
             elif self._is_auto_delivery_trigger(send_message):
                 logger.info(f'[{msg_time}] 【{self.cookie_id}】检测到自动发货触发消息，即使在暂停期间也继续处理: {send_message}')
                 # 使用统一的自动发货处理方法
-                await self._handle_auto_delivery(websocket, message, send_user_name, send_user_id,
-                                               item_id, chat_id, msg_time)
+                await self._handle_auto_delivery(message, send_user_name, send_user_id,
+                                                 item_id, chat_id, msg_time)
                 return
             # 【重要】检查是否为"我已小刀，待刀成"卡片消息 - 即使在人工接入暂停期间也要处理
             elif send_message == '[卡片消息]':
@@ -7709,8 +6885,8 @@ class XianyuLive:
                             logger.info(f'[{msg_time}] 【{self.cookie_id}】✅ 自动免拼发货成功')
                         else:
                             logger.warning(f'[{msg_time}] 【{self.cookie_id}】❌ 自动免拼发货失败: {result.get("error", "未知错误")}')
-                        await self._handle_auto_delivery(websocket, message, send_user_name, send_user_id,
-                                                       item_id, chat_id, msg_time)
+                        await self._handle_auto_delivery(message, send_user_name, send_user_id,
+                                                         item_id, chat_id, msg_time)
                         return
                     else:
                         logger.info(f'[{msg_time}] 【{self.cookie_id}】收到卡片消息，标题: {card_title or "未知"}')
@@ -7743,6 +6919,7 @@ class XianyuLive:
             logger.info(f"【{self.cookie_id}】开始启动XianyuLive主程序...")
             await self.create_session()  # 创建session
             logger.info(f"【{self.cookie_id}】Session创建完成，开始WebSocket连接循环...")
+            await self._load_cached_token()
 
             while True:
                 try:
@@ -7773,6 +6950,7 @@ class XianyuLive:
                             self._set_connection_state(ConnectionState.CONNECTED, "初始化完成，连接就绪")
                             self.connection_failures = 0
                             self.last_successful_connection = time.time()
+                            self._record_time_to_connected()
 
                             # 记录后台任务启动前的状态
                             logger.warning(f"【{self.cookie_id}】准备启动后台任务 - 当前状态: heartbeat={self.heartbeat_task}, token_refresh={self.token_refresh_task}, cleanup={self.cleanup_task}, cookie_refresh={self.cookie_refresh_task}")
@@ -7810,6 +6988,11 @@ class XianyuLive:
                             else:
                                 logger.info(f"【{self.cookie_id}】Cookie刷新任务已在运行，跳过启动")
 
+                            # 自动发货工作池只在首次连接时启动（启动时恢复中断的发货任务）
+                            if not self.delivery_pool.running:
+                                await self.delivery_pool.start()
+                                tasks_started.append("自动发货")
+
                             # 记录所有后台任务状态
                             if tasks_started:
                                 logger.info(f"【{self.cookie_id}】✅ 新启动的任务: {', '.join(tasks_started)}")
@@ -7949,6 +7132,10 @@ class XianyuLive:
                         if self.current_token:
                             logger.warning(f"【{self.cookie_id}】清空当前token，重新连接时将重新获取")
                             self.current_token = None
+                            # 缓存的Token可能已失效，删除后由下次刷新重新写入
+                            if self.token_source == 'cache':
+                                await asyncio.to_thread(token_cache.invalidate, self.cookie_id)
+                            self.token_source = None
 
                         # 直接重置任务引用，不等待取消（快速重连方案）
                         # 这样可以避免等待任务取消导致的阻塞问题
@@ -8079,6 +7266,12 @@ class XianyuLive:
                 self.cleanup_task = None
                 self.cookie_refresh_task = None
             
+            # 停止自动发货工作池（未完成的任务保留在数据库中，下次启动时恢复）
+            try:
+                await asyncio.wait_for(self.delivery_pool.stop(), timeout=10.0)
+            except Exception as e:
+                logger.error(f"【{self.cookie_id}】停止自动发货工作池失败: {self._safe_str(e)}")
+
             # 清理所有后台任务
             if self.background_tasks:
                 logger.info(f"【{self.cookie_id}】等待 {len(self.background_tasks)} 个后台任务完成...")
@@ -8089,7 +7282,13 @@ class XianyuLive:
                     )
                 except asyncio.TimeoutError:
                     logger.warning(f"【{self.cookie_id}】后台任务清理超时，强制继续")
-            
+
+            # 立即写入尚在延迟窗口内的Cookie变化
+            try:
+                await asyncio.wait_for(self.cookie_jar.flush(), timeout=5.0)
+            except Exception as e:
+                logger.error(f"【{self.cookie_id}】退出前保存Cookie失败: {self._safe_str(e)}")
+
             # 确保关闭session
             await self.close_session()
 
@@ -8140,7 +7339,7 @@ class XianyuLive:
         }
 
         # 始终从最新的cookies中获取_m_h5_tk token（刷新后cookies会被更新）
-        token = trans_cookies(self.cookies_str).get('_m_h5_tk', '').split('_')[0] if trans_cookies(self.cookies_str).get('_m_h5_tk') else ''
+        token = self.cookie_jar.h5_token
 
         logger.warning(f"准备获取商品列表，token: {token}")
         if token:
@@ -8161,22 +7360,9 @@ class XianyuLive:
             ) as response:
                 res_json = await response.json()
 
-                # 检查并更新Cookie
-                if 'set-cookie' in response.headers:
-                    new_cookies = {}
-                    for cookie in response.headers.getall('set-cookie', []):
-                        if '=' in cookie:
-                            name, value = cookie.split(';')[0].split('=', 1)
-                            new_cookies[name.strip()] = value.strip()
-
-                    # 更新cookies
-                    if new_cookies:
-                        self.cookies.update(new_cookies)
-                        # 生成新的cookie字符串
-                        self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
-                        # 更新数据库中的Cookie
-                        await self.update_config_cookies()
-                        logger.warning("已更新Cookie到数据库")
+                # 合并响应中的Set-Cookie，有变化时延迟写入数据库（短时间内的多次更新合并为一次写入）
+                if self.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                    self.cookie_jar.schedule_persist()
 
                 logger.info(f"商品信息获取响应: {res_json}")
 
@@ -8340,7 +7526,7 @@ class XianyuLive:
 
                     # 使用图片上传器上传到闲鱼CDN
                     from utils.image_uploader import ImageUploader
-                    uploader = ImageUploader(self.cookies_str)
+                    uploader = ImageUploader(self.cookie_jar)
 
                     async with uploader:
                         cdn_url = await uploader.upload_image(local_image_path)
@@ -8453,7 +7639,7 @@ class XianyuLive:
             logger.info(f"【{self.cookie_id}】开始上传图片: {image_path}")
 
             from utils.image_uploader import ImageUploader
-            uploader = ImageUploader(self.cookies_str)
+            uploader = ImageUploader(self.cookie_jar)
 
             async with uploader:
                 image_url = await uploader.upload_image(image_path)
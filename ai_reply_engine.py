@@ -12,13 +12,388 @@ AI回复引擎模块
 import os
 import json
 import time
+import heapq
+import asyncio
 import sqlite3
 import requests  # 确保已导入
 import threading
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
 from loguru import logger
-from openai import OpenAI
 from db_manager import db_manager
+from config import AI_REPLY
+from utils.keyed_lock import ThreadKeyedLock
+
+if TYPE_CHECKING:  # openai 导入较慢，只在创建客户端时加载
+    from openai import OpenAI
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本token数：中日韩字符按1个token，其余字符按4个字符1个token"""
+    if not text:
+        return 0
+    cjk_count = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af')
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+class PromptBuilder:
+    """AI提示词构建器
+
+    - 按 (cookie_id, item_id) 缓存预渲染且限长的商品信息，商品在数据库中变更时失效
+    - 按字符/token预算裁剪对话历史，保留最新轮次和最近一次议价回复
+    - 按账号统计提示词大小
+    """
+
+    def __init__(self, prompt_config: dict = None):
+        prompt_config = prompt_config or {}
+        self.max_item_chars = int(prompt_config.get('max_item_chars', 600))
+        self.max_context_chars = int(prompt_config.get('max_context_chars', 800))
+        self.max_context_tokens = int(prompt_config.get('max_context_tokens', 0))
+        self.max_context_turns = int(prompt_config.get('max_context_turns', 10))
+        self.item_cache_size = int(prompt_config.get('item_cache_size', 512))
+
+        # {(cookie_id, item_id): (source_tuple, rendered_text)}
+        self._item_cache = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+        # 商品信息更新/删除时失效对应缓存
+        db_manager.add_item_change_listener(self.invalidate_item)
+
+    def invalidate_item(self, cookie_id: str, item_id: str):
+        """使指定商品的预渲染信息失效"""
+        with self._lock:
+            self._item_cache.pop((cookie_id, item_id), None)
+
+    def _truncate(self, text: str, limit: int) -> str:
+        if limit > 0 and len(text) > limit:
+            return text[:max(limit - 3, 0)] + '...'
+        return text
+
+    def get_item_context(self, cookie_id: str, item_id: str, item_info: dict) -> str:
+        """获取预渲染的商品信息（命中缓存时不再重新拼接和截断）"""
+        title = str(item_info.get('title', '未知'))
+        price = str(item_info.get('price', '未知'))
+        desc = str(item_info.get('desc', '无'))
+        source = (title, price, desc)
+        key = (cookie_id, item_id)
+
+        with self._lock:
+            cached = self._item_cache.get(key)
+            if cached and cached[0] == source:
+                self._item_cache.move_to_end(key)
+                self._account_stats(cookie_id)['item_cache_hits'] += 1
+                return cached[1]
+            self._account_stats(cookie_id)['item_cache_misses'] += 1
+
+        header = f"商品标题: {title}\n商品价格: {price}元\n"
+        desc_limit = max(self.max_item_chars - len(header) - len("商品描述: "), 0) if self.max_item_chars > 0 else 0
+        rendered = header + f"商品描述: {self._truncate(desc, desc_limit)}"
+
+        with self._lock:
+            self._item_cache[key] = (source, rendered)
+            self._item_cache.move_to_end(key)
+            while len(self._item_cache) > self.item_cache_size:
+                self._item_cache.popitem(last=False)
+        return rendered
+
+    def build_context(self, context: List[Dict]) -> Tuple[str, int]:
+        """按预算裁剪对话历史，从最新一轮往前保留
+
+        Returns:
+            (对话历史文本, 被裁剪的轮数)
+        """
+        turns = context[-self.max_context_turns:] if self.max_context_turns > 0 else list(context)
+        dropped = len(context) - len(turns)
+
+        # 最近一次议价回复是议价状态的一部分，即使超出预算也保留
+        pinned_index = None
+        for i in range(len(turns) - 1, -1, -1):
+            if turns[i].get('role') == 'assistant' and turns[i].get('intent') == 'price':
+                pinned_index = i
+                break
+
+        lines = [f"{msg['role']}: {msg['content']}" for msg in turns]
+        pinned_chars = len(lines[pinned_index]) + 1 if pinned_index is not None else 0
+        pinned_tokens = estimate_tokens(lines[pinned_index]) if pinned_index is not None else 0
+
+        kept = []
+        used_chars = pinned_chars
+        used_tokens = pinned_tokens
+        for i in range(len(lines) - 1, -1, -1):
+            if i == pinned_index:
+                kept.append(i)
+                continue
+            line_chars = len(lines[i]) + 1
+            line_tokens = estimate_tokens(lines[i])
+            if self.max_context_chars > 0 and used_chars + line_chars > self.max_context_chars:
+                break
+            if self.max_context_tokens > 0 and used_tokens + line_tokens > self.max_context_tokens:
+                break
+            kept.append(i)
+            used_chars += line_chars
+            used_tokens += line_tokens
+
+        if pinned_index is not None and pinned_index not in kept:
+            kept.append(pinned_index)
+        kept.sort()
+        dropped += len(lines) - len(kept)
+        return "\n".join(lines[i] for i in kept), dropped
+
+    def _account_stats(self, cookie_id: str) -> dict:
+        stats = self._stats.get(cookie_id)
+        if stats is None:
+            stats = {
+                'prompts': 0,
+                'total_chars': 0,
+                'max_chars': 0,
+                'last_chars': 0,
+                'total_tokens': 0,
+                'trimmed_turns': 0,
+                'item_cache_hits': 0,
+                'item_cache_misses': 0,
+            }
+            self._stats[cookie_id] = stats
+        return stats
+
+    def record_prompt(self, cookie_id: str, system_prompt: str, user_prompt: str, trimmed_turns: int):
+        """记录一次提示词大小"""
+        chars = len(system_prompt) + len(user_prompt)
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        with self._lock:
+            stats = self._account_stats(cookie_id)
+            stats['prompts'] += 1
+            stats['total_chars'] += chars
+            stats['last_chars'] = chars
+            stats['max_chars'] = max(stats['max_chars'], chars)
+            stats['total_tokens'] += tokens
+            stats['trimmed_turns'] += trimmed_turns
+
+    def get_stats(self, cookie_id: str = None) -> Dict[str, dict]:
+        """获取提示词大小统计，cookie_id为空时返回所有账号"""
+        with self._lock:
+            items = [(cookie_id, self._stats[cookie_id])] if cookie_id in self._stats else \
+                ([] if cookie_id else list(self._stats.items()))
+            result = {}
+            for cid, stats in items:
+                prompts = stats['prompts']
+                result[cid] = dict(stats,
+                                   avg_chars=round(stats['total_chars'] / prompts, 1) if prompts else 0,
+                                   avg_tokens=round(stats['total_tokens'] / prompts, 1) if prompts else 0)
+            return result
+
+
+class _AIRequest:
+    """调度器中排队的AI请求"""
+
+    __slots__ = ('cookie_id', 'chat_id', 'seq', 'finish_tag', 'enqueued_at',
+                 'deadline', 'loop', 'admitted', 'state')
+
+    def __init__(self, cookie_id: str, chat_id: str, seq: int, finish_tag: float,
+                 deadline: float, loop, admitted):
+        self.cookie_id = cookie_id
+        self.chat_id = chat_id
+        self.seq = seq
+        self.finish_tag = finish_tag
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.loop = loop
+        self.admitted = admitted  # asyncio.Future，放行/放弃时在请求所属事件循环中完成
+        self.state = 'queued'     # queued / admitted / dropped
+
+
+class _ProviderQueue:
+    """单个AI服务商的队列状态"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue_size: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size
+        self.heap = []  # [(finish_tag, seq, request)]，已放弃的请求留在堆中，出队时跳过
+        self.queued = 0  # 堆中仍在排队（state为queued）的请求数
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self.account_finish = {}  # {cookie_id: 上一个请求的虚拟完成时间}
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'expired': 0,
+            'dropped_stale': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+        }
+
+
+class AIRequestScheduler:
+    """AI请求调度器
+
+    - 每个服务商一个有界队列，限制同时在途请求数
+    - 账号之间按权重公平排队（加权公平队列），单个账号无法占满服务商配额
+    - 排队超过 queue_timeout 的请求直接放弃
+    - 同一chat_id有更新的请求时，旧请求出队时直接丢弃，不再调用AI
+    """
+
+    def __init__(self, scheduler_config: dict = None):
+        scheduler_config = scheduler_config or {}
+        self.max_in_flight = int(scheduler_config.get('max_in_flight', 4))
+        self.max_queue_size = int(scheduler_config.get('max_queue_size', 50))
+        self.queue_timeout = float(scheduler_config.get('queue_timeout', 30))
+        self.account_weights = scheduler_config.get('account_weights') or {}
+        self.provider_overrides = scheduler_config.get('providers') or {}
+
+        self._providers = {}
+        self._chat_seq = {}  # {chat_id: 最新请求序号}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _get_provider(self, name: str) -> _ProviderQueue:
+        provider = self._providers.get(name)
+        if provider is None:
+            override = self.provider_overrides.get(name) or self.provider_overrides.get(name.split(':')[0]) or {}
+            provider = _ProviderQueue(
+                name,
+                int(override.get('max_in_flight', self.max_in_flight)),
+                int(override.get('max_queue_size', self.max_queue_size))
+            )
+            self._providers[name] = provider
+        return provider
+
+    def _get_weight(self, cookie_id: str) -> float:
+        try:
+            return max(float(self.account_weights.get(cookie_id, 1)), 0.01)
+        except (TypeError, ValueError):
+            return 1.0
+
+    @staticmethod
+    def _admit(request: _AIRequest, admitted: bool):
+        request.state = 'admitted' if admitted else 'dropped'
+
+        def _set():
+            if not request.admitted.done():
+                request.admitted.set_result(admitted)
+        request.loop.call_soon_threadsafe(_set)
+
+    def _release_chat(self, request: _AIRequest):
+        """请求结束后，如果它仍是该对话最新的请求，清理对话序号"""
+        if self._chat_seq.get(request.chat_id) == request.seq:
+            del self._chat_seq[request.chat_id]
+
+    def _dispatch(self, provider: _ProviderQueue):
+        """在有空闲配额时放行队首请求（调用方需持有 self._lock）"""
+        now = time.monotonic()
+        while provider.heap and provider.in_flight < provider.max_in_flight:
+            _, _, request = heapq.heappop(provider.heap)
+            if request.state != 'queued':
+                continue
+            provider.queued -= 1
+            if now > request.deadline:
+                provider.stats['expired'] += 1
+                self._release_chat(request)
+                self._admit(request, False)
+                continue
+            if request.seq < self._chat_seq.get(request.chat_id, 0):
+                provider.stats['dropped_stale'] += 1
+                logger.info(f"【{request.cookie_id}】对话 {request.chat_id} 已有更新消息，丢弃排队中的AI请求")
+                self._admit(request, False)
+                continue
+
+            wait = now - request.enqueued_at
+            provider.stats['total_wait'] += wait
+            provider.stats['max_wait'] = max(provider.stats['max_wait'], wait)
+            virtual_time = max(provider.virtual_time, request.finish_tag - 1 / self._get_weight(request.cookie_id))
+            if virtual_time > provider.virtual_time:
+                provider.virtual_time = virtual_time
+                # 完成时间不晚于虚拟时间的账号与从未出现过的账号等价，不再保留
+                for cid in [cid for cid, tag in provider.account_finish.items() if tag <= virtual_time]:
+                    del provider.account_finish[cid]
+            provider.in_flight += 1
+            self._admit(request, True)
+
+    async def submit(self, provider_name: str, cookie_id: str, chat_id: str, func, *args):
+        """排队并在线程池中执行 func(*args)，被拒绝/超时/丢弃时返回None"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            provider = self._get_provider(provider_name)
+            provider.stats['submitted'] += 1
+
+            if len(provider.heap) >= provider.max_queue_size > provider.queued:
+                # 清理堆中已超时/已取消的请求，避免堆随放弃的请求增长
+                provider.heap = [entry for entry in provider.heap if entry[2].state == 'queued']
+                heapq.heapify(provider.heap)
+
+            if provider.queued >= provider.max_queue_size:
+                provider.stats['rejected'] += 1
+                logger.warning(f"【{cookie_id}】AI服务商 {provider_name} 队列已满({provider.max_queue_size})，拒绝请求")
+                return None
+
+            self._seq += 1
+            self._chat_seq[chat_id] = self._seq
+
+            # 虚拟完成时间 = max(服务商虚拟时间, 账号上一个请求的完成时间) + 1/权重
+            start_tag = max(provider.virtual_time, provider.account_finish.get(cookie_id, 0.0))
+            finish_tag = start_tag + 1 / self._get_weight(cookie_id)
+            provider.account_finish[cookie_id] = finish_tag
+
+            request = _AIRequest(cookie_id, chat_id, self._seq, finish_tag,
+                                 time.monotonic() + self.queue_timeout, loop, loop.create_future())
+            heapq.heappush(provider.heap, (finish_tag, request.seq, request))
+            provider.queued += 1
+            self._dispatch(provider)
+
+        try:
+            admitted = await asyncio.wait_for(asyncio.shield(request.admitted), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                # 超时与放行可能同时发生，以请求状态为准
+                admitted = request.state == 'admitted'
+                if request.state == 'queued':
+                    request.state = 'dropped'
+                    provider.queued -= 1
+                    provider.stats['expired'] += 1
+                    self._release_chat(request)
+            if not admitted:
+                logger.warning(f"【{cookie_id}】AI请求排队超过 {self.queue_timeout} 秒，已放弃")
+        except asyncio.CancelledError:
+            # 调用方被取消：归还已占用的配额或从队列中撤销
+            with self._lock:
+                if request.state == 'admitted':
+                    provider.in_flight -= 1
+                    self._dispatch(provider)
+                elif request.state == 'queued':
+                    provider.queued -= 1
+                request.state = 'dropped'
+                self._release_chat(request)
+            raise
+
+        if not admitted:
+            return None
+
+        try:
+            return await asyncio.to_thread(func, *args)
+        finally:
+            with self._lock:
+                provider.in_flight -= 1
+                provider.stats['completed'] += 1
+                self._release_chat(request)
+                self._dispatch(provider)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """获取各服务商的队列统计"""
+        with self._lock:
+            result = {}
+            for name, provider in self._providers.items():
+                stats = dict(provider.stats)
+                dispatched = stats['completed'] + provider.in_flight
+                stats['avg_wait'] = round(stats.pop('total_wait') / dispatched, 3) if dispatched else 0
+                stats['max_wait'] = round(stats['max_wait'], 3)
+                stats['queued'] = provider.queued
+                stats['in_flight'] = provider.in_flight
+                stats['max_in_flight'] = provider.max_in_flight
+                stats['max_queue_size'] = provider.max_queue_size
+                result[name] = stats
+            return result
 
 
 class AIReplyEngine:
@@ -30,9 +405,13 @@ class AIReplyEngine:
         # self.agents = {}   # 已移除
         # self.client_last_used = {}  # 已移除
         self._init_default_prompts()
-        # 用于控制同一chat_id消息的串行处理
-        self._chat_locks = {}
-        self._chat_locks_lock = threading.Lock()
+        # DashScope/Gemini 接口地址（基准测试时可指向本地模拟服务）
+        self.dashscope_api_base = "https://dashscope.aliyuncs.com"
+        self.gemini_api_base = "https://generativelanguage.googleapis.com"
+        self.prompt_builder = PromptBuilder(AI_REPLY.get('prompt', {}))
+        self.scheduler = AIRequestScheduler(AI_REPLY.get('scheduler', {}))
+        # 用于控制同一chat_id消息的串行处理（按chat_id分配，处理完即释放）
+        self._chat_locks = ThreadKeyedLock('ai_chat')
     
     def _init_default_prompts(self):
         """初始化默认提示词"""
@@ -59,7 +438,7 @@ class AIReplyEngine:
 注意：结合商品信息，给出实用建议。'''
         }
     
-    def _create_openai_client(self, cookie_id: str) -> Optional[OpenAI]:
+    def _create_openai_client(self, cookie_id: str) -> Optional['OpenAI']:
         """
         (原 get_client) 创建指定账号的OpenAI客户端
         修复 P0-2: 移除了缓存逻辑，以支持多进程无状态部署
@@ -70,6 +449,7 @@ class AIReplyEngine:
         
         try:
             logger.info(f"创建新的OpenAI客户端实例 {cookie_id}: base_url={settings['base_url']}, api_key={'***' + settings['api_key'][-4:] if settings['api_key'] else 'None'}")
+            from openai import OpenAI
             client = OpenAI(
                 api_key=settings['api_key'],
                 base_url=settings['base_url']
@@ -105,7 +485,7 @@ class AIReplyEngine:
         else:
             raise ValueError("DashScope API URL中未找到app_id")
 
-        url = f"https://dashscope.aliyuncs.com/api/v1/apps/{app_id}/completion"
+        url = f"{self.dashscope_api_base}/api/v1/apps/{app_id}/completion"
 
         system_content = ""
         user_content = ""
@@ -157,7 +537,7 @@ class AIReplyEngine:
         api_key = settings['api_key']
         model_name = settings['model_name'] 
         
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
+        url = f"{self.gemini_api_base}/v1beta/models/{model_name}:generateContent?key={api_key}"
 
         headers = {"Content-Type": "application/json"}
 
@@ -219,7 +599,7 @@ class AIReplyEngine:
             logger.error(f"Gemini API 响应格式错误: {result} - {e}")
             raise Exception(f"Gemini API 响应格式错误: {result}")
 
-    def _call_openai_api(self, client: OpenAI, settings: dict, messages: list, max_tokens: int = 100, temperature: float = 0.7) -> str:
+    def _call_openai_api(self, client: 'OpenAI', settings: dict, messages: list, max_tokens: int = 100, temperature: float = 0.7) -> str:
         """调用OpenAI兼容API"""
         try:
             logger.info(f"调用OpenAI API: model={settings['model_name']}, base_url={settings.get('base_url', 'default')}")
@@ -282,41 +662,45 @@ class AIReplyEngine:
             logger.error(f"本地意图检测失败 {cookie_id}: {e}")
             return 'default'
     
-    def _get_chat_lock(self, chat_id: str) -> threading.Lock:
-        """获取指定chat_id的锁，如果不存在则创建"""
-        with self._chat_locks_lock:
-            if chat_id not in self._chat_locks:
-                self._chat_locks[chat_id] = threading.Lock()
-            return self._chat_locks[chat_id]
-    
     def generate_reply(self, message: str, item_info: dict, chat_id: str,
                       cookie_id: str, user_id: str, item_id: str,
                       skip_wait: bool = False) -> Optional[str]:
         """生成AI回复"""
         if not self.is_ai_enabled(cookie_id):
             return None
-        
+
+        intent, message_created_at = self._receive_message(message, chat_id, cookie_id, user_id, item_id)
+
+        # 如果调用方已经实现了去抖（debounce），可以通过 skip_wait=True 跳过内部等待
+        if not skip_wait:
+            logger.info(f"【{cookie_id}】消息已保存，等待10秒收集后续消息: {message[:20]}... (时间:{message_created_at})")
+            # 固定等待10秒，等待可能的后续消息（在锁外延迟，避免阻塞其他消息保存）
+            time.sleep(10)
+        else:
+            logger.info(f"【{cookie_id}】消息已保存（外部防抖已启用，跳过内部等待）: {message[:20]}... (时间:{message_created_at})")
+
+        return self._generate_reply_for_message(message, item_info, chat_id, cookie_id, user_id, item_id,
+                                                intent, message_created_at, skip_wait)
+
+    def _receive_message(self, message: str, chat_id: str, cookie_id: str,
+                         user_id: str, item_id: str) -> Tuple[str, Optional[str]]:
+        """检测意图并保存用户消息，返回 (意图, 消息创建时间)"""
+        # 先检测意图（用于后续保存）
+        intent = self.detect_intent(message, cookie_id)
+        logger.info(f"检测到意图: {intent} (账号: {cookie_id})")
+
+        # 在锁外先保存用户消息到数据库，让所有消息都能立即保存
+        message_created_at = self.save_conversation(chat_id, cookie_id, user_id, item_id, "user", message, intent)
+        return intent, message_created_at
+
+    def _generate_reply_for_message(self, message: str, item_info: dict, chat_id: str,
+                                    cookie_id: str, user_id: str, item_id: str,
+                                    intent: str, message_created_at: Optional[str],
+                                    skip_wait: bool = False) -> Optional[str]:
+        """为已保存的用户消息生成AI回复（同一chat_id串行处理，只回复最新一条消息）"""
         try:
-            # 先检测意图（用于后续保存）
-            intent = self.detect_intent(message, cookie_id)
-            logger.info(f"检测到意图: {intent} (账号: {cookie_id})")
-            
-            # 在锁外先保存用户消息到数据库，让所有消息都能立即保存
-            message_created_at = self.save_conversation(chat_id, cookie_id, user_id, item_id, "user", message, intent)
-            
-            # 如果调用方已经实现了去抖（debounce），可以通过 skip_wait=True 跳过内部等待
-            if not skip_wait:
-                logger.info(f"【{cookie_id}】消息已保存，等待10秒收集后续消息: {message[:20]}... (时间:{message_created_at})")
-                # 固定等待10秒，等待可能的后续消息（在锁外延迟，避免阻塞其他消息保存）
-                time.sleep(10)
-            else:
-                logger.info(f"【{cookie_id}】消息已保存（外部防抖已启用，跳过内部等待）: {message[:20]}... (时间:{message_created_at})")
-            
-            # 获取该chat_id的锁，确保同一对话的消息串行处理
-            chat_lock = self._get_chat_lock(chat_id)
-            
-            # 使用锁确保同一chat_id的消息串行处理
-            with chat_lock:
+            # 使用chat_id的锁确保同一对话的消息串行处理
+            with self._chat_locks.lock(chat_id):
                 # 获取最近时间窗口内的所有用户消息
                 # 如果 skip_wait=True（外部防抖），查询窗口为6秒（1秒防抖 + 5秒缓冲）
                 # 如果 skip_wait=False（内部等待），查询窗口为25秒（10秒等待 + 10秒消息间隔 + 5秒缓冲）
@@ -355,13 +739,11 @@ class AIReplyEngine:
                 custom_prompts = json.loads(settings['custom_prompts']) if settings['custom_prompts'] else {}
                 system_prompt = custom_prompts.get(intent, self.default_prompts[intent])
 
-                # 7. 构建商品信息
-                item_desc = f"商品标题: {item_info.get('title', '未知')}\n"
-                item_desc += f"商品价格: {item_info.get('price', '未知')}元\n"
-                item_desc += f"商品描述: {item_info.get('desc', '无')}"
+                # 7. 构建商品信息（按商品缓存预渲染、限长的文本）
+                item_desc = self.prompt_builder.get_item_context(cookie_id, item_id, item_info)
 
-                # 8. 构建对话历史
-                context_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in context[-10:]])  # 最近10条
+                # 8. 构建对话历史（按预算保留最新轮次和最近一次议价回复）
+                context_str, trimmed_turns = self.prompt_builder.build_context(context)
 
                 # 9. 构建用户消息
                 max_bargain_rounds = settings.get('max_bargain_rounds', 3)
@@ -383,6 +765,7 @@ class AIReplyEngine:
 用户消息：{message}
 
 请根据以上信息生成回复："""
+                self.prompt_builder.record_prompt(cookie_id, system_prompt, user_prompt, trimmed_turns)
 
                 # 10. 调用AI生成回复
                 messages = [
@@ -432,15 +815,39 @@ class AIReplyEngine:
                                    cookie_id: str, user_id: str, item_id: str,
                                    skip_wait: bool = False) -> Optional[str]:
         """
-        异步包装器：在独立线程池中执行同步的 `generate_reply`，并返回结果。
-        这样可以在异步代码中直接 await，而不阻塞事件循环。
+        异步生成回复：用户消息立即保存，AI调用经 `AIRequestScheduler` 按服务商排队，
+        在线程池中执行，不阻塞事件循环。同一对话已有更新消息时，旧请求在发送前被丢弃。
         """
         try:
-            import asyncio as _asyncio
-            return await _asyncio.to_thread(self.generate_reply, message, item_info, chat_id, cookie_id, user_id, item_id, skip_wait)
+            if not await asyncio.to_thread(self.is_ai_enabled, cookie_id):
+                return None
+
+            intent, message_created_at = await asyncio.to_thread(
+                self._receive_message, message, chat_id, cookie_id, user_id, item_id)
+
+            if not skip_wait:
+                logger.info(f"【{cookie_id}】消息已保存，等待10秒收集后续消息: {message[:20]}... (时间:{message_created_at})")
+                await asyncio.sleep(10)
+
+            settings = await asyncio.to_thread(db_manager.get_ai_reply_settings, cookie_id)
+            return await self.scheduler.submit(
+                self._get_provider_key(settings), cookie_id, chat_id,
+                self._generate_reply_for_message,
+                message, item_info, chat_id, cookie_id, user_id, item_id,
+                intent, message_created_at, skip_wait
+            )
         except Exception as e:
             logger.error(f"异步生成回复失败: {e}")
             return None
+
+    def _get_provider_key(self, settings: dict) -> str:
+        """获取AI服务商标识，用于调度器按服务商排队"""
+        if self._is_dashscope_api(settings):
+            return 'dashscope'
+        if self._is_gemini_api(settings):
+            return 'gemini'
+        base_url = settings.get('base_url') or 'default'
+        return f"openai:{urlparse(base_url).netloc or base_url}"
     
     def get_conversation_context(self, chat_id: str, cookie_id: str, limit: int = 20) -> List[Dict]:
         """获取对话上下文"""
@@ -448,13 +855,13 @@ class AIReplyEngine:
             with db_manager.lock:
                 cursor = db_manager.conn.cursor()
                 cursor.execute('''
-                SELECT role, content FROM ai_conversations 
+                SELECT role, content, intent FROM ai_conversations 
                 WHERE chat_id = ? AND cookie_id = ? 
                 ORDER BY created_at DESC LIMIT ?
                 ''', (chat_id, cookie_id, limit))
                 
                 results = cursor.fetchall()
-                context = [{"role": row[0], "content": row[1]} for row in reversed(results)]
+                context = [{"role": row[0], "content": row[1], "intent": row[2]} for row in reversed(results)]
                 return context
         except Exception as e:
             logger.error(f"获取对话上下文失败: {e}")
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI回复引擎离线基准测试
+
+启动本地模拟服务（支持 OpenAI chat-completions / DashScope / Gemini 三种协议，
+可配置延迟和错误注入），用可回放的对话语料驱动 AIReplyEngine，统计：
+端到端延迟 p50/p95/p99、吞吐量、数据库耗时、线程池饱和度。
+
+用法示例：
+    python benchmarks/ai_reply_benchmark.py --provider openai --concurrency 8
+    python benchmarks/ai_reply_benchmark.py --provider gemini --latency-ms 300 --error-rate 0.05
+    python benchmarks/ai_reply_benchmark.py --corpus benchmarks/ai_reply_corpus.jsonl --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "ai_reply_corpus.jsonl"
+
+
+# ==================== 模拟AI服务 ====================
+
+class MockAIServer:
+    """本地模拟AI服务，按请求路径识别协议"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 200,
+                 jitter_ms: float = 50, error_rate: float = 0.0, reply_text: str = "亲，可以的哦"):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.reply_text = reply_text
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ai-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            failed = self.error_rate > 0 and random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+            return failed
+
+    def _sleep(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _build_response(self, path: str, body: dict) -> dict:
+        if path.endswith("/chat/completions"):
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply_text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+        if path.endswith("/completion"):
+            return {
+                "output": {"text": self.reply_text, "finish_reason": "stop"},
+                "usage": {},
+                "request_id": uuid.uuid4().hex,
+            }
+        if ":generateContent" in path:
+            return {
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": self.reply_text}]},
+                    "finishReason": "STOP",
+                }]
+            }
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    body = {}
+
+                path = self.path.split("?")[0]
+                server._sleep()
+
+                if server._should_fail():
+                    self._send(500, {"error": {"message": "mock injected error", "type": "server_error"}})
+                    return
+
+                payload = server._build_response(path, body)
+                if payload is None:
+                    self._send(404, {"error": {"message": f"unknown path {path}"}})
+                else:
+                    self._send(200, payload)
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ==================== 语料 ====================
+
+def load_corpus(path: Path) -> List[Dict]:
+    """加载对话语料（JSONL，每行一个对话：{"chat_id", "item": {...}, "messages": [...]})"""
+    chats = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                chats.append(json.loads(line))
+    return chats
+
+
+def expand_corpus(chats: List[Dict], total_chats: int) -> List[Dict]:
+    """按需重复语料到指定对话数，每个副本使用独立chat_id"""
+    if total_chats <= 0 or not chats:
+        return chats
+    expanded = []
+    for i in range(total_chats):
+        chat = chats[i % len(chats)]
+        expanded.append(dict(chat, chat_id=f"{chat.get('chat_id', 'chat')}_{i}"))
+    return expanded
+
+
+# ==================== 统计 ====================
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+class BenchmarkMetrics:
+    """收集延迟、数据库耗时与线程池占用"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.latencies = []
+        self.queue_waits = []
+        self.db_times = []
+        self.successes = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated_time = 0.0
+        self._saturated_since = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def thread_started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.in_flight >= self.max_workers and self._saturated_since is None:
+                self._saturated_since = time.perf_counter()
+        self._local.db_time = 0.0
+
+    def thread_finished(self) -> float:
+        with self._lock:
+            if self._saturated_since is not None and self.in_flight >= self.max_workers:
+                self.saturated_time += time.perf_counter() - self._saturated_since
+                self._saturated_since = None
+            self.in_flight -= 1
+        return getattr(self._local, "db_time", 0.0)
+
+    def add_db_time(self, elapsed: float):
+        self._local.db_time = getattr(self._local, "db_time", 0.0) + elapsed
+
+
+def instrument_db(engine, db_manager, metrics: BenchmarkMetrics):
+    """包装引擎用到的数据库方法，统计每次请求的数据库耗时"""
+
+    def timed(func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.add_db_time(time.perf_counter() - start)
+        return wrapper
+
+    for name in ("save_conversation", "get_conversation_context", "get_bargain_count", "_get_recent_user_messages"):
+        setattr(engine, name, timed(getattr(engine, name)))
+    db_manager.get_ai_reply_settings = timed(db_manager.get_ai_reply_settings)
+
+
+# ==================== 基准测试主流程 ====================
+
+def provider_settings(provider: str, mock_url: str) -> Dict:
+    settings = {
+        "ai_enabled": True,
+        "api_key": "sk-benchmark",
+        "max_discount_percent": 10,
+        "max_discount_amount": 100,
+        "max_bargain_rounds": 3,
+        "custom_prompts": "",
+    }
+    if provider == "openai":
+        settings.update(model_name="gpt-benchmark", base_url=f"{mock_url}/v1")
+    elif provider == "dashscope":
+        # DashScope 通过 base_url 识别并解析 app_id，实际请求发往 engine.dashscope_api_base
+        settings.update(model_name="dashscope", base_url="https://dashscope.aliyuncs.com/api/v1/apps/benchmark")
+    elif provider == "gemini":
+        settings.update(model_name="gemini-benchmark", base_url=mock_url)
+    else:
+        raise ValueError(f"不支持的provider: {provider}")
+    return settings
+
+
+async def run_benchmark(args) -> Dict:
+    # 使用临时数据库，避免污染正式数据
+    if not os.getenv("DB_PATH"):
+        os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="ai_bench_"), "bench.db")
+    os.environ.setdefault("SQL_LOG_ENABLED", "false")
+    sys.path.insert(0, str(ROOT_DIR))
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    from db_manager import db_manager
+    from ai_reply_engine import AIReplyEngine
+
+    mock = MockAIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    mock.start()
+
+    engine = AIReplyEngine()
+    engine.dashscope_api_base = mock.base_url
+    engine.gemini_api_base = mock.base_url
+
+    metrics = BenchmarkMetrics(args.workers)
+    instrument_db(engine, db_manager, metrics)
+
+    settings = provider_settings(args.provider, mock.base_url)
+    account_ids = [f"bench_account_{i}" for i in range(args.accounts)]
+    for cookie_id in account_ids:
+        db_manager.save_ai_reply_settings(cookie_id, settings)
+
+    chats = expand_corpus(load_corpus(Path(args.corpus)), args.chats)
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="ai-bench")
+    loop.set_default_executor(executor)
+
+    def run_in_thread(submitted_at, **kwargs):
+        metrics.queue_waits.append(time.perf_counter() - submitted_at)
+        metrics.thread_started()
+        try:
+            return engine.generate_reply(**kwargs)
+        finally:
+            metrics.db_times.append(metrics.thread_finished())
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def replay_chat(index: int, chat: Dict):
+        cookie_id = account_ids[index % len(account_ids)]
+        item = chat.get("item", {})
+        async with semaphore:
+            for message in chat.get("messages", []):
+                start = time.perf_counter()
+                reply = await loop.run_in_executor(None, lambda: run_in_thread(
+                    time.perf_counter(),
+                    message=message,
+                    item_info=item,
+                    chat_id=chat["chat_id"],
+                    cookie_id=cookie_id,
+                    user_id=chat.get("user_id", "bench_user"),
+                    item_id=str(item.get("item_id", "bench_item")),
+                    skip_wait=True,
+                ))
+                metrics.latencies.append(time.perf_counter() - start)
+                if reply:
+                    metrics.successes += 1
+                else:
+                    metrics.failures += 1
+                if args.think_time_ms > 0:
+                    await asyncio.sleep(args.think_time_ms / 1000.0)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(replay_chat(i, chat) for i, chat in enumerate(chats)))
+    wall_time = time.perf_counter() - wall_start
+
+    executor.shutdown(wait=True)
+    mock.stop()
+
+    total = metrics.successes + metrics.failures
+    to_ms = lambda v: round(v * 1000, 2)
+    return {
+        "provider": args.provider,
+        "chats": len(chats),
+        "requests": total,
+        "successes": metrics.successes,
+        "failures": metrics.failures,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(total / wall_time, 2) if wall_time > 0 else 0,
+        "latency_ms": {
+            "p50": to_ms(percentile(metrics.latencies, 50)),
+            "p95": to_ms(percentile(metrics.latencies, 95)),
+            "p99": to_ms(percentile(metrics.latencies, 99)),
+            "max": to_ms(max(metrics.latencies) if metrics.latencies else 0),
+        },
+        "db_time_ms": {
+            "total": to_ms(sum(metrics.db_times)),
+            "avg": to_ms(sum(metrics.db_times) / len(metrics.db_times)) if metrics.db_times else 0,
+            "p95": to_ms(percentile(metrics.db_times, 95)),
+        },
+        "thread_pool": {
+            "peak_in_flight": metrics.peak_in_flight,
+            "saturated_ratio": round(metrics.saturated_time / wall_time, 3) if wall_time > 0 else 0,
+            "queue_wait_p50_ms": to_ms(percentile(metrics.queue_waits, 50)),
+            "queue_wait_p95_ms": to_ms(percentile(metrics.queue_waits, 95)),
+        },
+        "mock_server": {
+            "requests": mock.request_count,
+            "injected_errors": mock.error_count,
+        },
+    }
+
+
+def print_report(result: Dict):
+    print(f"\n===== AI回复引擎基准测试 ({result['provider']}) =====")
+    print(f"对话数: {result['chats']}  请求数: {result['requests']}  成功: {result['successes']}  失败: {result['failures']}")
+    print(f"并发: {result['concurrency']}  线程池: {result['workers']}  总耗时: {result['wall_time_s']}s  吞吐: {result['throughput_rps']} req/s")
+    lat = result["latency_ms"]
+    print(f"端到端延迟(ms): p50={lat['p50']}  p95={lat['p95']}  p99={lat['p99']}  max={lat['max']}")
+    db = result["db_time_ms"]
+    print(f"数据库耗时(ms): 总计={db['total']}  平均={db['avg']}  p95={db['p95']}")
+    pool = result["thread_pool"]
+    print(f"线程池: 峰值占用={pool['peak_in_flight']}/{result['workers']}  饱和时间占比={pool['saturated_ratio']}  "
+          f"排队p50={pool['queue_wait_p50_ms']}ms  排队p95={pool['queue_wait_p95_ms']}ms")
+    mock = result["mock_server"]
+    print(f"模拟服务: 请求={mock['requests']}  注入错误={mock['injected_errors']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI回复引擎离线基准测试")
+    parser.add_argument("--provider", choices=["openai", "dashscope", "gemini"], default="openai", help="模拟的API协议")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="对话语料JSONL文件")
+    parser.add_argument("--chats", type=int, default=0, help="回放对话数（0表示语料原样回放一次）")
+    parser.add_argument("--accounts", type=int, default=4, help="模拟账号数，对话按轮询分配")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时回放的对话数")
+    parser.add_argument("--workers", type=int, default=8, help="线程池大小")
+    parser.add_argument("--latency-ms", type=float, default=200, help="模拟服务平均延迟")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="模拟服务延迟抖动")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务错误注入比例 (0-1)")
+    parser.add_argument("--think-time-ms", type=float, default=0, help="同一对话内两条消息的间隔")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，便于复现")
+    parser.add_argument("--log-level", default="WARNING", help="引擎日志级别")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    result = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
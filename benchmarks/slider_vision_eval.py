@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滑块图像识别离线评估
+
+评估集来源：
+1. benchmarks/slider_eval_set/ 中固定的样本：由 --save-synthetic 生成的合成图片（source 为 synthetic），
+   只用于算法回归，不代表真实验证码上的准确率
+2. 线上保存的样本（SLIDER_VERIFICATION.vision.save_samples 开启后写入 slider_samples/），
+   只使用人工在 meta.json 中填写了 expected（真实距离，图片像素）的样本；
+   verified 只说明距离落在验证码容差内，不作为标注，未标注的样本不参与评估
+3. 合成样本（--synthetic N）：随机纹理背景 + 已知位置的缺口/滑块，用于回归测试
+
+统计（合成样本与线上样本分开统计）：命中率（误差在容差内）、平均绝对误差、识别耗时 p50/p95。
+
+用法示例：
+    python benchmarks/slider_vision_eval.py
+    python benchmarks/slider_vision_eval.py --samples slider_samples
+    python benchmarks/slider_vision_eval.py --synthetic 200 --seed 1 --tolerance 3
+    python benchmarks/slider_vision_eval.py --synthetic 100 --save-synthetic benchmarks/slider_eval_set --json
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_EVAL_SET = Path(__file__).resolve().parent / "slider_eval_set"
+sys.path.insert(0, str(ROOT_DIR))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from utils.slider_vision import locate_gap, measure_slide_to_end  # noqa: E402
+
+
+# ==================== 样本加载 ====================
+
+def _read(path: Path) -> Optional[bytes]:
+    return path.read_bytes() if path.exists() else None
+
+
+def load_samples(samples_dir: Path) -> List[Dict]:
+    """读取已标注 expected 的样本，未标注的线上样本跳过"""
+    samples = []
+    if not samples_dir.exists():
+        return samples
+    for meta_path in sorted(samples_dir.glob('*/meta.json')):
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except ValueError:
+            continue
+        expected = meta.get('expected')
+        if expected is None:
+            continue
+        sample_dir = meta_path.parent
+        kind = meta.get('kind', 'gap')
+        if kind == 'slide_to_end':
+            images = {'track': _read(sample_dir / 'track.png'), 'button': _read(sample_dir / 'button.png')}
+        else:
+            images = {'background': _read(sample_dir / 'background.png'), 'piece': _read(sample_dir / 'piece.png')}
+        samples.append({'name': sample_dir.name, 'kind': kind, 'source': meta.get('source', 'live'),
+                        'expected': expected, 'images': images})
+    return samples
+
+
+# ==================== 合成样本 ====================
+
+def _png(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(array, 0, 255).astype(np.uint8)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _texture(rng: np.random.Generator, height: int, width: int) -> np.ndarray:
+    """平滑渐变 + 色块 + 噪声的背景纹理"""
+    yy, xx = np.mgrid[0:height, 0:width]
+    image = 120 + 60 * np.sin(xx / rng.uniform(15, 40) + rng.uniform(0, 6)) * np.cos(yy / rng.uniform(15, 40))
+    for _ in range(rng.integers(4, 9)):
+        y0, x0 = rng.integers(0, height), rng.integers(0, width)
+        image[y0:y0 + rng.integers(10, 40), x0:x0 + rng.integers(10, 60)] += rng.uniform(-50, 50)
+    return image + rng.normal(0, 6, size=image.shape)
+
+
+def synthetic_gap(rng: np.random.Generator, width: int = 300, height: int = 150, piece: int = 44) -> Dict:
+    """拼图类：背景上变暗的缺口 + 从原图裁出的带边框拼图块"""
+    background = _texture(rng, height, width)
+    gap_x = int(rng.integers(piece + 20, width - piece - 5))
+    gap_y = int(rng.integers(5, height - piece - 5))
+    piece_image = background[gap_y:gap_y + piece, gap_x:gap_x + piece].copy()
+    piece_image[[0, -1], :] = 250
+    piece_image[:, [0, -1]] = 250
+    background[gap_y:gap_y + piece, gap_x:gap_x + piece] *= 0.45
+    background[gap_y:gap_y + piece, [gap_x, gap_x + piece - 1]] = 235
+    background[[gap_y, gap_y + piece - 1], gap_x:gap_x + piece] = 235
+    return {
+        'name': f'synthetic_gap_{gap_x}',
+        'kind': 'gap',
+        'source': 'synthetic',
+        'expected': gap_x,
+        'images': {'background': _png(background), 'piece': _png(piece_image)},
+    }
+
+
+def synthetic_track(rng: np.random.Generator, width: int = 300, height: int = 34, button: int = 40) -> Dict:
+    """滑到底类：浅灰轨道 + 任意位置的白色滑块按钮"""
+    track = np.full((height, width), 228.0) + rng.normal(0, 2, size=(height, width))
+    offset = int(rng.integers(0, width // 3))
+    button_image = np.full((height, button), 255.0)
+    button_image[:, [0, -1]] = 170
+    button_image[height // 2 - 5:height // 2 + 5, button // 2 - 6:button // 2 + 6] = 120  # 箭头图标
+    track[:, :offset] = 140  # 已滑过的部分
+    track[:, offset:offset + button] = button_image
+    return {
+        'name': f'synthetic_track_{offset}',
+        'kind': 'slide_to_end',
+        'source': 'synthetic',
+        'expected': width - (offset + button),
+        'images': {'track': _png(track), 'button': _png(button_image)},
+    }
+
+
+def save_samples(samples: List[Dict], target: Path):
+    """把合成样本保存成与线上样本相同的目录格式"""
+    for sample in samples:
+        sample_dir = target / sample['name']
+        sample_dir.mkdir(parents=True, exist_ok=True)
+        for name, data in sample['images'].items():
+            if data:
+                (sample_dir / f'{name}.png').write_bytes(data)
+        meta = {'kind': sample['kind'], 'source': sample['source'], 'expected': sample['expected']}
+        (sample_dir / 'meta.json').write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+# ==================== 评估 ====================
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 2)
+
+
+def evaluate(samples: List[Dict], tolerance: float) -> Dict:
+    results = {}
+    for sample in samples:
+        images = sample['images']
+        try:
+            if sample['kind'] == 'slide_to_end':
+                result = measure_slide_to_end(images['track'], images['button'])
+                predicted = result['distance_px']
+            else:
+                result = locate_gap(images['background'], images.get('piece'))
+                predicted = result['x']
+        except Exception as e:
+            result, predicted = {'elapsed_ms': 0.0, 'error': str(e)}, None
+
+        bucket = results.setdefault(f"{sample['kind']}/{sample['source']}", {'errors': [], 'times': [], 'hits': 0, 'failed': 0})
+        bucket['times'].append(result['elapsed_ms'])
+        if predicted is None:
+            bucket['failed'] += 1
+            continue
+        error = abs(predicted - sample['expected'])
+        bucket['errors'].append(error)
+        if error <= tolerance:
+            bucket['hits'] += 1
+
+    report = {}
+    for kind, bucket in results.items():
+        total = len(bucket['times'])
+        errors = bucket['errors']
+        report[kind] = {
+            'samples': total,
+            'accuracy': round(bucket['hits'] / total, 4) if total else 0,
+            'failed': bucket['failed'],
+            'mean_abs_error_px': round(sum(errors) / len(errors), 2) if errors else None,
+            'max_abs_error_px': round(max(errors), 2) if errors else None,
+            'time_p50_ms': percentile(bucket['times'], 0.5),
+            'time_p95_ms': percentile(bucket['times'], 0.95),
+        }
+    return {'tolerance_px': tolerance, 'kinds': report}
+
+
+def print_report(result: Dict):
+    print(f"容差: ±{result['tolerance_px']}px")
+    if not result['kinds']:
+        print("没有可评估的样本")
+        return
+    for kind, stats in result['kinds'].items():
+        print(f"[{kind}] 样本={stats['samples']}  命中率={stats['accuracy'] * 100:.1f}%  识别失败={stats['failed']}  "
+              f"平均误差={stats['mean_abs_error_px']}px  最大误差={stats['max_abs_error_px']}px  "
+              f"耗时p50={stats['time_p50_ms']}ms  p95={stats['time_p95_ms']}ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="滑块图像识别离线评估")
+    parser.add_argument("--samples", nargs='*', default=[str(DEFAULT_EVAL_SET), str(ROOT_DIR / "slider_samples")],
+                        help="样本目录（默认：固定评估集 + 线上保存的样本）")
+    parser.add_argument("--synthetic", type=int, default=0, help="额外生成的合成样本数（拼图类和滑到底类各一半）")
+    parser.add_argument("--save-synthetic", default=None, help="把合成样本保存到指定目录，便于固定评估集")
+    parser.add_argument("--tolerance", type=float, default=4, help="判定命中的最大误差（像素）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，便于复现")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+
+    samples = [sample for samples_dir in args.samples for sample in load_samples(Path(samples_dir))]
+    synthetic = []
+    for index in range(args.synthetic):
+        synthetic.append(synthetic_gap(rng) if index % 2 == 0 else synthetic_track(rng))
+    if args.save_synthetic and synthetic:
+        save_samples(synthetic, Path(args.save_synthetic))
+    samples.extend(synthetic)
+
+    result = evaluate(samples, args.tolerance)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
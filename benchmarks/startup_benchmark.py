@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动导入耗时基准测试
+
+在独立子进程中用 `python -X importtime -c "import <模块>"` 导入入口模块（临时目录作为工作目录，
+数据库写到临时文件，不影响本地数据），统计：
+模块累计导入耗时（多次运行取中位数）、子进程总耗时、导入最慢的顶层包。
+
+检查项（任一不满足时退出码为1，可用于CI）：
+1. 模块累计导入耗时不超过 --budget-ms
+2. 启动时不应加载的重量级依赖（默认 pandas / execjs / openai / playwright）没有被导入，
+   这些依赖应在首次使用时才导入
+
+用法示例：
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --module reply_server --budget-ms 2500 --runs 5
+    python benchmarks/startup_benchmark.py --forbid pandas --forbid execjs --top 20 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ["reply_server", "XianyuAutoAsync"]
+DEFAULT_FORBIDDEN = ["pandas", "execjs", "openai", "playwright"]
+
+
+# ==================== importtime 解析 ====================
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 -X importtime 输出，返回 [{'name', 'depth', 'self_us', 'cumulative_us'}]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue  # 表头行
+        field = parts[2][1:]  # 去掉分隔符后的一个空格，剩余缩进表示嵌套层级
+        name = field.strip()
+        entries.append({
+            "name": name,
+            "depth": (len(field) - len(field.lstrip())) // 2,
+            "self_us": self_us,
+            "cumulative_us": cumulative_us,
+        })
+    return entries
+
+
+def heaviest_packages(entries: List[Dict], module: str, top: int) -> List[Dict]:
+    """按顶层包汇总（取该包最大的累计耗时），返回最慢的前 top 个"""
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["name"].split(".")[0]
+        if package == module:
+            continue
+        packages[package] = max(packages.get(package, 0), entry["cumulative_us"])
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "cumulative_ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+# ==================== 基准测试 ====================
+
+def run_import(module: str, workdir: str) -> Dict:
+    """在子进程中导入模块一次"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT_DIR), env.get("PYTHONPATH")]))
+    env["DB_PATH"] = os.path.join(workdir, "data", "xianyu_data.db")
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=env, capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        raise RuntimeError(f"导入 {module} 失败（退出码 {proc.returncode}）:\n{tail}")
+
+    entries = parse_importtime(proc.stderr)
+    root = [entry for entry in entries if entry["name"] == module and entry["depth"] == 0]
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": root[-1]["cumulative_us"] / 1000 if root else sum(
+            entry["cumulative_us"] for entry in entries if entry["depth"] == 0) / 1000,
+        "entries": entries,
+    }
+
+
+def benchmark_module(module: str, runs: int, top: int, forbidden: List[str]) -> Dict:
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="startup_bench_") as workdir:
+        # 第一次导入会生成字节码缓存、初始化数据库，不计入统计
+        run_import(module, workdir)
+        for _ in range(runs):
+            samples.append(run_import(module, workdir))
+
+    last = samples[-1]
+    imported = {entry["name"].split(".")[0] for entry in last["entries"]}
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+        "import_ms_min": round(min(sample["import_ms"] for sample in samples), 1),
+        "wall_ms": round(statistics.median(sample["wall_ms"] for sample in samples), 1),
+        "modules_imported": len(last["entries"]),
+        "forbidden_imported": sorted(name for name in forbidden if name in imported),
+        "heaviest": heaviest_packages(last["entries"], module, top),
+    }
+
+
+def print_report(results: List[Dict], budget_ms: float):
+    for result in results:
+        status = "通过" if result["passed"] else "未通过"
+        print(f"[{result['module']}] {status}  导入耗时 中位数={result['import_ms']}ms  最小={result['import_ms_min']}ms  "
+              f"预算={budget_ms:.0f}ms  子进程总耗时={result['wall_ms']}ms  已导入模块={result['modules_imported']}")
+        if result["forbidden_imported"]:
+            print(f"  启动时不应导入: {', '.join(result['forbidden_imported'])}")
+        for item in result["heaviest"]:
+            print(f"  {item['cumulative_ms']:>9.1f}ms  {item['package']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="启动导入耗时基准测试")
+    parser.add_argument("--module", action="append", dest="modules", help="要测试的入口模块，可重复（默认 reply_server 和 XianyuAutoAsync）")
+    parser.add_argument("--runs", type=int, default=3, help="每个模块的测量次数（另有一次预热）")
+    parser.add_argument("--budget-ms", type=float, default=3000, help="单个模块累计导入耗时预算")
+    parser.add_argument("--forbid", action="append", dest="forbidden", help="启动时不应导入的顶层包，可重复（默认 pandas/execjs/openai/playwright）")
+    parser.add_argument("--top", type=int, default=10, help="输出导入最慢的顶层包数量")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    modules = args.modules or DEFAULT_MODULES
+    forbidden = args.forbidden or DEFAULT_FORBIDDEN
+
+    results = []
+    for module in modules:
+        try:
+            result = benchmark_module(module, max(1, args.runs), args.top, forbidden)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(2)
+        result["passed"] = result["import_ms"] <= args.budget_ms and not result["forbidden_imported"]
+        results.append(result)
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "results": results}, ensure_ascii=False, indent=2))
+    else:
+        print_report(results, args.budget_ms)
+
+    sys.exit(0 if all(result["passed"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
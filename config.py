@@ -114,6 +114,24 @@ AUTO_REPLY = config.get('AUTO_REPLY', {
         'timeout': 10
     }
 })
+AI_REPLY = config.get('AI_REPLY', {})
+AUTO_DELIVERY = config.get('AUTO_DELIVERY', {})
+API_CARD = config.get('API_CARD', {})
+REFRESH_SCHEDULER = config.get('REFRESH_SCHEDULER', {})
+TOKEN_CACHE = config.get('TOKEN_CACHE', {})
+STARTUP = config.get('STARTUP', {})
+COOKIE_JAR = config.get('COOKIE_JAR', {})
+HEALTH_CHECK = config.get('HEALTH_CHECK', {
+    'sample_interval': 5,
+    'db_ping_timeout': 2,
+    'max_sample_age': 30
+})
+ITEM_DETAIL = config.get('ITEM_DETAIL', {})
+BROWSER_POOL = config.get('BROWSER_POOL', {})
+BROWSER_GOVERNOR = config.get('BROWSER_GOVERNOR', {})
+BROWSER_PROFILES = config.get('BROWSER_PROFILES', {})
+MTOP_DETAIL = config.get('MTOP_DETAIL', {})
+ORDER_DETAIL = config.get('ORDER_DETAIL', {})
 MANUAL_MODE = config.get('MANUAL_MODE', {})
 LOG_CONFIG = config.get('LOG_CONFIG', {}) 
 _cookies_raw = config.get('COOKIES', [])
@@ -3,6 +3,7 @@ import asyncio
 from typing import Dict, List, Tuple, Optional
 from loguru import logger
 from db_manager import db_manager
+from utils.cookie_jar import cookie_jars
 
 __all__ = ["CookieManager", "manager"]
 
@@ -56,6 +57,21 @@ class CookieManager:
         logger.info(f"数据重新加载完成: Cookie {old_cookies_count} -> {new_cookies_count}, 关键字组 {old_keywords_count} -> {new_keywords_count}")
         return True
 
+    def _launch_startup_task(self, cookie_id: str, cookie_value: str, user_id: int = None) -> bool:
+        """由启动编排器调用：启动账号任务，账号已禁用、已删除或任务已存在时返回False"""
+        if cookie_id not in self.cookies or not self.get_cookie_status(cookie_id):
+            logger.info(f"【{cookie_id}】账号已禁用或已删除，跳过启动")
+            return False
+        task = self.tasks.get(cookie_id)
+        if task is not None and not task.done():
+            logger.info(f"【{cookie_id}】任务已启动，跳过")
+            return False
+        self.tasks[cookie_id] = self.loop.create_task(
+            self._run_xianyu(cookie_id, self.cookies.get(cookie_id, cookie_value), user_id)
+        )
+        logger.info(f"启动数据库中的 Cookie 任务: {cookie_id} (用户ID: {user_id})")
+        return True
+
     # ------------------------ 内部协程 ------------------------
     async def _run_xianyu(self, cookie_id: str, cookie_value: str, user_id: int = None):
         """在事件循环中启动 XianyuLive.main"""
@@ -101,6 +117,8 @@ class CookieManager:
             except:
                 pass
         finally:
+            from utils.startup_orchestrator import startup_orchestrator
+            startup_orchestrator.mark_failed(cookie_id, "任务在连接就绪前退出")
             logger.info(f"【{cookie_id}】_run_xianyu方法执行结束")
             # 确保日志被刷新
             try:
@@ -174,6 +192,7 @@ class CookieManager:
             
             self.cookies.pop(cookie_id, None)
             self.keywords.pop(cookie_id, None)
+            cookie_jars.discard(cookie_id)
             # 清理锁
             self._task_locks.pop(cookie_id, None)
             # 从数据库删除
@@ -259,8 +278,9 @@ class CookieManager:
                         logger.error(f"等待任务清理时出错: {cookie_id}, {e}")
                     logger.info(f"【{cookie_id}】旧任务已停止")
 
-                # 更新Cookie值
+                # 更新Cookie值（同步到账号共享的CookieJar，并取消旧Cookie待执行的延迟写入）
                 self.cookies[cookie_id] = new_value
+                cookie_jars.load(cookie_id, new_value)
                 
                 # 只有在需要时才保存到数据库（避免覆盖其他字段如pause_duration、remark等）
                 if save_to_db:
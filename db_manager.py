@@ -62,12 +62,20 @@ class DBManager:
 
         logger.info(f"SQL日志已启用，日志级别: {self.sql_log_level}")
 
+        # 商品信息变更监听器，回调签名: callback(cookie_id, item_id)
+        # 恢复备份时会重新调用 __init__，保留已注册的监听器
+        self._item_change_listeners = getattr(self, '_item_change_listeners', [])
+        # 订单变更监听器，回调签名: callback(order_id, changes)，changes 为写入的状态相关字段，删除时为None
+        self._order_change_listeners = getattr(self, '_order_change_listeners', [])
+
         self.init_db()
     
     def init_db(self):
         """初始化数据库表结构"""
         try:
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # INSERT OR REPLACE 删除旧行时也触发 DELETE 触发器，保证统计计数器准确
+            self.conn.execute('PRAGMA recursive_triggers = ON')
             cursor = self.conn.cursor()
             
             # 创建用户表
@@ -235,6 +243,96 @@ class DBManager:
             )
             ''')
 
+            # 创建订单状态历史表（状态变更记录，退款撤销时据此回退，由订单状态处理器批量写入）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_status_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id TEXT NOT NULL,
+                from_status TEXT,
+                to_status TEXT NOT NULL,
+                context TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_status_history_order ON order_status_history(order_id, id)')
+
+            # 创建订单待处理状态更新表（订单尚未入库时收到的状态变更，订单入库后按订单ID取出处理）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_pending_updates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id TEXT NOT NULL,
+                new_status TEXT NOT NULL,
+                cookie_id TEXT,
+                context TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_pending_updates_order ON order_pending_updates(order_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_pending_updates_next ON order_pending_updates(next_attempt_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_pending_updates_created ON order_pending_updates(created_at)')
+
+            # 创建订单待处理消息表（暂时无法提取订单ID的系统消息/红色提醒，提取到订单ID后按账号取出）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_pending_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cookie_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                message_hash TEXT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_pending_messages_cookie ON order_pending_messages(cookie_id, kind, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_pending_messages_created ON order_pending_messages(created_at)')
+
+            # 创建自动发货任务表（每个订单一个规划任务，每张卡券一个发货任务，以幂等键去重）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS delivery_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                cookie_id TEXT NOT NULL,
+                order_id TEXT,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                payload TEXT,
+                content TEXT,
+                attempts INTEGER DEFAULT 0,
+                run_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_delivery_jobs_due ON delivery_jobs(cookie_id, status, run_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_delivery_jobs_order ON delivery_jobs(order_id)')
+
+            # 创建API卡券预取缓冲表（按卡券和接口配置签名区分，取出即删除）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_card_buffer (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                card_id INTEGER NOT NULL,
+                config_hash TEXT NOT NULL,
+                content TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_api_card_buffer_card ON api_card_buffer(card_id, config_hash, id)')
+
+            # 创建账号Token缓存表（Token加密存储，启动时复用未过期的Token，跳过刷新）
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS account_tokens (
+                cookie_id TEXT PRIMARY KEY,
+                myid TEXT NOT NULL,
+                device_id TEXT NOT NULL,
+                token_encrypted TEXT NOT NULL,
+                refreshed_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            ''')
+
             # 检查并添加 is_bargain 列（用于标记小刀订单）
             try:
                 self._execute_sql(cursor, "SELECT is_bargain FROM orders LIMIT 1")
@@ -244,6 +342,16 @@ class DBManager:
                 self._execute_sql(cursor, "ALTER TABLE orders ADD COLUMN is_bargain INTEGER DEFAULT 0")
                 logger.info("orders 表 is_bargain 列添加完成")
 
+            # 检查并添加 detail_fetched_at 列（订单详情获取时间，用于缓存新鲜度判断）
+            try:
+                self._execute_sql(cursor, "SELECT detail_fetched_at FROM orders LIMIT 1")
+            except sqlite3.OperationalError:
+                logger.info("正在为 orders 表添加 detail_fetched_at 列...")
+                self._execute_sql(cursor, "ALTER TABLE orders ADD COLUMN detail_fetched_at TIMESTAMP")
+                # 已有金额的历史订单以最后更新时间作为获取时间
+                self._execute_sql(cursor, "UPDATE orders SET detail_fetched_at = updated_at WHERE amount IS NOT NULL AND amount != ''")
+                logger.info("orders 表 detail_fetched_at 列添加完成")
+
             # 检查并添加 user_id 列（用于数据库迁移）
             try:
                 self._execute_sql(cursor, "SELECT user_id FROM cards LIMIT 1")
@@ -464,6 +572,9 @@ class DBManager:
             # 执行数据库迁移
             self._migrate_database(cursor)
 
+            # 统计计数器需在迁移之后创建（迁移可能重建表，导致表上的触发器丢失）
+            self._init_stats_counters(cursor)
+
             self.conn.commit()
             logger.info("数据库初始化完成")
         except Exception as e:
@@ -471,6 +582,56 @@ class DBManager:
             self.conn.rollback()
             raise
 
+    # 由触发器维护的统计计数器: {表名: 计数器名}
+    STATS_COUNTER_TABLES = {
+        'users': 'total_users',
+        'cookies': 'total_cookies',
+        'cards': 'total_cards',
+        'keywords': 'total_keywords',
+        'orders': 'total_orders',
+    }
+
+    def _init_stats_counters(self, cursor):
+        """创建统计计数器表及触发器，并用 COUNT(*) 重建一次计数
+
+        计数器由各表的 INSERT/DELETE 触发器在同一事务内更新，
+        所有写入路径（包括直接执行的SQL、清空表、备份导入）都能保持一致。
+        """
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        # 统计禁用账号数时使用
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cookie_status_enabled ON cookie_status(enabled)')
+
+        for table_name, counter_name in self.STATS_COUNTER_TABLES.items():
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table_name}_count_insert AFTER INSERT ON {table_name}
+            BEGIN
+                UPDATE stats_counters SET value = value + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE name = '{counter_name}';
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table_name}_count_delete AFTER DELETE ON {table_name}
+            BEGIN
+                UPDATE stats_counters SET value = value - 1, updated_at = CURRENT_TIMESTAMP
+                WHERE name = '{counter_name}';
+            END
+            ''')
+
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            count = cursor.fetchone()[0]
+            cursor.execute('''
+            INSERT INTO stats_counters (name, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            ''', (counter_name, count))
+
+        logger.info("统计计数器初始化完成")
+
     def _migrate_database(self, cursor):
         """执行数据库迁移"""
         try:
@@ -743,6 +904,14 @@ class DBManager:
                     self._execute_sql(cursor, "ALTER TABLE orders ADD COLUMN is_bargain INTEGER DEFAULT 0")
                     logger.info("为orders表添加is_bargain字段")
 
+                # 检查orders表是否有detail_fetched_at字段
+                try:
+                    self._execute_sql(cursor, "SELECT detail_fetched_at FROM orders LIMIT 1")
+                except sqlite3.OperationalError:
+                    # detail_fetched_at字段不存在，需要添加
+                    self._execute_sql(cursor, "ALTER TABLE orders ADD COLUMN detail_fetched_at TIMESTAMP")
+                    logger.info("为orders表添加detail_fetched_at字段")
+
                 # 处理keywords表的唯一约束问题
                 # 由于SQLite不支持直接修改约束，我们需要重建表
                 self._migrate_keywords_table_constraints(cursor)
@@ -1132,6 +1301,7 @@ class DBManager:
         """获取数据库连接，如果已关闭则重新连接"""
         if self.conn is None:
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute('PRAGMA recursive_triggers = ON')
         return self.conn
 
     def _log_sql(self, sql: str, params: tuple = None, operation: str = "EXECUTE"):
@@ -1229,6 +1399,8 @@ class DBManager:
                 cursor = self.conn.cursor()
                 # 删除关联的关键字
                 self._execute_sql(cursor, "DELETE FROM keywords WHERE cookie_id = ?", (cookie_id,))
+                # 删除缓存的Token
+                self._execute_sql(cursor, "DELETE FROM account_tokens WHERE cookie_id = ?", (cookie_id,))
                 # 删除Cookie
                 self._execute_sql(cursor, "DELETE FROM cookies WHERE id = ?", (cookie_id,))
                 self.conn.commit()
@@ -1469,6 +1641,20 @@ class DBManager:
                 self.conn.rollback()
                 return False
 
+    def update_cookie_value_if_unchanged(self, cookie_id: str, expected_value: str, new_value: str) -> bool:
+        """数据库中的Cookie仍为 expected_value 时才更新（避免覆盖其他途径写入的新值），返回是否更新"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("UPDATE cookies SET value = ? WHERE id = ? AND value = ?",
+                               (new_value, cookie_id, expected_value))
+                self.conn.commit()
+                return cursor.rowcount > 0
+            except Exception as e:
+                logger.error(f"更新Cookie值失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return False
+
     def get_auto_confirm(self, cookie_id: str) -> bool:
         """获取Cookie的自动确认发货设置"""
         with self.lock:
@@ -1775,6 +1961,17 @@ class DBManager:
                 logger.error(f"获取Cookie状态失败: {e}")
                 return True  # 出错时默认启用
 
+    def get_last_order_times(self) -> Dict[str, str]:
+        """获取每个账号最近一笔订单的创建时间（用于启动排序）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('SELECT cookie_id, MAX(created_at) FROM orders WHERE cookie_id IS NOT NULL GROUP BY cookie_id')
+                return {row[0]: row[1] for row in cursor.fetchall() if row[1]}
+            except Exception as e:
+                logger.error(f"获取账号最近订单时间失败: {e}")
+                return {}
+
     def get_all_cookie_status(self) -> Dict[str, bool]:
         """获取所有Cookie的启用状态"""
         with self.lock:
@@ -3650,6 +3847,19 @@ class DBManager:
 
     # ==================== 商品信息管理 ====================
 
+    def add_item_change_listener(self, callback):
+        """注册商品信息变更回调，商品新增/更新/删除后调用 callback(cookie_id, item_id)"""
+        if callback not in self._item_change_listeners:
+            self._item_change_listeners.append(callback)
+
+    def _notify_item_changed(self, cookie_id: str, item_id: str):
+        """通知商品信息已变更（回调异常不影响数据库操作）"""
+        for callback in list(self._item_change_listeners):
+            try:
+                callback(cookie_id, item_id)
+            except Exception as e:
+                logger.warning(f"商品变更回调执行失败 {cookie_id} - {item_id}: {e}")
+
     def save_item_basic_info(self, cookie_id: str, item_id: str, item_title: str = None,
                             item_description: str = None, item_category: str = None,
                             item_price: str = None, item_detail: str = None) -> bool:
@@ -3684,6 +3894,7 @@ class DBManager:
                 if cursor.rowcount > 0:
                     self.conn.commit()
                     logger.info(f"新增商品基本信息: {item_id} - {item_title}")
+                    self._notify_item_changed(cookie_id, item_id)
                     return True
 
                 # 记录已存在，使用原子UPDATE操作，只更新非空字段且不覆盖现有非空值
@@ -3725,6 +3936,8 @@ class DBManager:
                         logger.debug(f"商品信息无需更新: {item_id}")
 
                 self.conn.commit()
+                if update_parts:
+                    self._notify_item_changed(cookie_id, item_id)
                 return True
 
         except Exception as e:
@@ -3827,6 +4040,7 @@ class DBManager:
                     logger.info(f"新增商品信息: {item_id}")
 
                 self.conn.commit()
+                self._notify_item_changed(cookie_id, item_id)
                 return True
 
         except Exception as e:
@@ -4055,6 +4269,7 @@ class DBManager:
                 if cursor.rowcount > 0:
                     self.conn.commit()
                     logger.info(f"更新商品详情成功: {item_id}")
+                    self._notify_item_changed(cookie_id, item_id)
                     return True
                 else:
                     logger.warning(f"未找到要更新的商品: {item_id}")
@@ -4065,6 +4280,30 @@ class DBManager:
             self.conn.rollback()
             return False
 
+    def get_recent_item_details(self, limit: int = 1000) -> list:
+        """获取最近更新且有详情的商品，用于预热商品详情缓存
+
+        Args:
+            limit: 最多返回的商品数量
+
+        Returns:
+            list: [(item_id, item_detail), ...]，按更新时间倒序
+        """
+        try:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT item_id, item_detail FROM item_info
+                WHERE item_detail IS NOT NULL AND TRIM(item_detail) != ''
+                ORDER BY updated_at DESC
+                LIMIT ?
+                ''', (limit,))
+                return cursor.fetchall()
+
+        except Exception as e:
+            logger.error(f"获取最近商品详情失败: {e}")
+            return []
+
     def update_item_title_only(self, cookie_id: str, item_id: str, item_title: str) -> bool:
         """仅更新商品标题（并发安全）
 
@@ -4099,6 +4338,7 @@ class DBManager:
 
                 self.conn.commit()
                 logger.info(f"更新商品标题成功: {item_id} - {item_title}")
+                self._notify_item_changed(cookie_id, item_id)
                 return True
 
         except Exception as e:
@@ -4119,6 +4359,7 @@ class DBManager:
             return 0
 
         success_count = 0
+        changed_items = []
         try:
             with self.lock:
                 cursor = self.conn.cursor()
@@ -4174,6 +4415,7 @@ class DBManager:
                             ))
 
                         success_count += 1
+                        changed_items.append((cookie_id, item_id))
 
                     except Exception as item_e:
                         logger.warning(f"批量保存单个商品失败 {item_data.get('item_id', 'unknown')}: {item_e}")
@@ -4181,6 +4423,8 @@ class DBManager:
 
                 cursor.execute('COMMIT')
                 logger.info(f"批量保存商品信息完成: {success_count}/{len(items_data)} 个商品")
+                for cookie_id, item_id in changed_items:
+                    self._notify_item_changed(cookie_id, item_id)
                 return success_count
 
         except Exception as e:
@@ -4210,6 +4454,7 @@ class DBManager:
                 if cursor.rowcount > 0:
                     self.conn.commit()
                     logger.info(f"删除商品信息成功: {cookie_id} - {item_id}")
+                    self._notify_item_changed(cookie_id, item_id)
                     return True
                 else:
                     logger.warning(f"未找到要删除的商品信息: {cookie_id} - {item_id}")
@@ -4233,6 +4478,7 @@ class DBManager:
             return 0
 
         success_count = 0
+        deleted_items = []
         try:
             with self.lock:
                 cursor = self.conn.cursor()
@@ -4251,6 +4497,7 @@ class DBManager:
 
                         if cursor.rowcount > 0:
                             success_count += 1
+                            deleted_items.append((cookie_id, item_id))
                             logger.debug(f"删除商品信息: {cookie_id} - {item_id}")
 
                     except Exception as item_e:
@@ -4258,6 +4505,8 @@ class DBManager:
                         continue
 
                 cursor.execute('COMMIT')
+                for cookie_id, item_id in deleted_items:
+                    self._notify_item_changed(cookie_id, item_id)
                 logger.info(f"批量删除商品信息完成: {success_count}/{len(items_to_delete)} 个商品")
                 return success_count
 
@@ -4340,6 +4589,35 @@ class DBManager:
 
     # ==================== 管理员专用方法 ====================
 
+    def get_system_stats(self) -> Dict[str, int]:
+        """获取系统统计信息（读取触发器维护的计数器，不随数据量增长）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('SELECT name, value FROM stats_counters')
+                counters = {name: value for name, value in cursor.fetchall()}
+
+                # 未设置状态的账号默认启用，因此活跃数 = 总数 - 已禁用数（走 enabled 索引）
+                cursor.execute('''
+                SELECT COUNT(*) FROM cookie_status s
+                JOIN cookies c ON c.id = s.cookie_id
+                WHERE s.enabled = 0
+                ''')
+                disabled_cookies = cursor.fetchone()[0]
+
+                total_cookies = counters.get('total_cookies', 0)
+                return {
+                    "total_users": counters.get('total_users', 0),
+                    "total_cookies": total_cookies,
+                    "active_cookies": max(total_cookies - disabled_cookies, 0),
+                    "total_cards": counters.get('total_cards', 0),
+                    "total_keywords": counters.get('total_keywords', 0),
+                    "total_orders": counters.get('total_orders', 0)
+                }
+            except Exception as e:
+                logger.error(f"获取系统统计信息失败: {e}")
+                raise
+
     def get_all_users(self):
         """获取所有用户信息（管理员专用）"""
         with self.lock:
@@ -4472,11 +4750,30 @@ class DBManager:
                 logger.error(f"获取表数据失败: {table_name} - {e}")
                 return [], []
 
+    def add_order_change_listener(self, callback):
+        """注册订单变更回调，订单状态/所属账号被写入或订单被删除后调用 callback(order_id, changes)
+
+        订单状态处理器自身的批量写入（save_order_status_batch）不会触发回调
+        """
+        if callback not in self._order_change_listeners:
+            self._order_change_listeners.append(callback)
+
+    def _notify_order_changed(self, order_id: str, changes: Optional[Dict[str, Any]]):
+        """通知订单已变更（回调异常不影响数据库操作）"""
+        for callback in list(self._order_change_listeners):
+            try:
+                callback(order_id, changes)
+            except Exception as e:
+                logger.warning(f"订单变更回调执行失败 {order_id}: {e}")
+
     def insert_or_update_order(self, order_id: str, item_id: str = None, buyer_id: str = None,
                               spec_name: str = None, spec_value: str = None, quantity: str = None,
                               amount: str = None, order_status: str = None, cookie_id: str = None,
-                              is_bargain: bool = None):
-        """插入或更新订单信息"""
+                              is_bargain: bool = None, detail_fetched: bool = False):
+        """插入或更新订单信息
+
+        detail_fetched 为 True 表示本次写入的是新获取的订单详情，会刷新 detail_fetched_at
+        """
         with self.lock:
             try:
                 cursor = self.conn.cursor()
@@ -4525,6 +4822,8 @@ class DBManager:
                     if is_bargain is not None:
                         update_fields.append("is_bargain = ?")
                         update_values.append(1 if is_bargain else 0)
+                    if detail_fetched:
+                        update_fields.append("detail_fetched_at = CURRENT_TIMESTAMP")
 
                     if update_fields:
                         update_fields.append("updated_at = CURRENT_TIMESTAMP")
@@ -4537,14 +4836,22 @@ class DBManager:
                     # 插入新订单
                     cursor.execute('''
                     INSERT INTO orders (order_id, item_id, buyer_id, spec_name, spec_value,
-                                      quantity, amount, order_status, cookie_id, is_bargain)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                      quantity, amount, order_status, cookie_id, is_bargain,
+                                      detail_fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? THEN CURRENT_TIMESTAMP END)
                     ''', (order_id, item_id, buyer_id, spec_name, spec_value,
                           quantity, amount, order_status or 'unknown', cookie_id,
-                          1 if is_bargain else 0))
+                          1 if is_bargain else 0, 1 if detail_fetched else 0))
                     logger.info(f"插入新订单: {order_id}")
 
                 self.conn.commit()
+
+                if existing:
+                    changes = {k: v for k, v in (('order_status', order_status), ('cookie_id', cookie_id)) if v is not None}
+                else:
+                    changes = {'order_status': order_status or 'unknown', 'cookie_id': cookie_id}
+                if changes:
+                    self._notify_order_changed(order_id, changes)
                 return True
 
             except Exception as e:
@@ -4559,7 +4866,8 @@ class DBManager:
                 cursor = self.conn.cursor()
                 cursor.execute('''
                 SELECT order_id, item_id, buyer_id, spec_name, spec_value,
-                       quantity, amount, order_status, cookie_id, is_bargain, created_at, updated_at
+                       quantity, amount, order_status, cookie_id, is_bargain, created_at, updated_at,
+                       detail_fetched_at
                 FROM orders WHERE order_id = ?
                 ''', (order_id,))
 
@@ -4578,7 +4886,8 @@ class DBManager:
                         'cookie_id': row[8],
                         'is_bargain': bool(row[9]) if row[9] is not None else False,
                         'created_at': row[10],
-                        'updated_at': row[11]
+                        'updated_at': row[11],
+                        'detail_fetched_at': row[12]
                     }
                 return None
 
@@ -4586,6 +4895,48 @@ class DBManager:
                 logger.error(f"获取订单信息失败: {order_id} - {e}")
                 return None
 
+    def get_fresh_order_detail(self, order_id: str, max_age_seconds: int):
+        """获取在有效期内获取过详情的订单，不存在或已过期返回None
+
+        Args:
+            order_id: 订单ID
+            max_age_seconds: 详情有效期（秒），0或负数表示永不过期
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                sql = '''
+                SELECT order_id, item_id, buyer_id, spec_name, spec_value, quantity, amount,
+                       order_status, cookie_id, detail_fetched_at
+                FROM orders
+                WHERE order_id = ? AND detail_fetched_at IS NOT NULL
+                '''
+                params = [order_id]
+                if max_age_seconds and max_age_seconds > 0:
+                    sql += " AND detail_fetched_at >= datetime('now', ?)"
+                    params.append(f'-{int(max_age_seconds)} seconds')
+                cursor.execute(sql, params)
+
+                row = cursor.fetchone()
+                if row:
+                    return {
+                        'order_id': row[0],
+                        'item_id': row[1],
+                        'buyer_id': row[2],
+                        'spec_name': row[3],
+                        'spec_value': row[4],
+                        'quantity': row[5],
+                        'amount': row[6],
+                        'status': row[7],
+                        'cookie_id': row[8],
+                        'detail_fetched_at': row[9]
+                    }
+                return None
+
+            except Exception as e:
+                logger.error(f"获取订单详情缓存失败: {order_id} - {e}")
+                return None
+
     def delete_order(self, order_id: str):
         """删除订单"""
         with self.lock:
@@ -4593,8 +4944,10 @@ class DBManager:
                 cursor = self.conn.cursor()
                 cursor.execute('DELETE FROM orders WHERE order_id = ?', (order_id,))
                 if cursor.rowcount > 0:
+                    cursor.execute('DELETE FROM order_status_history WHERE order_id = ?', (order_id,))
                     self.conn.commit()
                     logger.info(f"删除订单成功: {order_id}")
+                    self._notify_order_changed(order_id, None)
                     return True
                 return False
             except Exception as e:
@@ -4602,6 +4955,559 @@ class DBManager:
                 self.conn.rollback()
                 return False
 
+    def get_order_status_history(self, order_id: str, limit: int = 10):
+        """获取订单最近的状态变更记录（按时间从早到晚）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT from_status, to_status, context, created_at FROM order_status_history
+                WHERE order_id = ? ORDER BY id DESC LIMIT ?
+                ''', (order_id, limit))
+                rows = cursor.fetchall()
+                return [
+                    {'from_status': row[0], 'to_status': row[1], 'context': row[2], 'created_at': row[3]}
+                    for row in reversed(rows)
+                ]
+            except Exception as e:
+                logger.error(f"获取订单状态历史失败: {order_id} - {e}")
+                return []
+
+    def add_order_pending_update(self, order_id: str, new_status: str, cookie_id: str, context: str) -> bool:
+        """添加一条待处理的订单状态更新"""
+        with self.lock:
+            try:
+                now = time.time()
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                INSERT INTO order_pending_updates (order_id, new_status, cookie_id, context, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (order_id, new_status, cookie_id, context, now, now))
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"添加待处理订单状态更新失败: {order_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def get_order_pending_updates(self, order_id: str):
+        """获取订单的待处理状态更新（按添加顺序）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT id, new_status, cookie_id, context, attempts, created_at
+                FROM order_pending_updates WHERE order_id = ? ORDER BY id
+                ''', (order_id,))
+                return [
+                    {'id': row[0], 'new_status': row[1], 'cookie_id': row[2], 'context': row[3],
+                     'attempts': row[4], 'timestamp': row[5]}
+                    for row in cursor.fetchall()
+                ]
+            except Exception as e:
+                logger.error(f"获取待处理订单状态更新失败: {order_id} - {e}")
+                return []
+
+    def get_due_order_pending_ids(self, now: float, cookie_id: str = None, limit: int = 100):
+        """获取已到重试时间的待处理更新对应的订单ID（按到期时间排序，去重）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                if cookie_id:
+                    cursor.execute('''
+                    SELECT order_id FROM order_pending_updates
+                    WHERE next_attempt_at <= ? AND cookie_id = ? ORDER BY next_attempt_at LIMIT ?
+                    ''', (now, cookie_id, limit))
+                else:
+                    cursor.execute('''
+                    SELECT order_id FROM order_pending_updates
+                    WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?
+                    ''', (now, limit))
+                return list(dict.fromkeys(row[0] for row in cursor.fetchall()))
+            except Exception as e:
+                logger.error(f"获取到期的待处理订单状态更新失败: {e}")
+                return []
+
+    def reschedule_order_pending_updates(self, ids: list, next_attempt_at: float) -> bool:
+        """推迟待处理更新的下次处理时间，并累加尝试次数"""
+        if not ids:
+            return True
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                self._executemany_sql(cursor, '''
+                UPDATE order_pending_updates SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?
+                ''', [(next_attempt_at, pending_id) for pending_id in ids])
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"推迟待处理订单状态更新失败: {e}")
+                self.conn.rollback()
+                return False
+
+    def delete_order_pending_updates(self, ids: list = None, order_id: str = None) -> int:
+        """按记录ID或订单ID删除待处理更新，返回删除的条数"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                if ids:
+                    self._executemany_sql(cursor, "DELETE FROM order_pending_updates WHERE id = ?",
+                                          [(pending_id,) for pending_id in ids])
+                elif order_id:
+                    cursor.execute("DELETE FROM order_pending_updates WHERE order_id = ?", (order_id,))
+                else:
+                    return 0
+                self.conn.commit()
+                return cursor.rowcount
+            except Exception as e:
+                logger.error(f"删除待处理订单状态更新失败: {e}")
+                self.conn.rollback()
+                return 0
+
+    def count_order_pending_orders(self) -> int:
+        """获取有待处理更新的订单数量"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT COUNT(DISTINCT order_id) FROM order_pending_updates")
+                return cursor.fetchone()[0]
+            except Exception as e:
+                logger.error(f"统计待处理订单状态更新失败: {e}")
+                return 0
+
+    def add_order_pending_message(self, cookie_id: str, kind: str, message_hash: str, payload: dict) -> bool:
+        """添加一条暂时无法提取订单ID的待处理消息
+
+        Args:
+            kind: system（系统消息）/ red_reminder（红色提醒）
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                INSERT INTO order_pending_messages (cookie_id, kind, message_hash, payload, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ''', (cookie_id, kind, message_hash, json.dumps(payload, ensure_ascii=False), time.time()))
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"添加待处理订单消息失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def pop_order_pending_message(self, cookie_id: str, kind: str, message_hash: str = None):
+        """取出账号的一条待处理消息：优先取哈希匹配的最新一条，否则取最早的一条；同时删除其临时订单ID的待处理更新"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                row = None
+                if message_hash:
+                    cursor.execute('''
+                    SELECT id, payload FROM order_pending_messages
+                    WHERE cookie_id = ? AND kind = ? AND message_hash = ? ORDER BY id DESC LIMIT 1
+                    ''', (cookie_id, kind, message_hash))
+                    row = cursor.fetchone()
+                if not row:
+                    cursor.execute('''
+                    SELECT id, payload FROM order_pending_messages
+                    WHERE cookie_id = ? AND kind = ? ORDER BY id LIMIT 1
+                    ''', (cookie_id, kind))
+                    row = cursor.fetchone()
+                if not row:
+                    return None
+
+                payload = json.loads(row[1])
+                cursor.execute("DELETE FROM order_pending_messages WHERE id = ?", (row[0],))
+                if payload.get('temp_order_id'):
+                    cursor.execute("DELETE FROM order_pending_updates WHERE order_id = ?", (payload['temp_order_id'],))
+                self.conn.commit()
+                return payload
+            except Exception as e:
+                logger.error(f"取出待处理订单消息失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return None
+
+    def delete_expired_order_pending(self, before: float):
+        """删除早于指定时间的待处理更新和待处理消息
+
+        Returns:
+            (删除的更新条数, 删除的消息条数)
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("DELETE FROM order_pending_updates WHERE created_at < ?", (before,))
+                updates_deleted = cursor.rowcount
+                cursor.execute("DELETE FROM order_pending_messages WHERE created_at < ?", (before,))
+                messages_deleted = cursor.rowcount
+                self.conn.commit()
+                return updates_deleted, messages_deleted
+            except Exception as e:
+                logger.error(f"清理过期的待处理订单数据失败: {e}")
+                self.conn.rollback()
+                return 0, 0
+
+    # -------------------- 账号Token缓存 --------------------
+    def save_account_token(self, cookie_id: str, myid: str, device_id: str, token_encrypted: str,
+                           refreshed_at: float, expires_at: float) -> bool:
+        """保存账号的加密Token（每个账号只保留最新一条）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                INSERT OR REPLACE INTO account_tokens (cookie_id, myid, device_id, token_encrypted, refreshed_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (cookie_id, myid, device_id, token_encrypted, refreshed_at, expires_at))
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"保存账号Token缓存失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def get_account_token(self, cookie_id: str) -> Optional[Dict[str, Any]]:
+        """获取账号缓存的加密Token，不存在返回None"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT myid, device_id, token_encrypted, refreshed_at, expires_at
+                FROM account_tokens WHERE cookie_id = ?
+                ''', (cookie_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                return {
+                    'cookie_id': cookie_id,
+                    'myid': row[0],
+                    'device_id': row[1],
+                    'token_encrypted': row[2],
+                    'refreshed_at': row[3],
+                    'expires_at': row[4],
+                }
+            except Exception as e:
+                logger.error(f"获取账号Token缓存失败: {cookie_id} - {e}")
+                return None
+
+    def delete_account_token(self, cookie_id: str) -> bool:
+        """删除账号缓存的Token"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("DELETE FROM account_tokens WHERE cookie_id = ?", (cookie_id,))
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"删除账号Token缓存失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def get_account_token_summary(self) -> list:
+        """列出各账号缓存Token的有效期（不含Token内容）"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT cookie_id, refreshed_at, expires_at FROM account_tokens ORDER BY cookie_id")
+                return [
+                    {'cookie_id': row[0], 'refreshed_at': row[1], 'expires_at': row[2]}
+                    for row in cursor.fetchall()
+                ]
+            except Exception as e:
+                logger.error(f"统计账号Token缓存失败: {e}")
+                return []
+
+    # -------------------- API卡券预取缓冲 --------------------
+    def add_api_card_buffer(self, card_id: int, config_hash: str, content: str) -> bool:
+        """保存一条预取的API卡券内容"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "INSERT INTO api_card_buffer (card_id, config_hash, content, fetched_at) VALUES (?, ?, ?, ?)",
+                    (card_id, config_hash, content, time.time())
+                )
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"保存API卡券预取内容失败: 卡券ID={card_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def take_api_card_buffer(self, card_id: int, config_hash: str, min_fetched_at: float = 0):
+        """取出最早预取的一条内容（取出即删除），没有可用内容返回None"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT id, content FROM api_card_buffer
+                WHERE card_id = ? AND config_hash = ? AND fetched_at >= ?
+                ORDER BY id LIMIT 1
+                ''', (card_id, config_hash, min_fetched_at))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute("DELETE FROM api_card_buffer WHERE id = ?", (row[0],))
+                self.conn.commit()
+                return row[1]
+            except Exception as e:
+                logger.error(f"取出API卡券预取内容失败: 卡券ID={card_id} - {e}")
+                self.conn.rollback()
+                return None
+
+    def count_api_card_buffer(self, card_id: int, config_hash: str, min_fetched_at: float = 0) -> int:
+        """统计可用的预取内容数量"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    "SELECT COUNT(*) FROM api_card_buffer WHERE card_id = ? AND config_hash = ? AND fetched_at >= ?",
+                    (card_id, config_hash, min_fetched_at)
+                )
+                return cursor.fetchone()[0]
+            except Exception as e:
+                logger.error(f"统计API卡券预取内容失败: 卡券ID={card_id} - {e}")
+                return 0
+
+    def get_api_card_buffer_levels(self) -> list:
+        """按卡券和配置签名统计预取内容数量"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT card_id, config_hash, COUNT(*), MIN(fetched_at) FROM api_card_buffer
+                GROUP BY card_id, config_hash ORDER BY card_id
+                ''')
+                return [
+                    {'card_id': row[0], 'config_hash': row[1], 'count': row[2], 'oldest_fetched_at': row[3]}
+                    for row in cursor.fetchall()
+                ]
+            except Exception as e:
+                logger.error(f"统计API卡券预取缓冲失败: {e}")
+                return []
+
+    # -------------------- 自动发货任务 --------------------
+    DELIVERY_JOB_COLUMNS = ('id', 'idempotency_key', 'cookie_id', 'order_id', 'kind', 'status', 'payload',
+                            'content', 'attempts', 'run_at', 'last_error', 'created_at', 'started_at', 'finished_at')
+
+    def _delivery_job_row(self, row) -> dict:
+        job = dict(zip(self.DELIVERY_JOB_COLUMNS, row))
+        job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+        return job
+
+    def enqueue_delivery_job(self, idempotency_key: str, cookie_id: str, order_id: str, kind: str,
+                             payload: dict, run_at: float, rearm_failed: bool = False):
+        """按幂等键添加自动发货任务
+
+        Args:
+            rearm_failed: 幂等键已存在且任务已失败时，是否重新排队
+
+        Returns:
+            新任务（或重新排队的任务）的ID，任务已存在时返回None
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                INSERT OR IGNORE INTO delivery_jobs (idempotency_key, cookie_id, order_id, kind, payload, run_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (idempotency_key, cookie_id, order_id, kind, json.dumps(payload, ensure_ascii=False), run_at, time.time()))
+                job_id = cursor.lastrowid if cursor.rowcount else None
+
+                if job_id is None and rearm_failed:
+                    cursor.execute('''
+                    UPDATE delivery_jobs SET status = 'pending', attempts = 0, run_at = ?, payload = ?,
+                           last_error = NULL, started_at = NULL, finished_at = NULL
+                    WHERE idempotency_key = ? AND status = 'failed'
+                    ''', (run_at, json.dumps(payload, ensure_ascii=False), idempotency_key))
+                    if cursor.rowcount:
+                        cursor.execute("SELECT id FROM delivery_jobs WHERE idempotency_key = ?", (idempotency_key,))
+                        job_id = cursor.fetchone()[0]
+
+                self.conn.commit()
+                return job_id
+            except Exception as e:
+                logger.error(f"添加自动发货任务失败: {idempotency_key} - {e}")
+                self.conn.rollback()
+                return None
+
+    def rearm_failed_delivery_children(self, order_id: str, run_at: float) -> int:
+        """订单任务已完成时，重新排队其失败的卡券任务（或失败的结果通知任务），返回重新排队的任务数
+
+        状态为 uncertain 的卡券任务可能已送达，保留给人工确认，不重新排队；
+        已获取并保存的发货内容保留，重试时不会重复消费批量数据。
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                rearm_sql = '''
+                UPDATE delivery_jobs SET status = 'pending', attempts = 0, run_at = ?,
+                       last_error = NULL, started_at = NULL, finished_at = NULL
+                WHERE order_id = ? AND kind = ? AND status = 'failed'
+                '''
+                cursor.execute(rearm_sql, (run_at, order_id, 'card'))
+                rearmed = cursor.rowcount
+                if rearmed:
+                    # 卡券任务全部结束后重新入队结果通知
+                    cursor.execute("DELETE FROM delivery_jobs WHERE order_id = ? AND kind = 'notify' AND status IN ('done', 'failed')",
+                                   (order_id,))
+                else:
+                    cursor.execute(rearm_sql, (run_at, order_id, 'notify'))
+                    rearmed = cursor.rowcount
+                self.conn.commit()
+                return rearmed
+            except Exception as e:
+                logger.error(f"重新排队订单失败的发货任务失败: {order_id} - {e}")
+                self.conn.rollback()
+                return 0
+
+    def claim_delivery_job(self, cookie_id: str, now: float):
+        """领取账号下一个到期的发货任务（状态改为running并累加尝试次数），没有到期任务返回None"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT id FROM delivery_jobs
+                WHERE cookie_id = ? AND status = 'pending' AND run_at <= ?
+                ORDER BY run_at, id LIMIT 1
+                ''', (cookie_id, now))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute('''
+                UPDATE delivery_jobs SET status = 'running', attempts = attempts + 1, started_at = ?
+                WHERE id = ? AND status = 'pending'
+                ''', (now, row[0]))
+                if not cursor.rowcount:
+                    self.conn.commit()
+                    return None
+                cursor.execute(f"SELECT {', '.join(self.DELIVERY_JOB_COLUMNS)} FROM delivery_jobs WHERE id = ?", (row[0],))
+                job = self._delivery_job_row(cursor.fetchone())
+                self.conn.commit()
+                return job
+            except Exception as e:
+                logger.error(f"领取自动发货任务失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return None
+
+    def update_delivery_job(self, job_id: int, **fields) -> bool:
+        """更新发货任务字段（status/run_at/content/last_error/finished_at）"""
+        allowed = {'status', 'run_at', 'content', 'last_error', 'finished_at'}
+        updates = {key: value for key, value in fields.items() if key in allowed}
+        if not updates:
+            return False
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                assignments = ', '.join(f"{key} = ?" for key in updates)
+                cursor.execute(f"UPDATE delivery_jobs SET {assignments} WHERE id = ?", (*updates.values(), job_id))
+                self.conn.commit()
+                return cursor.rowcount > 0
+            except Exception as e:
+                logger.error(f"更新自动发货任务失败: {job_id} - {e}")
+                self.conn.rollback()
+                return False
+
+    def next_delivery_run_at(self, cookie_id: str):
+        """账号最早的待执行发货任务时间，没有待执行任务返回None"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                SELECT run_at FROM delivery_jobs WHERE cookie_id = ? AND status = 'pending'
+                ORDER BY run_at LIMIT 1
+                ''', (cookie_id,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+            except Exception as e:
+                logger.error(f"查询待执行发货任务失败: {cookie_id} - {e}")
+                return None
+
+    def recover_delivery_jobs(self, cookie_id: str):
+        """恢复进程中断时未完成的发货任务
+
+        running 状态的任务重新排队；sending 状态的任务可能已经发出，为避免重复发送标记为 uncertain
+
+        Returns:
+            (重新排队的任务数, 标记为uncertain的任务数)
+        """
+        with self.lock:
+            try:
+                now = time.time()
+                cursor = self.conn.cursor()
+                cursor.execute('''
+                UPDATE delivery_jobs SET status = 'pending', run_at = ?
+                WHERE cookie_id = ? AND status = 'running'
+                ''', (now, cookie_id))
+                requeued = cursor.rowcount
+                cursor.execute('''
+                UPDATE delivery_jobs SET status = 'uncertain', finished_at = ?, last_error = '进程中断时正在发送，为避免重复发送不再重试'
+                WHERE cookie_id = ? AND status = 'sending'
+                ''', (now, cookie_id))
+                uncertain = cursor.rowcount
+                self.conn.commit()
+                return requeued, uncertain
+            except Exception as e:
+                logger.error(f"恢复自动发货任务失败: {cookie_id} - {e}")
+                self.conn.rollback()
+                return 0, 0
+
+    def get_order_delivery_jobs(self, order_id: str, kind: str = None):
+        """获取订单的发货任务"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                columns = ', '.join(self.DELIVERY_JOB_COLUMNS)
+                if kind:
+                    cursor.execute(f"SELECT {columns} FROM delivery_jobs WHERE order_id = ? AND kind = ? ORDER BY id",
+                                   (order_id, kind))
+                else:
+                    cursor.execute(f"SELECT {columns} FROM delivery_jobs WHERE order_id = ? ORDER BY id", (order_id,))
+                return [self._delivery_job_row(row) for row in cursor.fetchall()]
+            except Exception as e:
+                logger.error(f"获取订单发货任务失败: {order_id} - {e}")
+                return []
+
+    def get_delivery_job_counts(self, cookie_id: str = None) -> dict:
+        """按状态统计发货任务数量"""
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                if cookie_id:
+                    cursor.execute("SELECT status, COUNT(*) FROM delivery_jobs WHERE cookie_id = ? GROUP BY status", (cookie_id,))
+                else:
+                    cursor.execute("SELECT status, COUNT(*) FROM delivery_jobs GROUP BY status")
+                return {row[0]: row[1] for row in cursor.fetchall()}
+            except Exception as e:
+                logger.error(f"统计自动发货任务失败: {e}")
+                return {}
+
+    def save_order_status_batch(self, status_updates: list, history_rows: list) -> bool:
+        """在一个事务中批量写入订单状态和状态历史
+
+        Args:
+            status_updates: [(order_id, order_status, cookie_id), ...]
+            history_rows: [(order_id, from_status, to_status, context), ...]
+        """
+        with self.lock:
+            try:
+                cursor = self.conn.cursor()
+                if status_updates:
+                    self._executemany_sql(cursor, '''
+                    UPDATE orders SET order_status = ?, cookie_id = COALESCE(?, cookie_id), updated_at = CURRENT_TIMESTAMP
+                    WHERE order_id = ?
+                    ''', [(status, cookie_id, order_id) for order_id, status, cookie_id in status_updates])
+                if history_rows:
+                    self._executemany_sql(cursor, '''
+                    INSERT INTO order_status_history (order_id, from_status, to_status, context)
+                    VALUES (?, ?, ?, ?)
+                    ''', history_rows)
+                self.conn.commit()
+                return True
+            except Exception as e:
+                logger.error(f"批量写入订单状态失败: {e}")
+                self.conn.rollback()
+                return False
+
     def get_orders_by_cookie(self, cookie_id: str, limit: int = 100):
         """根据Cookie ID获取订单列表"""
         with self.lock:
@@ -5209,6 +6115,39 @@ class DBManager:
                     logger.warning(f"清理邮箱验证记录失败: {e}")
                     stats['email_verifications'] = 0
                 
+                # 清理长期未使用的API卡券预取内容
+                try:
+                    cursor.execute("DELETE FROM api_card_buffer WHERE fetched_at < ?", (time.time() - days * 86400,))
+                    stats['api_card_buffer'] = cursor.rowcount
+                    if cursor.rowcount > 0:
+                        logger.info(f"清理了 {cursor.rowcount} 条未使用的API卡券预取内容（{days}天前）")
+                except Exception as e:
+                    logger.warning(f"清理API卡券预取内容失败: {e}")
+                    stats['api_card_buffer'] = 0
+
+                # 清理已结束的自动发货任务（幂等键保留与其他历史数据相同的天数）
+                try:
+                    cursor.execute(
+                        "DELETE FROM delivery_jobs WHERE status IN ('done', 'failed', 'uncertain') AND finished_at < ?",
+                        (time.time() - days * 86400,)
+                    )
+                    stats['delivery_jobs'] = cursor.rowcount
+                    if cursor.rowcount > 0:
+                        logger.info(f"清理了 {cursor.rowcount} 条已结束的自动发货任务（{days}天前）")
+                except Exception as e:
+                    logger.warning(f"清理自动发货任务失败: {e}")
+                    stats['delivery_jobs'] = 0
+
+                # 清理已过期的账号Token缓存（过期后不会再被复用）
+                try:
+                    cursor.execute("DELETE FROM account_tokens WHERE expires_at < ?", (time.time(),))
+                    stats['account_tokens'] = cursor.rowcount
+                    if cursor.rowcount > 0:
+                        logger.info(f"清理了 {cursor.rowcount} 条已过期的账号Token缓存")
+                except Exception as e:
+                    logger.warning(f"清理账号Token缓存失败: {e}")
+                    stats['account_tokens'] = 0
+
                 # 提交更改
                 self.conn.commit()
                 
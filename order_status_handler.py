@@ -6,11 +6,16 @@
 import re
 import json
 import time
+import hashlib
 import uuid
+import atexit
 import threading
 import asyncio
+from collections import OrderedDict
 from loguru import logger
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+
+from utils.single_flight import SingleFlight
 
 # ==================== 订单状态处理器配置 ====================
 # 订单状态处理器配置
@@ -19,9 +24,17 @@ ORDER_STATUS_HANDLER_CONFIG = {
     'strict_validation': True,                     # 是否启用严格的状态转换验证
     'log_level': 'info',                          # 日志级别 (debug/info/warning/error)
     'max_pending_age_hours': 24,                  # 待处理更新的最大保留时间（小时）
+    'pending_retry_base_seconds': 60,             # 订单仍未入库时待处理更新的重试间隔（秒，指数退避）
+    'pending_retry_max_seconds': 3600,            # 待处理更新重试间隔上限（秒）
     'enable_status_logging': True,                # 是否启用详细的状态变更日志
+    'max_cached_orders': 5000,                    # 内存中缓存的订单状态数量上限（LRU淘汰）
+    'flush_interval': 0.5,                        # 状态变更批量写入数据库的间隔（秒）
+    'flush_batch_size': 200,                      # 缓冲的变更达到该数量时立即写入
 }
 
+# 内存中保留的每个订单状态历史条数
+STATUS_HISTORY_LIMIT = 10
+
 
 class OrderStatusHandler:
     """订单状态处理器"""
@@ -58,22 +71,34 @@ class OrderStatusHandler:
             'cancelled': '已关闭',      # 交易关闭
         }
         
-        # 待处理的订单状态更新队列 {order_id: [update_info, ...]}
-        self.pending_updates = {}
-        # 待处理的系统消息队列（用于延迟处理）{cookie_id: [message_info, ...]}
-        self._pending_system_messages = {}
-        # 待处理的红色提醒消息队列（用于延迟处理）{cookie_id: [message_info, ...]}
-        self._pending_red_reminder_messages = {}
+        # 待处理的订单状态更新、系统消息和红色提醒消息保存在数据库中
+        # （order_pending_updates / order_pending_messages 表），重启后不会丢失，内存占用不随队列增长
         
         # 订单状态历史记录 {order_id: [status_history, ...]}
         # 用于退款撤销时回退到上一次状态
         self._order_status_history = {}
         
-        # 使用threading.RLock保护并发访问
-        # 注意：虽然在async环境中asyncio.Lock更理想，但本类的所有方法都是同步的
-        # 且被同步代码调用，因此保持使用threading.RLock是合适的
+        # 热点订单的当前状态缓存 {order_id: {'status': ..., 'cookie_id': ...}}
+        # 状态校验和转换都在内存中完成，未命中时在线程中从数据库加载（同一订单的并发加载只执行一次）
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._state_loads = SingleFlight('order_state')
+        
+        # 待写入数据库的状态变更，由后台线程按批次在一个事务中写入
+        self._dirty_states: Dict[str, Tuple[str, Optional[str]]] = {}   # {order_id: (status, cookie_id)}，同一订单只写最终状态
+        self._dirty_history: List[Tuple[str, str, str, str]] = []       # [(order_id, from_status, to_status, context), ...]
+        self._flush_event = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._flush_thread = None
+        self._flush_stats = {'flushes': 0, 'status_rows': 0, 'history_rows': 0, 'failures': 0}
+        atexit.register(self.flush)
+        
+        # 保护内存状态的锁：只在内存操作期间持有，不会跨越数据库IO或await
         self._lock = threading.RLock()
         
+        # 其他途径写入订单状态/所属账号或删除订单时，同步内存中的状态
+        from db_manager import db_manager
+        db_manager.add_order_change_listener(self._on_order_changed)
+        
         # 设置日志级别
         log_level = self.config.get('log_level', 'info')
         logger.info(f"订单状态处理器初始化完成，配置: {self.config}")
@@ -189,8 +214,162 @@ class OrderStatusHandler:
             logger.error(f"提取订单ID失败: {str(e)}")
             return None
     
-    def update_order_status(self, order_id: str, new_status: str, cookie_id: str, context: str = "") -> bool:
-        """更新订单状态到数据库
+    # ==================== 订单状态缓存与批量持久化 ====================
+    
+    def _load_state(self, order_id: str):
+        """从数据库加载订单当前状态和最近的状态历史（在线程中执行）
+        
+        Returns:
+            (state, history)，订单不存在时返回None
+        """
+        from db_manager import db_manager
+        
+        # 等待正在进行的批量写入完成，避免读到尚未落库的旧状态
+        with self._flush_lock:
+            order = db_manager.get_order_by_id(order_id)
+            if not order:
+                return None
+            history = db_manager.get_order_status_history(order_id, STATUS_HISTORY_LIMIT)
+        
+        state = {'status': order.get('status') or 'processing', 'cookie_id': order.get('cookie_id')}
+        history = [
+            {'from_status': row['from_status'], 'to_status': row['to_status'],
+             'context': row['context'], 'timestamp': row['created_at']}
+            for row in history
+        ]
+        return state, history
+    
+    def _cache_state(self, order_id: str, state: Dict[str, Any], history: list) -> Dict[str, Any]:
+        """把加载到的状态放入缓存，已被其他调用方缓存时以内存中的为准"""
+        with self._lock:
+            cached = self._states.get(order_id)
+            if cached is not None:
+                return cached
+            self._states[order_id] = state
+            if order_id not in self._order_status_history:
+                self._order_status_history[order_id] = history
+            
+            # LRU淘汰：跳过还有未写入变更的订单
+            overflow = len(self._states) - self.config.get('max_cached_orders', 5000)
+            if overflow > 0:
+                for old_id in list(self._states)[:overflow * 2]:
+                    if overflow <= 0:
+                        break
+                    if old_id in self._dirty_states or old_id == order_id:
+                        continue
+                    del self._states[old_id]
+                    self._order_status_history.pop(old_id, None)
+                    overflow -= 1
+            return state
+    
+    async def _get_state(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """获取订单当前状态，未命中缓存时异步从数据库加载，订单不存在返回None"""
+        with self._lock:
+            state = self._states.get(order_id)
+            if state is not None:
+                self._states.move_to_end(order_id)
+                return state
+        
+        loaded = await self._state_loads.do(order_id, lambda: asyncio.to_thread(self._load_state, order_id))
+        if loaded is None:
+            return None
+        return self._cache_state(order_id, *loaded)
+    
+    def invalidate(self, order_id: str, deleted: bool = False):
+        """订单状态被外部修改后，丢弃内存中的状态和尚未写入的状态变更（以外部写入为准）
+        
+        Args:
+            order_id: 订单ID
+            deleted: 订单已被删除，同时丢弃尚未写入的状态历史
+        """
+        with self._lock:
+            self._states.pop(order_id, None)
+            self._order_status_history.pop(order_id, None)
+            self._dirty_states.pop(order_id, None)
+            if deleted:
+                self._dirty_history = [row for row in self._dirty_history if row[0] != order_id]
+    
+    def _on_order_changed(self, order_id: str, changes: Optional[Dict[str, Any]]):
+        """数据库订单变更回调（见 db_manager.add_order_change_listener）"""
+        if changes is None or 'order_status' in changes:
+            self.invalidate(order_id, deleted=changes is None)
+            return
+        
+        cookie_id = changes.get('cookie_id')
+        if cookie_id is None:
+            return
+        with self._lock:
+            state = self._states.get(order_id)
+            if state is not None:
+                state['cookie_id'] = cookie_id
+            dirty = self._dirty_states.get(order_id)
+            if dirty is not None:
+                self._dirty_states[order_id] = (dirty[0], cookie_id)
+    
+    def _schedule_flush(self):
+        """确保后台写入线程已启动，缓冲较多时立即唤醒（调用方需持有 self._lock）"""
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self._flush_thread = threading.Thread(target=self._flush_loop, name='order-status-flush', daemon=True)
+            self._flush_thread.start()
+        if len(self._dirty_states) + len(self._dirty_history) >= self.config.get('flush_batch_size', 200):
+            self._flush_event.set()
+    
+    def _flush_loop(self):
+        interval = self.config.get('flush_interval', 0.5)
+        while True:
+            self._flush_event.wait(interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"订单状态批量写入出错: {str(e)}")
+    
+    def flush(self) -> bool:
+        """把缓冲的状态变更和状态历史在一个事务中写入数据库
+        
+        Returns:
+            bool: 写入是否成功（没有待写入的变更也返回True）
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty_states and not self._dirty_history:
+                    return True
+                status_updates = [(order_id, status, cookie_id) for order_id, (status, cookie_id) in self._dirty_states.items()]
+                history_rows = self._dirty_history
+                self._dirty_states = {}
+                self._dirty_history = []
+            
+            from db_manager import db_manager
+            if db_manager.save_order_status_batch(status_updates, history_rows):
+                self._flush_stats['flushes'] += 1
+                self._flush_stats['status_rows'] += len(status_updates)
+                self._flush_stats['history_rows'] += len(history_rows)
+                logger.debug(f"💾 订单状态批量写入: {len(status_updates)}个订单, {len(history_rows)}条历史")
+                return True
+            
+            # 写入失败：放回缓冲区等待下次重试，期间产生的新状态优先
+            self._flush_stats['failures'] += 1
+            with self._lock:
+                for order_id, status, cookie_id in status_updates:
+                    self._dirty_states.setdefault(order_id, (status, cookie_id))
+                self._dirty_history = history_rows + self._dirty_history
+            return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取状态缓存和批量写入统计"""
+        with self._lock:
+            return {
+                'cached_orders': len(self._states),
+                'dirty_orders': len(self._dirty_states),
+                'dirty_history': len(self._dirty_history),
+                'state_loads': self._state_loads.get_stats(),
+                **self._flush_stats,
+            }
+    
+    async def update_order_status(self, order_id: str, new_status: str, cookie_id: str, context: str = "") -> bool:
+        """更新订单状态
+        
+        状态校验和转换在内存中完成，变更由后台线程批量写入数据库
         
         Args:
             order_id: 订单ID
@@ -202,109 +381,79 @@ class OrderStatusHandler:
             bool: 更新是否成功
         """
         logger.info(f"🔄 订单状态处理器.update_order_status开始: order_id={order_id}, new_status={new_status}, cookie_id={cookie_id}, context={context}")
-        with self._lock:
-            try:
-                from db_manager import db_manager
-                
-                # 验证状态值是否有效
-                if new_status not in self.status_mapping:
-                    logger.error(f"❌ 无效的订单状态: {new_status}，有效状态: {list(self.status_mapping.keys())}")
-                    return False
-                
-                logger.info(f"✅ 订单状态验证通过: {new_status}")
-                
-                # 检查订单是否存在于数据库中（带重试机制）
-                current_order = None
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        logger.info(f"🔍 尝试获取订单信息 (尝试 {attempt + 1}/{max_retries}): {order_id}")
-                        current_order = db_manager.get_order_by_id(order_id)
-                        logger.info(f"✅ 订单信息获取成功: {order_id}")
-                        break
-                    except Exception as db_e:
-                        if attempt == max_retries - 1:
-                            logger.error(f"❌ 获取订单信息失败 (尝试 {attempt + 1}/{max_retries}): {str(db_e)}")
-                            return False
-                        else:
-                            logger.error(f"⚠️ 获取订单信息失败，重试中 (尝试 {attempt + 1}/{max_retries}): {str(db_e)}")
-                            time.sleep(0.1 * (attempt + 1))  # 递增延迟
-                
-                if not current_order:
-                    # 订单不存在，根据配置决定是否添加到待处理队列
-                    logger.info(f"⚠️ 订单 {order_id} 不存在于数据库中")
-                    if self.config.get('use_pending_queue', True):
-                        logger.info(f"📝 订单 {order_id} 不存在于数据库中，添加到待处理队列等待主程序拉取订单详情")
-                        self._add_to_pending_updates(order_id, new_status, cookie_id, context)
-                    else:
-                        logger.error(f"❌ 订单 {order_id} 不存在于数据库中且未启用待处理队列，跳过状态更新")
-                    return False
-                
-                current_status = current_order.get('order_status', 'processing')
-                logger.info(f"📊 当前订单状态: {current_status}, 目标状态: {new_status}")
-                
-                # 检查是否是相同的状态更新（避免重复处理）
-                if current_status == new_status:
-                    status_text = self.status_mapping.get(new_status, new_status)
-                    logger.info(f"⏭️ 订单 {order_id} 状态无变化，跳过重复更新: {status_text}")
-                    return True  # 返回True表示"成功"，避免重复日志
-                
-                # 检查状态转换是否合理（根据配置决定是否启用严格验证）
-                if self.config.get('strict_validation', True) and not self._is_valid_status_transition(current_status, new_status):
-                    logger.error(f"❌ 订单 {order_id} 状态转换不合理: {current_status} -> {new_status} (严格验证已启用)")
-                    logger.error(f"当前状态 '{current_status}' 允许转换到: {self._get_allowed_transitions(current_status)}")
-                    return False
-                
-                logger.info(f"✅ 状态转换验证通过: {current_status} -> {new_status}")
-                
-                # 处理退款撤销的特殊逻辑
-                if new_status == 'refund_cancelled':
-                    # 从历史记录中获取上一次状态
-                    previous_status = self._get_previous_status(order_id)
-                    if previous_status:
-                        logger.info(f"🔄 退款撤销，回退到上一次状态: {previous_status}")
-                        new_status = previous_status
-                    else:
-                        logger.warning(f"⚠️ 退款撤销但无法获取上一次状态，保持当前状态: {current_status}")
-                        new_status = current_status
-                
-                # 更新订单状态（带重试机制）
-                success = False
-                for attempt in range(max_retries):
-                    try:
-                        logger.info(f"💾 尝试更新订单状态 (尝试 {attempt + 1}/{max_retries}): {order_id}")
-                        success = db_manager.insert_or_update_order(
-                            order_id=order_id,
-                            order_status=new_status,
-                            cookie_id=cookie_id
-                        )
-                        logger.info(f"✅ 订单状态更新成功: {order_id}")
-                        break
-                    except Exception as db_e:
-                        if attempt == max_retries - 1:
-                            logger.error(f"❌ 更新订单状态失败 (尝试 {attempt + 1}/{max_retries}): {str(db_e)}")
-                            return False
-                        else:
-                            logger.error(f"⚠️ 更新订单状态失败，重试中 (尝试 {attempt + 1}/{max_retries}): {str(db_e)}")
-                            time.sleep(0.1 * (attempt + 1))  # 递增延迟
-                
-                if success:
-                    # 记录状态历史（用于退款撤销时回退）
-                    self._record_status_history(order_id, current_status, new_status, context)
-                    
-                    status_text = self.status_mapping.get(new_status, new_status)
-                    if self.config.get('enable_status_logging', True):
-                        logger.info(f"✅ 订单状态更新成功: {order_id} -> {status_text} ({context})")
+        try:
+            # 验证状态值是否有效
+            if new_status not in self.status_mapping:
+                logger.error(f"❌ 无效的订单状态: {new_status}，有效状态: {list(self.status_mapping.keys())}")
+                return False
+            
+            logger.info(f"✅ 订单状态验证通过: {new_status}")
+            
+            # 获取订单当前状态（优先使用内存缓存）
+            state = await self._get_state(order_id)
+            
+            if state is None:
+                # 订单不存在，根据配置决定是否添加到待处理队列
+                logger.info(f"⚠️ 订单 {order_id} 不存在于数据库中")
+                if self.config.get('use_pending_queue', True):
+                    logger.info(f"📝 订单 {order_id} 不存在于数据库中，添加到待处理队列等待主程序拉取订单详情")
+                    await self._add_to_pending_updates(order_id, new_status, cookie_id, context)
                 else:
-                    logger.error(f"❌ 订单状态更新失败: {order_id} -> {new_status} ({context})")
-                
-                return success
-                
-            except Exception as e:
-                logger.error(f"更新订单状态时出错: {str(e)}")
-                import traceback
-                logger.error(f"详细错误信息: {traceback.format_exc()}")
+                    logger.error(f"❌ 订单 {order_id} 不存在于数据库中且未启用待处理队列，跳过状态更新")
                 return False
+            
+            with self._lock:
+                return self._apply_transition(order_id, state, new_status, cookie_id, context)
+            
+        except Exception as e:
+            logger.error(f"更新订单状态时出错: {str(e)}")
+            import traceback
+            logger.error(f"详细错误信息: {traceback.format_exc()}")
+            return False
+    
+    def _apply_transition(self, order_id: str, state: Dict[str, Any], new_status: str, cookie_id: str, context: str) -> bool:
+        """在内存中校验并应用状态转换，变更加入批量写入缓冲（调用方需持有 self._lock）"""
+        current_status = state['status']
+        logger.info(f"📊 当前订单状态: {current_status}, 目标状态: {new_status}")
+        
+        # 检查是否是相同的状态更新（避免重复处理）
+        if current_status == new_status:
+            status_text = self.status_mapping.get(new_status, new_status)
+            logger.info(f"⏭️ 订单 {order_id} 状态无变化，跳过重复更新: {status_text}")
+            return True  # 返回True表示"成功"，避免重复日志
+        
+        # 检查状态转换是否合理（根据配置决定是否启用严格验证）
+        if self.config.get('strict_validation', True) and not self._is_valid_status_transition(current_status, new_status):
+            logger.error(f"❌ 订单 {order_id} 状态转换不合理: {current_status} -> {new_status} (严格验证已启用)")
+            logger.error(f"当前状态 '{current_status}' 允许转换到: {self._get_allowed_transitions(current_status)}")
+            return False
+        
+        logger.info(f"✅ 状态转换验证通过: {current_status} -> {new_status}")
+        
+        # 处理退款撤销的特殊逻辑
+        if new_status == 'refund_cancelled':
+            # 从历史记录中获取上一次状态
+            previous_status = self._get_previous_status(order_id)
+            if previous_status:
+                logger.info(f"🔄 退款撤销，回退到上一次状态: {previous_status}")
+                new_status = previous_status
+            else:
+                logger.warning(f"⚠️ 退款撤销但无法获取上一次状态，保持当前状态: {current_status}")
+                return True
+        
+        state['status'] = new_status
+        if cookie_id:
+            state['cookie_id'] = cookie_id
+        self._dirty_states[order_id] = (new_status, state['cookie_id'])
+        
+        # 记录状态历史（用于退款撤销时回退）
+        self._record_status_history(order_id, current_status, new_status, context)
+        self._schedule_flush()
+        
+        status_text = self.status_mapping.get(new_status, new_status)
+        if self.config.get('enable_status_logging', True):
+            logger.info(f"✅ 订单状态更新成功: {order_id} -> {status_text} ({context})")
+        return True
     
     def _is_valid_status_transition(self, current_status: str, new_status: str) -> bool:
         """检查状态转换是否合理
@@ -417,7 +566,7 @@ class OrderStatusHandler:
             return None
     
     def _record_status_history(self, order_id: str, from_status: str, to_status: str, context: str):
-        """记录订单状态历史
+        """记录订单状态历史（内存中保留最近几条，同时加入批量写入缓冲）
         
         Args:
             order_id: 订单ID
@@ -438,10 +587,11 @@ class OrderStatusHandler:
                     'timestamp': time.time()
                 }
                 self._order_status_history[order_id].append(history_entry)
+                self._dirty_history.append((order_id, from_status, to_status, context))
                 
                 # 限制历史记录数量，只保留最近10条
-                if len(self._order_status_history[order_id]) > 10:
-                    self._order_status_history[order_id] = self._order_status_history[order_id][-10:]
+                if len(self._order_status_history[order_id]) > STATUS_HISTORY_LIMIT:
+                    self._order_status_history[order_id] = self._order_status_history[order_id][-STATUS_HISTORY_LIMIT:]
                 
                 logger.debug(f"📝 记录订单状态历史: {order_id} {from_status} -> {to_status}")
     
@@ -458,12 +608,12 @@ class OrderStatusHandler:
             if order_id not in self._order_status_history or not self._order_status_history[order_id]:
                 return None
             
-            # 获取最后一次状态变化的目标状态
+            # 最后一次状态变化是进入当前状态（退款中）的那次，回退到它的原状态
             last_entry = self._order_status_history[order_id][-1]
-            return last_entry['to_status']
+            return last_entry['from_status']
     
-    def _add_to_pending_updates(self, order_id: str, new_status: str, cookie_id: str, context: str):
-        """添加到待处理更新队列
+    async def _add_to_pending_updates(self, order_id: str, new_status: str, cookie_id: str, context: str):
+        """添加到待处理更新队列（持久化到数据库，重启后不会丢失）
         
         Args:
             order_id: 订单ID
@@ -471,22 +621,18 @@ class OrderStatusHandler:
             cookie_id: Cookie ID
             context: 上下文信息
         """
-        with self._lock:
-            if order_id not in self.pending_updates:
-                self.pending_updates[order_id] = []
-            
-            update_info = {
-                'new_status': new_status,
-                'cookie_id': cookie_id,
-                'context': context,
-                'timestamp': time.time()
-            }
-            
-            self.pending_updates[order_id].append(update_info)
+        from db_manager import db_manager
+        if await asyncio.to_thread(db_manager.add_order_pending_update, order_id, new_status, cookie_id, context):
             logger.info(f"订单 {order_id} 状态更新已添加到待处理队列: {new_status} ({context})")
     
-    def process_pending_updates(self, order_id: str) -> bool:
-        """处理指定订单的待处理更新
+    def _next_attempt_at(self, attempts: int) -> float:
+        """订单仍未入库时，待处理更新的下次处理时间（指数退避）"""
+        base = self.config.get('pending_retry_base_seconds', 60)
+        delay = min(base * (2 ** attempts), self.config.get('pending_retry_max_seconds', 3600))
+        return time.time() + delay
+    
+    async def process_pending_updates(self, order_id: str) -> bool:
+        """处理指定订单的待处理更新（按订单ID索引查询）
         
         Args:
             order_id: 订单ID
@@ -494,21 +640,29 @@ class OrderStatusHandler:
         Returns:
             bool: 是否有更新被处理
         """
-        with self._lock:
-            if order_id not in self.pending_updates:
-                return False
-            
-            updates = self.pending_updates.pop(order_id)
-            processed_count = 0
+        from db_manager import db_manager
+        
+        updates = await asyncio.to_thread(db_manager.get_order_pending_updates, order_id)
+        if not updates:
+            return False
         
+        state = await self._get_state(order_id)
+        if state is None:
+            # 订单仍未入库，推迟到下次处理
+            next_attempt_at = self._next_attempt_at(max(update['attempts'] for update in updates))
+            await asyncio.to_thread(db_manager.reschedule_order_pending_updates,
+                                    [update['id'] for update in updates], next_attempt_at)
+            logger.info(f"订单 {order_id} 尚未入库，{len(updates)} 个待处理更新推迟处理")
+            return False
+        
+        processed_count = 0
         for update_info in updates:
             try:
-                success = self.update_order_status(
-                    order_id=order_id,
-                    new_status=update_info['new_status'],
-                    cookie_id=update_info['cookie_id'],
-                    context=f"待处理队列: {update_info['context']}"
-                )
+                with self._lock:
+                    success = self._apply_transition(
+                        order_id, state, update_info['new_status'], update_info['cookie_id'],
+                        f"待处理队列: {update_info['context']}"
+                    )
                 
                 if success:
                     processed_count += 1
@@ -519,41 +673,45 @@ class OrderStatusHandler:
             except Exception as e:
                 logger.error(f"处理待处理更新时出错: {str(e)}")
         
+        # 订单已入库，状态转换的结果不会因重试而改变，处理过的记录全部删除
+        await asyncio.to_thread(db_manager.delete_order_pending_updates, [update['id'] for update in updates])
+        
         if processed_count > 0:
             logger.info(f"订单 {order_id} 共处理了 {processed_count} 个待处理状态更新")
         
         return processed_count > 0
     
-    def process_all_pending_updates(self) -> int:
-        """处理所有待处理的更新
+    async def process_all_pending_updates(self, cookie_id: str = None, limit: int = 100) -> int:
+        """处理已到重试时间的待处理更新（按 next_attempt_at 索引范围查询，不扫描整个队列）
         
+        Args:
+            cookie_id: 只处理指定账号的更新，为None时处理所有账号
+            limit: 单次最多读取的待处理记录数
+            
         Returns:
             int: 处理的订单数量
         """
-        with self._lock:
-            if not self.pending_updates:
-                return 0
-            
-            order_ids = list(self.pending_updates.keys())
-            processed_orders = 0
+        from db_manager import db_manager
         
+        order_ids = await asyncio.to_thread(db_manager.get_due_order_pending_ids, time.time(), cookie_id, limit)
+        processed_orders = 0
         for order_id in order_ids:
-            if self.process_pending_updates(order_id):
+            if await self.process_pending_updates(order_id):
                 processed_orders += 1
         
         return processed_orders
     
     def get_pending_updates_count(self) -> int:
-        """获取待处理更新的数量
+        """获取有待处理更新的订单数量
         
         Returns:
             int: 待处理更新的数量
         """
-        with self._lock:
-            return len(self.pending_updates)
+        from db_manager import db_manager
+        return db_manager.count_order_pending_orders()
     
     def clear_old_pending_updates(self, max_age_hours: int = None):
-        """清理过期的待处理更新
+        """清理过期的待处理更新和待处理消息（按创建时间范围删除）
         
         Args:
             max_age_hours: 最大保留时间（小时），如果为None则使用配置中的默认值
@@ -566,71 +724,31 @@ class OrderStatusHandler:
         if max_age_hours is None:
             max_age_hours = self.config.get('max_pending_age_hours', 24)
         
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
+        from db_manager import db_manager
+        updates_deleted, messages_deleted = db_manager.delete_expired_order_pending(time.time() - max_age_hours * 3600)
         
-        with self._lock:
-            # 清理 pending_updates
-            expired_orders = []
-            for order_id, updates in self.pending_updates.items():
-                # 过滤掉过期的更新
-                valid_updates = [
-                    update for update in updates 
-                    if current_time - update['timestamp'] < max_age_seconds
-                ]
-                
-                if not valid_updates:
-                    expired_orders.append(order_id)
-                else:
-                    self.pending_updates[order_id] = valid_updates
-            
-            # 移除完全过期的订单
-            for order_id in expired_orders:
-                del self.pending_updates[order_id]
-                logger.info(f"清理过期的待处理更新: 订单 {order_id}")
-            
-            if expired_orders:
-                logger.info(f"共清理了 {len(expired_orders)} 个过期的待处理订单更新")
-            
-            # 清理 _pending_system_messages
-            expired_cookies_system = []
-            for cookie_id, messages in self._pending_system_messages.items():
-                valid_messages = [
-                    msg for msg in messages 
-                    if current_time - msg.get('timestamp', 0) < max_age_seconds
-                ]
-                
-                if not valid_messages:
-                    expired_cookies_system.append(cookie_id)
-                else:
-                    self._pending_system_messages[cookie_id] = valid_messages
-            
-            for cookie_id in expired_cookies_system:
-                del self._pending_system_messages[cookie_id]
-                logger.info(f"清理过期的待处理系统消息: 账号 {cookie_id}")
-            
-            # 清理 _pending_red_reminder_messages
-            expired_cookies_red = []
-            for cookie_id, messages in self._pending_red_reminder_messages.items():
-                valid_messages = [
-                    msg for msg in messages 
-                    if current_time - msg.get('timestamp', 0) < max_age_seconds
-                ]
-                
-                if not valid_messages:
-                    expired_cookies_red.append(cookie_id)
-                else:
-                    self._pending_red_reminder_messages[cookie_id] = valid_messages
-            
-            for cookie_id in expired_cookies_red:
-                del self._pending_red_reminder_messages[cookie_id]
-                logger.info(f"清理过期的待处理红色提醒消息: 账号 {cookie_id}")
-            
-            total_cleared = len(expired_orders) + len(expired_cookies_system) + len(expired_cookies_red)
-            if total_cleared > 0:
-                logger.info(f"内存清理完成，共清理了 {total_cleared} 个过期项目")
+        if updates_deleted:
+            logger.info(f"共清理了 {updates_deleted} 个过期的待处理订单更新")
+        if messages_deleted:
+            logger.info(f"共清理了 {messages_deleted} 个过期的待处理消息")
+    
+    @staticmethod
+    def _message_hash(message) -> str:
+        """消息哈希（用于匹配待处理消息，需跨进程稳定，不能使用内置hash）"""
+        text = str(sorted(message.items())) if isinstance(message, dict) else str(message)
+        return hashlib.md5(text.encode('utf-8')).hexdigest()
+    
+    async def _add_to_pending_messages(self, kind: str, cookie_id: str, message: dict, pending_info: dict):
+        """添加暂时无法提取订单ID的消息到待处理消息队列
+        
+        Args:
+            kind: system（系统消息）/ red_reminder（红色提醒）
+        """
+        from db_manager import db_manager
+        await asyncio.to_thread(db_manager.add_order_pending_message, cookie_id, kind,
+                                self._message_hash(message), pending_info)
     
-    def handle_system_message(self, message: dict, send_message: str, cookie_id: str, msg_time: str) -> bool:
+    async def handle_system_message(self, message: dict, send_message: str, cookie_id: str, msg_time: str) -> bool:
         """处理系统消息并更新订单状态
         
         Args:
@@ -672,52 +790,42 @@ class OrderStatusHandler:
             order_id = self.extract_order_id(message)
             if not order_id:
                 # 如果无法提取订单ID，根据配置决定是否添加到待处理队列
-                if self.config.get('use_pending_queue', True):
-                    logger.info(f'[{msg_time}] 【{cookie_id}】{send_message}，暂时无法提取订单ID，添加到待处理队列')
-                else:
+                if not self.config.get('use_pending_queue', True):
                     logger.error(f'[{msg_time}] 【{cookie_id}】{send_message}，无法提取订单ID且未启用待处理队列，跳过处理')
-                return False
+                    return False
+                logger.info(f'[{msg_time}] 【{cookie_id}】{send_message}，暂时无法提取订单ID，添加到待处理队列')
                 
                 # 创建一个临时的订单ID占位符，用于标识这个待处理的状态更新
                 temp_order_id = f"temp_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
                 
-                # 获取对应的状态
-                new_status = message_status_mapping[send_message]
-                
                 # 添加到待处理队列，使用特殊标记
-                self._add_to_pending_updates(
+                await self._add_to_pending_updates(
                     order_id=temp_order_id,
                     new_status=new_status,
                     cookie_id=cookie_id,
                     context=f"{send_message} - {msg_time} - 等待订单ID提取"
                 )
                 
-                # 添加到待处理的系统消息队列
-                if cookie_id not in self._pending_system_messages:
-                    self._pending_system_messages[cookie_id] = []
-                
-                self._pending_system_messages[cookie_id].append({
-                    'message': message,
+                # 添加到待处理的系统消息队列（按消息哈希匹配）
+                await self._add_to_pending_messages('system', cookie_id, message, {
                     'send_message': send_message,
                     'cookie_id': cookie_id,
                     'msg_time': msg_time,
                     'new_status': new_status,
                     'temp_order_id': temp_order_id,
-                    'message_hash': hash(str(sorted(message.items()))) if isinstance(message, dict) else hash(str(message)),  # 添加消息哈希用于匹配
-                    'timestamp': time.time()  # 添加时间戳用于清理
                 })
                 
-                return True
+                # 状态尚未更新，订单ID提取后由 on_order_id_extracted 延迟处理
+                return False
             
             # 获取对应的状态（new_status已经在上面通过_check_refund_message或message_status_mapping确定了）
             
-            # 检查当前订单状态，避免不合理的状态回退
-            from db_manager import db_manager
-            current_order = db_manager.get_order_by_id(order_id)
+            # 检查当前订单状态，避免不合理的状态回退（内存缓存，未命中时异步加载）
+            current_state = await self._get_state(order_id)
             
             # 如果订单存在，检查是否需要忽略这次状态更新
-            if current_order and current_order.get('order_status'):
-                current_status = current_order.get('order_status')
+            if current_state and current_state.get('status'):
+                current_status = current_state['status']
                 
                 # 定义状态优先级（数字越大，状态越靠后）
                 status_priority = {
@@ -738,7 +846,7 @@ class OrderStatusHandler:
                     return True  # 返回True表示已处理，但实际上是忽略
             
             # 更新订单状态
-            success = self.update_order_status(
+            success = await self.update_order_status(
                 order_id=order_id,
                 new_status=new_status,
                 cookie_id=cookie_id,
@@ -757,7 +865,7 @@ class OrderStatusHandler:
             logger.error(f'[{msg_time}] 【{cookie_id}】处理系统消息订单状态更新时出错: {str(e)}')
             return False
     
-    def handle_red_reminder_message(self, message: dict, red_reminder: str, user_id: str, cookie_id: str, msg_time: str) -> bool:
+    async def handle_red_reminder_message(self, message: dict, red_reminder: str, user_id: str, cookie_id: str, msg_time: str) -> bool:
         """处理红色提醒消息并更新订单状态
         
         Args:
@@ -779,43 +887,37 @@ class OrderStatusHandler:
             order_id = self.extract_order_id(message)
             if not order_id:
                 # 如果无法提取订单ID，根据配置决定是否添加到待处理队列
-                if self.config.get('use_pending_queue', True):
-                    logger.info(f'[{msg_time}] 【{cookie_id}】交易关闭，暂时无法提取订单ID，添加到待处理队列')
-                else:
+                if not self.config.get('use_pending_queue', True):
                     logger.error(f'[{msg_time}] 【{cookie_id}】交易关闭，无法提取订单ID且未启用待处理队列，跳过处理')
-                return False
+                    return False
+                logger.info(f'[{msg_time}] 【{cookie_id}】交易关闭，暂时无法提取订单ID，添加到待处理队列')
                 
                 # 创建一个临时的订单ID占位符，用于标识这个待处理的状态更新
                 temp_order_id = f"temp_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
                 
                 # 添加到待处理队列，使用特殊标记
-                self._add_to_pending_updates(
+                await self._add_to_pending_updates(
                     order_id=temp_order_id,
                     new_status='cancelled',
                     cookie_id=cookie_id,
                     context=f"交易关闭 - 用户{user_id} - {msg_time} - 等待订单ID提取"
                 )
                 
-                # 添加到待处理的红色提醒消息队列
-                if cookie_id not in self._pending_red_reminder_messages:
-                    self._pending_red_reminder_messages[cookie_id] = []
-                
-                self._pending_red_reminder_messages[cookie_id].append({
-                    'message': message,
+                # 添加到待处理的红色提醒消息队列（按消息哈希匹配）
+                await self._add_to_pending_messages('red_reminder', cookie_id, message, {
                     'red_reminder': red_reminder,
                     'user_id': user_id,
                     'cookie_id': cookie_id,
                     'msg_time': msg_time,
                     'new_status': 'cancelled',
                     'temp_order_id': temp_order_id,
-                    'message_hash': hash(str(sorted(message.items()))) if isinstance(message, dict) else hash(str(message)),  # 添加消息哈希用于匹配
-                    'timestamp': time.time()  # 添加时间戳用于清理
                 })
                 
-                return True
+                # 状态尚未更新，订单ID提取后由 on_order_id_extracted 延迟处理
+                return False
             
             # 更新订单状态为已关闭
-            success = self.update_order_status(
+            success = await self.update_order_status(
                 order_id=order_id,
                 new_status='cancelled',
                 cookie_id=cookie_id,
@@ -833,7 +935,7 @@ class OrderStatusHandler:
             logger.error(f'[{msg_time}] 【{cookie_id}】处理交易关闭订单状态更新时出错: {str(e)}')
             return False
     
-    def handle_auto_delivery_order_status(self, order_id: str, cookie_id: str, context: str = "自动发货") -> bool:
+    async def handle_auto_delivery_order_status(self, order_id: str, cookie_id: str, context: str = "自动发货") -> bool:
         """处理自动发货时的订单状态更新
         
         Args:
@@ -844,14 +946,14 @@ class OrderStatusHandler:
         Returns:
             bool: 更新是否成功
         """
-        return self.update_order_status(
+        return await self.update_order_status(
             order_id=order_id,
             new_status='shipped',  # 已发货
             cookie_id=cookie_id,
             context=context
         )
     
-    def handle_order_basic_info_status(self, order_id: str, cookie_id: str, context: str = "基本信息保存") -> bool:
+    async def handle_order_basic_info_status(self, order_id: str, cookie_id: str, context: str = "基本信息保存") -> bool:
         """处理订单基本信息保存时的状态设置
         
         Args:
@@ -862,7 +964,7 @@ class OrderStatusHandler:
         Returns:
             bool: 更新是否成功
         """
-        return self.update_order_status(
+        return await self.update_order_status(
             order_id=order_id,
             new_status='processing',  # 处理中
             cookie_id=cookie_id,
@@ -886,7 +988,7 @@ class OrderStatusHandler:
         logger.info(f"✅ 订单详情已获取，处理待处理队列: order_id={order_id}")
         return True
     
-    def on_order_details_fetched(self, order_id: str):
+    async def on_order_details_fetched(self, order_id: str):
         """当主程序拉取到订单详情后调用此方法处理待处理的更新
         
         Args:
@@ -899,55 +1001,13 @@ class OrderStatusHandler:
             logger.info(f"⏭️ 订单 {order_id} 详情已拉取，但未启用待处理队列，跳过处理")
             return
         
-        logger.info(f"✅ 待处理队列已启用，检查订单 {order_id} 的待处理更新")
-        
-        with self._lock:
-            if order_id in self.pending_updates:
-                logger.info(f"📝 检测到订单 {order_id} 详情已拉取，开始处理待处理的状态更新")
-                # 注意：process_pending_updates 内部也有锁，这里需要先释放锁避免死锁
-                updates = self.pending_updates.pop(order_id)
-                logger.info(f"📊 订单 {order_id} 有 {len(updates)} 个待处理更新")
-            else:
-                logger.info(f"ℹ️ 订单 {order_id} 没有待处理的更新")
-                return
-        
-        # 在锁外处理更新，避免死锁
-        if 'updates' in locals():
-            logger.info(f"🔄 开始处理订单 {order_id} 的 {len(updates)} 个待处理更新")
-            self._process_updates_outside_lock(order_id, updates)
+        # 按订单ID索引查询并处理待处理的更新
+        if await self.process_pending_updates(order_id):
             logger.info(f"✅ 订单 {order_id} 的待处理更新处理完成")
+        else:
+            logger.info(f"ℹ️ 订单 {order_id} 没有可处理的待处理更新")
     
-    def _process_updates_outside_lock(self, order_id: str, updates: list):
-        """在锁外处理更新，避免死锁
-        
-        Args:
-            order_id: 订单ID
-            updates: 更新列表
-        """
-        processed_count = 0
-        
-        for update_info in updates:
-            try:
-                success = self.update_order_status(
-                    order_id=order_id,
-                    new_status=update_info['new_status'],
-                    cookie_id=update_info['cookie_id'],
-                    context=f"待处理队列: {update_info['context']}"
-                )
-                
-                if success:
-                    processed_count += 1
-                    logger.info(f"处理待处理更新成功: 订单 {order_id} -> {update_info['new_status']}")
-                else:
-                    logger.error(f"处理待处理更新失败: 订单 {order_id} -> {update_info['new_status']}")
-                    
-            except Exception as e:
-                logger.error(f"处理待处理更新时出错: {str(e)}")
-        
-        if processed_count > 0:
-            logger.info(f"订单 {order_id} 共处理了 {processed_count} 个待处理状态更新")
-    
-    def on_order_id_extracted(self, order_id: str, cookie_id: str, message: dict = None):
+    async def on_order_id_extracted(self, order_id: str, cookie_id: str, message: dict = None):
         """当主程序成功提取到订单ID后调用此方法处理待处理的系统消息
         
         Args:
@@ -957,116 +1017,54 @@ class OrderStatusHandler:
         """
         logger.info(f"🔄 订单状态处理器.on_order_id_extracted开始: order_id={order_id}, cookie_id={cookie_id}")
         
-        with self._lock:
-            # 检查是否启用待处理队列
-            if not self.config.get('use_pending_queue', True):
-                logger.info(f"⏭️ 订单 {order_id} ID已提取，但未启用待处理队列，跳过处理")
-                return
+        # 检查是否启用待处理队列
+        if not self.config.get('use_pending_queue', True):
+            logger.info(f"⏭️ 订单 {order_id} ID已提取，但未启用待处理队列，跳过处理")
+            return
+        
+        logger.info(f"✅ 待处理队列已启用，检查账号 {cookie_id} 的待处理系统消息")
+        
+        # 取出一条待处理消息：优先按消息哈希匹配，否则按FIFO原则（同时清理其临时订单ID的待处理更新）
+        from db_manager import db_manager
+        message_hash = self._message_hash(message) if message else None
+        pending_system = await asyncio.to_thread(db_manager.pop_order_pending_message, cookie_id, 'system', message_hash)
+        pending_red = await asyncio.to_thread(db_manager.pop_order_pending_message, cookie_id, 'red_reminder', message_hash)
+        
+        # 处理待处理的系统消息
+        if pending_system:
+            logger.info(f"🔄 开始处理待处理的系统消息: {pending_system['send_message']}")
             
-            logger.info(f"✅ 待处理队列已启用，检查账号 {cookie_id} 的待处理系统消息")
+            success = await self.update_order_status(
+                order_id=order_id,
+                new_status=pending_system['new_status'],
+                cookie_id=cookie_id,
+                context=f"{pending_system['send_message']} - {pending_system['msg_time']} - 延迟处理"
+            )
             
-            # 处理待处理的系统消息队列
-            if cookie_id in self._pending_system_messages and self._pending_system_messages[cookie_id]:
-                logger.info(f"📝 账号 {cookie_id} 有 {len(self._pending_system_messages[cookie_id])} 个待处理的系统消息")
-                pending_msg = None
-                
-                # 如果提供了消息，尝试匹配
-                if message:
-                    logger.info(f"🔍 尝试通过消息哈希匹配待处理的系统消息")
-                    message_hash = hash(str(sorted(message.items()))) if isinstance(message, dict) else hash(str(message))
-                    # 从后往前遍历，避免pop时索引变化问题
-                    for i in range(len(self._pending_system_messages[cookie_id]) - 1, -1, -1):
-                        msg = self._pending_system_messages[cookie_id][i]
-                        if msg.get('message_hash') == message_hash:
-                            pending_msg = self._pending_system_messages[cookie_id].pop(i)
-                            logger.info(f"✅ 通过消息哈希匹配到待处理的系统消息: {pending_msg['send_message']}")
-                            break
-                
-                # 如果没有匹配到，使用FIFO原则
-                if not pending_msg and self._pending_system_messages[cookie_id]:
-                    pending_msg = self._pending_system_messages[cookie_id].pop(0)
-                    logger.info(f"✅ 使用FIFO原则处理待处理的系统消息: {pending_msg['send_message']}")
-                
-                if pending_msg:
-                    logger.info(f"🔄 开始处理待处理的系统消息: {pending_msg['send_message']}")
-                    
-                    # 更新订单状态
-                    success = self.update_order_status(
-                        order_id=order_id,
-                        new_status=pending_msg['new_status'],
-                        cookie_id=cookie_id,
-                        context=f"{pending_msg['send_message']} - {pending_msg['msg_time']} - 延迟处理"
-                    )
-                    
-                    if success:
-                        status_text = self.status_mapping.get(pending_msg['new_status'], pending_msg['new_status'])
-                        logger.info(f'✅ [{pending_msg["msg_time"]}] 【{cookie_id}】{pending_msg["send_message"]}，订单 {order_id} 状态已更新为{status_text} (延迟处理)')
-                    else:
-                        logger.error(f'❌ [{pending_msg["msg_time"]}] 【{cookie_id}】{pending_msg["send_message"]}，但订单 {order_id} 状态更新失败 (延迟处理)')
-                    
-                    # 清理临时订单ID的待处理更新
-                    temp_order_id = pending_msg['temp_order_id']
-                    if temp_order_id in self.pending_updates:
-                        del self.pending_updates[temp_order_id]
-                        logger.info(f"🗑️ 清理临时订单ID {temp_order_id} 的待处理更新")
-                    
-                    # 如果队列为空，删除该账号的队列
-                    if not self._pending_system_messages[cookie_id]:
-                        del self._pending_system_messages[cookie_id]
-                        logger.info(f"🗑️ 账号 {cookie_id} 的待处理系统消息队列已清空")
-                else:
-                    logger.info(f"ℹ️ 订单 {order_id} ID已提取，但没有找到对应的待处理系统消息")
+            if success:
+                status_text = self.status_mapping.get(pending_system['new_status'], pending_system['new_status'])
+                logger.info(f'✅ [{pending_system["msg_time"]}] 【{cookie_id}】{pending_system["send_message"]}，订单 {order_id} 状态已更新为{status_text} (延迟处理)')
             else:
-                logger.info(f"ℹ️ 账号 {cookie_id} 没有待处理的系统消息")
+                logger.error(f'❌ [{pending_system["msg_time"]}] 【{cookie_id}】{pending_system["send_message"]}，但订单 {order_id} 状态更新失败 (延迟处理)')
+        else:
+            logger.info(f"ℹ️ 账号 {cookie_id} 没有待处理的系统消息")
+        
+        # 处理待处理的红色提醒消息
+        if pending_red:
+            logger.info(f"检测到订单 {order_id} ID已提取，开始处理待处理的红色提醒消息: {pending_red['red_reminder']}")
             
-            # 处理待处理的红色提醒消息队列
-            if cookie_id in self._pending_red_reminder_messages and self._pending_red_reminder_messages[cookie_id]:
-                pending_msg = None
-                
-                # 如果提供了消息，尝试匹配
-                if message:
-                    message_hash = hash(str(sorted(message.items()))) if isinstance(message, dict) else hash(str(message))
-                    # 从后往前遍历，避免pop时索引变化问题
-                    for i in range(len(self._pending_red_reminder_messages[cookie_id]) - 1, -1, -1):
-                        msg = self._pending_red_reminder_messages[cookie_id][i]
-                        if msg.get('message_hash') == message_hash:
-                            pending_msg = self._pending_red_reminder_messages[cookie_id].pop(i)
-                            logger.info(f"通过消息哈希匹配到待处理的红色提醒消息: {pending_msg['red_reminder']}")
-                            break
-                
-                # 如果没有匹配到，使用FIFO原则
-                if not pending_msg and self._pending_red_reminder_messages[cookie_id]:
-                    pending_msg = self._pending_red_reminder_messages[cookie_id].pop(0)
-                    logger.info(f"使用FIFO原则处理待处理的红色提醒消息: {pending_msg['red_reminder']}")
-                
-                if pending_msg:
-                    logger.info(f"检测到订单 {order_id} ID已提取，开始处理待处理的红色提醒消息: {pending_msg['red_reminder']}")
-                    
-                    # 更新订单状态
-                    success = self.update_order_status(
-                        order_id=order_id,
-                        new_status=pending_msg['new_status'],
-                        cookie_id=cookie_id,
-                        context=f"{pending_msg['red_reminder']} - 用户{pending_msg['user_id']} - {pending_msg['msg_time']} - 延迟处理"
-                    )
-                    
-                    if success:
-                        status_text = self.status_mapping.get(pending_msg['new_status'], pending_msg['new_status'])
-                        logger.info(f'[{pending_msg["msg_time"]}] 【{cookie_id}】{pending_msg["red_reminder"]}，订单 {order_id} 状态已更新为{status_text} (延迟处理)')
-                    else:
-                        logger.error(f'[{pending_msg["msg_time"]}] 【{cookie_id}】{pending_msg["red_reminder"]}，但订单 {order_id} 状态更新失败 (延迟处理)')
-                    
-                    # 清理临时订单ID的待处理更新
-                    temp_order_id = pending_msg['temp_order_id']
-                    if temp_order_id in self.pending_updates:
-                        del self.pending_updates[temp_order_id]
-                        logger.info(f"清理临时订单ID {temp_order_id} 的待处理更新")
-                    
-                    # 如果队列为空，删除该账号的队列
-                    if not self._pending_red_reminder_messages[cookie_id]:
-                        del self._pending_red_reminder_messages[cookie_id]
-                else:
-                    logger.error(f"订单 {order_id} ID已提取，但没有找到对应的待处理红色提醒消息")
+            success = await self.update_order_status(
+                order_id=order_id,
+                new_status=pending_red['new_status'],
+                cookie_id=cookie_id,
+                context=f"{pending_red['red_reminder']} - 用户{pending_red['user_id']} - {pending_red['msg_time']} - 延迟处理"
+            )
+            
+            if success:
+                status_text = self.status_mapping.get(pending_red['new_status'], pending_red['new_status'])
+                logger.info(f'[{pending_red["msg_time"]}] 【{cookie_id}】{pending_red["red_reminder"]}，订单 {order_id} 状态已更新为{status_text} (延迟处理)')
+            else:
+                logger.error(f'[{pending_red["msg_time"]}] 【{cookie_id}】{pending_red["red_reminder"]}，但订单 {order_id} 状态更新失败 (延迟处理)')
 
 
 # 创建全局实例
@@ -13,10 +13,8 @@ import json
 import os
 import re
 import uvicorn
-import pandas as pd
 import io
 import asyncio
-from collections import defaultdict
 
 import cookie_manager
 from db_manager import db_manager
@@ -25,6 +23,11 @@ from ai_reply_engine import ai_reply_engine
 from utils.qr_login import qr_login_manager
 from utils.xianyu_utils import trans_cookies
 from utils.image_utils import image_manager
+from utils.health_sampler import health_sampler
+from utils.browser_pool import browser_pool
+from utils.browser_governor import browser_governor
+from utils.browser_profiles import browser_profiles
+from utils.keyed_lock import KeyedLock, get_keyed_lock_stats
 
 from loguru import logger
 
@@ -48,13 +51,12 @@ TOKEN_EXPIRE_TIME = 24 * 60 * 60  # token过期时间：24小时
 # HTTP Bearer认证
 security = HTTPBearer(auto_error=False)
 
-# 扫码登录检查锁 - 防止并发处理同一个session
-qr_check_locks = defaultdict(lambda: asyncio.Lock())
+# 扫码登录检查锁 - 防止并发处理同一个session（按session分配，处理完即释放）
+qr_check_locks = KeyedLock('qr_check')
 qr_check_processed = {}  # 记录已处理的session: {session_id: {'processed': bool, 'timestamp': float}}
 
 # 账号密码登录会话管理
 password_login_sessions = {}  # {session_id: {'account_id': str, 'account': str, 'password': str, 'show_browser': bool, 'status': str, 'verification_url': str, 'qr_code_url': str, 'slider_instance': object, 'task': asyncio.Task, 'timestamp': float}}
-password_login_locks = defaultdict(lambda: asyncio.Lock())
 
 # 不再需要单独的密码初始化，由数据库初始化时处理
 
@@ -72,8 +74,6 @@ def cleanup_qr_check_records():
     for session_id in expired_sessions:
         if session_id in qr_check_processed:
             del qr_check_processed[session_id]
-        if session_id in qr_check_locks:
-            del qr_check_locks[session_id]
 
 
 def load_keywords() -> List[Tuple[str, str]]:
@@ -356,52 +356,62 @@ if not os.path.exists(uploads_dir):
     logger.info(f"创建图片上传目录: {uploads_dir}")
 
 # 健康检查端点
-@app.get('/health')
-async def health_check():
-    """健康检查端点，用于Docker健康检查和负载均衡器"""
-    try:
-        # 检查Cookie管理器状态
-        manager_status = "ok" if cookie_manager.manager is not None else "error"
+# 系统指标由后台采样器定期采集，探针请求只读取缓存结果，不阻塞事件循环
+@app.on_event("startup")
+async def start_health_sampler():
+    """在API事件循环中启动健康检查采样器"""
+    health_sampler.start()
 
-        # 检查数据库连接
-        from db_manager import db_manager
-        try:
-            db_manager.get_all_cookies()
-            db_status = "ok"
-        except Exception:
-            db_status = "error"
-
-        # 获取系统状态
-        import psutil
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory_info = psutil.virtual_memory()
-
-        status = {
-            "status": "healthy" if manager_status == "ok" and db_status == "ok" else "unhealthy",
-            "timestamp": time.time(),
-            "services": {
-                "cookie_manager": manager_status,
-                "database": db_status
-            },
-            "system": {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory_info.percent,
-                "memory_available": memory_info.available
-            }
-        }
 
-        if status["status"] == "unhealthy":
-            raise HTTPException(status_code=503, detail=status)
+@app.on_event("shutdown")
+async def stop_health_sampler():
+    """停止健康检查采样器"""
+    await health_sampler.stop()
 
-        return status
 
-    except Exception as e:
-        return {
-            "status": "unhealthy",
+@app.on_event("shutdown")
+async def close_browser_pool():
+    """关闭API事件循环中的共享浏览器"""
+    await browser_pool.close()
+
+
+@app.get('/health/live')
+async def liveness_check():
+    """存活检查：进程和事件循环能够响应即返回成功（常数时间）"""
+    return {"status": "alive", "timestamp": time.time()}
+
+
+def _build_readiness_status() -> Tuple[bool, Dict[str, Any]]:
+    snapshot = health_sampler.get_snapshot()
+    if snapshot is None:
+        return False, {
+            "status": "starting",
             "timestamp": time.time(),
-            "error": str(e)
+            "uptime": round(time.time() - health_sampler.started_at, 2)
         }
 
+    ready = health_sampler.is_ready(snapshot)
+    status = dict(snapshot)
+    status["status"] = "healthy" if ready else "unhealthy"
+    status["timestamp"] = time.time()
+    return ready, status
+
+
+@app.get('/health/ready')
+async def readiness_check():
+    """就绪检查：读取后台采样结果，未就绪时返回503"""
+    ready, status = _build_readiness_status()
+    if not ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get('/health')
+async def health_check():
+    """健康检查端点，用于Docker健康检查和负载均衡器（读取后台采样结果）"""
+    _, status = _build_readiness_status()
+    return status
+
 
 # ==================== 版本检查和更新日志接口 ====================
 import httpx
@@ -1389,6 +1399,15 @@ def get_cookies_details(current_user: Dict[str, Any] = Depends(get_current_user)
     return result
 
 
+@app.get("/cookies/startup-status")
+def get_cookies_startup_status(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """获取当前用户账号的启动就绪状态"""
+    from db_manager import db_manager
+    from utils.startup_orchestrator import startup_orchestrator
+    user_cookies = db_manager.get_all_cookies(current_user['user_id'])
+    return startup_orchestrator.get_status(cookie_ids=user_cookies.keys())
+
+
 @app.post("/cookies")
 def add_cookie(item: CookieIn, current_user: Dict[str, Any] = Depends(get_current_user)):
     if cookie_manager.manager is None:
@@ -1586,16 +1605,19 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
     try:
         log_with_user('info', f"开始执行账号密码登录任务: {session_id}, 账号: {account_id}", current_user)
         
-        # 导入 XianyuSliderStealth
-        from utils.xianyu_slider_stealth import XianyuSliderStealth
+        # 导入异步版滑块/登录处理器
+        from utils.xianyu_slider_async import AsyncXianyuSliderStealth
+        from utils.xianyu_slider_stealth import SLIDER_PRIORITY_INTERACTIVE
         import base64
         import io
         
-        # 创建 XianyuSliderStealth 实例
-        slider_instance = XianyuSliderStealth(
+        # 创建 AsyncXianyuSliderStealth 实例（开始登录时才排队获取并发槽位）
+        slider_instance = AsyncXianyuSliderStealth(
             user_id=account_id,
             enable_learning=True,
-            headless=not show_browser
+            headless=not show_browser,
+            purpose='login',
+            priority=SLIDER_PRIORITY_INTERACTIVE  # 用户正在页面上等待结果
         )
         
         # 更新会话信息
@@ -1603,7 +1625,7 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
         
         # 定义通知回调函数，用于检测到人脸认证时返回验证链接或截图（同步函数）
         def notification_callback(message: str, screenshot_path: str = None, verification_url: str = None, screenshot_path_new: str = None):
-            """人脸认证通知回调（同步）
+            """人脸认证通知回调（同步，由登录流程在Web服务的事件循环中直接调用，不能阻塞）
             
             Args:
                 message: 通知消息
@@ -1673,7 +1695,7 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
                             import traceback
                             log_with_user('error', f"通知错误详情: {traceback.format_exc()}", current_user)
                     
-                    # 在后台线程中发送通知，避免阻塞登录流程
+                    # 在后台线程中发送通知，避免阻塞Web服务的事件循环和登录流程
                     import threading
                     notification_thread = threading.Thread(target=send_face_verification_notification)
                     notification_thread.daemon = True
@@ -1735,7 +1757,7 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
                             import traceback
                             log_with_user('error', f"通知错误详情: {traceback.format_exc()}", current_user)
                     
-                    # 在后台线程中发送通知，避免阻塞登录流程
+                    # 在后台线程中发送通知，避免阻塞Web服务的事件循环和登录流程
                     import threading
                     notification_thread = threading.Thread(target=send_face_verification_notification)
                     notification_thread.daemon = True
@@ -1744,12 +1766,12 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
             except Exception as e:
                 log_with_user('error', f"处理人脸认证通知失败: {str(e)}", current_user)
         
-        # 调用登录方法（同步方法，需要在后台线程中执行）
+        # 登录流程（本函数由 asyncio.create_task 在Web服务的事件循环中启动，登录直接在该循环中执行，不再单独开线程）
         import threading
         
-        def run_login():
+        async def run_login():
             try:
-                cookies_dict = slider_instance.login_with_password_playwright(
+                cookies_dict = await slider_instance.login_with_password_playwright(
                     account=account,
                     password=password,
                     show_browser=show_browser,
@@ -1809,7 +1831,7 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
                                 if account_id not in cookie_manager.manager.keywords:
                                     cookie_manager.manager.keywords[account_id] = []
                                 
-                                # 在后台启动任务（使用线程安全的方式，因为run_login是在后台线程中运行的）
+                                # 在后台启动任务（账号任务运行在 cookie_manager 的事件循环中，与Web服务的事件循环不在同一线程，需要线程安全的方式提交）
                                 try:
                                     # 尝试使用run_coroutine_threadsafe，这是线程安全的方式
                                     fut = asyncio.run_coroutine_threadsafe(
@@ -1869,7 +1891,7 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
                             logger.error(traceback.format_exc())
                     
                     # 在后台线程中运行异步任务
-                    # 由于run_login是在线程中运行的，需要创建新的事件循环
+                    # 刷新过程较长，使用独立线程和新的事件循环，不占用Web服务的事件循环
                     def run_async_refresh():
                         try:
                             import asyncio
@@ -1906,17 +1928,15 @@ async def _execute_password_login(session_id: str, account_id: str, account: str
                 import traceback
                 logger.error(traceback.format_exc())
             finally:
-                # 清理实例（释放并发槽位）
+                # 清理实例（释放并发槽位，登录流程结束时已归还，这里兜底）
                 try:
-                    from utils.xianyu_slider_stealth import concurrency_manager
-                    concurrency_manager.unregister_instance(account_id)
+                    slider_instance.release_slot()
                     log_with_user('debug', f"已释放并发槽位: {account_id}", current_user)
                 except Exception as cleanup_e:
                     log_with_user('warning', f"清理实例时出错: {str(cleanup_e)}", current_user)
         
-        # 在后台线程中执行登录
-        login_thread = threading.Thread(target=run_login, daemon=True)
-        login_thread.start()
+        # 执行登录（排队和等待人脸验证期间不占用线程）
+        await run_login()
         
     except Exception as e:
         password_login_sessions[session_id]['status'] = 'failed'
@@ -2073,7 +2093,15 @@ async def check_password_login_status(
             del password_login_sessions[session_id]
             return result
         else:
-            # 处理中
+            # 处理中（排队等待滑块验证槽位时返回排队位置）
+            from utils.xianyu_slider_stealth import concurrency_manager
+            queue_position = concurrency_manager.get_queue_position(session['account_id'])
+            if queue_position:
+                return {
+                    'status': 'processing',
+                    'queue_position': queue_position,
+                    'message': f'正在排队等待浏览器资源，前面还有 {queue_position - 1} 个任务，请稍候...'
+                }
             return {
                 'status': 'processing',
                 'message': '登录处理中，请稍候...'
@@ -2247,15 +2275,12 @@ async def check_qr_code_status(session_id: str, current_user: Dict[str, Any] = D
                 # 返回简单的成功状态，避免重复处理
                 return {'status': 'already_processed', 'message': '该会话已处理完成'}
 
-        # 获取该session的锁
-        session_lock = qr_check_locks[session_id]
-
-        # 使用非阻塞方式尝试获取锁
-        if session_lock.locked():
+        # 使用非阻塞方式检查该session的锁
+        if qr_check_locks.locked(session_id):
             log_with_user('debug', f"扫码登录session {session_id} 正在被其他请求处理，跳过", current_user)
             return {'status': 'processing', 'message': '正在处理中，请稍候...'}
 
-        async with session_lock:
+        async with qr_check_locks.lock(session_id):
             # 再次检查是否已处理（双重检查）
             if session_id in qr_check_processed and qr_check_processed[session_id]['processed']:
                 log_with_user('debug', f"扫码登录session {session_id} 在获取锁后发现已处理，直接返回", current_user)
@@ -3541,6 +3566,9 @@ def export_keywords(cid: str, current_user: Dict[str, Any] = Depends(get_current
                     '关键词内容': keyword_data['reply']
                 })
 
+        # pandas 导入较慢，只在导入导出Excel时加载
+        import pandas as pd
+
         # 如果没有数据，创建空的DataFrame但保留列名（作为模板）
         if not data:
             df = pd.DataFrame(columns=['关键词', '商品ID', '关键词内容'])
@@ -3617,6 +3645,9 @@ async def import_keywords(cid: str, file: UploadFile = File(...), current_user:
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="请上传Excel文件(.xlsx或.xls)")
 
+    # pandas 导入较慢，只在导入导出Excel时加载
+    import pandas as pd
+
     try:
         # 读取Excel文件
         contents = await file.read()
@@ -4711,6 +4742,111 @@ def test_ai_reply(cookie_id: str, test_data: dict, _: None = Depends(require_aut
         raise HTTPException(status_code=500, detail=f"服务器错误: {str(e)}")
 
 
+@app.get("/ai-reply-prompt-stats")
+def get_ai_reply_prompt_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """获取当前用户各账号的AI提示词大小统计"""
+    try:
+        user_cookies = db_manager.get_all_cookies(current_user['user_id'])
+        all_stats = ai_reply_engine.prompt_builder.get_stats()
+        return {cid: stats for cid, stats in all_stats.items() if cid in user_cookies}
+    except Exception as e:
+        logger.error(f"获取AI提示词统计异常: {e}")
+        raise HTTPException(status_code=500, detail=f"服务器错误: {str(e)}")
+
+
+@app.get("/admin/ai-scheduler-stats")
+def get_ai_scheduler_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取AI请求调度器各服务商的队列统计（管理员专用）"""
+    return ai_reply_engine.scheduler.get_stats()
+
+
+@app.get("/admin/browser-governor-stats")
+def get_browser_governor_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取全局浏览器资源调度统计：Chromium内存、各用途活跃/排队数量和等待时间（管理员专用）"""
+    return browser_governor.get_stats()
+
+
+@app.get("/admin/slider-queue-stats")
+def get_slider_queue_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取滑块验证槽位的排队情况：各账号排队位置、等待时间和槽位利用率（管理员专用）"""
+    from utils.xianyu_slider_stealth import concurrency_manager
+    return concurrency_manager.get_stats()
+
+
+@app.get("/admin/slider-vision-stats")
+def get_slider_vision_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取滑块截图识别的识别次数、采用率和平均耗时（管理员专用）"""
+    from utils.slider_vision import slider_vision
+    return slider_vision.get_stats()
+
+
+@app.get("/admin/order-status-stats")
+def get_order_status_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取订单状态缓存数量、待写入变更和批量写入统计（管理员专用）"""
+    from order_status_handler import order_status_handler
+    return order_status_handler.get_stats()
+
+
+@app.get("/admin/delivery-queue-stats")
+def get_delivery_queue_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取自动发货任务数量、各账号工作池吞吐和延迟统计（管理员专用）"""
+    from utils.delivery_queue import delivery_queue
+    return delivery_queue.get_stats()
+
+
+@app.get("/admin/api-card-stats")
+def get_api_card_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取API卡券接口熔断状态、请求统计和预取缓冲水位（管理员专用）"""
+    from utils.api_card_client import api_card_client
+    return api_card_client.get_stats()
+
+
+@app.get("/admin/keyed-lock-stats")
+def get_keyed_lock_stats_api(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取按键锁的当前键数量、争用和等待统计（管理员专用）"""
+    return get_keyed_lock_stats()
+
+
+@app.get("/admin/refresh-schedule")
+def get_refresh_schedule(limit: int = 100, admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取Token/Cookie刷新调度计划和并发情况（管理员专用）"""
+    from utils.refresh_scheduler import refresh_scheduler
+    return refresh_scheduler.get_schedule(limit)
+
+
+@app.get("/admin/token-cache-stats")
+def get_token_cache_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取Token缓存命中情况和各账号启动到连接就绪的耗时（管理员专用）"""
+    from utils.token_cache import token_cache
+    return token_cache.get_stats()
+
+
+@app.get("/admin/startup-status")
+def get_startup_status(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取所有账号的分批启动进度和启动耗时统计（管理员专用）"""
+    from utils.startup_orchestrator import startup_orchestrator
+    return startup_orchestrator.get_status()
+
+
+@app.get("/admin/cookie-jar-stats")
+def get_cookie_jar_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取各账号Cookie的解析、合并和写入数据库次数统计（管理员专用）"""
+    from utils.cookie_jar import cookie_jars
+    return cookie_jars.get_stats()
+
+
+@app.get("/admin/browser-pool-stats")
+def get_browser_pool_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取共享浏览器池的启动次数、回收情况和页面耗时统计（管理员专用）"""
+    return browser_pool.get_stats()
+
+
+@app.get("/admin/browser-profile-stats")
+def get_browser_profile_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
+    """获取账号持久化浏览器目录的使用情况，以及使用/未使用持久化目录时的刷新耗时和验证率（管理员专用）"""
+    return browser_profiles.get_stats()
+
+
 # ==================== 日志管理API ====================
 
 @app.get("/logs")
@@ -5284,45 +5420,8 @@ def get_system_stats(admin_user: Dict[str, Any] = Depends(require_admin)):
     try:
         log_with_user('info', "查询系统统计信息", admin_user)
 
-        # 用户统计
-        all_users = db_manager.get_all_users()
-        total_users = len(all_users)
-
-        # Cookie统计
-        all_cookies = db_manager.get_all_cookies()
-        total_cookies = len(all_cookies)
-        
-        # 活跃账号统计（启用状态的账号）
-        active_cookies = 0
-        for cookie_id in all_cookies.keys():
-            status = db_manager.get_cookie_status(cookie_id)
-            if status:
-                active_cookies += 1
-
-        # 卡券统计
-        all_cards = db_manager.get_all_cards()
-        total_cards = len(all_cards) if all_cards else 0
-
-        # 关键词统计
-        all_keywords = db_manager.get_all_keywords()
-        total_keywords = sum(len(kw_list) for kw_list in all_keywords.values())
-
-        # 订单统计
-        total_orders = 0
-        try:
-            orders = db_manager.get_all_orders()
-            total_orders = len(orders) if orders else 0
-        except:
-            pass
-
-        stats = {
-            "total_users": total_users,
-            "total_cookies": total_cookies,
-            "active_cookies": active_cookies,
-            "total_cards": total_cards,
-            "total_keywords": total_keywords,
-            "total_orders": total_orders
-        }
+        # 计数器由数据库触发器维护，查询开销与数据量无关
+        stats = db_manager.get_system_stats()
 
         log_with_user('info', f"系统统计信息查询完成: {stats}", admin_user)
         return stats
@@ -5707,7 +5806,7 @@ def get_table_data(table_name: str, admin_user: Dict[str, Any] = Depends(require
             'ai_reply_settings', 'ai_conversations', 'ai_item_cache', 'item_info',
             'message_notifications', 'cards', 'delivery_rules', 'notification_channels',
             'user_settings', 'system_settings', 'email_verifications', 'captcha_codes', 'orders', "item_replay",
-            'risk_control_logs'
+            'risk_control_logs', 'order_status_history', 'order_pending_updates', 'order_pending_messages', 'delivery_jobs', 'api_card_buffer', 'account_tokens'
         ]
 
         if table_name not in allowed_tables:
@@ -5785,7 +5884,7 @@ def clear_table_data(table_name: str, admin_user: Dict[str, Any] = Depends(requi
             'ai_reply_settings', 'ai_conversations', 'ai_item_cache', 'item_info',
             'message_notifications', 'cards', 'delivery_rules', 'notification_channels',
             'user_settings', 'system_settings', 'email_verifications', 'captcha_codes', 'orders', 'item_replay',
-            'risk_control_logs'
+            'risk_control_logs', 'order_status_history', 'order_pending_updates', 'order_pending_messages', 'delivery_jobs', 'api_card_buffer', 'account_tokens'
         ]
 
         # 不允许清空用户表
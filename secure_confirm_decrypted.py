@@ -8,7 +8,8 @@ import json
 import time
 import aiohttp
 from loguru import logger
-from utils.xianyu_utils import generate_sign, trans_cookies
+from utils.xianyu_utils import generate_sign
+from utils.cookie_jar import cookie_jars
 
 
 class SecureConfirm:
@@ -25,18 +26,25 @@ class SecureConfirm:
             main_instance: 主实例对象（XianyuLive）
         """
         self.session = session
-        self.cookies_str = cookies_str
         self.cookie_id = cookie_id
         self.main_instance = main_instance
 
-        # 解析cookies
-        self.cookies = trans_cookies(cookies_str) if cookies_str else {}
+        # 与账号内其他组件共享同一个CookieJar（首次创建时用 cookies_str 初始化）
+        self.cookie_jar = cookie_jars.get(cookie_id, cookies_str)
 
         # Token相关属性
         self.current_token = None
         self.last_token_refresh_time = 0
         self.token_refresh_interval = 3600  # 1小时
 
+    @property
+    def cookies(self):
+        return self.cookie_jar.cookies
+
+    @property
+    def cookies_str(self):
+        return self.cookie_jar.cookies_str
+
     def _safe_str(self, obj):
         """安全字符串转换"""
         try:
@@ -73,17 +81,6 @@ class SecureConfirm:
             logger.error(f"【{self.cookie_id}】获取真实商品ID失败: {self._safe_str(e)}")
             return None
 
-    async def _update_config_cookies(self):
-        """更新数据库中的Cookie配置"""
-        try:
-            from db_manager import db_manager
-            # 更新数据库中的cookies
-            db_manager.update_cookie_account_info(self.cookie_id, cookie_value=self.cookies_str)
-            logger.debug(f"【{self.cookie_id}】已更新数据库中的Cookie")
-        except Exception as e:
-            logger.error(f"【{self.cookie_id}】更新数据库Cookie失败: {self._safe_str(e)}")
-
-
     async def auto_confirm(self, order_id, item_id=None, retry_count=0):
         """自动确认发货 - 使用真实商品ID刷新token"""
         if retry_count >= 4:  # 最多重试3次
@@ -119,7 +116,7 @@ class SecureConfirm:
         }
 
         # 始终从最新的cookies中获取_m_h5_tk token（刷新后cookies会被更新）
-        token = trans_cookies(self.cookies_str).get('_m_h5_tk', '').split('_')[0] if trans_cookies(self.cookies_str).get('_m_h5_tk') else ''
+        token = self.cookie_jar.h5_token
 
         if token:
             logger.info(f"使用cookies中的_m_h5_tk token: {token}")
@@ -138,22 +135,9 @@ class SecureConfirm:
             ) as response:
                 res_json = await response.json()
 
-                # 检查并更新Cookie
-                if 'set-cookie' in response.headers:
-                    new_cookies = {}
-                    for cookie in response.headers.getall('set-cookie', []):
-                        if '=' in cookie:
-                            name, value = cookie.split(';')[0].split('=', 1)
-                            new_cookies[name.strip()] = value.strip()
-
-                    # 更新cookies
-                    if new_cookies:
-                        self.cookies.update(new_cookies)
-                        # 生成新的cookie字符串
-                        self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
-                        # 更新数据库中的Cookie
-                        await self._update_config_cookies()
-                        logger.debug("已更新Cookie到数据库")
+                # 合并响应中的Set-Cookie，有变化时延迟写入数据库
+                if self.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                    self.cookie_jar.schedule_persist()
 
                 logger.info(f"【{self.cookie_id}】自动确认发货响应: {res_json}")
 
@@ -1,21 +1,30 @@
 import asyncio
 import time
 from loguru import logger
-from utils.xianyu_utils import trans_cookies, generate_sign
+from utils.xianyu_utils import generate_sign
+from utils.cookie_jar import cookie_jars
 
 
 class SecureFreeshipping:
     def __init__(self, session, cookies_str, cookie_id):
         self.session = session
-        self.cookies_str = cookies_str
         self.cookie_id = cookie_id
-        self.cookies = trans_cookies(cookies_str) if cookies_str else {}
+        # 与账号内其他组件共享同一个CookieJar（首次创建时用 cookies_str 初始化）
+        self.cookie_jar = cookie_jars.get(cookie_id, cookies_str)
         
         # 这些属性将由主类传递
         self.current_token = None
         self.last_token_refresh_time = None
         self.token_refresh_interval = None
 
+    @property
+    def cookies(self):
+        return self.cookie_jar.cookies
+
+    @property
+    def cookies_str(self):
+        return self.cookie_jar.cookies_str
+
     def _safe_str(self, obj):
         """安全转换为字符串"""
         try:
@@ -23,18 +32,6 @@ class SecureFreeshipping:
         except:
             return "无法转换的对象"
 
-    async def update_config_cookies(self):
-        """更新数据库中的cookies"""
-        try:
-            from db_manager import db_manager
-            
-            # 更新数据库中的Cookie
-            db_manager.update_config_cookies(self.cookie_id, self.cookies_str)
-            logger.debug(f"【{self.cookie_id}】Cookie已更新到数据库")
-            
-        except Exception as e:
-            logger.error(f"【{self.cookie_id}】更新Cookie到数据库失败: {self._safe_str(e)}")
-
     async def auto_freeshipping(self, order_id, item_id, buyer_id, retry_count=0):
         """自动免拼发货 - 加密版本"""
         if retry_count >= 4:  # 最多重试3次
@@ -69,7 +66,7 @@ class SecureFreeshipping:
         logger.info(f"【{self.cookie_id}】参数详情 - order_id: {order_id}, item_id: {item_id}, buyer_id: {buyer_id}")
 
         # 始终从最新的cookies中获取_m_h5_tk token（刷新后cookies会被更新）
-        token = trans_cookies(self.cookies_str).get('_m_h5_tk', '').split('_')[0] if trans_cookies(self.cookies_str).get('_m_h5_tk') else ''
+        token = self.cookie_jar.h5_token
 
         if token:
             logger.info(f"使用cookies中的_m_h5_tk token: {token}")
@@ -88,22 +85,9 @@ class SecureFreeshipping:
             ) as response:
                 res_json = await response.json()
 
-                # 检查并更新Cookie
-                if 'set-cookie' in response.headers:
-                    new_cookies = {}
-                    for cookie in response.headers.getall('set-cookie', []):
-                        if '=' in cookie:
-                            name, value = cookie.split(';')[0].split('=', 1)
-                            new_cookies[name.strip()] = value.strip()
-                    
-                    # 更新cookies
-                    if new_cookies:
-                        self.cookies.update(new_cookies)
-                        # 生成新的cookie字符串
-                        self.cookies_str = '; '.join([f"{k}={v}" for k, v in self.cookies.items()])
-                        # 更新数据库中的Cookie
-                        await self.update_config_cookies()
-                        logger.debug("已更新Cookie到数据库")
+                # 合并响应中的Set-Cookie，有变化时延迟写入数据库
+                if self.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                    self.cookie_jar.schedule_persist()
 
                 logger.info(f"【{self.cookie_id}】自动免拼发货响应: {res_json}")
                 
@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger
+
+from config import API_CARD
+from db_manager import db_manager
+
+# 参数中的占位符，如 {order_id}；包含占位符的POST参数依赖订单数据，不能预取
+PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
+
+
+class CircuitBreaker:
+    """接口熔断器
+
+    连续失败达到阈值后熔断，熔断期间直接拒绝请求；超过恢复时间后放行一个试探请求，
+    成功则恢复，失败则重新熔断。
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = max(1, int(threshold))
+        self.reset_seconds = float(reset_seconds)
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.open_count = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None or self.trial_in_flight:
+                self.open_count += 1
+            self.opened_at = time.time()
+        self.trial_in_flight = False
+
+
+class ApiCardConfig:
+    """解析后的API卡券配置（按配置内容缓存，避免每次发货重复解析JSON）"""
+
+    __slots__ = ('url', 'method', 'timeout', 'headers', 'params', 'endpoint', 'signature',
+                 'prefetch_size', 'dynamic')
+
+    def __init__(self, api_config: dict):
+        self.url = api_config.get('url')
+        self.method = api_config.get('method', 'GET').upper()
+        self.timeout = api_config.get('timeout', 10)
+        headers = api_config.get('headers', '{}')
+        params = api_config.get('params', '{}')
+        self.headers = json.loads(headers) if isinstance(headers, str) else headers
+        self.params = json.loads(params) if isinstance(params, str) else params
+        parts = urlsplit(self.url or '')
+        self.endpoint = f"{parts.scheme}://{parts.netloc}"
+        self.signature = hashlib.md5(json.dumps(
+            [self.url, self.method, self.headers, self.params], ensure_ascii=False, sort_keys=True
+        ).encode('utf-8')).hexdigest()
+        self.prefetch_size = int(api_config.get('prefetch_size', API_CARD.get('prefetch_size', 0)) or 0)
+        # 只有POST请求会替换动态参数
+        self.dynamic = self.method == 'POST' and bool(
+            self.params and PLACEHOLDER_PATTERN.search(json.dumps(self.params, ensure_ascii=False))
+        )
+
+    @property
+    def prefetchable(self) -> bool:
+        return self.prefetch_size > 0 and not self.dynamic
+
+
+class _Endpoint:
+    """单个接口域名的连接池、并发上限和熔断器（连接池绑定创建它的事件循环）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop = None
+        self.breaker = CircuitBreaker(API_CARD.get('breaker_threshold', 5), API_CARD.get('breaker_reset_seconds', 30))
+        self.inflight = 0
+        self.latencies = deque(maxlen=200)
+        self.counters = {'requests': 0, 'errors': 0, 'rejected': 0}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.loop is not loop:
+            old, old_loop = self.session, self.loop
+            connector = aiohttp.TCPConnector(limit=int(API_CARD.get('max_connections', 20)), ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.semaphore = asyncio.Semaphore(int(API_CARD.get('max_concurrency', 5)))
+            self.loop = loop
+            if old is not None and not old.closed:
+                await self._close_session(old, old_loop)
+        return self.session
+
+    @staticmethod
+    async def _close_session(session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]):
+        """关闭被替换的会话：会话只能在创建它的事件循环中关闭"""
+        try:
+            if loop is asyncio.get_running_loop():
+                await session.close()
+            elif loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            # 原事件循环已停止时连接随循环一起释放，无法再关闭
+        except Exception as e:
+            logger.warning(f"关闭旧的API连接池失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'open_count': self.breaker.open_count,
+            'inflight': self.inflight,
+            'latency_p50_ms': round(ordered[count // 2] * 1000, 1) if count else None,
+            'latency_p95_ms': round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1) if count else None,
+            **self.counters,
+        }
+
+
+class ApiCardClient:
+    """API类型卡券的取卡客户端
+
+    - 每个接口域名独立的连接池和并发上限，按连续失败次数熔断
+    - 参数不依赖订单数据的卡券可开启预取：预取内容保存在数据库中，取出即删除，
+      低于目标数量时在后台补充，发货时不再等待供应商接口
+    """
+
+    def __init__(self):
+        self.max_attempts = max(1, int(API_CARD.get('max_attempts', 4)))
+        self.retry_base_seconds = float(API_CARD.get('retry_base_seconds', 2))
+        self.prefetch_max_age = float(API_CARD.get('prefetch_max_age', 0))
+        self._configs: OrderedDict = OrderedDict()
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._refilling: Dict[tuple, asyncio.Task] = {}
+        self._prefetch_targets: Dict[int, int] = {}
+        self._counters = {'buffer_hits': 0, 'buffer_misses': 0, 'prefetched': 0}
+
+    def parse_config(self, api_config) -> ApiCardConfig:
+        """解析卡券的api_config（按内容缓存）"""
+        if isinstance(api_config, str):
+            api_config = json.loads(api_config)
+        key = json.dumps(api_config, ensure_ascii=False, sort_keys=True)
+        config = self._configs.get(key)
+        if config is None:
+            config = ApiCardConfig(api_config)
+            self._configs[key] = config
+            while len(self._configs) > 256:
+                self._configs.popitem(last=False)
+        else:
+            self._configs.move_to_end(key)
+        return config
+
+    def _endpoint(self, config: ApiCardConfig) -> _Endpoint:
+        endpoint = self._endpoints.get(config.endpoint)
+        if endpoint is None:
+            endpoint = self._endpoints[config.endpoint] = _Endpoint(config.endpoint)
+        return endpoint
+
+    @staticmethod
+    def _extract_content(response_text: str) -> str:
+        # 尝试解析JSON响应，如果失败则使用原始文本
+        try:
+            result = json.loads(response_text)
+            # 如果返回的是对象，尝试提取常见的内容字段
+            if isinstance(result, dict):
+                return result.get('data') or result.get('content') or result.get('card') or str(result)
+            return str(result)
+        except ValueError:
+            return response_text
+
+    async def fetch(self, config: ApiCardConfig, params=None, max_attempts: Optional[int] = None) -> Optional[str]:
+        """调用卡券接口，服务器错误(5xx/408)和网络异常时重试，熔断期间直接返回None"""
+        if config.method not in ('GET', 'POST'):
+            logger.error(f"不支持的HTTP方法: {config.method}")
+            return None
+
+        params = config.params if params is None else params
+        endpoint = self._endpoint(config)
+        attempts = max_attempts or self.max_attempts
+
+        for attempt in range(attempts):
+            if not endpoint.breaker.allow():
+                endpoint.counters['rejected'] += 1
+                logger.warning(f"卡券接口 {endpoint.name} 已熔断，跳过调用")
+                return None
+
+            retry_info = f" (重试 {attempt + 1}/{attempts})" if attempt > 0 else ""
+            logger.info(f"调用API获取卡券: {config.method} {config.url}{retry_info}")
+            if config.method == 'POST' and params:
+                logger.warning(f"POST请求参数: {json.dumps(params, ensure_ascii=False)}")
+
+            session = await endpoint.get_session()
+            timeout = aiohttp.ClientTimeout(total=config.timeout)
+            retryable = False
+            async with endpoint.semaphore:
+                endpoint.inflight += 1
+                endpoint.counters['requests'] += 1
+                started = time.time()
+                try:
+                    if config.method == 'GET':
+                        request = session.get(config.url, headers=config.headers, params=params, timeout=timeout)
+                    else:
+                        request = session.post(config.url, headers=config.headers, json=params, timeout=timeout)
+                    async with request as response:
+                        status_code = response.status
+                        response_text = await response.text()
+                except asyncio.CancelledError:
+                    # 取消的试探请求不计入熔断，允许下一个请求重新试探
+                    endpoint.breaker.trial_in_flight = False
+                    raise
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    endpoint.counters['errors'] += 1
+                    endpoint.breaker.record_failure()
+                    logger.warning(f"API调用网络异常: {e.__class__.__name__} {e}")
+                    retryable = True
+                else:
+                    endpoint.latencies.append(time.time() - started)
+                    if status_code == 200:
+                        endpoint.breaker.record_success()
+                        content = self._extract_content(response_text)
+                        logger.info(f"API调用成功，返回内容长度: {len(content)}")
+                        return content
+
+                    logger.warning(f"API调用失败: {status_code} - {response_text[:200]}...")
+                    endpoint.counters['errors'] += 1
+                    # 服务器错误(5xx)或请求超时计入熔断并重试，其他状态码说明接口可用但请求无效
+                    if status_code >= 500 or status_code == 408:
+                        endpoint.breaker.record_failure()
+                        retryable = True
+                    else:
+                        endpoint.breaker.record_success()
+                finally:
+                    endpoint.inflight -= 1
+
+            if not retryable:
+                return None
+            if attempt < attempts - 1:
+                wait_time = (attempt + 1) * self.retry_base_seconds  # 递增等待时间: 2s, 4s, 6s
+                logger.info(f"等待 {wait_time} 秒后重试...")
+                await asyncio.sleep(wait_time)
+
+        logger.error(f"API调用失败，已达到最大重试次数({attempts})")
+        return None
+
+    async def take_prefetched(self, card_id: int, config: ApiCardConfig) -> Optional[str]:
+        """取出一条预取内容，并在缓冲不足时后台补充；没有可用内容返回None"""
+        self._prefetch_targets[card_id] = config.prefetch_size
+        content = await asyncio.to_thread(db_manager.take_api_card_buffer, card_id, config.signature,
+                                          self._min_fetched_at())
+        if content is None:
+            self._counters['buffer_misses'] += 1
+        else:
+            self._counters['buffer_hits'] += 1
+            logger.info(f"使用预取的API卡券内容: 卡券ID={card_id}")
+        self._schedule_refill(card_id, config)
+        return content
+
+    def _min_fetched_at(self) -> float:
+        return time.time() - self.prefetch_max_age if self.prefetch_max_age > 0 else 0
+
+    def _schedule_refill(self, card_id: int, config: ApiCardConfig):
+        key = (card_id, config.signature)
+        task = self._refilling.get(key)
+        if task is not None and not task.done():
+            return
+        self._refilling[key] = asyncio.create_task(self._refill(card_id, config))
+
+    async def _refill(self, card_id: int, config: ApiCardConfig):
+        """补充预取缓冲到目标数量（单次不重试，失败或熔断时等下次取卡再补）"""
+        try:
+            while True:
+                level = await asyncio.to_thread(db_manager.count_api_card_buffer, card_id, config.signature,
+                                                self._min_fetched_at())
+                if level >= config.prefetch_size:
+                    return
+                content = await self.fetch(config, max_attempts=1)
+                if not content:
+                    logger.warning(f"API卡券预取失败，当前缓冲 {level}/{config.prefetch_size}: 卡券ID={card_id}")
+                    return
+                await asyncio.to_thread(db_manager.add_api_card_buffer, card_id, config.signature, content)
+                self._counters['prefetched'] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"API卡券预取异常: 卡券ID={card_id} - {e}")
+        finally:
+            self._refilling.pop((card_id, config.signature), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各接口的熔断状态、请求统计，以及各卡券的预取缓冲水位"""
+        buffers = db_manager.get_api_card_buffer_levels()
+        for buffer in buffers:
+            buffer['target'] = self._prefetch_targets.get(buffer['card_id'])
+        return {
+            'endpoints': {name: endpoint.get_stats() for name, endpoint in self._endpoints.items()},
+            'buffers': buffers,
+            'refilling': len(self._refilling),
+            **self._counters,
+        }
+
+
+# 全局API卡券客户端
+api_card_client = ApiCardClient()
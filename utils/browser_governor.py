@@ -0,0 +1,390 @@
+"""
+全局浏览器资源调度器
+
+所有会启动/占用 Chromium 的流程（订单详情、登录、滑块验证、Cookie刷新、商品详情、商品搜索）
+在使用浏览器前都需要先获得许可：
+- 按用途优先级排队，同优先级先到先得（自动发货依赖的订单详情 > 登录 > ... > 搜索）
+- 总并发数和各用途并发数受限
+- 实时统计 Chromium 进程内存（RSS），超出内存预算时暂停放行
+- 排队超时或队列已满的请求直接拒绝，并记录等待时间供排查
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import BROWSER_GOVERNOR, SLIDER_VERIFICATION
+
+
+# 各用途的默认调度参数（priority越小越优先）
+DEFAULT_PURPOSES = {
+    'order_detail': {'priority': 0, 'max_wait': 120, 'max_queue': 50},
+    'login': {'priority': 1, 'max_wait': 90, 'max_queue': 20},
+    'slider': {'priority': 1, 'max_wait': SLIDER_VERIFICATION.get('wait_timeout', 60), 'max_queue': 20,
+               'max_concurrent': SLIDER_VERIFICATION.get('max_concurrent', 3)},
+    'cookie_refresh': {'priority': 2, 'max_wait': 60, 'max_queue': 20},
+    'item_detail': {'priority': 3, 'max_wait': 30, 'max_queue': 10},
+    'search': {'priority': 4, 'max_wait': 20, 'max_queue': 5},
+}
+
+# 未配置的用途按最低优先级处理
+FALLBACK_PURPOSE = {'priority': 5, 'max_wait': 30, 'max_queue': 10}
+
+CHROMIUM_PROCESS_NAMES = ('chrome', 'chromium', 'headless_shell')
+
+
+# Playwright浏览器是否就绪：Start.py 在后台检测/安装浏览器期间清除，结束后设置；
+# 其他入口不涉及安装，默认已就绪
+playwright_ready = threading.Event()
+playwright_ready.set()
+
+
+class BrowserAdmissionError(Exception):
+    """浏览器资源不足，请求被拒绝（排队超时或队列已满）"""
+
+
+class _Ticket:
+    """一次浏览器使用许可"""
+
+    __slots__ = ('purpose', 'owner', 'priority', 'seq', 'enqueued_at', 'admitted_at',
+                 'state', 'event', 'future', 'loop')
+
+    def __init__(self, purpose: str, owner: str, priority: int, seq: int):
+        self.purpose = purpose
+        self.owner = owner
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.time()
+        self.admitted_at = None
+        self.state = 'waiting'  # waiting / admitted / shed / released
+        self.event = None       # 同步等待使用
+        self.future = None      # 异步等待使用
+        self.loop = None
+
+
+class BrowserGovernor:
+    """全局浏览器资源调度器（线程安全，同时支持同步和异步调用）"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', True)
+        self.max_concurrent = max(1, int(settings.get('max_concurrent', 6)))
+        self.memory_budget_mb = settings.get('memory_budget_mb', 2048)
+        self.min_available_mb = settings.get('min_available_mb', 300)
+        self.estimated_browser_mb = settings.get('estimated_browser_mb', 250)
+        self.memory_sample_interval = settings.get('memory_sample_interval', 2)
+        self.poll_interval = settings.get('poll_interval', 1)
+
+        self.purposes: Dict[str, Dict[str, Any]] = {name: dict(cfg) for name, cfg in DEFAULT_PURPOSES.items()}
+        for name, cfg in (settings.get('purposes') or {}).items():
+            self.purposes.setdefault(name, dict(FALLBACK_PURPOSE)).update(cfg or {})
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._active: Dict[str, int] = {}
+        self._active_total = 0
+        self._active_tickets = set()
+
+        # 内存采样结果
+        self._memory = {'chromium_rss': 0, 'processes': 0, 'available': None, 'sampled_at': 0.0}
+        self._fresh_admissions = 0  # 最近一次采样之后放行的数量，采样还未体现其内存占用
+        self._process = None
+
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------------
+    # 内部状态（调用方需持有 self._lock）
+    # ------------------------------------------------------------------
+    def _purpose_config(self, purpose: str) -> Dict[str, Any]:
+        return self.purposes.get(purpose) or FALLBACK_PURPOSE
+
+    def _purpose_stats(self, purpose: str) -> Dict[str, Any]:
+        stats = self._stats.get(purpose)
+        if stats is None:
+            stats = self._stats[purpose] = {
+                'admitted': 0, 'shed': 0, 'timeouts': 0, 'waits': deque(maxlen=200)
+            }
+        return stats
+
+    def _sample_memory(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._memory['sampled_at'] < self.memory_sample_interval:
+            return
+        try:
+            import psutil
+            if self._process is None:
+                self._process = psutil.Process()
+            rss = 0
+            count = 0
+            for child in self._process.children(recursive=True):
+                try:
+                    name = child.name().lower()
+                    if any(keyword in name for keyword in CHROMIUM_PROCESS_NAMES):
+                        rss += child.memory_info().rss
+                        count += 1
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+            self._memory.update({
+                'chromium_rss': rss,
+                'processes': count,
+                'available': psutil.virtual_memory().available,
+                'sampled_at': now,
+            })
+            self._fresh_admissions = 0
+        except Exception as e:
+            # psutil不可用时只按并发数调度
+            self._memory['sampled_at'] = now
+            logger.debug(f"浏览器资源调度: 内存采样失败: {e}")
+
+    def _memory_allows(self) -> bool:
+        if self._active_total == 0:
+            # 至少放行一个，避免内存估算偏差导致永久阻塞
+            return True
+        estimated = self.estimated_browser_mb * 1024 * 1024
+        if self.memory_budget_mb:
+            projected = self._memory['chromium_rss'] + estimated * (self._fresh_admissions + 1)
+            if projected > self.memory_budget_mb * 1024 * 1024:
+                return False
+        available = self._memory['available']
+        if self.min_available_mb and available is not None:
+            if available - estimated * (self._fresh_admissions + 1) < self.min_available_mb * 1024 * 1024:
+                return False
+        return True
+
+    def _admit_waiters(self):
+        """按优先级放行排队中的请求"""
+        if not self._waiting:
+            return
+        self._sample_memory()
+        for ticket in sorted(self._waiting, key=lambda t: (t.priority, t.seq)):
+            if self._active_total >= self.max_concurrent:
+                break
+            limit = self._purpose_config(ticket.purpose).get('max_concurrent')
+            if limit and self._active.get(ticket.purpose, 0) >= limit:
+                # 该用途已达上限，不影响其他用途
+                continue
+            if not self._memory_allows():
+                # 内存不足时严格按优先级等待，不让低优先级插队
+                break
+            self._grant(ticket)
+
+    def _grant(self, ticket: _Ticket):
+        self._waiting.remove(ticket)
+        ticket.state = 'admitted'
+        ticket.admitted_at = time.time()
+        self._active[ticket.purpose] = self._active.get(ticket.purpose, 0) + 1
+        self._active_total += 1
+        self._active_tickets.add(ticket)
+        self._fresh_admissions += 1
+
+        waited = ticket.admitted_at - ticket.enqueued_at
+        stats = self._purpose_stats(ticket.purpose)
+        stats['admitted'] += 1
+        stats['waits'].append(waited)
+        if waited >= 1:
+            logger.info(f"浏览器资源调度: {ticket.purpose}【{ticket.owner}】排队 {waited:.1f} 秒后获得许可")
+
+        if ticket.event is not None:
+            ticket.event.set()
+        elif ticket.future is not None:
+            ticket.loop.call_soon_threadsafe(self._wake, ticket.future)
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(True)
+
+    def _shed(self, ticket: _Ticket, reason: str):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+        ticket.state = 'shed'
+        stats = self._purpose_stats(ticket.purpose)
+        if reason == 'timeout':
+            stats['timeouts'] += 1
+        else:
+            stats['shed'] += 1
+        waited = time.time() - ticket.enqueued_at
+        logger.warning(f"浏览器资源调度: {ticket.purpose}【{ticket.owner}】被拒绝（{reason}），已等待 {waited:.1f} 秒，"
+                       f"当前活跃 {self._active_total}/{self.max_concurrent}，排队 {len(self._waiting)}")
+        return BrowserAdmissionError(f"浏览器资源繁忙（{reason}），{ticket.purpose} 请求已等待 {waited:.1f} 秒")
+
+    def _enqueue(self, purpose: str, owner: str) -> _Ticket:
+        cfg = self._purpose_config(purpose)
+        ticket = _Ticket(purpose, owner, cfg.get('priority', FALLBACK_PURPOSE['priority']), next(self._seq))
+        max_queue = cfg.get('max_queue')
+        if max_queue is not None:
+            queued = sum(1 for t in self._waiting if t.purpose == purpose)
+            if queued >= max_queue:
+                raise self._shed(ticket, 'queue_full')
+        self._waiting.append(ticket)
+        self._admit_waiters()
+        return ticket
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def _playwright_not_ready(self, purpose: str, owner: str) -> BrowserAdmissionError:
+        logger.warning(f"【{owner}】Playwright浏览器仍在安装，{purpose} 暂时无法使用浏览器")
+        return BrowserAdmissionError(f"Playwright浏览器仍在安装: {purpose}")
+
+    def acquire(self, purpose: str, owner: str = '', timeout: float = None) -> Optional[_Ticket]:
+        """同步获取浏览器使用许可（在线程中调用），失败抛出 BrowserAdmissionError"""
+        if timeout is None:
+            timeout = self._purpose_config(purpose).get('max_wait', FALLBACK_PURPOSE['max_wait'])
+        deadline = time.time() + timeout
+        # 首次启动浏览器前等待Playwright浏览器检测/安装完成（计入排队时间）
+        if not playwright_ready.wait(timeout):
+            raise self._playwright_not_ready(purpose, owner)
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            ticket = self._enqueue(purpose, owner)
+            if ticket.state == 'admitted':
+                return ticket
+            ticket.event = threading.Event()
+
+        while True:
+            remaining = deadline - time.time()
+            if ticket.event.wait(max(0.0, min(self.poll_interval, remaining))):
+                return ticket
+            with self._lock:
+                if ticket.state == 'admitted':
+                    return ticket
+                if time.time() >= deadline:
+                    raise self._shed(ticket, 'timeout')
+                # 定期重新评估（内存可能在没有释放事件的情况下下降）
+                self._admit_waiters()
+                if ticket.state == 'admitted':
+                    return ticket
+
+    async def acquire_async(self, purpose: str, owner: str = '', timeout: float = None) -> Optional[_Ticket]:
+        """异步获取浏览器使用许可，失败抛出 BrowserAdmissionError"""
+        if timeout is None:
+            timeout = self._purpose_config(purpose).get('max_wait', FALLBACK_PURPOSE['max_wait'])
+        deadline = time.time() + timeout
+        if not playwright_ready.is_set() and not await asyncio.to_thread(playwright_ready.wait, timeout):
+            raise self._playwright_not_ready(purpose, owner)
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            ticket = self._enqueue(purpose, owner)
+            if ticket.state == 'admitted':
+                return ticket
+            ticket.loop = loop
+            ticket.future = loop.create_future()
+
+        try:
+            while True:
+                remaining = deadline - time.time()
+                try:
+                    await asyncio.wait_for(asyncio.shield(ticket.future),
+                                           timeout=max(0.0, min(self.poll_interval, remaining)))
+                    return ticket
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    if ticket.state == 'admitted':
+                        return ticket
+                    if time.time() >= deadline:
+                        raise self._shed(ticket, 'timeout')
+                    self._admit_waiters()
+                    if ticket.state == 'admitted':
+                        return ticket
+        except asyncio.CancelledError:
+            with self._lock:
+                admitted = ticket.state == 'admitted'
+                if ticket.state == 'waiting':
+                    self._waiting.remove(ticket)
+                    ticket.state = 'released'
+            if admitted:
+                self.release(ticket)
+            raise
+
+    def release(self, ticket: Optional[_Ticket]):
+        """归还许可"""
+        if ticket is None:
+            return
+        with self._lock:
+            if ticket.state != 'admitted':
+                return
+            ticket.state = 'released'
+            self._active_tickets.discard(ticket)
+            self._active[ticket.purpose] = max(0, self._active.get(ticket.purpose, 0) - 1)
+            self._active_total = max(0, self._active_total - 1)
+            self._admit_waiters()
+
+    @asynccontextmanager
+    async def slot(self, purpose: str, owner: str = '', timeout: float = None):
+        """异步上下文管理器形式的许可"""
+        ticket = await self.acquire_async(purpose, owner, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @staticmethod
+    def _summarize(samples) -> Dict[str, Any]:
+        if not samples:
+            return {'count': 0}
+        ordered = sorted(samples)
+        count = len(ordered)
+        return {
+            'count': count,
+            'avg_ms': round(sum(ordered) / count * 1000, 1),
+            'p95_ms': round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+            'max_ms': round(ordered[-1] * 1000, 1),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计：内存、各用途活跃/排队数量和等待时间"""
+        with self._lock:
+            self._sample_memory()
+            now = time.time()
+            purposes = {}
+            for name in set(self.purposes) | set(self._stats) | set(self._active):
+                stats = self._purpose_stats(name)
+                purposes[name] = {
+                    'priority': self._purpose_config(name).get('priority'),
+                    'active': self._active.get(name, 0),
+                    'waiting': sum(1 for t in self._waiting if t.purpose == name),
+                    'admitted': stats['admitted'],
+                    'shed': stats['shed'],
+                    'timeouts': stats['timeouts'],
+                    'wait': self._summarize(stats['waits']),
+                }
+            memory = self._memory
+            return {
+                'enabled': self.enabled,
+                'max_concurrent': self.max_concurrent,
+                'active_total': self._active_total,
+                'memory': {
+                    'chromium_rss_mb': round(memory['chromium_rss'] / 1024 / 1024, 1),
+                    'chromium_processes': memory['processes'],
+                    'available_mb': round(memory['available'] / 1024 / 1024, 1) if memory['available'] is not None else None,
+                    'budget_mb': self.memory_budget_mb,
+                    'sample_age': round(now - memory['sampled_at'], 1),
+                },
+                'purposes': purposes,
+                'active': [
+                    {'purpose': t.purpose, 'owner': t.owner, 'held': round(now - t.admitted_at, 1)}
+                    for t in self._active_tickets
+                ],
+                'waiting': [
+                    {'purpose': t.purpose, 'owner': t.owner, 'waited': round(now - t.enqueued_at, 1)}
+                    for t in sorted(self._waiting, key=lambda t: (t.priority, t.seq))
+                ],
+            }
+
+
+# 创建全局浏览器资源调度器实例
+browser_governor = BrowserGovernor(BROWSER_GOVERNOR)
@@ -0,0 +1,800 @@
+"""
+进程级 Playwright 浏览器池
+
+商品详情、订单详情、Cookie刷新等流程共享常驻的 Chromium 进程：
+- 每个事件循环维护独立的 Playwright 实例和浏览器（Playwright对象不能跨事件循环使用）
+- 每个账号一个隔离的浏览器上下文，自动注入该账号的Cookie
+- 页面用完后回收复用，浏览器/上下文按存活时间和使用次数定期轮换
+- 后台清理任务负责健康检查和空闲资源回收
+"""
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from config import BROWSER_POOL
+from utils.browser_governor import browser_governor
+from utils.browser_profiles import browser_profiles
+
+
+# Chromium 启动参数（原先在各个调用处重复定义）
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--no-first-run',
+    '--no-zygote',
+    '--disable-gpu',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-features=TranslateUI',
+    '--disable-ipc-flooding-protection',
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--hide-scrollbars',
+    '--mute-audio',
+    '--no-default-browser-check',
+    '--no-pings'
+]
+
+# Docker 环境额外参数
+DOCKER_BROWSER_ARGS = [
+    '--disable-background-networking',
+    '--disable-client-side-phishing-detection',
+    '--disable-hang-monitor',
+    '--disable-popup-blocking',
+    '--disable-prompt-on-repost',
+    '--disable-web-resources',
+    '--metrics-recording-only',
+    '--safebrowsing-disable-auto-update',
+    '--enable-automation',
+    '--password-store=basic',
+    '--use-mock-keychain'
+]
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
+DEFAULT_VIEWPORT = {'width': 1920, 'height': 1080}
+
+
+def get_browser_args() -> List[str]:
+    """获取当前环境的浏览器启动参数"""
+    args = list(BROWSER_ARGS)
+    if os.getenv('DOCKER_ENV'):
+        args.extend(DOCKER_BROWSER_ARGS)
+    return args
+
+
+def parse_cookie_string(cookies_str: str, domain: str = '.goofish.com') -> List[Dict[str, str]]:
+    """将Cookie字符串转换为 Playwright add_cookies 所需的格式"""
+    cookies = []
+    for cookie_pair in (cookies_str or '').split('; '):
+        if '=' in cookie_pair:
+            name, value = cookie_pair.split('=', 1)
+            cookies.append({
+                'name': name.strip(),
+                'value': value.strip(),
+                'domain': domain,
+                'path': '/'
+            })
+    return cookies
+
+
+class _PooledBrowser:
+    """池中的一个 Chromium 进程"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.launched_at = time.time()
+        self.last_used = time.time()
+        self.uses = 0
+        self.leases = 0
+        self.contexts = 0
+        self.retiring = False
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+
+class _AccountContext:
+    """账号专属的浏览器上下文"""
+
+    def __init__(self, key: str, context, owner: _PooledBrowser, cookies_str: str):
+        self.key = key
+        self.context = context
+        self.owner = owner
+        self.cookies_str = cookies_str
+        self.created_at = time.time()
+        self.last_used = time.time()
+        self.uses = 0
+        self.leases = 0
+        self.retiring = False
+        self.idle_pages = []
+
+
+class _LoopState:
+    """单个事件循环内的浏览器池状态"""
+
+    def __init__(self):
+        self.playwright = None
+        self.browsers: List[_PooledBrowser] = []
+        self.contexts: Dict[str, _AccountContext] = {}
+        # 池外浏览器（账号持久化目录上下文、滑块验证/密码登录等）不属于池中浏览器，但共用 Playwright 实例
+        self.external_leases = 0
+        self.lock = asyncio.Lock()
+        self.janitor: Optional[asyncio.Task] = None
+
+
+class BrowserPool:
+    """进程级浏览器池"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', True)
+        self.max_browsers = max(1, int(settings.get('max_browsers', 2)))
+        self.contexts_per_browser = max(1, int(settings.get('contexts_per_browser', 8)))
+        self.browser_max_age = settings.get('browser_max_age', 1800)
+        self.browser_max_uses = settings.get('browser_max_uses', 200)
+        self.browser_idle_timeout = settings.get('browser_idle_timeout', 900)
+        self.context_max_age = settings.get('context_max_age', 600)
+        self.context_max_uses = settings.get('context_max_uses', 50)
+        self.context_idle_timeout = settings.get('context_idle_timeout', 300)
+        self.idle_pages_per_context = int(settings.get('idle_pages_per_context', 1))
+        self.janitor_interval = settings.get('janitor_interval', 60)
+        self.launch_timeout = settings.get('launch_timeout', 30)
+
+        # 每个事件循环一份状态，事件循环被回收后自动释放
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._states_lock = threading.Lock()
+
+        # 统计信息（跨事件循环汇总）
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            'playwright_starts': 0,
+            'browser_launches': 0,
+            'browser_recycles': 0,
+            'browser_failures': 0,
+            'contexts_created': 0,
+            'contexts_recycled': 0,
+            'pages_created': 0,
+            'pages_reused': 0,
+            'leases': 0,
+            'lease_failures': 0,
+            'dedicated_launches': 0,
+            'persistent_launches': 0,
+        }
+        self._recycle_reasons: Dict[str, int] = {}
+        self._acquire_latency = deque(maxlen=500)
+        self._lease_latency: Dict[str, deque] = {}
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def _record_recycle(self, kind: str, reason: str):
+        with self._stats_lock:
+            key = f"{kind}:{reason}"
+            self._recycle_reasons[key] = self._recycle_reasons.get(key, 0) + 1
+            counter = 'contexts_recycled' if kind == 'context' else 'browser_recycles'
+            self._counters[counter] += 1
+
+    def _record_latency(self, purpose: str, acquire_time: float, lease_time: float):
+        with self._stats_lock:
+            self._acquire_latency.append(acquire_time)
+            samples = self._lease_latency.get(purpose)
+            if samples is None:
+                samples = self._lease_latency[purpose] = deque(maxlen=200)
+            samples.append(lease_time)
+
+    @staticmethod
+    def _summarize(samples) -> Dict[str, Any]:
+        if not samples:
+            return {'count': 0}
+        ordered = sorted(samples)
+        count = len(ordered)
+        return {
+            'count': count,
+            'avg_ms': round(sum(ordered) / count * 1000, 1),
+            'p50_ms': round(ordered[int(count * 0.5)] * 1000, 1),
+            'p95_ms': round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+            'max_ms': round(ordered[-1] * 1000, 1),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取浏览器池统计信息"""
+        with self._states_lock:
+            states = list(self._states.values())
+        now = time.time()
+        browsers = []
+        contexts = []
+        for state in states:
+            for entry in state.browsers:
+                browsers.append({
+                    'age': round(now - entry.launched_at, 1),
+                    'uses': entry.uses,
+                    'leases': entry.leases,
+                    'contexts': entry.contexts,
+                    'retiring': entry.retiring,
+                    'connected': entry.is_healthy(),
+                })
+            for ctx in state.contexts.values():
+                contexts.append({
+                    'key': ctx.key,
+                    'age': round(now - ctx.created_at, 1),
+                    'uses': ctx.uses,
+                    'leases': ctx.leases,
+                    'idle_pages': len(ctx.idle_pages),
+                })
+
+        with self._stats_lock:
+            return {
+                'enabled': self.enabled,
+                'event_loops': len(states),
+                'counters': dict(self._counters),
+                'recycle_reasons': dict(self._recycle_reasons),
+                'acquire_latency': self._summarize(self._acquire_latency),
+                'lease_latency': {purpose: self._summarize(samples)
+                                  for purpose, samples in self._lease_latency.items()},
+                'browsers': browsers,
+                'contexts': contexts,
+            }
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def _get_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._states_lock:
+            state = self._states.get(loop)
+            if state is None:
+                state = _LoopState()
+                self._states[loop] = state
+        return state
+
+    async def _start_playwright(self):
+        from playwright.async_api import async_playwright
+
+        is_docker = os.getenv('DOCKER_ENV') or os.path.exists('/.dockerenv')
+        if not is_docker:
+            return await asyncio.wait_for(async_playwright().start(), timeout=self.launch_timeout)
+
+        # Docker环境下修复asyncio子进程问题：启动期间使用不做任何事的子进程监视器
+        class DummyChildWatcher:
+            def __enter__(self):
+                return self
+            def __exit__(self, *args):
+                pass
+            def is_active(self):
+                return True
+            def add_child_handler(self, *args, **kwargs):
+                pass
+            def remove_child_handler(self, *args, **kwargs):
+                pass
+            def attach_loop(self, *args, **kwargs):
+                pass
+            def close(self):
+                pass
+
+        class DockerEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+            def get_child_watcher(self):
+                return DummyChildWatcher()
+
+        old_policy = asyncio.get_event_loop_policy()
+        asyncio.set_event_loop_policy(DockerEventLoopPolicy())
+        try:
+            return await asyncio.wait_for(async_playwright().start(), timeout=self.launch_timeout)
+        finally:
+            asyncio.set_event_loop_policy(old_policy)
+
+    async def _launch_browser(self, state: _LoopState) -> _PooledBrowser:
+        if state.playwright is None:
+            state.playwright = await self._start_playwright()
+            self._count('playwright_starts')
+            logger.info("浏览器池: Playwright已启动")
+        try:
+            browser = await asyncio.wait_for(
+                state.playwright.chromium.launch(headless=True, args=get_browser_args()),
+                timeout=self.launch_timeout
+            )
+        except Exception:
+            self._count('browser_failures')
+            raise
+        entry = _PooledBrowser(browser)
+        state.browsers.append(entry)
+        self._count('browser_launches')
+        logger.info(f"浏览器池: 启动新浏览器，当前浏览器数: {len(state.browsers)}")
+        if state.janitor is None or state.janitor.done():
+            state.janitor = asyncio.get_running_loop().create_task(self._janitor(state))
+        return entry
+
+    def _browser_recycle_reason(self, entry: _PooledBrowser) -> Optional[str]:
+        if not entry.is_healthy():
+            return 'disconnected'
+        if self.browser_max_age and time.time() - entry.launched_at > self.browser_max_age:
+            return 'max_age'
+        if self.browser_max_uses and entry.uses >= self.browser_max_uses:
+            return 'max_uses'
+        return None
+
+    def _context_recycle_reason(self, ctx: _AccountContext) -> Optional[str]:
+        if ctx.owner.retiring or not ctx.owner.is_healthy():
+            return 'browser_retired'
+        if self.context_max_age and time.time() - ctx.created_at > self.context_max_age:
+            return 'max_age'
+        if self.context_max_uses and ctx.uses >= self.context_max_uses:
+            return 'max_uses'
+        return None
+
+    def _retire_browser(self, state: _LoopState, entry: _PooledBrowser, reason: str):
+        """标记浏览器退役：不再分配新上下文，租约全部归还后关闭"""
+        if entry.retiring:
+            return
+        entry.retiring = True
+        self._record_recycle('browser', reason)
+        logger.info(f"浏览器池: 浏览器退役（{reason}），已使用 {entry.uses} 次")
+        for ctx in list(state.contexts.values()):
+            if ctx.owner is entry:
+                self._retire_context(state, ctx, 'browser_retired')
+
+    def _retire_context(self, state: _LoopState, ctx: _AccountContext, reason: str):
+        if ctx.retiring:
+            return
+        ctx.retiring = True
+        self._record_recycle('context', reason)
+        if state.contexts.get(ctx.key) is ctx:
+            del state.contexts[ctx.key]
+
+    async def _close_context(self, ctx: _AccountContext):
+        ctx.owner.contexts -= 1
+        ctx.idle_pages.clear()
+        try:
+            await asyncio.wait_for(ctx.context.close(), timeout=5.0)
+        except Exception as e:
+            logger.debug(f"浏览器池: 关闭上下文出错（可忽略）: {e}")
+
+    async def _close_browser(self, state: _LoopState, entry: _PooledBrowser):
+        if entry in state.browsers:
+            state.browsers.remove(entry)
+        try:
+            await asyncio.wait_for(entry.browser.close(), timeout=5.0)
+        except Exception as e:
+            logger.debug(f"浏览器池: 关闭浏览器出错（可忽略）: {e}")
+
+    async def _reap(self, state: _LoopState):
+        """关闭已退役且没有租约的上下文和浏览器"""
+        for entry in list(state.browsers):
+            if entry.retiring and entry.leases == 0:
+                await self._close_browser(state, entry)
+
+    async def _pick_browser(self, state: _LoopState) -> _PooledBrowser:
+        """选择承载新上下文的浏览器，必要时启动新浏览器"""
+        for entry in list(state.browsers):
+            if not entry.retiring:
+                reason = self._browser_recycle_reason(entry)
+                if reason:
+                    self._retire_browser(state, entry, reason)
+        await self._reap(state)
+
+        active = [entry for entry in state.browsers if not entry.retiring]
+        if active:
+            least = min(active, key=lambda entry: entry.contexts)
+            if least.contexts < self.contexts_per_browser or len(active) >= self.max_browsers:
+                return least
+        return await self._launch_browser(state)
+
+    async def _get_account_context(self, state: _LoopState, key: str, cookies_str: str) -> _AccountContext:
+        ctx = state.contexts.get(key)
+        if ctx is not None:
+            reason = self._context_recycle_reason(ctx)
+            if reason:
+                self._retire_context(state, ctx, reason)
+                if ctx.leases == 0:
+                    await self._close_context(ctx)
+                ctx = None
+
+        if ctx is None:
+            owner = await self._pick_browser(state)
+            context = await owner.browser.new_context(
+                viewport=DEFAULT_VIEWPORT,
+                user_agent=DEFAULT_USER_AGENT
+            )
+            owner.contexts += 1
+            ctx = _AccountContext(key, context, owner, None)
+            state.contexts[key] = ctx
+            self._count('contexts_created')
+
+        if cookies_str and ctx.cookies_str != cookies_str:
+            # 账号Cookie已更新，替换上下文中的Cookie
+            if ctx.cookies_str is not None:
+                await ctx.context.clear_cookies()
+            await ctx.context.add_cookies(parse_cookie_string(cookies_str))
+            ctx.cookies_str = cookies_str
+        return ctx
+
+    async def _janitor(self, state: _LoopState):
+        """后台清理：健康检查、回收过期/空闲的上下文和浏览器"""
+        while True:
+            await asyncio.sleep(self.janitor_interval)
+            try:
+                async with state.lock:
+                    now = time.time()
+                    for ctx in list(state.contexts.values()):
+                        reason = self._context_recycle_reason(ctx)
+                        if not reason and ctx.leases == 0 and self.context_idle_timeout \
+                                and now - ctx.last_used > self.context_idle_timeout:
+                            reason = 'idle'
+                        if reason:
+                            self._retire_context(state, ctx, reason)
+                            if ctx.leases == 0:
+                                await self._close_context(ctx)
+
+                    for entry in list(state.browsers):
+                        if entry.retiring:
+                            continue
+                        reason = self._browser_recycle_reason(entry)
+                        if not reason and entry.leases == 0 and entry.contexts == 0 and self.browser_idle_timeout \
+                                and now - entry.last_used > self.browser_idle_timeout:
+                            reason = 'idle'
+                        if reason:
+                            self._retire_browser(state, entry, reason)
+                    await self._reap(state)
+
+                    if not state.browsers:
+                        # 所有浏览器都已关闭，释放Playwright，下次租用时再启动
+                        state.janitor = None
+                        await self._stop_idle_playwright(state)
+                        return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"浏览器池清理任务异常: {e}")
+
+    async def _stop_idle_playwright(self, state: _LoopState):
+        """没有池中浏览器和池外浏览器时停止Playwright（需持有 state.lock）"""
+        if state.browsers or state.external_leases or state.playwright is None:
+            return
+        if state.janitor is not None and not state.janitor.done():
+            # 清理任务仍在运行，由它负责停止
+            return
+        playwright, state.playwright = state.playwright, None
+        try:
+            await asyncio.wait_for(playwright.stop(), timeout=5.0)
+        except Exception as e:
+            logger.debug(f"浏览器池: 停止Playwright出错（可忽略）: {e}")
+        logger.info("浏览器池: 已无浏览器，Playwright已停止")
+
+    async def close(self):
+        """关闭当前事件循环中的所有浏览器"""
+        state = self._get_state()
+        if state.janitor:
+            state.janitor.cancel()
+            state.janitor = None
+        async with state.lock:
+            for ctx in list(state.contexts.values()):
+                self._retire_context(state, ctx, 'shutdown')
+                await self._close_context(ctx)
+            for entry in list(state.browsers):
+                await self._close_browser(state, entry)
+            if state.playwright is not None:
+                playwright, state.playwright = state.playwright, None
+                try:
+                    await asyncio.wait_for(playwright.stop(), timeout=5.0)
+                except Exception as e:
+                    logger.debug(f"浏览器池: 停止Playwright出错（可忽略）: {e}")
+
+    # ------------------------------------------------------------------
+    # 租用接口
+    # ------------------------------------------------------------------
+    @asynccontextmanager
+    async def _dedicated_browser(self):
+        """浏览器池禁用时的降级方案：为本次调用单独启动浏览器"""
+        playwright = await self._start_playwright()
+        browser = None
+        self._count('dedicated_launches')
+        try:
+            browser = await playwright.chromium.launch(headless=True, args=get_browser_args())
+            yield browser
+        finally:
+            if browser:
+                try:
+                    await asyncio.wait_for(browser.close(), timeout=5.0)
+                except Exception as e:
+                    logger.debug(f"关闭浏览器出错（可忽略）: {e}")
+            try:
+                await asyncio.wait_for(playwright.stop(), timeout=2.0)
+            except Exception as e:
+                logger.debug(f"停止Playwright出错（可忽略）: {e}")
+
+    def _release_failed(self, state: _LoopState, entry: Optional[_PooledBrowser], error: Exception):
+        """租约异常结束时根据错误判断浏览器是否已损坏"""
+        self._count('lease_failures')
+        if entry and not entry.retiring and (not entry.is_healthy() or 'has been closed' in str(error)):
+            self._retire_browser(state, entry, 'crashed')
+
+    @asynccontextmanager
+    async def page(self, account_key: str, cookies_str: str = None, extra_headers: Dict[str, str] = None,
+                   purpose: str = 'default'):
+        """租用账号专属上下文中的页面
+
+        Args:
+            account_key: 账号标识（通常为cookie_id），同一账号复用同一个上下文
+            cookies_str: 账号Cookie字符串，变化时自动更新到上下文
+            extra_headers: 页面额外请求头
+            purpose: 调用用途，用于资源调度优先级和分类统计页面耗时
+
+        Raises:
+            BrowserAdmissionError: 浏览器资源繁忙，排队超时或被拒绝
+        """
+        ticket = await browser_governor.acquire_async(purpose, account_key)
+        try:
+            async with self._lease_page(account_key, cookies_str, extra_headers, purpose) as page:
+                yield page
+        finally:
+            browser_governor.release(ticket)
+
+    @asynccontextmanager
+    async def _lease_page(self, account_key: str, cookies_str: str, extra_headers: Optional[Dict[str, str]],
+                          purpose: str):
+        if not self.enabled:
+            async with self._dedicated_browser() as browser:
+                context = await browser.new_context(viewport=DEFAULT_VIEWPORT, user_agent=DEFAULT_USER_AGENT)
+                if cookies_str:
+                    await context.add_cookies(parse_cookie_string(cookies_str))
+                page = await context.new_page()
+                if extra_headers:
+                    await page.set_extra_http_headers(extra_headers)
+                yield page
+            return
+
+        state = self._get_state()
+        acquire_start = time.perf_counter()
+        async with state.lock:
+            try:
+                ctx = await self._get_account_context(state, account_key, cookies_str)
+            except Exception:
+                self._count('lease_failures')
+                raise
+            ctx.leases += 1
+            ctx.uses += 1
+            ctx.owner.leases += 1
+            ctx.owner.uses += 1
+
+        page = None
+        try:
+            while ctx.idle_pages:
+                candidate = ctx.idle_pages.pop()
+                if not candidate.is_closed():
+                    page = candidate
+                    self._count('pages_reused')
+                    break
+            if page is None:
+                page = await ctx.context.new_page()
+                self._count('pages_created')
+            await page.set_extra_http_headers(extra_headers or {})
+        except Exception as e:
+            async with state.lock:
+                ctx.leases -= 1
+                ctx.owner.leases -= 1
+                self._release_failed(state, ctx.owner, e)
+                self._retire_context(state, ctx, 'crashed')
+                if ctx.leases == 0:
+                    await self._close_context(ctx)
+            raise
+
+        self._count('leases')
+        lease_start = time.perf_counter()
+        acquire_time = lease_start - acquire_start
+        failed = None
+        try:
+            yield page
+        except BaseException as e:
+            # 包括任务取消：页面状态不确定，不再放回复用
+            failed = e
+            raise
+        finally:
+            lease_time = time.perf_counter() - lease_start
+            self._record_latency(purpose, acquire_time, lease_time)
+            async with state.lock:
+                ctx.leases -= 1
+                ctx.owner.leases -= 1
+                ctx.last_used = ctx.owner.last_used = time.time()
+                if failed is not None:
+                    self._release_failed(state, ctx.owner, failed)
+
+                if not ctx.retiring and not page.is_closed() and failed is None \
+                        and len(ctx.idle_pages) < self.idle_pages_per_context:
+                    ctx.idle_pages.append(page)
+                else:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+
+                if ctx.retiring and ctx.leases == 0:
+                    await self._close_context(ctx)
+                await self._reap(state)
+
+    @asynccontextmanager
+    async def isolated_context(self, cookies_str: str = None, purpose: str = 'default', owner: str = ''):
+        """在池中浏览器上创建一次性的隔离上下文，退出时关闭
+
+        适用于需要干净Cookie环境的流程（如扫码登录后获取真实Cookie）。
+        """
+        ticket = await browser_governor.acquire_async(purpose, owner)
+        try:
+            async with self._lease_isolated_context(cookies_str, purpose) as context:
+                yield context
+        finally:
+            browser_governor.release(ticket)
+
+    @asynccontextmanager
+    async def _lease_isolated_context(self, cookies_str: Optional[str], purpose: str):
+        if not self.enabled:
+            async with self._dedicated_browser() as browser:
+                context = await browser.new_context(viewport=DEFAULT_VIEWPORT, user_agent=DEFAULT_USER_AGENT)
+                if cookies_str:
+                    await context.add_cookies(parse_cookie_string(cookies_str))
+                yield context
+            return
+
+        state = self._get_state()
+        acquire_start = time.perf_counter()
+        async with state.lock:
+            owner = await self._pick_browser(state)
+            owner.leases += 1
+            owner.uses += 1
+
+        context = None
+        failed = None
+        lease_start = None
+        try:
+            context = await owner.browser.new_context(viewport=DEFAULT_VIEWPORT, user_agent=DEFAULT_USER_AGENT)
+            if cookies_str:
+                await context.add_cookies(parse_cookie_string(cookies_str))
+            self._count('leases')
+            lease_start = time.perf_counter()
+            yield context
+        except BaseException as e:
+            failed = e
+            raise
+        finally:
+            if lease_start is not None:
+                self._record_latency(purpose, lease_start - acquire_start, time.perf_counter() - lease_start)
+            if context is not None:
+                try:
+                    await asyncio.wait_for(context.close(), timeout=5.0)
+                except Exception as e:
+                    logger.debug(f"浏览器池: 关闭隔离上下文出错（可忽略）: {e}")
+            async with state.lock:
+                owner.leases -= 1
+                owner.last_used = time.time()
+                if failed is not None:
+                    self._release_failed(state, owner, failed)
+                await self._reap(state)
+
+    @asynccontextmanager
+    async def profile_context(self, account_id: str, cookies_str: str = None, purpose: str = 'default'):
+        """使用账号持久化用户数据目录启动浏览器上下文，退出时关闭（目录保留，下次启动直接复用）
+
+        未启用持久化目录、浏览器池已禁用或目录正被其他流程使用时，回退为一次性隔离上下文。
+
+        Yields:
+            (context, persistent)：浏览器上下文，以及是否使用了持久化目录
+        """
+        ticket = await browser_governor.acquire_async(purpose, account_id)
+        try:
+            profile_dir = None
+            if self.enabled and browser_profiles.enabled:
+                profile_dir = browser_profiles.try_acquire(account_id)
+
+            if profile_dir is None:
+                async with self._lease_isolated_context(cookies_str, purpose) as context:
+                    yield context, False
+                return
+
+            try:
+                async with self._lease_persistent_context(account_id, profile_dir, cookies_str, purpose) as context:
+                    yield context, True
+            finally:
+                browser_profiles.release(account_id)
+        finally:
+            browser_governor.release(ticket)
+
+    @asynccontextmanager
+    async def playwright_lease(self):
+        """租用当前事件循环共享的 Playwright 实例，用于需要自定义启动参数的池外浏览器
+
+        省去每次启动 Playwright 驱动进程的开销；浏览器池禁用时为本次调用单独启动 Playwright。
+        """
+        if not self.enabled:
+            playwright = await self._start_playwright()
+            try:
+                yield playwright
+            finally:
+                try:
+                    await asyncio.wait_for(playwright.stop(), timeout=2.0)
+                except Exception as e:
+                    logger.debug(f"停止Playwright出错（可忽略）: {e}")
+            return
+
+        state = self._get_state()
+        async with state.lock:
+            if state.playwright is None:
+                state.playwright = await self._start_playwright()
+                self._count('playwright_starts')
+                logger.info("浏览器池: Playwright已启动")
+            state.external_leases += 1
+        try:
+            yield state.playwright
+        finally:
+            async with state.lock:
+                state.external_leases -= 1
+                await self._stop_idle_playwright(state)
+
+    @asynccontextmanager
+    async def _lease_persistent_context(self, account_id: str, profile_dir: str, cookies_str: Optional[str],
+                                        purpose: str):
+        await asyncio.to_thread(browser_profiles.prepare, profile_dir)
+
+        acquire_start = time.perf_counter()
+        async with self.playwright_lease() as playwright:
+            context = None
+            lease_start = None
+            try:
+                for attempt in range(2):
+                    try:
+                        context = await asyncio.wait_for(
+                            playwright.chromium.launch_persistent_context(
+                                profile_dir,
+                                headless=True,
+                                args=get_browser_args(),
+                                viewport=DEFAULT_VIEWPORT,
+                                user_agent=DEFAULT_USER_AGENT
+                            ),
+                            timeout=self.launch_timeout
+                        )
+                        break
+                    except Exception as e:
+                        self._count('browser_failures')
+                        if attempt:
+                            raise
+                        await asyncio.to_thread(browser_profiles.recover, account_id, e)
+                self._count('persistent_launches')
+
+                # 目录中保存的可能是已过期或已退出登录的旧Cookie：先清空再写入账号当前Cookie，
+                # 避免刷新后读回的Cookie中混入旧值（localStorage等其他状态仍然复用）
+                if cookies_str:
+                    await context.clear_cookies()
+                    await context.add_cookies(parse_cookie_string(cookies_str))
+                self._count('leases')
+                lease_start = time.perf_counter()
+                yield context
+            finally:
+                if lease_start is not None:
+                    self._record_latency(purpose, lease_start - acquire_start, time.perf_counter() - lease_start)
+                if context is not None:
+                    try:
+                        # 关闭时 Chromium 将Cookie、localStorage等写回用户数据目录
+                        await asyncio.wait_for(context.close(), timeout=10.0)
+                    except Exception as e:
+                        logger.debug(f"浏览器池: 关闭持久化上下文出错（可忽略）: {e}")
+
+
+# 创建全局浏览器池实例
+browser_pool = BrowserPool(BROWSER_POOL)
@@ -0,0 +1,310 @@
+"""
+按账号持久化的浏览器用户数据目录
+
+Cookie刷新、滑块验证和密码登录复用同一账号的用户数据目录（launch_persistent_context），
+保留 localStorage、设备指纹类Cookie和HTTP缓存，减少冷启动耗时和触发滑块验证的概率：
+- 同一目录同一时间只能被一个 Chromium 使用，占用时调用方回退到临时环境
+- 启动前清理异常退出遗留的 Singleton 锁文件，超出大小上限时先清理缓存目录
+- 启动失败视为目录损坏，重建目录后重试一次
+- 定期删除长期未使用的目录，并按总大小上限淘汰最久未使用的目录
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import BROWSER_PROFILES
+
+
+# Chromium 异常退出后遗留、会导致"目录已被占用"的锁文件
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+# 超出大小上限时优先清理的缓存目录（不影响登录态）
+CACHE_DIRS = (
+    'Default/Cache',
+    'Default/Code Cache',
+    'Default/GPUCache',
+    'Default/Service Worker/CacheStorage',
+    'Default/Service Worker/ScriptCache',
+    'GrShaderCache',
+    'GraphiteDawnCache',
+    'ShaderCache',
+)
+
+FEATURES_FILE = 'xianyu_features.json'
+
+# 页面被风控拦截（滑块/验证码/重新登录）的特征
+VERIFICATION_URL_KEYWORDS = ('punish', 'captcha', 'x5secdata', 'login.taobao.com', 'passport.goofish.com')
+VERIFICATION_TITLE_KEYWORDS = ('验证', '滑块', 'captcha', '登录')
+
+
+def is_verification_page(url: str, title: str = '') -> bool:
+    """根据URL和标题判断页面是否被要求验证"""
+    url = (url or '').lower()
+    title = (title or '').lower()
+    return any(keyword in url for keyword in VERIFICATION_URL_KEYWORDS) \
+        or any(keyword in title for keyword in VERIFICATION_TITLE_KEYWORDS)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class BrowserProfileManager:
+    """账号浏览器用户数据目录管理器"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', True)
+        self.root_dir = os.path.abspath(settings.get('root_dir', 'browser_data'))
+        self.max_profile_bytes = int(settings.get('max_profile_mb', 300)) * 1024 * 1024
+        self.max_total_bytes = int(settings.get('max_total_mb', 3072)) * 1024 * 1024
+        self.max_idle_seconds = float(settings.get('max_idle_days', 30)) * 86400
+        self.cleanup_interval = settings.get('cleanup_interval', 3600)
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._last_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+
+        # 按 用途/模式 统计耗时和触发验证的比例，用于对比持久化目录的效果
+        self._stats_lock = threading.Lock()
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._counters = {'launches': 0, 'busy_fallbacks': 0, 'recovered': 0, 'trimmed': 0, 'removed': 0}
+
+    # ------------------------------------------------------------------
+    # 目录与占用
+    # ------------------------------------------------------------------
+    def profile_dir(self, account_id: str) -> str:
+        """账号的用户数据目录（与原密码登录使用的 browser_data/user_<账号> 保持一致）"""
+        safe_id = re.sub(r'[^\w.-]', '_', str(account_id))
+        return os.path.join(self.root_dir, f'user_{safe_id}')
+
+    def _lock_for(self, profile_dir: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(profile_dir)
+            if lock is None:
+                lock = self._locks[profile_dir] = threading.Lock()
+            return lock
+
+    def try_acquire(self, account_id: str, timeout: float = 0) -> Optional[str]:
+        """占用账号目录，成功返回目录路径（之后需调用 prepare，用完调用 release），已被占用返回None"""
+        profile_dir = self.profile_dir(account_id)
+        lock = self._lock_for(profile_dir)
+        acquired = lock.acquire(timeout=timeout) if timeout > 0 else lock.acquire(blocking=False)
+        if not acquired:
+            self._count('busy_fallbacks')
+            logger.info(f"【{account_id}】浏览器用户数据目录正在使用，本次使用临时环境")
+            return None
+        self._count('launches')
+        return profile_dir
+
+    def release(self, account_id: str):
+        """释放 try_acquire 占用的目录，并刷新最后使用时间"""
+        profile_dir = self.profile_dir(account_id)
+        try:
+            os.utime(profile_dir, None)
+        except OSError:
+            pass
+        self._lock_for(profile_dir).release()
+
+    def prepare(self, profile_dir: str):
+        """启动前准备目录：清理遗留锁文件，超出大小上限时清理缓存（会遍历目录，异步调用方应放到线程中执行）"""
+        os.makedirs(profile_dir, exist_ok=True)
+        # 上次进程异常退出时遗留的锁文件会导致 Chromium 拒绝启动
+        for name in SINGLETON_FILES:
+            path = os.path.join(profile_dir, name)
+            if os.path.lexists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.debug(f"删除遗留锁文件失败 {path}: {e}")
+
+        if self.max_profile_bytes and _dir_size(profile_dir) > self.max_profile_bytes:
+            for cache_dir in CACHE_DIRS:
+                shutil.rmtree(os.path.join(profile_dir, cache_dir), ignore_errors=True)
+            self._count('trimmed')
+            size = _dir_size(profile_dir)
+            logger.info(f"浏览器用户数据目录超出上限，已清理缓存: {profile_dir}，当前 {size / 1024 / 1024:.1f}MB")
+            if size > self.max_profile_bytes:
+                # 清理缓存后仍超限，说明目录异常膨胀，直接重建
+                self._reset(profile_dir)
+
+    def _reset(self, profile_dir: str):
+        features = self._read_features(profile_dir)
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        os.makedirs(profile_dir, exist_ok=True)
+        if features:
+            self._write_features(profile_dir, features)
+
+    def recover(self, account_id: str, error: Exception = None):
+        """目录损坏（启动失败）时重建，调用方应持有该目录"""
+        profile_dir = self.profile_dir(account_id)
+        logger.warning(f"【{account_id}】浏览器用户数据目录可能已损坏，重建后重试: {error}")
+        self._reset(profile_dir)
+        self._count('recovered')
+
+    def launch_persistent(self, playwright, account_id: str, profile_dir: str, **options):
+        """使用同步 Playwright 启动持久化上下文，启动失败时重建目录重试一次"""
+        try:
+            return playwright.chromium.launch_persistent_context(profile_dir, **options)
+        except Exception as e:
+            self.recover(account_id, e)
+            return playwright.chromium.launch_persistent_context(profile_dir, **options)
+
+    async def launch_persistent_async(self, playwright, account_id: str, profile_dir: str, **options):
+        """launch_persistent 的异步 Playwright 版本"""
+        try:
+            return await playwright.chromium.launch_persistent_context(profile_dir, **options)
+        except Exception as e:
+            await asyncio.to_thread(self.recover, account_id, e)
+            return await playwright.chromium.launch_persistent_context(profile_dir, **options)
+
+    # ------------------------------------------------------------------
+    # 固定的浏览器特征（持久化目录配合固定指纹，避免同一目录每次换UA）
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _read_features(profile_dir: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(profile_dir, FEATURES_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_features(profile_dir: str, features: Dict[str, Any]):
+        try:
+            with open(os.path.join(profile_dir, FEATURES_FILE), 'w', encoding='utf-8') as f:
+                json.dump(features, f, ensure_ascii=False)
+        except OSError as e:
+            logger.debug(f"保存浏览器特征失败: {e}")
+
+    def load_features(self, account_id: str, factory) -> Dict[str, Any]:
+        """读取账号固定的浏览器特征，不存在时调用 factory 生成并保存"""
+        profile_dir = self.profile_dir(account_id)
+        features = self._read_features(profile_dir)
+        if not features:
+            features = factory()
+            self._write_features(profile_dir, features)
+        return features
+
+    # ------------------------------------------------------------------
+    # 清理
+    # ------------------------------------------------------------------
+    def maybe_cleanup(self) -> int:
+        """距上次清理超过 cleanup_interval 时执行清理，返回删除的目录数"""
+        if time.time() - self._last_cleanup < self.cleanup_interval:
+            return 0
+        # 多个账号的清理循环同时到期时只执行一次
+        if not self._cleanup_lock.acquire(blocking=False):
+            return 0
+        try:
+            if time.time() - self._last_cleanup < self.cleanup_interval:
+                return 0
+            self._last_cleanup = time.time()
+            return self.cleanup()
+        finally:
+            self._cleanup_lock.release()
+
+    def cleanup(self) -> int:
+        """删除长期未使用的目录，并按总大小上限淘汰最久未使用的目录（跳过正在使用的目录）"""
+        if not os.path.isdir(self.root_dir):
+            return 0
+
+        profiles = []
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if not name.startswith('user_') or not os.path.isdir(path):
+                continue
+            try:
+                profiles.append([path, os.path.getmtime(path), _dir_size(path)])
+            except OSError:
+                continue
+
+        now = time.time()
+        removed = 0
+        total = sum(size for _, _, size in profiles)
+        # 最久未使用的排在前面
+        for path, mtime, size in sorted(profiles, key=lambda p: p[1]):
+            idle = self.max_idle_seconds and now - mtime > self.max_idle_seconds
+            over_total = self.max_total_bytes and total > self.max_total_bytes
+            if not idle and not over_total:
+                continue
+            lock = self._lock_for(path)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                lock.release()
+            total -= size
+            removed += 1
+            logger.info(f"删除浏览器用户数据目录（{'长期未使用' if idle else '超出总大小上限'}）: {path}")
+
+        if removed:
+            self._count('removed', removed)
+        return removed
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_run(self, purpose: str, persistent: bool, duration: float, verification: bool, success: bool = True):
+        """记录一次浏览器流程的耗时和是否触发验证"""
+        key = f"{purpose}:{'persistent' if persistent else 'ephemeral'}"
+        with self._stats_lock:
+            run = self._runs.get(key)
+            if run is None:
+                run = self._runs[key] = {'runs': 0, 'verifications': 0, 'failures': 0,
+                                         'durations': deque(maxlen=200)}
+            run['runs'] += 1
+            run['verifications'] += 1 if verification else 0
+            run['failures'] += 0 if success else 1
+            run['durations'].append(duration)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取目录使用统计，按 用途:模式 对比耗时和验证率"""
+        with self._stats_lock:
+            runs = {}
+            for key, run in self._runs.items():
+                durations = sorted(run['durations'])
+                count = len(durations)
+                runs[key] = {
+                    'runs': run['runs'],
+                    'failures': run['failures'],
+                    'verification_rate': round(run['verifications'] / run['runs'], 3) if run['runs'] else 0,
+                    'avg_duration_ms': round(sum(durations) / count * 1000, 1) if count else None,
+                    'p95_duration_ms': round(durations[min(count - 1, int(count * 0.95))] * 1000, 1) if count else None,
+                }
+            counters = dict(self._counters)
+        with self._locks_guard:
+            in_use = sum(1 for lock in self._locks.values() if lock.locked())
+        return {
+            'enabled': self.enabled,
+            'root_dir': self.root_dir,
+            'in_use': in_use,
+            'counters': counters,
+            'runs': runs,
+        }
+
+
+# 创建全局浏览器用户数据目录管理器实例
+browser_profiles = BrowserProfileManager(BROWSER_PROFILES)
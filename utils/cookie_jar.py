@@ -0,0 +1,296 @@
+import asyncio
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from loguru import logger
+
+from config import COOKIE_JAR
+from db_manager import db_manager
+from utils.xianyu_utils import trans_cookies
+
+
+class _CookieDict(dict):
+    """Cookie字典，任何修改都会让所属 CookieJar 的字符串缓存失效"""
+
+    def __init__(self, on_change, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._on_change()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_change()
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._on_change()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+
+def parse_set_cookie(header: str):
+    """解析一条 Set-Cookie，返回 (名称, 值, 是否删除)，无法解析时返回None"""
+    pair, _, attributes = header.partition(';')
+    if '=' not in pair:
+        return None
+    name, value = pair.split('=', 1)
+    name, value = name.strip(), value.strip()
+    if not name:
+        return None
+    deleted = False
+    for attribute in attributes.split(';'):
+        key, _, attr_value = attribute.partition('=')
+        if key.strip().lower() == 'max-age':
+            try:
+                deleted = int(attr_value.strip()) <= 0
+            except ValueError:
+                pass
+    return name, value, deleted
+
+
+class CookieJar:
+    """单个账号的Cookie，账号内所有组件（主连接、确认发货、免拼发货、图片上传等）共享同一个实例
+
+    - 只在加载时解析一次，Cookie字符串在内容变化后按需重新生成并缓存
+    - Set-Cookie 按字段增量合并，值没有变化时不算修改
+    - 修改后延迟 persist_debounce 秒写入数据库，窗口内的多次修改合并为一次写入；
+      自动写入时若数据库中的Cookie已被其他途径修改（如用户手动更新），放弃本次写入并以数据库为准
+    """
+
+    def __init__(self, cookie_id: str):
+        self.cookie_id = cookie_id
+        self.user_id = None
+        self.persist_debounce = float(COOKIE_JAR.get('persist_debounce', 5))
+        self._cookies = _CookieDict(self._invalidate)
+        self._str = ''
+        self._str_valid = True
+        self._persisted: Optional[str] = None  # 最近一次从数据库加载或写入数据库的值
+        self._persist_handle: Optional[asyncio.TimerHandle] = None
+        self._persist_task: Optional[asyncio.Task] = None  # 正在执行的延迟写入
+        self._stats = {'parses': 0, 'renders': 0, 'merges': 0, 'changed_merges': 0,
+                       'persists': 0, 'coalesced': 0, 'conflicts': 0}
+
+    def _invalidate(self):
+        self._str_valid = False
+
+    # -------------------- 读取 --------------------
+    @property
+    def cookies(self) -> Dict[str, str]:
+        return self._cookies
+
+    @property
+    def cookies_str(self) -> str:
+        if not self._str_valid:
+            self._str = '; '.join(f"{k}={v}" for k, v in self._cookies.items())
+            self._str_valid = True
+            self._stats['renders'] += 1
+        return self._str
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._cookies.get(name, default)
+
+    @property
+    def h5_token(self) -> str:
+        """_m_h5_tk 中用于签名的token部分"""
+        return self._cookies.get('_m_h5_tk', '').split('_')[0]
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未写入数据库的修改"""
+        return self.cookies_str != self._persisted
+
+    # -------------------- 修改 --------------------
+    def replace_str(self, cookies_str: str):
+        """整体替换为新的Cookie字符串"""
+        cookies_str = cookies_str or ''
+        if self._str_valid and cookies_str == self._str:
+            return
+        parsed = trans_cookies(cookies_str) if cookies_str else {}
+        self._stats['parses'] += 1
+        dict.clear(self._cookies)
+        dict.update(self._cookies, parsed)
+        self._str = cookies_str
+        self._str_valid = True
+
+    def replace(self, cookies: Mapping[str, str]):
+        """整体替换为新的Cookie字典"""
+        if cookies is self._cookies:
+            return
+        cookies = dict(cookies)
+        dict.clear(self._cookies)
+        dict.update(self._cookies, cookies)
+        self._invalidate()
+
+    def load(self, cookies_str: str) -> bool:
+        """加载来自数据库或调用方的Cookie（视为已持久化），返回内容是否被替换
+
+        与上次加载/写入的值相同时（如实例重启传入的旧值），保留本地可能更新的内容；
+        否则说明Cookie被外部更新，整体替换并取消待执行的写入。
+        """
+        if cookies_str == self._persisted:
+            return False
+        self._cancel_persist()
+        self.replace_str(cookies_str)
+        self._persisted = self.cookies_str
+        return True
+
+    def update(self, cookies: Mapping[str, str]) -> bool:
+        """增量合并字段，返回是否有变化"""
+        changed = {k: v for k, v in cookies.items() if self._cookies.get(k) != v}
+        if changed:
+            self._cookies.update(changed)
+        return bool(changed)
+
+    def merge_set_cookie(self, headers: Iterable[str]) -> bool:
+        """合并响应中的 Set-Cookie，返回是否有变化"""
+        changed = False
+        for header in headers:
+            parsed = parse_set_cookie(header)
+            if parsed is None:
+                continue
+            name, value, deleted = parsed
+            if deleted:
+                if name in self._cookies:
+                    del self._cookies[name]
+                    changed = True
+            elif self._cookies.get(name) != value:
+                self._cookies[name] = value
+                changed = True
+        self._stats['merges'] += 1
+        if changed:
+            self._stats['changed_merges'] += 1
+        return changed
+
+    # -------------------- 持久化 --------------------
+    def schedule_persist(self):
+        """延迟写入数据库，窗口内的多次修改只写一次"""
+        if self._persist_handle is not None:
+            self._stats['coalesced'] += 1
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环（同步调用场景）时直接写入
+            value = self.cookies_str
+            if self._write(value, force=False):
+                self._persisted = value
+            return
+        self._persist_handle = loop.call_later(self.persist_debounce, self._start_persist)
+
+    def _start_persist(self):
+        self._persist_handle = None
+        self._persist_task = asyncio.ensure_future(self._persist())
+
+    async def _persist(self):
+        """执行延迟写入（异常只记录日志，不向事件循环抛出）"""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"【{self.cookie_id}】延迟保存Cookie失败: {e}")
+        finally:
+            if self._persist_task is asyncio.current_task():
+                self._persist_task = None
+
+    def _cancel_persist(self):
+        if self._persist_handle is not None:
+            self._persist_handle.cancel()
+            self._persist_handle = None
+
+    async def flush(self, force: bool = False) -> bool:
+        """立即写入数据库
+
+        Args:
+            force: 是否强制覆盖数据库中的值（Cookie刷新、登录等明确以当前内容为准的场景）
+        """
+        self._cancel_persist()
+        # 等待正在执行的延迟写入完成，避免两次写入同时修改 _persisted
+        task = self._persist_task
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            await asyncio.shield(task)
+        value = self.cookies_str
+        if not force and value == self._persisted:
+            return True
+        success = await asyncio.to_thread(self._write, value, force)
+        if success:
+            self._persisted = value
+        elif not force:
+            # 数据库中的值已被其他途径修改（如用户手动更新、扫码登录），以数据库为准
+            current = await asyncio.to_thread(db_manager.get_cookie, self.cookie_id)
+            if current:
+                self.load(current)
+        return success
+
+    def _write(self, value: str, force: bool) -> bool:
+        if force or self._persisted is None:
+            success = db_manager.update_cookie_account_info(self.cookie_id, cookie_value=value, user_id=self.user_id)
+        else:
+            success = db_manager.update_cookie_value_if_unchanged(self.cookie_id, self._persisted, value)
+            if not success:
+                self._stats['conflicts'] += 1
+                logger.warning(f"【{self.cookie_id}】数据库中的Cookie已被其他途径修改，放弃本次自动保存并重新加载")
+                return False
+        if success:
+            self._stats['persists'] += 1
+            logger.debug(f"【{self.cookie_id}】Cookie已写入数据库")
+        return success
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'fields': len(self._cookies),
+            'dirty': self.dirty,
+            'persist_pending': self._persist_handle is not None or self._persist_task is not None,
+            **self._stats,
+        }
+
+
+class CookieJarRegistry:
+    """按账号获取共享的 CookieJar"""
+
+    def __init__(self):
+        self._jars: Dict[str, CookieJar] = {}
+
+    def get(self, cookie_id: str, cookies_str: Optional[str] = None) -> CookieJar:
+        """获取账号的 CookieJar，首次创建时用 cookies_str 初始化"""
+        jar = self._jars.get(cookie_id)
+        if jar is None:
+            jar = self._jars[cookie_id] = CookieJar(cookie_id)
+            if cookies_str:
+                jar.load(cookies_str)
+        return jar
+
+    def load(self, cookie_id: str, cookies_str: str):
+        """账号Cookie被外部更新时同步到已存在的 CookieJar"""
+        jar = self._jars.get(cookie_id)
+        if jar is not None:
+            jar.load(cookies_str)
+
+    def discard(self, cookie_id: str):
+        jar = self._jars.pop(cookie_id, None)
+        if jar is not None:
+            jar._cancel_persist()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {cookie_id: jar.get_stats() for cookie_id, jar in list(self._jars.items())}
+
+
+# 全局 CookieJar 登记表
+cookie_jars = CookieJarRegistry()
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from config import AUTO_DELIVERY
+from db_manager import db_manager
+
+
+class DeliveryJobError(Exception):
+    """发货任务执行失败
+
+    Args:
+        retry: 是否允许重试（达到最大尝试次数后仍会标记为失败）
+        delay: 指定下次重试的延迟秒数，为空时按指数退避计算
+    """
+
+    def __init__(self, message: str, retry: bool = True, delay: Optional[float] = None):
+        super().__init__(message)
+        self.retry = retry
+        self.delay = delay
+
+
+def _percentiles(samples) -> Dict[str, Any]:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'p50_ms': round(ordered[count // 2] * 1000, 1),
+        'p95_ms': round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1),
+    }
+
+
+class DeliveryWorkerPool:
+    """单个账号的自动发货任务工作池
+
+    任务持久化在 delivery_jobs 表中，按 run_at 调度；工作协程从数据库领取到期任务，
+    执行失败时按指数退避重试，超过最大尝试次数后标记为失败。任务结束（done/failed）
+    并写回数据库后回调 on_finished(job, status, error)。启动时恢复进程中断前未完成的任务。
+    """
+
+    def __init__(self, cookie_id: str,
+                 runner: Callable[[dict], Awaitable[None]],
+                 on_finished: Optional[Callable[[dict, str, Optional[str]], Awaitable[None]]] = None,
+                 workers: Optional[int] = None):
+        self.cookie_id = cookie_id
+        self.runner = runner
+        self.on_finished = on_finished
+        self.workers = max(1, int(workers or AUTO_DELIVERY.get('workers', 2)))
+        self.max_attempts = max(1, int(AUTO_DELIVERY.get('max_attempts', 3)))
+        self.retry_base_seconds = float(AUTO_DELIVERY.get('retry_base_seconds', 10))
+        self.retry_max_seconds = float(AUTO_DELIVERY.get('retry_max_seconds', 300))
+        self.poll_interval = float(AUTO_DELIVERY.get('poll_interval', 5))
+
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._busy = 0
+
+        # 统计：执行耗时、排队延迟（到期到开始执行）样本，以及最近完成时间（用于计算吞吐）
+        self._latencies = deque(maxlen=500)
+        self._queue_delays = deque(maxlen=500)
+        self._finished_times = deque(maxlen=1000)
+        self._counters = {'completed': 0, 'failed': 0, 'retried': 0, 'recovered': 0, 'uncertain': 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """恢复中断的任务并启动工作协程"""
+        if self._tasks:
+            return
+        requeued, uncertain = await asyncio.to_thread(db_manager.recover_delivery_jobs, self.cookie_id)
+        self._counters['recovered'] += requeued
+        self._counters['uncertain'] += uncertain
+        if requeued or uncertain:
+            logger.warning(f"【{self.cookie_id}】恢复自动发货任务: 重新排队 {requeued} 个，"
+                           f"中断时正在发送（不再重发）{uncertain} 个")
+
+        self._wakeup = asyncio.Event()
+        delivery_queue.register(self)
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"【{self.cookie_id}】自动发货工作池已启动，并发数: {self.workers}")
+
+    async def stop(self):
+        """停止工作协程（正在执行的任务会被取消，下次启动时恢复）"""
+        tasks, self._tasks = self._tasks, []
+        delivery_queue.unregister(self)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"【{self.cookie_id}】自动发货工作池已停止")
+
+    def notify(self):
+        """有新任务入队时唤醒工作协程"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait_for_work(self):
+        next_run_at = await asyncio.to_thread(db_manager.next_delivery_run_at, self.cookie_id)
+        timeout = self.poll_interval
+        if next_run_at is not None:
+            timeout = min(timeout, max(0.0, next_run_at - time.time()))
+        if timeout <= 0:
+            return
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(db_manager.claim_delivery_job, self.cookie_id, time.time())
+                if job is None:
+                    await self._wait_for_work()
+                    continue
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"【{self.cookie_id}】自动发货工作协程 #{index} 异常: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.retry_max_seconds, self.retry_base_seconds * (2 ** max(0, attempts - 1)))
+
+    async def _execute(self, job: dict):
+        started = time.time()
+        self._queue_delays.append(max(0.0, started - job['run_at']))
+        self._busy += 1
+        error = None
+        try:
+            await self.runner(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if getattr(e, 'retry', True) and job['attempts'] < self.max_attempts:
+                delay = getattr(e, 'delay', None)
+                delay = self._retry_delay(job['attempts']) if delay is None else delay
+                self._counters['retried'] += 1
+                logger.warning(f"【{self.cookie_id}】发货任务 {job['idempotency_key']} 第 {job['attempts']} 次执行失败，"
+                               f"{delay:.0f} 秒后重试: {error}")
+                await asyncio.to_thread(db_manager.update_delivery_job, job['id'],
+                                        status='pending', run_at=time.time() + delay, last_error=error)
+                return
+        finally:
+            self._busy -= 1
+            self._latencies.append(time.time() - started)
+
+        finished = time.time()
+        if error is None:
+            status = 'done'
+            self._counters['completed'] += 1
+            self._finished_times.append(finished)
+            await asyncio.to_thread(db_manager.update_delivery_job, job['id'], status=status, finished_at=finished)
+        else:
+            status = 'failed'
+            self._counters['failed'] += 1
+            logger.error(f"【{self.cookie_id}】发货任务 {job['idempotency_key']} 失败（共尝试 {job['attempts']} 次）: {error}")
+            await asyncio.to_thread(db_manager.update_delivery_job, job['id'],
+                                    status=status, last_error=error, finished_at=finished)
+
+        if self.on_finished:
+            try:
+                await self.on_finished(job, status, error)
+            except Exception as e:
+                logger.error(f"【{self.cookie_id}】发货任务结束回调异常: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作池统计（吞吐按最近一分钟完成的任务数计算）"""
+        now = time.time()
+        return {
+            'cookie_id': self.cookie_id,
+            'workers': self.workers,
+            'running': self.running,
+            'busy': self._busy,
+            'throughput_per_min': sum(1 for finished in self._finished_times if now - finished <= 60),
+            'latency': _percentiles(self._latencies),
+            'queue_delay': _percentiles(self._queue_delays),
+            **self._counters,
+        }
+
+
+class DeliveryQueue:
+    """所有账号的自动发货工作池登记表"""
+
+    def __init__(self):
+        self._pools: Dict[str, DeliveryWorkerPool] = {}
+
+    def register(self, pool: DeliveryWorkerPool):
+        self._pools[pool.cookie_id] = pool
+
+    def unregister(self, pool: DeliveryWorkerPool):
+        if self._pools.get(pool.cookie_id) is pool:
+            del self._pools[pool.cookie_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'jobs': db_manager.get_delivery_job_counts(),
+            'pools': {cookie_id: pool.get_stats() for cookie_id, pool in self._pools.items()},
+        }
+
+
+# 全局发货队列登记表
+delivery_queue = DeliveryQueue()
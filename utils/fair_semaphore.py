@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+class _Waiter:
+    __slots__ = ('owner', 'priority', 'seq', 'enqueued_at', 'granted', 'future', 'loop')
+
+    def __init__(self, owner: str, priority: int, seq: int):
+        self.owner = owner
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.time()
+        self.granted = False
+        self.future = None  # 异步等待使用，同步等待方阻塞在条件变量上
+        self.loop = None
+
+
+def _summarize(samples) -> Dict[str, Any]:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'avg_ms': round(sum(ordered) / count * 1000, 1),
+        'p95_ms': round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1),
+    }
+
+
+class FairSemaphore:
+    """按优先级排队的公平信号量（线程安全，同时支持协程和线程等待）
+
+    - priority 越小越优先，同一优先级先到先得
+    - 有人排队时新来的请求直接入队，释放时许可直接交给队首，后来者无法插队
+    - 线程等待在条件变量上，协程等待在自己的 Future 上，释放时立即唤醒，不需要轮询
+    - 协程可以来自不同事件循环，通过 call_soon_threadsafe 唤醒
+    """
+
+    def __init__(self, value: int, name: str = ''):
+        self.name = name
+        self._value = max(1, int(value))
+        self._in_use = 0
+        self._queues: Dict[int, deque] = {}
+        self._waiting = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+        # 统计：等待时间样本、计数，以及按时间加权的占用量（用于计算平均利用率）
+        self._created_at = time.time()
+        self._busy_since = self._created_at
+        self._busy_area = 0.0
+        self._waits = deque(maxlen=200)
+        self._counters = {'granted': 0, 'queued': 0, 'timeouts': 0, 'cancelled': 0}
+
+    # ------------------------------------------------------------------
+    # 内部状态（调用方需持有 self._lock）
+    # ------------------------------------------------------------------
+    def _set_in_use(self, value: int):
+        now = time.time()
+        self._busy_area += self._in_use * (now - self._busy_since)
+        self._busy_since = now
+        self._in_use = value
+
+    def _try_acquire(self) -> bool:
+        if self._in_use < self._value and not self._waiting:
+            self._set_in_use(self._in_use + 1)
+            self._counters['granted'] += 1
+            self._waits.append(0.0)
+            return True
+        return False
+
+    def _enqueue(self, owner: str, priority: int) -> _Waiter:
+        waiter = _Waiter(owner, priority, next(self._seq))
+        self._queues.setdefault(priority, deque()).append(waiter)
+        self._waiting += 1
+        self._counters['queued'] += 1
+        return waiter
+
+    def _remove(self, waiter: _Waiter, reason: str):
+        queue = self._queues.get(waiter.priority)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[waiter.priority]
+        self._waiting -= 1
+        self._counters[reason] += 1
+
+    def _pop_head(self) -> Optional[_Waiter]:
+        if not self._queues:
+            return None
+        priority = min(self._queues)
+        queue = self._queues[priority]
+        waiter = queue.popleft()
+        if not queue:
+            del self._queues[priority]
+        self._waiting -= 1
+        return waiter
+
+    def _ordered_waiters(self) -> List[_Waiter]:
+        return [w for priority in sorted(self._queues) for w in self._queues[priority]]
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def acquire(self, owner: str = '', timeout: Optional[float] = None, blocking: bool = True,
+                priority: int = 0) -> bool:
+        """同步获取许可（在线程中调用），超时返回False"""
+        with self._cond:
+            if self._try_acquire():
+                return True
+            if not blocking:
+                return False
+            waiter = self._enqueue(owner, priority)
+            if self._cond.wait_for(lambda: waiter.granted, timeout):
+                return True
+            self._remove(waiter, 'timeouts')
+            return False
+
+    async def acquire_async(self, owner: str = '', timeout: Optional[float] = None, priority: int = 0) -> bool:
+        """异步获取许可，超时返回False"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return True
+            waiter = self._enqueue(owner, priority)
+            waiter.loop = loop
+            waiter.future = loop.create_future()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.granted:
+                    return True
+                self._remove(waiter, 'timeouts')
+                return False
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._remove(waiter, 'cancelled')
+            # 已被分配许可但调用方取消了，转交给下一个等待者
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        """归还许可：有人排队时直接交给优先级最高、最早入队的等待者"""
+        with self._cond:
+            while True:
+                waiter = self._pop_head()
+                if waiter is None:
+                    self._set_in_use(max(0, self._in_use - 1))
+                    return
+                if waiter.future is not None:
+                    try:
+                        waiter.loop.call_soon_threadsafe(self._wake, waiter.future)
+                    except RuntimeError:
+                        # 等待者所在的事件循环已关闭，跳过
+                        continue
+                waiter.granted = True
+                self._counters['granted'] += 1
+                self._waits.append(time.time() - waiter.enqueued_at)
+                if waiter.future is None:
+                    self._cond.notify_all()
+                return
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(True)
+
+    @property
+    def limit(self) -> int:
+        return self._value
+
+    def available(self) -> int:
+        """当前可立即获取的许可数"""
+        with self._lock:
+            return 0 if self._waiting else self._value - self._in_use
+
+    def position(self, owner: str) -> Optional[int]:
+        """owner 在等待队列中的位置（从1开始），未在排队返回None"""
+        with self._lock:
+            for index, waiter in enumerate(self._ordered_waiters(), 1):
+                if waiter.owner == owner:
+                    return index
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取占用、排队、等待时间和利用率统计"""
+        with self._lock:
+            now = time.time()
+            elapsed = now - self._created_at
+            busy_area = self._busy_area + self._in_use * (now - self._busy_since)
+            return {
+                'name': self.name,
+                'limit': self._value,
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'utilization': round(self._in_use / self._value, 3),
+                'avg_utilization': round(busy_area / (self._value * elapsed), 3) if elapsed > 0 else 0.0,
+                'wait': _summarize(self._waits),
+                **self._counters,
+                'waiting_by_priority': {priority: len(queue) for priority, queue in sorted(self._queues.items())},
+                'waiters': [
+                    {'owner': w.owner, 'priority': w.priority, 'position': index,
+                     'waited': round(now - w.enqueued_at, 1)}
+                    for index, w in enumerate(self._ordered_waiters(), 1)
+                ],
+            }
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+from loguru import logger
+from config import HEALTH_CHECK
+
+
+class HealthSampler:
+    """后台系统状态采样器
+
+    按固定间隔在API事件循环中采样 CPU/内存、数据库连通性、事件循环延迟
+    以及各账号的WebSocket连接状态，健康检查接口只读取缓存结果，不再做阻塞操作。
+    """
+
+    def __init__(self, interval: float = 5, db_ping_timeout: float = 2, max_sample_age: float = 30):
+        """初始化采样器
+
+        Args:
+            interval: 采样间隔（秒）
+            db_ping_timeout: 数据库探测超时（秒）
+            max_sample_age: 采样结果最大有效期（秒），超过则认为采样器已停止
+        """
+        self.interval = interval
+        self.db_ping_timeout = db_ping_timeout
+        self.max_sample_age = max_sample_age
+        self.started_at = time.time()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._process = None
+
+    def start(self):
+        """在当前事件循环中启动采样任务"""
+        if self._task and not self._task.done():
+            return
+        try:
+            import psutil
+            self._process = psutil.Process(os.getpid())
+            # 首次调用 cpu_percent(None) 返回0，先调用一次建立基准
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+        except Exception as e:
+            logger.warning(f"psutil 初始化失败，系统指标将不可用: {e}")
+            self._process = None
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"健康检查采样器已启动，采样间隔: {self.interval}秒")
+
+    async def stop(self):
+        """停止采样任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        loop_lag = 0.0
+        while True:
+            try:
+                self._snapshot = await self._sample(loop_lag)
+            except Exception as e:
+                logger.error(f"健康检查采样失败: {e}")
+
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            # 实际唤醒时间与预期时间的差值即事件循环延迟
+            loop_lag = max(loop.time() - expected, 0.0)
+
+    def _ping_db(self) -> float:
+        """执行 SELECT 1 探测数据库，返回耗时（秒）"""
+        from db_manager import db_manager
+        start = time.perf_counter()
+        with db_manager.lock:
+            db_manager.conn.execute('SELECT 1').fetchone()
+        return time.perf_counter() - start
+
+    def _collect_system(self) -> Dict[str, Any]:
+        if self._process is None:
+            return {}
+        import psutil
+        memory_info = psutil.virtual_memory()
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": memory_info.percent,
+            "memory_available": memory_info.available,
+            "process_cpu_percent": self._process.cpu_percent(interval=None),
+            "process_rss": self._process.memory_info().rss,
+        }
+
+    def _collect_accounts(self) -> Dict[str, str]:
+        # 只读取已加载的模块，未加载说明还没有账号实例，避免在采样时触发重量级导入
+        module = sys.modules.get('XianyuAutoAsync')
+        if module is None:
+            return {}
+        accounts = {}
+        for cookie_id, instance in module.XianyuLive.get_all_instances().items():
+            state = getattr(instance, 'connection_state', None)
+            accounts[cookie_id] = getattr(state, 'value', str(state))
+        return accounts
+
+    async def _sample(self, loop_lag: float) -> Dict[str, Any]:
+        import cookie_manager
+
+        try:
+            db_latency = await asyncio.wait_for(asyncio.to_thread(self._ping_db), timeout=self.db_ping_timeout)
+            database = {"status": "ok", "latency_ms": round(db_latency * 1000, 2)}
+        except asyncio.TimeoutError:
+            database = {"status": "timeout", "latency_ms": None}
+        except Exception as e:
+            database = {"status": "error", "error": str(e)}
+
+        accounts = self._collect_accounts()
+        connected = sum(1 for state in accounts.values() if state == "connected")
+
+        return {
+            "sampled_at": time.time(),
+            "services": {
+                "cookie_manager": "ok" if cookie_manager.manager is not None else "error",
+                "database": database["status"],
+            },
+            "database": database,
+            "event_loop_lag_ms": round(loop_lag * 1000, 2),
+            "system": self._collect_system(),
+            "accounts": {
+                "total": len(accounts),
+                "connected": connected,
+                "states": accounts,
+            },
+        }
+
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """获取最近一次采样结果（附带采样时间距今的秒数）"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        result = dict(snapshot)
+        result["sample_age"] = round(time.time() - snapshot["sampled_at"], 2)
+        return result
+
+    def is_ready(self, snapshot: Optional[Dict[str, Any]]) -> bool:
+        """根据采样结果判断服务是否就绪"""
+        if snapshot is None or snapshot["sample_age"] > self.max_sample_age:
+            return False
+        services = snapshot["services"]
+        return services["cookie_manager"] == "ok" and services["database"] == "ok"
+
+
+# 创建全局健康检查采样器实例
+health_sampler = HealthSampler(
+    interval=HEALTH_CHECK.get('sample_interval', 5),
+    db_ping_timeout=HEALTH_CHECK.get('db_ping_timeout', 2),
+    max_sample_age=HEALTH_CHECK.get('max_sample_age', 30),
+)
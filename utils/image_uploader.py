@@ -6,19 +6,32 @@ import asyncio
 import json
 import os
 import tempfile
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, Union
 from loguru import logger
 from PIL import Image
 import io
 
+if TYPE_CHECKING:
+    from utils.cookie_jar import CookieJar
+
 
 class ImageUploader:
     """图片上传器 - 上传图片到闲鱼CDN"""
     
-    def __init__(self, cookies_str: str):
-        self.cookies_str = cookies_str
+    def __init__(self, cookies: Union[str, 'CookieJar']):
+        """
+        Args:
+            cookies: Cookie字符串，或账号共享的 CookieJar（每次请求都使用其最新的Cookie）
+        """
+        self._cookies = cookies
         self.upload_url = "https://stream-upload.goofish.com/api/upload.api?floderId=0&appkey=xy_chat&_input_charset=utf-8"
         self.session = None
+
+    @property
+    def cookies_str(self) -> str:
+        if isinstance(self._cookies, str):
+            return self._cookies
+        return self._cookies.cookies_str
     
     async def create_session(self):
         """创建HTTP会话"""
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from config import ITEM_DETAIL
+from utils.single_flight import SingleFlight
+
+
+def extract_description(item_detail: Optional[str]) -> Optional[str]:
+    """从 item_info.item_detail 中提取商品描述
+
+    item_detail 可能是描述文本、带 detail 字段的JSON，或批量同步时写入的商品基本信息JSON（不算描述）
+    """
+    text = (item_detail or '').strip()
+    if not text:
+        return None
+    if text.startswith('{'):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+        if isinstance(data, dict):
+            detail = data.get('detail')
+            return detail.strip() if isinstance(detail, str) and detail.strip() else None
+    return text
+
+
+class ItemDetailCache:
+    """进程内共享的商品详情 LRU+TTL 缓存
+
+    - _entries 按访问顺序排列（末尾最近使用），满时从头部淘汰，get/put/淘汰均为 O(1)
+    - _expiry 按写入顺序排列，TTL 固定，因此头部总是最早过期的项，清理只需检查过期项
+    - 未命中时通过单飞加载（同一商品的并发请求只加载一次），数据库 item_info.item_detail 作为持久层，
+      商品信息变更时通过数据库变更回调失效
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 24 * 60 * 60):
+        """
+        Args:
+            max_size: 最大缓存商品数
+            ttl: 缓存有效期（秒）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._expiry: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight('item_detail')
+        self._warmed = False
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0, 'expired': 0}
+
+    def get(self, item_id: str) -> Optional[str]:
+        """获取未过期的商品详情，未命中返回None"""
+        with self._lock:
+            detail = self._entries.get(item_id)
+            if detail is None:
+                self._stats['misses'] += 1
+                return None
+            if self._expiry[item_id] <= time.time():
+                self._remove(item_id)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(item_id)
+            self._stats['hits'] += 1
+            return detail
+
+    def put(self, item_id: str, detail: str):
+        """写入商品详情，超出容量时淘汰最久未使用的项"""
+        with self._lock:
+            self._entries[item_id] = detail
+            self._entries.move_to_end(item_id)
+            self._expiry[item_id] = time.time() + self.ttl
+            self._expiry.move_to_end(item_id)
+            while len(self._entries) > self.max_size:
+                oldest_item_id, _ = self._entries.popitem(last=False)
+                del self._expiry[oldest_item_id]
+                self._stats['evictions'] += 1
+
+    def invalidate(self, item_id: str):
+        """删除指定商品的缓存"""
+        with self._lock:
+            self._remove(item_id)
+
+    def invalidate_item(self, cookie_id: str, item_id: str):
+        """商品信息变更回调：删除缓存，下次从数据库重新加载"""
+        self.invalidate(item_id)
+
+    def _remove(self, item_id: str):
+        self._entries.pop(item_id, None)
+        self._expiry.pop(item_id, None)
+
+    def cleanup_expired(self) -> int:
+        """清理过期项，返回清理数量"""
+        now = time.time()
+        count = 0
+        with self._lock:
+            while self._expiry:
+                item_id, expire_at = next(iter(self._expiry.items()))
+                if expire_at > now:
+                    break
+                self._remove(item_id)
+                count += 1
+            self._stats['expired'] += count
+        return count
+
+    def warm_from_db(self):
+        """首次使用时从 item_info 表预热最近更新的商品详情（每个进程只执行一次）"""
+        if self._warmed:
+            return
+        self._warmed = True
+        try:
+            from db_manager import db_manager
+            # 商品被修改/删除/重新同步时使缓存失效，保证与数据库一致
+            db_manager.add_item_change_listener(self.invalidate_item)
+            rows = db_manager.get_recent_item_details(self.max_size)
+        except Exception as e:
+            logger.warning(f"从数据库预热商品详情缓存失败: {e}")
+            return
+
+        count = 0
+        # 按更新时间从旧到新写入，最近更新的商品排在LRU末尾
+        for item_id, item_detail in reversed(rows):
+            detail = extract_description(item_detail)
+            if detail:
+                self.put(item_id, detail)
+                count += 1
+        logger.info(f"商品详情缓存预热完成: {count} 个商品")
+
+    async def get_or_load(self, item_id: str, loader: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """读取缓存，未命中时通过单飞调用 loader 加载并写入缓存"""
+        detail = self.get(item_id)
+        if detail is not None:
+            return detail
+
+        async def load():
+            self._stats['loads'] += 1
+            loaded = await loader()
+            if loaded:
+                self.put(item_id, loaded)
+            return loaded
+
+        return await self._flight.do(item_id, load)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            **self._stats,
+            'flight': self._flight.get_stats(),
+        }
+
+
+# 创建全局商品详情缓存实例
+item_detail_cache = ItemDetailCache(
+    max_size=ITEM_DETAIL.get('cache', {}).get('max_size', 1000),
+    ttl=ITEM_DETAIL.get('cache', {}).get('ttl', 24 * 60 * 60),
+)
@@ -12,6 +12,7 @@ import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from loguru import logger
+from utils.browser_governor import browser_governor
 
 # 修复Docker环境中的asyncio事件循环策略问题
 if sys.platform.startswith('linux') or os.getenv('DOCKER_ENV'):
@@ -48,6 +49,7 @@ class XianyuSearcher:
         self.page = None
         self.api_responses = []
         self.user_id = "default"  # 默认用户ID
+        self._governor_ticket = None  # 浏览器资源调度许可
 
     async def _handle_scratch_captcha_manual(self, page, max_retries=3, wait_for_completion=True):
         """人工处理刮刮乐滑块（远程控制 + 截图备份）
@@ -566,31 +568,32 @@ class XianyuSearcher:
                 if is_scratch_captcha:
                     pass  # slider_success 已经在上面设置
                 else:
-                    # 普通滑块：使用 XianyuSliderStealth（同步API）
-                    from utils.xianyu_slider_stealth import XianyuSliderStealth
+                    # 普通滑块：使用 AsyncXianyuSliderStealth（异步API，可直接操作当前页面）
+                    from utils.xianyu_slider_async import AsyncXianyuSliderStealth
                     
                     # 创建滑块处理实例
-                    slider_handler = XianyuSliderStealth(
+                    slider_handler = AsyncXianyuSliderStealth(
                         user_id=getattr(self, 'user_id', 'default'),
                         enable_learning=True,
                         headless=True
                     )
                     
-                    # 将现有的浏览器对象传递给滑块处理器（复用现有浏览器）
-                    slider_handler.page = page
-                    slider_handler.context = context
-                    slider_handler.browser = browser
-                    slider_handler.playwright = playwright
-                    
-                    # 调用滑块处理方法
-                    logger.info(f"🎯 开始处理滑块验证（最多尝试 {actual_max_retries} 次）...")
-                    slider_success = slider_handler.solve_slider(max_retries=actual_max_retries)
-                    
-                    # 清除引用，防止 XianyuSliderStealth 尝试关闭我们的浏览器
-                    slider_handler.page = None
-                    slider_handler.context = None
-                    slider_handler.browser = None
-                    slider_handler.playwright = None
+                    try:
+                        # 占用滑块并发槽位（浏览器已在运行，不再申请浏览器准入）
+                        await slider_handler.acquire_slot(use_governor=False)
+                        
+                        # 将现有的浏览器对象传递给滑块处理器（复用现有浏览器）
+                        slider_handler.page = page
+                        slider_handler.context = context
+                        
+                        # 调用滑块处理方法
+                        logger.info(f"🎯 开始处理滑块验证（最多尝试 {actual_max_retries} 次）...")
+                        slider_success = await slider_handler.solve_slider(max_retries=actual_max_retries)
+                    finally:
+                        # 清除引用，防止 close_browser 关闭我们的浏览器，再清理临时目录并归还槽位
+                        slider_handler.page = None
+                        slider_handler.context = None
+                        await slider_handler.close_browser()
                 
                 if slider_success:
                     logger.success("✅ 滑块验证成功！")
@@ -604,16 +607,6 @@ class XianyuSearcher:
                 import traceback
                 logger.error(traceback.format_exc())
                 
-                # 确保清除引用
-                try:
-                    if 'slider_handler' in locals():
-                        slider_handler.page = None
-                        slider_handler.context = None
-                        slider_handler.browser = None
-                        slider_handler.playwright = None
-                except:
-                    pass
-                
                 return False
                 
         except Exception as e:
@@ -688,65 +681,77 @@ class XianyuSearcher:
             raise Exception("Playwright 未安装，无法使用真实搜索功能")
 
         if not self.browser:
-            playwright = await async_playwright().start()
-            
-            # 设置持久化数据目录（保存缓存、cookies等）
-            import tempfile
-            user_data_dir = os.path.join(tempfile.gettempdir(), 'xianyu_browser_cache')
-            os.makedirs(user_data_dir, exist_ok=True)
-            logger.info(f"使用持久化数据目录（保留缓存）: {user_data_dir}")
-            
-            # 简化的浏览器启动参数，避免冲突
-            browser_args = [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--no-first-run',
-                '--disable-extensions',
-                '--disable-default-apps',
-                '--no-default-browser-check',
-                # 中文语言设置
-                '--lang=zh-CN',
-                '--accept-lang=zh-CN,zh,en-US,en'
-            ]
-
-            # 只在确实是Docker环境时添加额外参数
-            if os.getenv('DOCKER_ENV') == 'true':
-                browser_args.extend([
-                    '--disable-gpu',
-                    # 移除--single-process参数，使用多进程模式提高稳定性
-                    # '--single-process'  # 注释掉，避免崩溃
-                ])
-
-            logger.info("正在启动浏览器（中文模式，持久化缓存）...")
-            
-            # 使用 launch_persistent_context 实现跨会话的缓存持久化
-            # 这样通过一次滑块验证后，下次搜索可以复用缓存，避免再次出现滑块
-            self.context = await playwright.chromium.launch_persistent_context(
-                user_data_dir,  # 第一个参数是用户数据目录，用于持久化
-                headless=True,  # 无头模式，后台运行
-                args=browser_args,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={'width': 1280, 'height': 720},
-                locale='zh-CN',  # 设置语言为中文
-                # 持久化上下文会自动保存和加载：
-                # - Cookies
-                # - 缓存
-                # - LocalStorage
-                # - SessionStorage
-                # - 其他浏览器状态
-            )
-            
-            # launch_persistent_context 返回的是 context，不是 browser
-            # 需要通过 context.browser 获取 browser 对象
-            self.browser = self.context.browser
+            # 搜索优先级最低，资源紧张时排队或直接拒绝
+            if self._governor_ticket is None:
+                self._governor_ticket = await browser_governor.acquire_async('search', self.user_id)
+            try:
+                await self._launch_browser()
+            except Exception:
+                browser_governor.release(self._governor_ticket)
+                self._governor_ticket = None
+                raise
+
+    async def _launch_browser(self):
+        """启动持久化上下文浏览器"""
+        playwright = await async_playwright().start()
+        
+        # 设置持久化数据目录（保存缓存、cookies等）
+        import tempfile
+        user_data_dir = os.path.join(tempfile.gettempdir(), 'xianyu_browser_cache')
+        os.makedirs(user_data_dir, exist_ok=True)
+        logger.info(f"使用持久化数据目录（保留缓存）: {user_data_dir}")
+        
+        # 简化的浏览器启动参数，避免冲突
+        browser_args = [
+            '--no-sandbox',
+            '--disable-setuid-sandbox',
+            '--disable-dev-shm-usage',
+            '--no-first-run',
+            '--disable-extensions',
+            '--disable-default-apps',
+            '--no-default-browser-check',
+            # 中文语言设置
+            '--lang=zh-CN',
+            '--accept-lang=zh-CN,zh,en-US,en'
+        ]
+
+        # 只在确实是Docker环境时添加额外参数
+        if os.getenv('DOCKER_ENV') == 'true':
+            browser_args.extend([
+                '--disable-gpu',
+                # 移除--single-process参数，使用多进程模式提高稳定性
+                # '--single-process'  # 注释掉，避免崩溃
+            ])
+
+        logger.info("正在启动浏览器（中文模式，持久化缓存）...")
+        
+        # 使用 launch_persistent_context 实现跨会话的缓存持久化
+        # 这样通过一次滑块验证后，下次搜索可以复用缓存，避免再次出现滑块
+        self.context = await playwright.chromium.launch_persistent_context(
+            user_data_dir,  # 第一个参数是用户数据目录，用于持久化
+            headless=True,  # 无头模式，后台运行
+            args=browser_args,
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            viewport={'width': 1280, 'height': 720},
+            locale='zh-CN',  # 设置语言为中文
+            # 持久化上下文会自动保存和加载：
+            # - Cookies
+            # - 缓存
+            # - LocalStorage
+            # - SessionStorage
+            # - 其他浏览器状态
+        )
+        
+        # launch_persistent_context 返回的是 context，不是 browser
+        # 需要通过 context.browser 获取 browser 对象
+        self.browser = self.context.browser
 
-            logger.info("浏览器启动成功（持久化上下文已创建）...")
+        logger.info("浏览器启动成功（持久化上下文已创建）...")
 
-            logger.info("创建页面...")
-            self.page = await self.context.new_page()
+        logger.info("创建页面...")
+        self.page = await self.context.new_page()
 
-            logger.info("浏览器初始化完成（缓存将持久化保存）")
+        logger.info("浏览器初始化完成（缓存将持久化保存）")
 
     async def close_browser(self):
         """关闭浏览器（持久化上下文会自动保存缓存和cookies）"""
@@ -764,6 +769,9 @@ class XianyuSearcher:
             logger.debug("商品搜索器浏览器已关闭（缓存已保存）")
         except Exception as e:
             logger.warning(f"关闭商品搜索器浏览器时出错: {e}")
+        finally:
+            browser_governor.release(self._governor_ticket)
+            self._governor_ticket = None
     
     async def search_items(self, keyword: str, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
         """
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Hashable, Optional
+
+from loguru import logger
+
+# 所有按键锁实例（弱引用），用于统一输出统计
+_instances = weakref.WeakSet()
+
+
+class _Entry:
+    __slots__ = ('lock', 'refs', 'generation', 'lease')
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.refs = 0  # 持有者 + 等待者数量，归零时删除
+        self.generation = 0  # 每次加锁递增，用于识别租约过期后的过时释放
+        self.lease = None  # 租约定时器（asyncio.TimerHandle 或 threading.Timer）
+
+
+class _KeyedLockBase:
+    """按键分配锁的公共部分：引用计数、租约过期和争用统计"""
+
+    def __init__(self, name: str = '', lease_timeout: Optional[float] = None):
+        self.name = name
+        self.lease_timeout = lease_timeout
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._waits = deque(maxlen=200)
+        self._stats = {'acquired': 0, 'contended': 0, 'timeouts': 0, 'lease_expired': 0, 'peak_keys': 0}
+        _instances.add(self)
+
+    def _ref(self, key: Hashable, factory) -> _Entry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(factory())
+            self._stats['peak_keys'] = max(self._stats['peak_keys'], len(self._entries))
+        entry.refs += 1
+        if entry.lock.locked():
+            self._stats['contended'] += 1
+        return entry
+
+    def _unref(self, key: Hashable, entry: _Entry):
+        entry.refs -= 1
+        if entry.refs <= 0 and self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _expire(self, key: Hashable, entry: _Entry, generation: int):
+        """租约到期仍未释放时强制释放，避免持有者异常挂起导致该键永久不可用"""
+        if entry.generation != generation or not entry.lock.locked():
+            return
+        entry.generation += 1
+        entry.lease = None
+        entry.lock.release()
+        self._stats['lease_expired'] += 1
+        logger.warning(f"按键锁 {self.name}[{key}] 持有超过 {self.lease_timeout} 秒，已强制释放")
+
+    def locked(self, key: Hashable) -> bool:
+        """键对应的锁是否被持有（不存在时不会创建）"""
+        entry = self._entries.get(key)
+        return entry is not None and entry.lock.locked()
+
+    def get_stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        count = len(waits)
+        return {
+            'name': self.name,
+            'keys': len(self._entries),
+            'held': sum(1 for entry in list(self._entries.values()) if entry.lock.locked()),
+            'wait_p95_ms': round(waits[min(count - 1, int(count * 0.95))] * 1000, 1) if count else 0,
+            **self._stats,
+        }
+
+
+class KeyedLock(_KeyedLockBase):
+    """按键分配的异步锁
+
+    首次使用某个键时创建锁，最后一个持有者/等待者释放后删除，字典大小只与正在使用的键数量有关。
+    支持等待超时和持有租约（lease_timeout 秒后强制释放）。只能在同一个事件循环中使用。
+
+    用法：
+        async with locks.lock(key):
+            ...
+    """
+
+    @asynccontextmanager
+    async def lock(self, key: Hashable, timeout: Optional[float] = None):
+        entry = self._ref(key, asyncio.Lock)
+        started = time.time()
+        try:
+            if timeout is None:
+                await entry.lock.acquire()
+            else:
+                await asyncio.wait_for(entry.lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            self._unref(key, entry)
+            raise
+        except BaseException:
+            self._unref(key, entry)
+            raise
+
+        self._waits.append(time.time() - started)
+        self._stats['acquired'] += 1
+        entry.generation += 1
+        generation = entry.generation
+        if self.lease_timeout:
+            entry.lease = asyncio.get_running_loop().call_later(
+                self.lease_timeout, self._expire, key, entry, generation
+            )
+        try:
+            yield
+        finally:
+            if entry.generation == generation:
+                if entry.lease is not None:
+                    entry.lease.cancel()
+                    entry.lease = None
+                entry.lock.release()
+            self._unref(key, entry)
+
+
+class ThreadKeyedLock(_KeyedLockBase):
+    """按键分配的线程锁（语义同 KeyedLock，供同步代码使用）
+
+    用法：
+        with locks.lock(key):
+            ...
+    """
+
+    def __init__(self, name: str = '', lease_timeout: Optional[float] = None):
+        super().__init__(name, lease_timeout)
+        self._guard = threading.Lock()
+
+    def _expire(self, key: Hashable, entry: _Entry, generation: int):
+        with self._guard:
+            super()._expire(key, entry, generation)
+
+    @contextmanager
+    def lock(self, key: Hashable, timeout: Optional[float] = None):
+        with self._guard:
+            entry = self._ref(key, threading.Lock)
+        started = time.time()
+        try:
+            acquired = entry.lock.acquire(timeout=-1 if timeout is None else timeout)
+        except BaseException:
+            with self._guard:
+                self._unref(key, entry)
+            raise
+        if not acquired:
+            with self._guard:
+                self._stats['timeouts'] += 1
+                self._unref(key, entry)
+            raise TimeoutError(f"等待按键锁 {self.name}[{key}] 超时")
+
+        with self._guard:
+            self._waits.append(time.time() - started)
+            self._stats['acquired'] += 1
+            entry.generation += 1
+            generation = entry.generation
+            if self.lease_timeout:
+                entry.lease = threading.Timer(self.lease_timeout, self._expire, (key, entry, generation))
+                entry.lease.daemon = True
+                entry.lease.start()
+        try:
+            yield
+        finally:
+            with self._guard:
+                if entry.generation == generation:
+                    if entry.lease is not None:
+                        entry.lease.cancel()
+                        entry.lease = None
+                    entry.lock.release()
+                self._unref(key, entry)
+
+
+def get_keyed_lock_stats() -> Dict[str, Any]:
+    """获取所有按键锁的统计"""
+    return {lock.name or str(id(lock)): lock.get_stats() for lock in list(_instances)}
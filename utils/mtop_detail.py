@@ -0,0 +1,321 @@
+"""
+基于签名 mtop 接口的商品详情/订单详情获取（无需浏览器）
+
+复用账号现有的 aiohttp 会话和 _m_h5_tk 签名，一次HTTP请求即可拿到详情；
+接口要求滑块/安全验证或返回结构无法识别时返回 None，由调用方回退到浏览器获取；
+验证/错误结果短期缓存，期间不再重复请求接口。
+"""
+
+import json
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from config import MTOP_DETAIL
+from utils.xianyu_utils import generate_sign
+
+
+# 需要人工/浏览器验证的错误码
+VERIFY_ERROR_CODES = ('FAIL_SYS_USER_VALIDATE', 'RGV587_ERROR', 'FAIL_SYS_ILLEGAL_ACCESS')
+# 令牌失效的错误码（响应会通过Set-Cookie下发新的_m_h5_tk，刷新后重试一次即可）
+TOKEN_ERROR_CODES = ('FAIL_SYS_TOKEN_EXOIRED', 'FAIL_SYS_TOKEN_EXPIRED', 'FAIL_SYS_TOKEN_EMPTY', 'FAIL_SYS_TOKEN_ILLEGAL')
+
+# 订单详情响应中各字段可能使用的键名
+SKU_KEYS = ('skuInfo', 'skuText', 'skuDesc', 'skuName', 'sku')
+STATUS_KEYS = ('orderStatusText', 'statusText', 'orderStatus', 'tradeStatus')
+# 订单实付金额的字段路径（相对 data，按优先顺序），可通过 MTOP_DETAIL.amount_paths 覆盖
+AMOUNT_PATHS = (
+    'actualPayFee',
+    'module.priceModule.actualPayFee',
+    'orderInfo.actualPayFee',
+    'priceInfo.actualPayFee',
+    'payInfo.actualPayFee',
+    'totalFee',
+    'payAmount',
+)
+# 订单购买数量的字段路径（相对 data，按优先顺序），可通过 MTOP_DETAIL.quantity_paths 覆盖；
+# 数量决定发送的卡券数，不做全局搜索，都不存在时回退浏览器获取
+QUANTITY_PATHS = (
+    'module.orderInfoVO.buyQuantity',
+    'module.orderInfoVO.buyAmount',
+    'orderInfo.buyQuantity',
+    'orderInfo.buyAmount',
+    'buyQuantity',
+    'buyAmount',
+)
+# 金额路径都不存在时才全局搜索的键名：只接受明确表示实付总额的字段，
+# 不接受 totalPrice 等可能是单价、运费或优惠金额的字段
+AMOUNT_FALLBACK_KEYS = ('actualPayFee', 'actualPaidFee', 'realPay')
+
+
+class MtopDetailFetcher:
+    """账号级 mtop 详情获取器"""
+
+    def __init__(self, main_instance):
+        """
+        Args:
+            main_instance: XianyuLive 实例（提供 session、cookies 和 cookie 持久化）
+        """
+        self.main = main_instance
+        self.enabled = MTOP_DETAIL.get('enabled', True)
+        self.timeout = MTOP_DETAIL.get('timeout', 10)
+        self.amount_paths = tuple(MTOP_DETAIL.get('amount_paths') or AMOUNT_PATHS)
+        self.quantity_paths = tuple(MTOP_DETAIL.get('quantity_paths') or QUANTITY_PATHS)
+        # 失败结果短期缓存，期间直接回退浏览器，不再重复请求接口
+        self.negative_ttl = MTOP_DETAIL.get('negative_ttl', 300)
+        self._verify_until = 0.0                    # 账号需要验证时，整个账号的接口调用暂停到该时间
+        self._failed_until: Dict[str, float] = {}   # {'item:商品ID' / 'order:订单ID': 失败缓存到期时间}
+
+    def _skip_reason(self, key: str) -> Optional[str]:
+        """处于失败缓存期内时返回原因，否则返回 None"""
+        now = time.time()
+        if now < self._verify_until:
+            return 'verify'
+        until = self._failed_until.get(key)
+        if until is not None:
+            if now < until:
+                return 'error'
+            del self._failed_until[key]
+        return None
+
+    def _remember_failure(self, key: str, status: str):
+        """缓存 verify / error 结果（令牌失效已在 _call 中重试，不缓存）"""
+        if self.negative_ttl <= 0:
+            return
+        now = time.time()
+        if status == 'verify':
+            self._verify_until = now + self.negative_ttl
+        elif status == 'error':
+            # 清理过期记录，避免长期运行后无限增长
+            if len(self._failed_until) >= 1000:
+                self._failed_until = {k: v for k, v in self._failed_until.items() if v > now}
+            self._failed_until[key] = now + self.negative_ttl
+
+    async def _call(self, api: str, version: str, data: Dict[str, Any], spm_cnt: str = None) -> Tuple[str, Dict[str, Any]]:
+        """调用签名 mtop 接口
+
+        Returns:
+            (状态, 响应JSON)，状态为 success / verify / token / error
+        """
+        import aiohttp
+
+        main = self.main
+        if not main.session:
+            await main.create_session()
+
+        for attempt in range(2):
+            params = {
+                'jsv': '2.7.2',
+                'appKey': '34839810',
+                't': str(int(time.time()) * 1000),
+                'sign': '',
+                'v': version,
+                'type': 'originaljson',
+                'accountSite': 'xianyu',
+                'dataType': 'json',
+                'timeout': '20000',
+                'api': api,
+                'sessionOption': 'AutoLoginOnly',
+            }
+            if spm_cnt:
+                params['spm_cnt'] = spm_cnt
+
+            data_val = json.dumps(data, separators=(',', ':'))
+            token = main.cookie_jar.h5_token
+            params['sign'] = generate_sign(params['t'], token, data_val)
+
+            async with main.session.post(
+                f'https://h5api.m.goofish.com/h5/{api}/{version}/',
+                params=params,
+                data={'data': data_val},
+                headers={'cookie': main.cookies_str},
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                res_json = await response.json(content_type=None)
+                # 合并响应中的Set-Cookie（令牌失效时包含新的_m_h5_tk），有变化时延迟写入数据库
+                if main.cookie_jar.merge_set_cookie(response.headers.getall('set-cookie', [])):
+                    main.cookie_jar.schedule_persist()
+
+            ret = ' '.join(res_json.get('ret', [])) if isinstance(res_json, dict) else ''
+            if 'SUCCESS' in ret:
+                return 'success', res_json
+            if any(code in ret for code in VERIFY_ERROR_CODES):
+                return 'verify', res_json
+            if any(code in ret for code in TOKEN_ERROR_CODES):
+                if attempt == 0:
+                    logger.info(f"【{main.cookie_id}】{api} 令牌失效，使用响应下发的新令牌重试")
+                    continue
+                return 'token', res_json
+            return 'error', res_json
+        return 'token', {}
+
+    # ------------------------------------------------------------------
+    # 商品详情
+    # ------------------------------------------------------------------
+    async def fetch_item_detail(self, item_id: str) -> Optional[str]:
+        """获取商品描述文本，失败返回 None"""
+        if not self.enabled:
+            return None
+        key = f"item:{item_id}"
+        skip = self._skip_reason(key)
+        if skip:
+            logger.debug(f"【{self.main.cookie_id}】mtop商品详情近期失败({skip})，直接回退: {item_id}")
+            return None
+        try:
+            status, res_json = await self._call(
+                MTOP_DETAIL.get('item_detail_api', 'mtop.taobao.idle.pc.detail'),
+                MTOP_DETAIL.get('item_detail_version', '1.0'),
+                {'itemId': item_id},
+                spm_cnt='a21ybx.im.0.0'
+            )
+            if status != 'success':
+                logger.warning(f"【{self.main.cookie_id}】mtop商品详情获取失败({status}): {item_id}, {res_json.get('ret')}")
+                self._remember_failure(key, status)
+                return None
+            item_do = (res_json.get('data') or {}).get('itemDO') or {}
+            desc = item_do.get('desc')
+            if not desc:
+                logger.warning(f"【{self.main.cookie_id}】mtop商品详情响应中没有描述: {item_id}")
+                return None
+            return desc.strip()
+        except Exception as e:
+            logger.warning(f"【{self.main.cookie_id}】mtop商品详情请求异常: {item_id}, {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # 订单详情
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _get_path(obj: Any, path: str) -> Optional[Any]:
+        """按 "a.b.c" 路径取值，路径不存在或值为空/非标量时返回 None"""
+        for part in path.split('.'):
+            if not isinstance(obj, dict):
+                return None
+            obj = obj.get(part)
+        if obj in (None, '', [], {}) or isinstance(obj, (dict, list)):
+            return None
+        return obj
+
+    def _find_amount(self, order_id: str, data: Dict[str, Any]) -> Optional[Any]:
+        """查找订单实付金额：优先匹配明确的字段路径，都不存在时才全局搜索实付总额字段"""
+        for path in self.amount_paths:
+            value = self._get_path(data, path)
+            if value is not None:
+                return value
+        value = self._find_value(data, AMOUNT_FALLBACK_KEYS)
+        if value is not None:
+            logger.warning(f"【{self.main.cookie_id}】订单 {order_id} 未匹配到已知的金额字段路径，使用全局搜索结果: {value}")
+        return value
+
+    def _find_quantity(self, order_id: str, data: Dict[str, Any]) -> Optional[str]:
+        """按明确的字段路径查找购买数量，没有匹配或不是正整数时返回 None"""
+        for path in self.quantity_paths:
+            value = self._get_path(data, path)
+            if value is None:
+                continue
+            quantity = str(value).strip().lstrip('x')
+            if re.fullmatch(r'\d+', quantity) and int(quantity) > 0:
+                return str(int(quantity))
+            logger.warning(f"【{self.main.cookie_id}】订单 {order_id} 的购买数量无效({path}={value!r})")
+            return None
+        logger.warning(f"【{self.main.cookie_id}】订单 {order_id} 未匹配到已知的数量字段路径")
+        return None
+
+    @staticmethod
+    def _find_value(obj: Any, keys: Tuple[str, ...]) -> Optional[Any]:
+        """在响应中按优先顺序查找第一个非空字段（广度优先，越靠近顶层越优先）"""
+        for key in keys:
+            queue = [obj]
+            while queue:
+                node = queue.pop(0)
+                if isinstance(node, dict):
+                    value = node.get(key)
+                    if value not in (None, '', [], {}) and not isinstance(value, (dict, list)):
+                        return value
+                    queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+                elif isinstance(node, list):
+                    queue.extend(v for v in node if isinstance(v, (dict, list)))
+        return None
+
+    @staticmethod
+    def _parse_sku(sku_text: str) -> Dict[str, str]:
+        """解析 "规格名:规格值" 形式的SKU文本"""
+        sku_text = (sku_text or '').replace('：', ':').strip()
+        if ':' not in sku_text:
+            return {}
+        spec_name, spec_value = [part.strip() for part in sku_text.split(':', 1)]
+        if spec_name and spec_value:
+            return {'spec_name': spec_name, 'spec_value': spec_value}
+        return {}
+
+    def parse_order_detail(self, order_id: str, res_json: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """将订单详情接口响应转换为与浏览器获取一致的结构，无法识别时返回 None"""
+        data = res_json.get('data') or {}
+        amount = self._find_amount(order_id, data)
+        if amount is None:
+            return None
+
+        amount = str(amount).replace('¥', '').replace('￥', '').strip()
+        # 部分接口以分为单位返回整数金额
+        if re.fullmatch(r'\d+', amount) and MTOP_DETAIL.get('amount_in_cents', False):
+            amount = f"{int(amount) / 100:.2f}"
+
+        # 数量决定发送的卡券数，无法确定时交给浏览器获取
+        quantity = self._find_quantity(order_id, data)
+        if quantity is None:
+            return None
+
+        sku_info = self._parse_sku(str(self._find_value(data, SKU_KEYS) or ''))
+        sku_info.update({'quantity': quantity, 'amount': amount})
+
+        result = {
+            'order_id': order_id,
+            'url': f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller",
+            'title': f"订单详情 - {order_id}",
+            'sku_info': sku_info,
+            'spec_name': sku_info.get('spec_name', ''),
+            'spec_value': sku_info.get('spec_value', ''),
+            'quantity': quantity,
+            'amount': amount,
+            'timestamp': time.time(),
+            'from_cache': False,
+            'source': 'mtop',
+        }
+        status = self._find_value(data, STATUS_KEYS)
+        if status is not None:
+            result['order_status_text'] = str(status)
+        return result
+
+    async def fetch_order_detail(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """获取订单详情（规格/数量/金额），失败返回 None"""
+        if not self.enabled:
+            return None
+        key = f"order:{order_id}"
+        skip = self._skip_reason(key)
+        if skip:
+            logger.debug(f"【{self.main.cookie_id}】mtop订单详情近期失败({skip})，直接回退: {order_id}")
+            return None
+        try:
+            start = time.perf_counter()
+            status, res_json = await self._call(
+                MTOP_DETAIL.get('order_detail_api', 'mtop.idle.web.trade.order.detail'),
+                MTOP_DETAIL.get('order_detail_version', '1.0'),
+                {'tid': order_id}
+            )
+            if status != 'success':
+                logger.warning(f"【{self.main.cookie_id}】mtop订单详情获取失败({status}): {order_id}, {res_json.get('ret')}")
+                self._remember_failure(key, status)
+                return None
+            result = self.parse_order_detail(order_id, res_json)
+            if result is None:
+                logger.warning(f"【{self.main.cookie_id}】mtop订单详情响应结构无法识别: {order_id}")
+                self._remember_failure(key, 'error')
+                return None
+            logger.info(f"【{self.main.cookie_id}】mtop订单详情获取成功: {order_id}, 耗时 {(time.perf_counter() - start) * 1000:.0f}ms, "
+                        f"规格: {result['spec_name']}:{result['spec_value']}, 数量: {result['quantity']}, 金额: {result['amount']}")
+            return result
+        except Exception as e:
+            logger.warning(f"【{self.main.cookie_id}】mtop订单详情请求异常: {order_id}, {e}")
+            return None
@@ -13,7 +13,9 @@ from loguru import logger
 import re
 import json
 from threading import Lock
-from collections import defaultdict
+
+from config import ORDER_DETAIL
+from utils.single_flight import SingleFlight
 
 # 修复Docker环境中的asyncio事件循环策略问题
 if sys.platform.startswith('linux') or os.getenv('DOCKER_ENV'):
@@ -37,14 +39,12 @@ if os.getenv('DOCKER_ENV'):
 class OrderDetailFetcher:
     """闲鱼订单详情获取器"""
 
-    # 类级别的锁字典，为每个order_id维护一个锁
-    _order_locks = defaultdict(lambda: asyncio.Lock())
-
     def __init__(self, cookie_string: str = None, headless: bool = True):
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.headless = headless  # 保存headless设置
+        self._pooled = False  # 页面是否来自共享浏览器池（池中资源不由本对象关闭）
 
         # 请求头配置
         self.headers = {
@@ -175,6 +175,13 @@ class OrderDetailFetcher:
             logger.error(f"浏览器初始化失败: {e}")
             return False
 
+    def attach_page(self, page: Page):
+        """使用共享浏览器池租用的页面，替代单独启动浏览器"""
+        self.page = page
+        self.context = page.context
+        self.browser = page.context.browser
+        self._pooled = True
+
     async def _set_cookies(self):
         """设置Cookie"""
         try:
@@ -199,7 +206,7 @@ class OrderDetailFetcher:
 
     async def fetch_order_detail(self, order_id: str, timeout: int = 30) -> Optional[Dict[str, Any]]:
         """
-        获取订单详情（带锁机制和数据库缓存）
+        获取订单详情（带数据库缓存，并发去重由 fetch_order_detail_simple 负责）
 
         Args:
             order_id: 订单ID
@@ -208,151 +215,105 @@ class OrderDetailFetcher:
         Returns:
             包含订单详情的字典，失败时返回None
         """
-        # 获取该订单ID的锁
-        order_lock = self._order_locks[order_id]
-
-        async with order_lock:
-            logger.info(f"🔒 获取订单 {order_id} 的锁，开始处理...")
-
-            try:
-                # 首先查询数据库中是否已存在该订单（在初始化浏览器之前）
-                from db_manager import db_manager
-                existing_order = db_manager.get_order_by_id(order_id)
-
-                if existing_order:
-                    # 检查金额字段是否有效（不为空且不为0）
-                    amount = existing_order.get('amount', '')
-                    amount_valid = False
-
-                    if amount:
-                        # 移除可能的货币符号和空格，检查是否为有效数字
-                        amount_clean = str(amount).replace('¥', '').replace('￥', '').replace('$', '').strip()
-                        try:
-                            amount_value = float(amount_clean)
-                            amount_valid = amount_value > 0
-                        except (ValueError, TypeError):
-                            amount_valid = False
-
-                    if amount_valid:
-                        logger.info(f"📋 订单 {order_id} 已存在于数据库中且金额有效({amount})，直接返回缓存数据")
-                        print(f"✅ 订单 {order_id} 使用缓存数据，跳过浏览器获取")
-
-                        # 构建返回格式，与浏览器获取的格式保持一致
-                        result = {
-                            'order_id': existing_order['order_id'],
-                            'url': f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller",
-                            'title': f"订单详情 - {order_id}",
-                            'sku_info': {
-                                'spec_name': existing_order.get('spec_name', ''),
-                                'spec_value': existing_order.get('spec_value', ''),
-                                'quantity': existing_order.get('quantity', ''),
-                                'amount': existing_order.get('amount', '')
-                            },
-                            'spec_name': existing_order.get('spec_name', ''),
-                            'spec_value': existing_order.get('spec_value', ''),
-                            'quantity': existing_order.get('quantity', ''),
-                            'amount': existing_order.get('amount', ''),
-                            'timestamp': time.time(),
-                            'from_cache': True  # 标记数据来源
-                        }
-                        return result
-                    else:
-                        logger.info(f"📋 订单 {order_id} 存在于数据库中但金额无效({amount})，需要重新获取")
-                        print(f"⚠️ 订单 {order_id} 金额无效，重新获取详情...")
-
-                # 只有在数据库中没有有效数据时才初始化浏览器
-                logger.info(f"🌐 订单 {order_id} 需要浏览器获取，开始初始化浏览器...")
-                print(f"🔍 订单 {order_id} 开始浏览器获取详情...")
+        try:
+            # 首先查询数据库中是否有新鲜的订单详情（在初始化浏览器之前）
+            cached = get_cached_order_detail(order_id)
+            if cached:
+                return cached
+
+            # 只有在数据库中没有有效数据时才初始化浏览器
+            logger.info(f"🌐 订单 {order_id} 需要浏览器获取，开始初始化浏览器...")
+            print(f"🔍 订单 {order_id} 开始浏览器获取详情...")
+
+            # 确保浏览器准备就绪
+            if not await self._ensure_browser_ready():
+                logger.error("浏览器初始化失败，无法获取订单详情")
+                return None
 
-                # 确保浏览器准备就绪
-                if not await self._ensure_browser_ready():
-                    logger.error("浏览器初始化失败，无法获取订单详情")
-                    return None
+            # 构建订单详情URL
+            url = f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller"
+            logger.info(f"开始访问订单详情页面: {url}")
 
-                # 构建订单详情URL
-                url = f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller"
-                logger.info(f"开始访问订单详情页面: {url}")
+            # 访问页面（带重试机制）
+            max_retries = 2
+            response = None
 
-                # 访问页面（带重试机制）
-                max_retries = 2
-                response = None
+            for retry in range(max_retries + 1):
+                try:
+                    response = await self.page.goto(url, wait_until='networkidle', timeout=timeout * 1000)
 
-                for retry in range(max_retries + 1):
-                    try:
-                        response = await self.page.goto(url, wait_until='networkidle', timeout=timeout * 1000)
+                    if response and response.status == 200:
+                        break
+                    else:
+                        logger.warning(f"页面访问失败，状态码: {response.status if response else 'None'}，重试 {retry + 1}/{max_retries + 1}")
 
-                        if response and response.status == 200:
-                            break
+                except Exception as e:
+                    logger.warning(f"页面访问异常: {e}，重试 {retry + 1}/{max_retries + 1}")
+
+                    # 如果是浏览器连接问题，尝试重新初始化
+                    if "Target page, context or browser has been closed" in str(e):
+                        logger.info("检测到浏览器连接断开，尝试重新初始化...")
+                        if await self._ensure_browser_ready():
+                            logger.info("浏览器重新初始化成功，继续重试...")
+                            continue
                         else:
-                            logger.warning(f"页面访问失败，状态码: {response.status if response else 'None'}，重试 {retry + 1}/{max_retries + 1}")
-
-                    except Exception as e:
-                        logger.warning(f"页面访问异常: {e}，重试 {retry + 1}/{max_retries + 1}")
-
-                        # 如果是浏览器连接问题，尝试重新初始化
-                        if "Target page, context or browser has been closed" in str(e):
-                            logger.info("检测到浏览器连接断开，尝试重新初始化...")
-                            if await self._ensure_browser_ready():
-                                logger.info("浏览器重新初始化成功，继续重试...")
-                                continue
-                            else:
-                                logger.error("浏览器重新初始化失败")
-                                return None
-
-                        if retry == max_retries:
-                            logger.error(f"页面访问最终失败: {e}")
+                            logger.error("浏览器重新初始化失败")
                             return None
 
-                        await asyncio.sleep(1)  # 重试前等待1秒
+                    if retry == max_retries:
+                        logger.error(f"页面访问最终失败: {e}")
+                        return None
 
-                if not response or response.status != 200:
-                    logger.error(f"页面访问最终失败，状态码: {response.status if response else 'None'}")
-                    return None
+                    await asyncio.sleep(1)  # 重试前等待1秒
 
-                logger.info("页面加载成功，等待内容渲染...")
+            if not response or response.status != 200:
+                logger.error(f"页面访问最终失败，状态码: {response.status if response else 'None'}")
+                return None
 
-                # 等待页面完全加载
-                try:
-                    await self.page.wait_for_load_state('networkidle')
-                except Exception as e:
-                    logger.warning(f"等待页面加载状态失败: {e}")
-                    # 继续执行，不中断流程
+            logger.info("页面加载成功，等待内容渲染...")
 
-                # 额外等待确保动态内容加载完成
-                await asyncio.sleep(3)
+            # 等待页面完全加载
+            try:
+                await self.page.wait_for_load_state('networkidle')
+            except Exception as e:
+                logger.warning(f"等待页面加载状态失败: {e}")
+                # 继续执行，不中断流程
 
-                # 获取并解析SKU信息
-                sku_info = await self._get_sku_content()
+            # 额外等待确保动态内容加载完成
+            await asyncio.sleep(3)
 
-                # 获取页面标题
-                try:
-                    title = await self.page.title()
-                except Exception as e:
-                    logger.warning(f"获取页面标题失败: {e}")
-                    title = f"订单详情 - {order_id}"
-
-                result = {
-                    'order_id': order_id,
-                    'url': url,
-                    'title': title,
-                    'sku_info': sku_info,  # 包含解析后的规格信息
-                    'spec_name': sku_info.get('spec_name', '') if sku_info else '',
-                    'spec_value': sku_info.get('spec_value', '') if sku_info else '',
-                    'quantity': sku_info.get('quantity', '') if sku_info else '',  # 数量
-                    'amount': sku_info.get('amount', '') if sku_info else '',      # 金额
-                    'timestamp': time.time(),
-                    'from_cache': False  # 标记数据来源
-                }
-
-                logger.info(f"订单详情获取成功: {order_id}")
-                if sku_info:
-                    logger.info(f"规格信息 - 名称: {result['spec_name']}, 值: {result['spec_value']}")
-                    logger.info(f"数量: {result['quantity']}, 金额: {result['amount']}")
-                return result
+            # 获取并解析SKU信息
+            sku_info = await self._get_sku_content()
 
+            # 获取页面标题
+            try:
+                title = await self.page.title()
             except Exception as e:
-                logger.error(f"获取订单详情失败: {e}")
-                return None
+                logger.warning(f"获取页面标题失败: {e}")
+                title = f"订单详情 - {order_id}"
+
+            result = {
+                'order_id': order_id,
+                'url': url,
+                'title': title,
+                'sku_info': sku_info,  # 包含解析后的规格信息
+                'spec_name': sku_info.get('spec_name', '') if sku_info else '',
+                'spec_value': sku_info.get('spec_value', '') if sku_info else '',
+                'quantity': sku_info.get('quantity', '') if sku_info else '',  # 数量
+                'amount': sku_info.get('amount', '') if sku_info else '',      # 金额
+                'timestamp': time.time(),
+                'from_cache': False  # 标记数据来源
+            }
+
+            logger.info(f"订单详情获取成功: {order_id}")
+            if sku_info:
+                logger.info(f"规格信息 - 名称: {result['spec_name']}, 值: {result['spec_value']}")
+                logger.info(f"数量: {result['quantity']}, 金额: {result['amount']}")
+            return result
+
+        except Exception as e:
+            logger.error(f"获取订单详情失败: {e}")
+            return None
 
     def _parse_sku_content(self, sku_content: str) -> Dict[str, str]:
         """
@@ -603,6 +564,12 @@ class OrderDetailFetcher:
 
     async def _force_close_browser(self):
         """强制关闭浏览器，忽略所有错误"""
+        if self._pooled:
+            # 池中的页面由浏览器池回收，这里只释放引用
+            self.page = self.context = self.browser = None
+            self._pooled = False
+            return
+
         try:
             if self.page:
                 try:
@@ -630,6 +597,10 @@ class OrderDetailFetcher:
 
     async def close(self):
         """关闭浏览器"""
+        if self._pooled:
+            await self._force_close_browser()
+            return
+
         try:
             if self.page:
                 await self.page.close()
@@ -653,15 +624,78 @@ class OrderDetailFetcher:
         await self.close()
 
 
+# 同一订单的并发获取去重
+_order_detail_flight = SingleFlight('order_detail')
+
+
+def _is_valid_amount(amount) -> bool:
+    """金额不为空且大于0"""
+    if not amount:
+        return False
+    # 移除可能的货币符号和空格，检查是否为有效数字
+    amount_clean = str(amount).replace('¥', '').replace('￥', '').replace('$', '').strip()
+    try:
+        return float(amount_clean) > 0
+    except (ValueError, TypeError):
+        return False
+
+
+def get_cached_order_detail(order_id: str) -> Optional[Dict[str, Any]]:
+    """从 orders 表读取缓存的订单详情
+
+    只有在有效期（ORDER_DETAIL.cache_ttl）内获取过详情且金额有效时才命中，否则返回None
+    """
+    try:
+        from db_manager import db_manager
+        existing_order = db_manager.get_fresh_order_detail(order_id, ORDER_DETAIL.get('cache_ttl', 604800))
+    except Exception as e:
+        logger.warning(f"检查数据库缓存失败: {e}")
+        return None
+
+    if not existing_order:
+        return None
+
+    amount = existing_order.get('amount', '')
+    if not _is_valid_amount(amount):
+        logger.info(f"📋 订单 {order_id} 存在于数据库中但金额无效({amount})，需要重新获取")
+        return None
+
+    logger.info(f"📋 订单 {order_id} 缓存有效(获取于 {existing_order['detail_fetched_at']}，金额 {amount})，直接返回缓存数据")
+
+    # 构建返回格式，与浏览器获取的格式保持一致
+    return {
+        'order_id': existing_order['order_id'],
+        'url': f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller",
+        'title': f"订单详情 - {order_id}",
+        'sku_info': {
+            'spec_name': existing_order.get('spec_name', ''),
+            'spec_value': existing_order.get('spec_value', ''),
+            'quantity': existing_order.get('quantity', ''),
+            'amount': amount
+        },
+        'spec_name': existing_order.get('spec_name', ''),
+        'spec_value': existing_order.get('spec_value', ''),
+        'quantity': existing_order.get('quantity', ''),
+        'amount': amount,
+        'order_status': existing_order.get('status', 'unknown'),
+        'detail_fetched_at': existing_order['detail_fetched_at'],
+        'timestamp': time.time(),
+        'from_cache': True
+    }
+
+
 # 便捷函数
-async def fetch_order_detail_simple(order_id: str, cookie_string: str = None, headless: bool = True) -> Optional[Dict[str, Any]]:
+async def fetch_order_detail_simple(order_id: str, cookie_string: str = None, headless: bool = True,
+                                    cookie_id: str = None, api_fetcher=None) -> Optional[Dict[str, Any]]:
     """
-    简单的订单详情获取函数（优化版：先检查数据库，再初始化浏览器）
+    简单的订单详情获取函数（先检查数据库缓存，同一订单的并发请求只获取一次）
 
     Args:
         order_id: 订单ID
         cookie_string: Cookie字符串，如果不提供则使用默认值
         headless: 是否无头模式
+        cookie_id: 账号ID，提供时复用浏览器池中该账号的上下文
+        api_fetcher: 可选的无浏览器获取函数（如签名mtop接口），成功时不再启动浏览器
 
     Returns:
         订单详情字典，包含以下字段：
@@ -676,59 +710,55 @@ async def fetch_order_detail_simple(order_id: str, cookie_string: str = None, he
         - timestamp: 获取时间戳
         失败时返回None
     """
-    # 先检查数据库中是否有有效数据
-    try:
-        from db_manager import db_manager
-        existing_order = db_manager.get_order_by_id(order_id)
-
-        if existing_order:
-            # 检查金额字段是否有效
-            amount = existing_order.get('amount', '')
-            amount_valid = False
-
-            if amount:
-                amount_clean = str(amount).replace('¥', '').replace('￥', '').replace('$', '').strip()
-                try:
-                    amount_value = float(amount_clean)
-                    amount_valid = amount_value > 0
-                except (ValueError, TypeError):
-                    amount_valid = False
-
-            if amount_valid:
-                logger.info(f"📋 订单 {order_id} 已存在于数据库中且金额有效({amount})，直接返回缓存数据")
-                print(f"✅ 订单 {order_id} 使用缓存数据，跳过浏览器获取")
-
-                # 构建返回格式
-                result = {
-                    'order_id': existing_order['order_id'],
-                    'url': f"https://www.goofish.com/order-detail?orderId={order_id}&role=seller",
-                    'title': f"订单详情 - {order_id}",
-                    'sku_info': {
-                        'spec_name': existing_order.get('spec_name', ''),
-                        'spec_value': existing_order.get('spec_value', ''),
-                        'quantity': existing_order.get('quantity', ''),
-                        'amount': existing_order.get('amount', '')
-                    },
-                    'spec_name': existing_order.get('spec_name', ''),
-                    'spec_value': existing_order.get('spec_value', ''),
-                    'quantity': existing_order.get('quantity', ''),
-                    'amount': existing_order.get('amount', ''),
-                    'order_status': existing_order.get('order_status', 'unknown'),  # 添加订单状态
-                    'timestamp': time.time(),
-                    'from_cache': True
-                }
-                return result
-            else:
-                logger.info(f"📋 订单 {order_id} 存在于数据库中但金额无效({amount})，需要重新获取")
-                print(f"⚠️ 订单 {order_id} 金额无效，重新获取详情...")
-    except Exception as e:
-        logger.warning(f"检查数据库缓存失败: {e}")
+    # 先检查数据库中是否有新鲜的有效数据
+    cached = get_cached_order_detail(order_id)
+    if cached:
+        return cached
+
+    # 同一订单的并发请求共享同一次获取
+    return await _order_detail_flight.do(
+        order_id,
+        lambda: _fetch_order_detail_uncached(order_id, cookie_string, headless, cookie_id, api_fetcher)
+    )
+
+
+async def _fetch_order_detail_uncached(order_id: str, cookie_string: str, headless: bool,
+                                       cookie_id: str, api_fetcher) -> Optional[Dict[str, Any]]:
+    """跳过缓存直接获取订单详情（接口优先，失败时使用浏览器）"""
+    # 优先通过接口获取，只有接口失败（如需要验证）时才使用浏览器
+    if api_fetcher is not None:
+        result = await api_fetcher(order_id)
+        if result:
+            return result
+        logger.info(f"订单 {order_id} 接口获取失败，回退到浏览器获取")
 
     # 数据库中没有有效数据，使用浏览器获取
     logger.info(f"🌐 订单 {order_id} 需要浏览器获取，开始初始化浏览器...")
     print(f"🔍 订单 {order_id} 开始浏览器获取详情...")
 
     fetcher = OrderDetailFetcher(cookie_string, headless)
+
+    # 无头模式从共享浏览器池租用页面；有头模式（调试）仍单独启动浏览器
+    if headless:
+        from utils.browser_pool import browser_pool
+        try:
+            if cookie_id:
+                async with browser_pool.page(cookie_id, cookie_string, extra_headers=fetcher.headers,
+                                             purpose='order_detail') as page:
+                    fetcher.attach_page(page)
+                    return await fetcher.fetch_order_detail(order_id)
+            else:
+                async with browser_pool.isolated_context(cookie_string, purpose='order_detail', owner=order_id) as context:
+                    page = await context.new_page()
+                    await page.set_extra_http_headers(fetcher.headers)
+                    fetcher.attach_page(page)
+                    return await fetcher.fetch_order_detail(order_id)
+        except Exception as e:
+            logger.error(f"从浏览器池获取订单详情失败: {e}")
+            return None
+        finally:
+            await fetcher.close()
+
     try:
         if await fetcher.init_browser(headless=headless):
             return await fetcher.fetch_order_detail(order_id)
@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config import REFRESH_SCHEDULER
+
+# 回调返回 (下次执行间隔秒数, 本次是否成功)，返回None表示停止调度
+RefreshCallback = Callable[[], Awaitable[Optional[Tuple[float, bool]]]]
+
+
+class RefreshJob:
+    """单个账号的一类刷新任务（截止时间由调度器统一管理）"""
+
+    __slots__ = ('kind', 'owner', 'callback', 'due_at', 'failures', 'runs', 'running',
+                 'last_run_at', 'last_ok', 'seq', 'task', 'finished')
+
+    def __init__(self, kind: str, owner: str, callback: RefreshCallback, due_at: float, seq: int):
+        self.kind = kind
+        self.owner = owner
+        self.callback = callback
+        self.due_at = due_at
+        self.failures = 0  # 连续失败次数，失败越多越优先
+        self.runs = 0
+        self.running = False
+        self.last_run_at = None
+        self.last_ok = None
+        self.seq = seq
+        self.task: Optional[asyncio.Task] = None
+        self.finished = asyncio.get_running_loop().create_future()  # 停止调度时完成
+
+    async def wait_finished(self):
+        await asyncio.shield(self.finished)
+
+
+class RefreshScheduler:
+    """全局刷新调度器
+
+    所有账号的 Token/Cookie 刷新截止时间由一个定时协程统一管理，取代每个账号每分钟轮询的循环：
+    - 每次计算出的间隔随机提前一部分（jitter_ratio），首次 Cookie 刷新在 initial_spread 内随机分散，
+      避免同时启动的账号同时刷新
+    - 按刷新类型限制全局并发数（Cookie刷新需要启动浏览器）
+    - 同时到期时，连续失败次数多的账号优先，其次是离截止时间最近（超期最久）的账号
+    """
+
+    def __init__(self):
+        self.jitter_ratio = float(REFRESH_SCHEDULER.get('jitter_ratio', 0.1))
+        self.initial_spread = float(REFRESH_SCHEDULER.get('initial_spread', 600))
+        self.max_concurrent = {'token': 2, 'cookie': 1, **REFRESH_SCHEDULER.get('max_concurrent', {})}
+        self._jobs: Dict[Tuple[str, str], RefreshJob] = {}
+        self._running: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._stats = {'runs': 0, 'failures': 0, 'deferred': 0}
+
+    def jittered(self, delay: float) -> float:
+        """随机提前一部分，只会早于截止时间执行"""
+        return max(0.0, delay * random.uniform(1 - self.jitter_ratio, 1))
+
+    def register(self, kind: str, owner: str, callback: RefreshCallback, first_delay: float = 0) -> RefreshJob:
+        """注册刷新任务（同一账号同一类型重复注册时替换旧任务）"""
+        old = self._jobs.get((kind, owner))
+        if old is not None:
+            self.unregister(old)
+        job = RefreshJob(kind, owner, callback, time.time() + self.jittered(first_delay), next(self._seq))
+        self._jobs[(kind, owner)] = job
+        self._ensure_timer()
+        self._wakeup.set()
+        return job
+
+    def unregister(self, job: RefreshJob):
+        """注销刷新任务，正在执行的刷新随之取消"""
+        if self._jobs.get((job.kind, job.owner)) is job:
+            del self._jobs[(job.kind, job.owner)]
+        if job.task is not None and not job.task.done() and job.task is not asyncio.current_task():
+            job.task.cancel()
+        if not job.finished.done():
+            job.finished.set_result(None)
+
+    def _ensure_timer(self):
+        loop = asyncio.get_running_loop()
+        if self._timer is None or self._timer.done() or self._timer.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._timer = loop.create_task(self._timer_loop())
+
+    async def _timer_loop(self):
+        while self._jobs:
+            try:
+                now = time.time()
+                due = [job for job in self._jobs.values() if not job.running and job.due_at <= now]
+                due.sort(key=lambda job: (-job.failures, job.due_at, job.seq))
+                for job in due:
+                    limit = int(self.max_concurrent.get(job.kind, 1))
+                    if self._running.get(job.kind, 0) >= limit:
+                        self._stats['deferred'] += 1
+                        continue
+                    self._start(job)
+
+                waiting = [job.due_at for job in self._jobs.values() if not job.running and job.due_at > now]
+                timeout = max(0.0, min(waiting) - now) if waiting else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"刷新调度器异常: {e}")
+                await asyncio.sleep(1)
+
+    def _start(self, job: RefreshJob):
+        job.running = True
+        self._running[job.kind] = self._running.get(job.kind, 0) + 1
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: RefreshJob):
+        result = None
+        try:
+            job.runs += 1
+            job.last_run_at = time.time()
+            self._stats['runs'] += 1
+            result = await job.callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"【{job.owner}】{job.kind}刷新任务异常: {e}")
+            result = (60, False)
+        finally:
+            job.running = False
+            self._running[job.kind] -= 1
+            if result is None:
+                self.unregister(job)
+            else:
+                delay, ok = result
+                job.last_ok = ok
+                job.failures = 0 if ok else job.failures + 1
+                if not ok:
+                    self._stats['failures'] += 1
+                job.due_at = time.time() + self.jittered(delay)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def get_schedule(self, limit: int = 100) -> Dict[str, Any]:
+        """获取即将执行的刷新计划（按截止时间排序）"""
+        now = time.time()
+        jobs: List[RefreshJob] = sorted(list(self._jobs.values()), key=lambda job: job.due_at)
+        return {
+            'jobs': len(jobs),
+            'running': dict(self._running),
+            'max_concurrent': self.max_concurrent,
+            **self._stats,
+            'upcoming': [
+                {
+                    'kind': job.kind,
+                    'owner': job.owner,
+                    'due_in': round(job.due_at - now, 1),
+                    'running': job.running,
+                    'failures': job.failures,
+                    'runs': job.runs,
+                    'last_ok': job.last_ok,
+                }
+                for job in jobs[:limit]
+            ],
+        }
+
+
+# 全局刷新调度器
+refresh_scheduler = RefreshScheduler()
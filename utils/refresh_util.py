@@ -16,6 +16,7 @@ import time
 import random
 from loguru import logger
 from DrissionPage import Chromium, ChromiumOptions
+from utils.slider_vision import slider_vision
 
 def log_captcha_event(cookie_id: str, event_type: str, success: bool = None, details: str = ""):
     """简单记录滑块验证事件到txt文件"""
@@ -1207,7 +1208,9 @@ class DrissionHandler:
 
                     self._slide()  # 处理滑块验证码
 
-                    if not self._detect_captcha():
+                    captcha_present = self._detect_captcha()
+                    slider_vision.confirm_sample(getattr(self, '_vision_result', None), not captcha_present)
+                    if not captcha_present:
                         logger.info("滑块验证成功，开始获取 cookies")
 
                         # 方法1: 尝试从监听数据获取新的cookies
@@ -1314,10 +1317,34 @@ class DrissionHandler:
                 pass
 
 
+    def _vision_slide_distance(self):
+        """截图识别滑块按钮到轨道末端的距离，未启用或置信度不足返回None"""
+        if not slider_vision.enabled:
+            return None
+        try:
+            track = self.page.ele("#nc_1__scale_text", timeout=2)
+            button = self.page.ele("#nc_1_n1z", timeout=2)
+            if not track or not button:
+                return None
+            return slider_vision.slide_to_end_distance(
+                track.get_screenshot(as_bytes='png'), button.get_screenshot(as_bytes='png'),
+                {'width': track.rect.size[0]}, getattr(self, 'cookie_id', 'unknown')
+            )
+        except Exception as e:
+            logger.debug(f"滑块截图识别失败，使用轨道宽度估算: {e}")
+            return None
+
     def _calculate_slide_distance(self):
         """
-        动态计算滑动距离，适应不同分辨率
+        动态计算滑动距离，适应不同分辨率（启用图像识别时优先使用识别出的实际距离）
         """
+        self._vision_result = self._vision_slide_distance()
+        if self._vision_result:
+            # 滑到底类验证：滑过末端会被轨道截住，多滑一点避免差几像素
+            final_distance = int(self._vision_result['distance']) + random.randint(5, 15)
+            logger.info(f"基于图像识别计算滑动距离: {self._vision_result['distance']:.1f}px, 最终距离: {final_distance}px")
+            return final_distance
+
         try:
             # 获取页面尺寸
             page_width = self.page.size[0] if hasattr(self.page, 'size') else 1920
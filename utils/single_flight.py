@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """异步单飞（single-flight）去重
+
+    相同 key 的并发调用只执行一次，其余调用等待并共享同一个结果（或异常）；
+    执行完成后立即移除记录，字典大小只与正在执行的 key 数量有关，无需定时清理。
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {'calls': 0, 'executions': 0, 'shared': 0, 'errors': 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入 key 对应的调用
+
+        Args:
+            key: 去重键
+            func: 无参协程函数，只有第一个调用方会执行
+        """
+        loop = asyncio.get_running_loop()
+        self._stats['calls'] += 1
+
+        while True:
+            future = self._inflight.get(key)
+            # 其他事件循环中的调用无法跨循环等待，直接单独执行
+            if future is None or future.get_loop() is not loop:
+                break
+            self._stats['shared'] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 执行方被取消时重新竞争执行权，自身被取消时向上传播
+                if future.cancelled():
+                    continue
+                raise
+
+        if future is not None:
+            self._stats['executions'] += 1
+            return await func()
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        self._stats['executions'] += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self._stats['errors'] += 1
+            future.set_exception(e)
+            # 没有等待者时标记异常已读取，避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取去重统计"""
+        return {'name': self.name, 'inflight': len(self._inflight), **self._stats}
@@ -0,0 +1,311 @@
+"""
+滑块验证图像识别（可选，依赖 NumPy 和 Pillow，未安装或未启用时调用方回退到DOM几何计算）
+
+- 拼图类验证：用拼图块的边缘图在背景图中做归一化互相关（NCC）匹配，定位缺口
+- 滑到底类验证（nc）：在轨道截图中匹配滑块按钮，测量按钮到轨道末端的实际像素距离
+- 匹配全程向量化：滑动窗口 + 积分图计算窗口均值和方差，不逐像素循环
+- 可选保存截图和识别结果并记录验证是否通过；人工在 meta.json 中填写 expected（真实距离）后
+  才进入离线评估集（benchmarks/slider_vision_eval.py）
+"""
+
+import io
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from config import SLIDER_VERIFICATION
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    from PIL import Image
+except ImportError:  # 可选依赖
+    np = None
+
+VISION_AVAILABLE = np is not None
+
+VISION = SLIDER_VERIFICATION.get('vision', {}) or {}
+
+# 拼图类验证的背景图和拼图块选择器（未找到背景图时按滑到底类处理）
+DEFAULT_IMAGE_SELECTORS = [
+    'canvas[class*="puzzle"]',
+    'img[class*="puzzle-bg"]',
+    'img[class*="captcha-bg"]',
+    '[class*="puzzle"] img',
+]
+DEFAULT_PIECE_SELECTORS = [
+    'img[class*="puzzle-piece"]',
+    'img[class*="slider-piece"]',
+    'canvas[class*="piece"]',
+]
+
+
+def decode_gray(image_bytes: bytes) -> Tuple['np.ndarray', Optional['np.ndarray']]:
+    """解码图片为灰度矩阵（float32），有透明通道时一并返回alpha"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        alpha = None
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            rgba = image.convert('RGBA')
+            alpha = np.asarray(rgba, dtype=np.float32)[..., 3] / 255.0
+            gray = np.asarray(rgba.convert('L'), dtype=np.float32)
+        else:
+            gray = np.asarray(image.convert('L'), dtype=np.float32)
+    return gray, alpha
+
+
+def edge_map(gray: 'np.ndarray') -> 'np.ndarray':
+    """Sobel 梯度幅值（与输入同尺寸）"""
+    padded = np.pad(gray, 1, mode='edge')
+    gx = (padded[:-2, 2:] + 2 * padded[1:-1, 2:] + padded[2:, 2:]
+          - padded[:-2, :-2] - 2 * padded[1:-1, :-2] - padded[2:, :-2])
+    gy = (padded[2:, :-2] + 2 * padded[2:, 1:-1] + padded[2:, 2:]
+          - padded[:-2, :-2] - 2 * padded[:-2, 1:-1] - padded[:-2, 2:])
+    return np.hypot(gx, gy)
+
+
+def _window_sums(image: 'np.ndarray', h: int, w: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """用积分图计算所有 h*w 窗口的和与平方和"""
+    integral = np.pad(image, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    integral_sq = np.pad(image * image, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+
+    def box(table):
+        return table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+
+    return box(integral), box(integral_sq)
+
+
+def match_template(image: 'np.ndarray', template: 'np.ndarray') -> Tuple[int, int, float]:
+    """归一化互相关模板匹配，返回 (x, y, score)，score 范围 [-1, 1]"""
+    h, w = template.shape
+    if image.shape[0] < h or image.shape[1] < w:
+        raise ValueError("模板尺寸大于搜索图像")
+    count = float(h * w)
+    t = template - template.mean()
+    t_norm = float(np.sqrt((t * t).sum()))
+    if t_norm == 0:
+        return 0, 0, 0.0
+
+    # 模板已去均值，分子不需要再减窗口均值
+    windows = sliding_window_view(image, (h, w))
+    numerator = np.einsum('ijkl,kl->ij', windows, t, optimize=True)
+    sums, squares = _window_sums(image, h, w)
+    variance = squares - sums * sums / count
+    denominator = np.sqrt(np.clip(variance, 1e-6, None)) * t_norm
+    scores = numerator / denominator
+    y, x = np.unravel_index(int(np.argmax(scores)), scores.shape)
+    return int(x), int(y), float(scores[y, x])
+
+
+def _crop_to_alpha(gray: 'np.ndarray', alpha: Optional['np.ndarray']):
+    """按透明通道裁掉拼图块四周的空白，返回 (灰度, 掩码)"""
+    if alpha is None:
+        return gray, None
+    rows = np.where(alpha.max(axis=1) > 0.1)[0]
+    cols = np.where(alpha.max(axis=0) > 0.1)[0]
+    if rows.size == 0 or cols.size == 0:
+        return gray, None
+    top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+    return gray[top:bottom, left:right], (alpha[top:bottom, left:right] > 0.1).astype(np.float32)
+
+
+def locate_gap(background_bytes: bytes, piece_bytes: Optional[bytes] = None, min_x: int = 0) -> Dict[str, Any]:
+    """在背景图中定位缺口，返回缺口左边缘的x坐标（图片像素）和置信度
+
+    有拼图块图片时做边缘模板匹配；没有时取竖直边缘最强的列（缺口边缘）
+    """
+    start = time.perf_counter()
+    background, _ = decode_gray(background_bytes)
+    edges = edge_map(background)
+
+    if piece_bytes:
+        piece, alpha = decode_gray(piece_bytes)
+        piece, mask = _crop_to_alpha(piece, alpha)
+        piece_edges = edge_map(piece)
+        if mask is not None:
+            # 掩码边界本身就是拼图形状，轮廓附近的梯度最有区分度
+            piece_edges = piece_edges + edge_map(mask * 255.0)
+        search = edges[:, min_x:]
+        x, y, score = match_template(search, piece_edges)
+        x += min_x
+        method = 'template'
+    else:
+        # 竖直方向的边缘强度（只用x方向梯度），按列求和
+        padded = np.pad(background, 1, mode='edge')
+        gx = np.abs(padded[1:-1, 2:] - padded[1:-1, :-2])
+        profile = gx.sum(axis=0)
+        profile[:min_x] = 0
+        x = int(np.argmax(profile))
+        y = 0
+        baseline = float(np.median(profile[min_x:])) if profile[min_x:].size else 0.0
+        peak = float(profile[x])
+        # 峰值相对中位数越突出越可信，映射到 [0, 1)
+        ratio = peak / baseline if baseline > 0 else 0.0
+        score = 1 - 1 / ratio if ratio > 1 else 0.0
+        method = 'edge_profile'
+
+    return {
+        'method': method,
+        'x': x,
+        'y': y,
+        'score': round(score, 4),
+        'image_width': int(background.shape[1]),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def measure_slide_to_end(track_bytes: bytes, button_bytes: bytes) -> Dict[str, Any]:
+    """在轨道截图中匹配滑块按钮，返回按钮右边缘到轨道末端的距离（图片像素）"""
+    start = time.perf_counter()
+    track, _ = decode_gray(track_bytes)
+    button, _ = decode_gray(button_bytes)
+    # 按钮截图可能比轨道略高，裁成轨道高度
+    if button.shape[0] > track.shape[0]:
+        offset = (button.shape[0] - track.shape[0]) // 2
+        button = button[offset:offset + track.shape[0]]
+    if button.shape[1] > track.shape[1]:
+        raise ValueError("按钮截图宽度大于轨道")
+    x, y, score = match_template(edge_map(track), edge_map(button))
+    button_width = int(button.shape[1])
+    return {
+        'method': 'slide_to_end',
+        'x': x,
+        'y': y,
+        'score': round(score, 4),
+        'button_width': button_width,
+        'image_width': int(track.shape[1]),
+        'distance_px': int(track.shape[1]) - (x + button_width),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+class SliderVision:
+    """滑块识别入口：判断是否启用、计算CSS像素距离、保存评估样本"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.enabled = bool(settings.get('enabled', False)) and VISION_AVAILABLE
+        self.min_score = settings.get('min_score', 0.5)
+        self.save_samples = settings.get('save_samples', False)
+        self.samples_dir = settings.get('samples_dir', 'slider_samples')
+        self.image_selectors = settings.get('image_selectors') or DEFAULT_IMAGE_SELECTORS
+        self.piece_selectors = settings.get('piece_selectors') or DEFAULT_PIECE_SELECTORS
+        self._stats = {'attempts': 0, 'accepted': 0, 'low_score': 0, 'errors': 0,
+                       'verified_success': 0, 'verified_fail': 0, 'elapsed_ms': 0.0}
+        if settings.get('enabled') and not VISION_AVAILABLE:
+            logger.warning("滑块图像识别已启用，但未安装 numpy/Pillow，将使用DOM几何计算滑动距离")
+
+    def gap_distance(self, background_bytes: bytes, background_box: Dict[str, float],
+                     piece_bytes: Optional[bytes] = None, piece_box: Optional[Dict[str, float]] = None,
+                     owner: str = '') -> Optional[Dict[str, Any]]:
+        """拼图类：返回拼图块需要移动的CSS像素距离"""
+        def compute():
+            result = locate_gap(background_bytes, piece_bytes,
+                                min_x=self._piece_right_px(background_box, piece_box, background_bytes))
+            scale = background_box['width'] / result['image_width']
+            piece_offset = piece_box['x'] - background_box['x'] if piece_box else 0
+            result['distance'] = result['x'] * scale - piece_offset
+            return result
+
+        images = {'background.png': background_bytes}
+        if piece_bytes:
+            images['piece.png'] = piece_bytes
+        return self._run('gap', compute, images, owner)
+
+    def slide_to_end_distance(self, track_bytes: bytes, button_bytes: bytes, track_box: Dict[str, float],
+                              owner: str = '') -> Optional[Dict[str, Any]]:
+        """滑到底类：返回按钮需要移动的CSS像素距离"""
+        def compute():
+            result = measure_slide_to_end(track_bytes, button_bytes)
+            result['distance'] = result['distance_px'] * track_box['width'] / result['image_width']
+            return result
+
+        return self._run('slide_to_end', compute, {'track.png': track_bytes, 'button.png': button_bytes}, owner)
+
+    @staticmethod
+    def _piece_right_px(background_box, piece_box, background_bytes) -> int:
+        """缺口不会和拼图块初始位置重叠，搜索从拼图块右侧开始"""
+        if not piece_box:
+            return 0
+        with Image.open(io.BytesIO(background_bytes)) as image:
+            image_width = image.width
+        scale = image_width / background_box['width']
+        return max(0, int((piece_box['x'] + piece_box['width'] - background_box['x']) * scale))
+
+    def _run(self, kind: str, compute, images: Dict[str, bytes], owner: str) -> Optional[Dict[str, Any]]:
+        self._stats['attempts'] += 1
+        try:
+            result = compute()
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.debug(f"【{owner}】滑块图像识别失败: {e}")
+            return None
+        self._stats['elapsed_ms'] += result['elapsed_ms']
+        result['kind'] = kind
+        if self.save_samples:
+            result['sample'] = self._save_sample(kind, images, result, owner)
+        if result['score'] < self.min_score:
+            self._stats['low_score'] += 1
+            logger.info(f"【{owner}】滑块图像识别置信度过低({result['score']:.2f} < {self.min_score})，使用DOM几何计算")
+            return None
+        self._stats['accepted'] += 1
+        logger.info(f"【{owner}】滑块图像识别({result['method']}): 距离{result['distance']:.1f}px, "
+                    f"置信度{result['score']:.2f}, 耗时{result['elapsed_ms']:.1f}ms")
+        return result
+
+    def _save_sample(self, kind: str, images: Dict[str, bytes], result: Dict[str, Any], owner: str) -> Optional[str]:
+        """保存截图和识别结果，验证结束后通过 confirm_sample 标记是否成功"""
+        try:
+            sample_dir = os.path.join(self.samples_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{owner}_{kind}_{os.getpid()}_{int(time.time() * 1000) % 1000}")
+            os.makedirs(sample_dir, exist_ok=True)
+            for name, data in images.items():
+                with open(os.path.join(sample_dir, name), 'wb') as f:
+                    f.write(data)
+            meta = {key: value for key, value in result.items() if key != 'sample'}
+            meta['predicted'] = result['distance_px'] if kind == 'slide_to_end' else result['x']
+            meta['verified'] = None
+            with open(os.path.join(sample_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            return sample_dir
+        except Exception as e:
+            logger.debug(f"【{owner}】保存滑块识别样本失败: {e}")
+            return None
+
+    def confirm_sample(self, result: Optional[Dict[str, Any]], success: bool):
+        """记录使用识别距离后的验证结果
+
+        验证通过只说明距离在验证码的容差内，不把预测值当作标注（否则评估集只是在用模型评估模型自己），
+        样本需人工填写 expected 后才参与评估
+        """
+        if not result:
+            return
+        self._stats['verified_success' if success else 'verified_fail'] += 1
+        sample_dir = result.get('sample')
+        if not sample_dir:
+            return
+        meta_path = os.path.join(sample_dir, 'meta.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['verified'] = bool(success)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.debug(f"更新滑块识别样本失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取识别次数、采用率和平均耗时"""
+        attempts = self._stats['attempts']
+        return {
+            'enabled': self.enabled,
+            'available': VISION_AVAILABLE,
+            'min_score': self.min_score,
+            **{key: value for key, value in self._stats.items() if key != 'elapsed_ms'},
+            'avg_elapsed_ms': round(self._stats['elapsed_ms'] / attempts, 2) if attempts else 0,
+        }
+
+
+# 创建全局滑块图像识别实例
+slider_vision = SliderVision(VISION)
@@ -0,0 +1,221 @@
+import asyncio
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config import STARTUP
+from db_manager import db_manager
+
+# 账号启动状态
+QUEUED = 'queued'        # 排队等待启动
+STARTING = 'starting'    # 任务已启动，正在连接
+READY = 'ready'          # 连接就绪
+SLOW = 'slow'            # 超过就绪等待时间仍未连接，已让出启动名额（连接继续进行）
+FAILED = 'failed'        # 连接失败或任务退出
+SKIPPED = 'skipped'      # 启动时账号已禁用、已删除或任务已由其他途径启动
+
+
+class AccountStartup:
+    """单个账号的启动进度"""
+
+    __slots__ = ('cookie_id', 'launcher', 'last_order_at', 'state', 'queued_at', 'started_at', 'ready_at', 'error')
+
+    def __init__(self, cookie_id: str, launcher: Callable[[], bool], last_order_at: Optional[str]):
+        self.cookie_id = cookie_id
+        self.launcher = launcher
+        self.last_order_at = last_order_at
+        self.state = QUEUED
+        self.queued_at = time.time()
+        self.started_at = None
+        self.ready_at = None
+        self.error = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'cookie_id': self.cookie_id,
+            'state': self.state,
+            'last_order_at': self.last_order_at,
+            'wait_seconds': round(self.started_at - self.queued_at, 2) if self.started_at else None,
+            'connect_seconds': round(self.ready_at - self.started_at, 2) if self.ready_at and self.started_at else None,
+            'error': self.error,
+        }
+
+
+def _percentiles(samples) -> Dict[str, Any]:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'p50_s': round(ordered[count // 2], 2),
+        'p95_s': round(ordered[min(count - 1, int(count * 0.95))], 2),
+        'max_s': round(ordered[-1], 2),
+    }
+
+
+class StartupOrchestrator:
+    """分批启动账号，避免所有账号在同一时刻连接、刷新Token
+
+    - 最近有订单的账号优先启动
+    - 同时处于连接中的账号数量有上限：从 initial_parallel 开始，每有一个账号连接就绪加一，
+      直到 max_parallel；账号连接失败时减半，降低触发风控的概率
+    - 相邻两次启动至少间隔 start_interval 秒（附加随机抖动）
+    - 超过 ready_timeout 秒仍未就绪的账号让出名额，连接在后台继续
+    """
+
+    def __init__(self):
+        self.max_parallel = max(1, int(STARTUP.get('max_parallel', 3)))
+        self.initial_parallel = min(self.max_parallel, max(1, int(STARTUP.get('initial_parallel', 1))))
+        self.start_interval = float(STARTUP.get('start_interval', 2))
+        self.start_jitter = float(STARTUP.get('start_jitter', 1))
+        self.ready_timeout = float(STARTUP.get('ready_timeout', 120))
+
+        self._accounts: Dict[str, AccountStartup] = {}
+        self._inflight = set()
+        self._parallel = self.initial_parallel
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self, accounts: List[Tuple[str, Callable[[], bool]]]):
+        """按优先级排队启动账号，launcher 启动账号任务，返回False表示跳过"""
+        try:
+            last_orders = db_manager.get_last_order_times()
+        except Exception as e:
+            logger.warning(f"获取账号最近订单时间失败，按默认顺序启动: {e}")
+            last_orders = {}
+
+        entries = [AccountStartup(cookie_id, launcher, last_orders.get(cookie_id)) for cookie_id, launcher in accounts]
+        # 最近有订单的账号优先（时间字符串可直接比较），没有订单的保持原有顺序排在最后
+        entries.sort(key=lambda entry: entry.last_order_at or '', reverse=True)
+        for entry in entries:
+            self._accounts[entry.cookie_id] = entry
+
+        self.started_at = time.time()
+        self.finished_at = None
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run(entries))
+        logger.info(f"账号分批启动: 共 {len(entries)} 个账号，并发上限 {self.max_parallel}，"
+                    f"启动间隔 {self.start_interval} 秒")
+
+    async def _wait_changed(self, timeout: float):
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _release_slow(self):
+        now = time.time()
+        for cookie_id in list(self._inflight):
+            entry = self._accounts[cookie_id]
+            if now - entry.started_at >= self.ready_timeout:
+                entry.state = SLOW
+                self._inflight.discard(cookie_id)
+                logger.warning(f"【{cookie_id}】启动 {self.ready_timeout:.0f} 秒仍未连接就绪，让出启动名额")
+
+    async def _run(self, entries: List[AccountStartup]):
+        last_start = 0.0
+        try:
+            for entry in entries:
+                while entry.state == QUEUED:
+                    self._release_slow()
+                    if len(self._inflight) < self._parallel:
+                        break
+                    await self._wait_changed(timeout=1)
+
+                delay = last_start + self.start_interval + random.uniform(0, self.start_jitter) - time.time()
+                if delay > 0 and entry.state == QUEUED:
+                    await asyncio.sleep(delay)
+
+                # 排队期间已通过其他途径启动并就绪的账号不再启动
+                if entry.state != QUEUED:
+                    continue
+
+                try:
+                    launched = entry.launcher()
+                except Exception as e:
+                    entry.state = FAILED
+                    entry.error = str(e)
+                    logger.error(f"【{entry.cookie_id}】启动账号任务失败: {e}")
+                    continue
+                if launched is False:
+                    entry.state = SKIPPED
+                    continue
+
+                last_start = time.time()
+                entry.started_at = last_start
+                entry.state = STARTING
+                self._inflight.add(entry.cookie_id)
+
+            while self._inflight:
+                self._release_slow()
+                await self._wait_changed(timeout=1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"账号分批启动异常: {e}")
+        finally:
+            self.finished_at = time.time()
+            summary = self.get_status(include_accounts=False)
+            logger.info(f"账号分批启动完成: 耗时 {self.finished_at - self.started_at:.1f} 秒，状态 {summary['states']}")
+
+    def mark_ready(self, cookie_id: str):
+        """账号连接就绪（重复调用无副作用），成功一个放宽一个并发名额"""
+        entry = self._accounts.get(cookie_id)
+        if entry is None or entry.state not in (QUEUED, STARTING, SLOW):
+            return
+        entry.state = READY
+        entry.ready_at = time.time()
+        if cookie_id in self._inflight:
+            self._inflight.discard(cookie_id)
+            self._parallel = min(self.max_parallel, self._parallel + 1)
+        if self._changed is not None:
+            self._changed.set()
+
+    def mark_failed(self, cookie_id: str, reason: str = ''):
+        """账号启动失败（连接达到最大失败次数或任务退出），并发名额减半"""
+        entry = self._accounts.get(cookie_id)
+        if entry is None or entry.state not in (STARTING, SLOW):
+            return
+        entry.state = FAILED
+        entry.error = reason
+        if cookie_id in self._inflight:
+            self._inflight.discard(cookie_id)
+            self._parallel = max(1, self._parallel // 2)
+        if self._changed is not None:
+            self._changed.set()
+
+    def get_status(self, cookie_ids=None, include_accounts: bool = True) -> Dict[str, Any]:
+        """获取启动进度和耗时统计，cookie_ids 不为空时只返回这些账号"""
+        entries = list(self._accounts.values())
+        if cookie_ids is not None:
+            cookie_ids = set(cookie_ids)
+            entries = [entry for entry in entries if entry.cookie_id in cookie_ids]
+
+        states: Dict[str, int] = {}
+        for entry in entries:
+            states[entry.state] = states.get(entry.state, 0) + 1
+        end = self.finished_at or time.time()
+        status = {
+            'running': self._task is not None and not self._task.done(),
+            'complete': self.finished_at is not None,
+            'elapsed_seconds': round(end - self.started_at, 2) if self.started_at else None,
+            'parallel': self._parallel,
+            'max_parallel': self.max_parallel,
+            'states': states,
+            'wait_time': _percentiles([entry.started_at - entry.queued_at for entry in entries if entry.started_at]),
+            'connect_time': _percentiles([entry.ready_at - entry.started_at
+                                          for entry in entries if entry.ready_at and entry.started_at]),
+        }
+        if include_accounts:
+            status['accounts'] = [entry.to_dict() for entry in entries]
+        return status
+
+
+# 全局账号启动编排器
+startup_orchestrator = StartupOrchestrator()
@@ -0,0 +1,159 @@
+"""
+账号Token缓存（可选，依赖 cryptography，未安装或未启用时每次启动都重新刷新Token）
+
+- Token 连同刷新时间、过期时间和 device_id 按账号保存在 account_tokens 表中，Token 使用 Fernet 加密
+- 启动时复用剩余有效期足够的 Token（并沿用获取该 Token 时的 device_id），连接时跳过刷新
+- 用缓存 Token 连接失败时删除该缓存，下次连接重新刷新
+- 记录每个账号从实例启动到连接就绪的耗时及 Token 来源
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import TOKEN_CACHE, TOKEN_REFRESH_INTERVAL
+from db_manager import db_manager
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # 可选依赖
+    Fernet = None
+
+CRYPTO_AVAILABLE = Fernet is not None
+
+
+def _percentiles(samples) -> Dict[str, Any]:
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'p50_s': round(ordered[count // 2], 2),
+        'p95_s': round(ordered[min(count - 1, int(count * 0.95))], 2),
+        'max_s': round(ordered[-1], 2),
+    }
+
+
+class TokenCache:
+    """按账号加密缓存Token，并统计启动到连接就绪的耗时"""
+
+    def __init__(self):
+        self.enabled = bool(TOKEN_CACHE.get('enabled', True)) and CRYPTO_AVAILABLE
+        # 缓存有效期不超过Token刷新间隔，与连接时判断Token是否需要刷新的标准一致
+        self.ttl = min(float(TOKEN_CACHE.get('ttl', TOKEN_REFRESH_INTERVAL)), float(TOKEN_REFRESH_INTERVAL))
+        self.min_remaining = float(TOKEN_CACHE.get('min_remaining', 300))
+        self.key_file = TOKEN_CACHE.get('key_file', 'data/token_cache.key')
+        self._fernet = None
+        self._connect_times: Dict[str, Dict[str, Any]] = {}
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'saved': 0, 'invalidated': 0, 'decrypt_errors': 0}
+
+        if TOKEN_CACHE.get('enabled', True) and not CRYPTO_AVAILABLE:
+            logger.warning("未安装 cryptography，Token缓存已禁用，每次启动都将重新刷新Token")
+
+    def _get_fernet(self):
+        """加载加密密钥：优先使用环境变量 TOKEN_CACHE_KEY，否则读取密钥文件（不存在时生成）"""
+        if self._fernet is None:
+            key = os.getenv('TOKEN_CACHE_KEY')
+            if key:
+                key = key.encode()
+            elif os.path.exists(self.key_file):
+                with open(self.key_file, 'rb') as f:
+                    key = f.read().strip()
+            else:
+                key = Fernet.generate_key()
+                key_dir = os.path.dirname(self.key_file)
+                if key_dir:
+                    os.makedirs(key_dir, exist_ok=True)
+                # 仅所有者可读写
+                fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(key)
+                logger.info(f"已生成Token缓存加密密钥: {self.key_file}")
+            self._fernet = Fernet(key)
+        return self._fernet
+
+    def load(self, cookie_id: str, myid: str) -> Optional[Dict[str, Any]]:
+        """获取可复用的Token，返回 {'token', 'device_id', 'refreshed_at', 'expires_at'}，没有可用Token返回None"""
+        if not self.enabled:
+            return None
+        record = db_manager.get_account_token(cookie_id)
+        if not record:
+            self._stats['misses'] += 1
+            return None
+        # 账号已更换（Cookie中的unb变化）或剩余有效期不足时不复用
+        if record['myid'] != myid or record['expires_at'] - time.time() < self.min_remaining:
+            self._stats['expired'] += 1
+            db_manager.delete_account_token(cookie_id)
+            return None
+        try:
+            token = self._get_fernet().decrypt(record['token_encrypted'].encode()).decode()
+        except (InvalidToken, ValueError) as e:
+            # 密钥更换后旧缓存无法解密，直接丢弃
+            logger.warning(f"【{cookie_id}】Token缓存解密失败，已丢弃: {e.__class__.__name__}")
+            self._stats['decrypt_errors'] += 1
+            db_manager.delete_account_token(cookie_id)
+            return None
+        self._stats['hits'] += 1
+        return {
+            'token': token,
+            'device_id': record['device_id'],
+            'refreshed_at': record['refreshed_at'],
+            'expires_at': record['expires_at'],
+        }
+
+    def save(self, cookie_id: str, myid: str, device_id: str, token: str, refreshed_at: float) -> bool:
+        """加密保存刷新得到的Token"""
+        if not self.enabled:
+            return False
+        try:
+            token_encrypted = self._get_fernet().encrypt(token.encode()).decode()
+        except Exception as e:
+            logger.error(f"【{cookie_id}】Token加密失败，跳过缓存: {e}")
+            return False
+        saved = db_manager.save_account_token(cookie_id, myid, device_id, token_encrypted,
+                                              refreshed_at, refreshed_at + self.ttl)
+        if saved:
+            self._stats['saved'] += 1
+        return saved
+
+    def invalidate(self, cookie_id: str):
+        """删除账号的缓存Token（缓存Token连接失败时调用）"""
+        if not self.enabled:
+            return
+        if db_manager.delete_account_token(cookie_id):
+            self._stats['invalidated'] += 1
+
+    def record_connected(self, cookie_id: str, seconds: float, token_source: str):
+        """记录实例启动到首次连接就绪的耗时，token_source 为 cache 或 refresh"""
+        self._connect_times[cookie_id] = {
+            'seconds': round(seconds, 2),
+            'token_source': token_source,
+            'connected_at': time.time(),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中情况和各账号启动到连接就绪的耗时（不包含Token内容）"""
+        now = time.time()
+        by_source: Dict[str, list] = {}
+        for item in self._connect_times.values():
+            by_source.setdefault(item['token_source'], []).append(item['seconds'])
+        return {
+            'enabled': self.enabled,
+            'crypto_available': CRYPTO_AVAILABLE,
+            'ttl': self.ttl,
+            'min_remaining': self.min_remaining,
+            **self._stats,
+            'cached_tokens': [
+                {**item, 'remaining': round(item['expires_at'] - now, 1)}
+                for item in db_manager.get_account_token_summary()
+            ] if self.enabled else [],
+            'time_to_connected': {source: _percentiles(samples) for source, samples in by_source.items()},
+            'accounts': dict(self._connect_times),
+        }
+
+
+# 全局Token缓存
+token_cache = TokenCache()
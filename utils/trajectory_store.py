@@ -0,0 +1,341 @@
+"""
+滑块轨迹学习数据存储
+
+- 每个账号的成功轨迹追加写入 trajectory_history/{账号}_success.jsonl，一次成功只追加一行
+- 文件行数超过保留窗口的2倍时压缩为最近的窗口记录（均摊 O(1)）
+- 内存中维护最近窗口记录的增量统计（均值、标准差、最值），参数优化不再读文件
+- 兼容旧版 {账号}_success.json：首次加载时导入并改名为 .bak
+"""
+
+import json
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List
+
+from loguru import logger
+
+
+TRAJECTORY_DIR = 'trajectory_history'
+
+# 每个账号保留的成功记录数（与旧版JSON文件保留的数量一致）
+HISTORY_WINDOW = 100
+
+# 参与均值/标准差统计的字段
+NUMERIC_FIELDS = ('total_steps', 'base_delay', 'slow_factor', 'acceleration_phase', 'fast_phase', 'slow_start_ratio')
+
+
+class AppendOnlyLog:
+    """JSONL 追加日志，支持原子重写（压缩）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lines = 0  # 当前文件中的记录数（加载时统计，追加时累加）
+
+    def append(self, record: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.lines += 1
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """逐行读取记录，跳过损坏的行（如进程中断时写了一半的最后一行）"""
+        self.lines = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.lines += 1
+                yield record
+
+    def rewrite(self, records: Iterable[Dict[str, Any]]):
+        """用给定记录原子替换日志文件"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(tmp_path, self.path)
+        self.lines = count
+
+
+class _RollingValue:
+    """滑动窗口内单个字段的均值与离差平方和（Welford 算法，支持移出最早的值）
+
+    不用 E[x²]-mean² 计算方差，避免数值相近时大数相减的精度损失
+    """
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+    def std(self) -> float:
+        if self.count < 2:
+            return 0
+        return math.sqrt(self.m2 / self.count)
+
+
+class TrajectoryHistory:
+    """单个账号最近成功记录的滑动窗口及增量统计"""
+
+    def __init__(self, window: int = HISTORY_WINDOW):
+        self.window = window
+        self.records: deque = deque()
+        self.values = {field: _RollingValue() for field in NUMERIC_FIELDS}
+        self.completion_used = 0
+        self.completion_steps = 0.0
+        self.point_total = 0
+        # 轨迹点数的单调队列，维护窗口内的最小/最大值
+        self._point_min: deque = deque()
+        self._point_max: deque = deque()
+        self._seq = 0
+
+    @staticmethod
+    def _number(record: Dict[str, Any], field: str) -> float:
+        try:
+            return float(record.get(field) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _point_count(record: Dict[str, Any]) -> int:
+        if 'trajectory_point_count' in record:
+            return int(record.get('trajectory_point_count') or 0)
+        return len(record.get('trajectory_points') or [])
+
+    def add(self, record: Dict[str, Any]):
+        seq = self._seq
+        self._seq += 1
+        self.records.append((seq, record))
+        for field, rolling in self.values.items():
+            rolling.add(self._number(record, field))
+        if record.get('completion_used'):
+            self.completion_used += 1
+            self.completion_steps += self._number(record, 'completion_steps')
+        points = self._point_count(record)
+        self.point_total += points
+        while self._point_min and self._point_min[-1][1] >= points:
+            self._point_min.pop()
+        self._point_min.append((seq, points))
+        while self._point_max and self._point_max[-1][1] <= points:
+            self._point_max.pop()
+        self._point_max.append((seq, points))
+
+        if len(self.records) > self.window:
+            self._evict()
+
+    def _evict(self):
+        seq, record = self.records.popleft()
+        for field, rolling in self.values.items():
+            rolling.remove(self._number(record, field))
+        if record.get('completion_used'):
+            self.completion_used -= 1
+            self.completion_steps -= self._number(record, 'completion_steps')
+        self.point_total -= self._point_count(record)
+        if self._point_min and self._point_min[0][0] == seq:
+            self._point_min.popleft()
+        if self._point_max and self._point_max[0][0] == seq:
+            self._point_max.popleft()
+
+    def summary(self) -> Dict[str, Any]:
+        """窗口内的统计结果"""
+        count = len(self.records)
+        result: Dict[str, Any] = {'count': count}
+        for field, rolling in self.values.items():
+            result[field] = {'avg': rolling.mean if count else 0, 'std': rolling.std()}
+        result['completion_usage_rate'] = self.completion_used / count if count else 0
+        result['avg_completion_steps'] = self.completion_steps / self.completion_used if self.completion_used else 0
+        result['trajectory_length_stats'] = [
+            self._point_min[0][1], self._point_max[0][1], self.point_total / count
+        ] if count else []
+        return result
+
+
+class TrajectoryStore:
+    """各账号成功轨迹的追加存储（线程安全）"""
+
+    def __init__(self, base_dir: str = TRAJECTORY_DIR, window: int = HISTORY_WINDOW):
+        self.base_dir = base_dir
+        self.window = window
+        self._histories: Dict[str, TrajectoryHistory] = {}
+        self._logs: Dict[str, AppendOnlyLog] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, user_id: str) -> TrajectoryHistory:
+        """首次访问时从文件加载（调用方需持有 self._lock）"""
+        history = self._histories.get(user_id)
+        if history is not None:
+            return history
+
+        history = TrajectoryHistory(self.window)
+        log = AppendOnlyLog(os.path.join(self.base_dir, f"{user_id}_success.jsonl"))
+        try:
+            for record in log.read():
+                history.add(record)
+            legacy_path = os.path.join(self.base_dir, f"{user_id}_success.json")
+            if os.path.exists(legacy_path):
+                history = self._import_legacy(user_id, legacy_path, history, log)
+        except Exception as e:
+            logger.warning(f"【{user_id}】加载历史成功数据失败: {e}")
+
+        if history.records:
+            logger.info(f"【{user_id}】加载历史成功数据: {len(history.records)}条记录")
+        self._histories[user_id] = history
+        self._logs[user_id] = log
+        return history
+
+    def _import_legacy(self, user_id: str, legacy_path: str, history: TrajectoryHistory,
+                       log: AppendOnlyLog) -> TrajectoryHistory:
+        """导入旧版整文件JSON格式的历史记录，返回合并后的窗口"""
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        existing = [record for _, record in history.records]
+        merged = (legacy if isinstance(legacy, list) else []) + existing
+        merged = merged[-self.window:]
+        merged_history = TrajectoryHistory(self.window)
+        for record in merged:
+            merged_history.add(record)
+        log.rewrite(merged)
+        os.replace(legacy_path, f"{legacy_path}.bak")
+        logger.info(f"【{user_id}】已将旧版历史成功数据转换为追加格式: {len(merged)}条记录")
+        return merged_history
+
+    def append(self, user_id: str, record: Dict[str, Any]):
+        """追加一条成功记录，并增量更新统计"""
+        with self._lock:
+            history = self._load(user_id)
+            log = self._logs[user_id]
+            log.append(record)
+            history.add(record)
+            if log.lines > self.window * 2:
+                # 压缩：只保留窗口内的记录
+                log.rewrite(record for _, record in history.records)
+
+    def summary(self, user_id: str) -> Dict[str, Any]:
+        """获取账号最近成功记录的统计"""
+        with self._lock:
+            return self._load(user_id).summary()
+
+    def records(self, user_id: str) -> List[Dict[str, Any]]:
+        """获取账号最近的成功记录"""
+        with self._lock:
+            return [record for _, record in self._load(user_id).records]
+
+
+class CounterLog:
+    """计数器快照 + 追加日志
+
+    每次计数只追加一行，累计到一定条数时写一次快照；加载时快照 + 重放日志。
+    日志按代编号（{名称}.log.jsonl、{名称}.1.log.jsonl ...），快照记录它已包含到哪一代：
+    压缩时先切换到新一代日志，再写入快照，最后删除旧日志。任何一步中断，
+    加载时都只重放快照之后的日志，既不会丢失也不会重复计数。
+    """
+
+    def __init__(self, snapshot_path: str, compact_every: int = 200):
+        self.snapshot_path = snapshot_path
+        self._log_base = os.path.splitext(snapshot_path)[0]
+        self.generation = 0
+        self.log = AppendOnlyLog(self._log_path(0))
+        self.compact_every = compact_every
+
+    def _log_path(self, generation: int) -> str:
+        if generation == 0:
+            return f"{self._log_base}.log.jsonl"
+        return f"{self._log_base}.{generation}.log.jsonl"
+
+    def _log_generations(self) -> List[int]:
+        """磁盘上已有日志的代编号（升序）"""
+        directory = os.path.dirname(self._log_base) or '.'
+        prefix = os.path.basename(self._log_base) + '.'
+        generations = []
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if not (name.startswith(prefix) and name.endswith('.log.jsonl')):
+                    continue
+                middle = name[len(prefix):-len('.log.jsonl')]
+                if middle == '':
+                    generations.append(0)
+                elif middle.isdigit():
+                    generations.append(int(middle))
+        return sorted(generations)
+
+    def load(self, counters: Dict[str, Dict[str, int]], apply) -> Dict[str, Dict[str, int]]:
+        """读取快照到 counters，再对快照之后各代日志中的每条记录调用 apply(counters, record)"""
+        covered = -1  # 快照已包含的最后一代日志
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if isinstance(snapshot.get('counters'), dict) and 'covered_generation' in snapshot:
+                counters.update(snapshot['counters'])
+                covered = int(snapshot['covered_generation'])
+            else:
+                # 旧版快照只有计数器本身，压缩后日志已清空，当前日志均未包含
+                counters.update(snapshot)
+
+        generations = self._log_generations()
+        for generation in generations:
+            log = AppendOnlyLog(self._log_path(generation))
+            if generation <= covered:
+                # 已包含在快照中（压缩时删除旧日志前中断），直接删除
+                os.remove(log.path)
+                continue
+            for record in log.read():
+                apply(counters, record)
+            self.generation, self.log = generation, log
+        if self.generation <= covered:
+            self.generation = covered + 1
+            self.log = AppendOnlyLog(self._log_path(self.generation))
+        return counters
+
+    def append(self, record: Dict[str, Any], counters: Dict[str, Dict[str, int]]):
+        self.log.append(record)
+        if self.log.lines >= self.compact_every:
+            self.compact(counters)
+
+    def compact(self, counters: Dict[str, Dict[str, int]]):
+        """切换到新一代日志，写入包含旧日志的快照后删除旧日志"""
+        old_logs = [self._log_path(generation) for generation in self._log_generations()
+                    if generation <= self.generation]
+        covered = self.generation
+        self.generation += 1
+        self.log = AppendOnlyLog(self._log_path(self.generation))
+
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'covered_generation': covered, 'counters': counters}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+        for path in old_logs:
+            os.remove(path)
+
+
+# 创建全局轨迹存储实例
+trajectory_store = TrajectoryStore()
@@ -0,0 +1,1504 @@
+"""
+闲鱼滑块验证 / 密码登录 - 异步版本
+
+滑块验证和密码登录的唯一实现，使用 Playwright 异步API：
+- 所有等待改为 asyncio.sleep，验证和登录在事件循环中执行，不再各自独占一个线程
+- 并发槽位通过公平信号量异步排队（先到先得，释放时立即唤醒），不再每秒轮询
+- 复用当前事件循环共享的 Playwright 实例，省去每次启动驱动进程的开销
+- 轨迹生成、参数学习、反检测脚本等复用 XianyuSliderStealth 中的公共部分
+"""
+
+import asyncio
+import glob
+import inspect
+import os
+import random
+import re
+import shutil
+import time
+import traceback
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from utils.browser_pool import browser_pool
+from utils.browser_profiles import browser_profiles
+from utils.slider_vision import slider_vision
+from utils.xianyu_slider_stealth import (
+    SLIDER_PRIORITY_ROUTINE, XianyuSliderStealth, concurrency_manager, strategy_stats
+)
+
+
+# 滑块容器选择器（支持多种类型）
+CONTAINER_SELECTORS = [
+    "#nc_1_n1z",  # 滑块按钮也可以作为容器标识
+    "#baxia-dialog-content",
+    ".nc-container",
+    ".nc_wrapper",
+    ".nc_scale",
+    "[class*='nc-container']",
+    # 刮刮乐类型滑块
+    "#nocaptcha",
+    ".scratch-captcha-container",
+    ".scratch-captcha-question-bg",
+    # 通用选择器
+    "[class*='slider']",
+    "[class*='captcha']"
+]
+
+# 滑块按钮选择器
+BUTTON_SELECTORS = [
+    # nc 系列滑块
+    "#nc_1_n1z",
+    ".nc_iconfont",
+    ".btn_slide",
+    # 刮刮乐类型滑块
+    "#scratch-captcha-btn",
+    ".scratch-captcha-slider .button",
+    # 通用选择器
+    "[class*='slider']",
+    "[class*='btn']",
+    "[role='button']"
+]
+
+# 滑块轨道选择器
+TRACK_SELECTORS = [
+    "#nc_1_n1t",
+    ".nc_scale",
+    ".nc_1_n1t",
+    "[class*='track']",
+    "[class*='scale']"
+]
+
+# 登录流程中检测是否出现滑块的选择器
+LOGIN_SLIDER_SELECTORS = ['#nc_1_n1z', '.nc-container', '.nc_scale', '.nc-wrapper']
+# 人脸/二维码验证检测时用于排除滑块的选择器
+QR_SLIDER_SELECTORS = LOGIN_SLIDER_SELECTORS + ['.nc_iconfont', '[class*="nc_"]']
+# 等待人脸验证期间检测滑块的选择器
+WAIT_SLIDER_SELECTORS = ["#nc_1_n1z", ".nc-container", "#baxia-dialog-content", ".nc_wrapper", "#nocaptcha"]
+
+FAILURE_KEYWORDS = ["验证失败", "点击框体重试", "重试", "失败", "请重试", "验证码错误", "滑动验证失败"]
+FAILURE_SELECTORS = [
+    "text=验证失败，点击框体重试",
+    "text=验证失败",
+    "text=点击框体重试",
+    "text=重试",
+    ".nc-lang-cnt",
+    "[class*='retry']",
+    "[class*='fail']",
+    "[class*='error']",
+    ".captcha-tips",
+    "#captcha-loading",
+    ".nc_1_nocaptcha",
+    ".nc_wrapper",
+    ".nc-container"
+]
+
+LOGIN_URL = "https://www.goofish.com/im"
+MAIN_PAGE_LOGIN_SELECTORS = [
+    '#fm-login-id',
+    'input[name="fm-login-id"]',
+    'input[placeholder*="手机号"]',
+    'input[placeholder*="邮箱"]',
+    '.fm-login-id',
+    '#J_LoginForm input[type="text"]'
+]
+FRAME_LOGIN_SELECTORS = MAIN_PAGE_LOGIN_SELECTORS[:4]
+QR_SELECTORS = [
+    'img[alt*="二维码"]',
+    'img[alt*="扫码"]',
+    'img[src*="qrcode"]',
+    'canvas[class*="qrcode"]',
+    '.qr-code',
+    '#qr-code',
+    '[class*="qr-code"]',
+    '[id*="qr-code"]'
+]
+FACE_KEYWORDS = ['拍摄脸部', '人脸验证', '人脸识别', '面部验证', '请进行人脸验证', '请完成人脸识别']
+FACE_SCREENSHOT_DIR = "static/uploads/images"
+
+# 人脸验证等待时长
+FACE_VERIFY_CHECK_INTERVAL = 10
+FACE_VERIFY_MAX_WAIT = 450
+
+_UNSET = object()
+
+
+def _is_detached_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return 'detached' in message or 'disconnected' in message
+
+
+class VerificationFrame:
+    """人脸验证frame，附带验证链接和截图路径"""
+
+    def __init__(self, original_frame, verify_url, screenshot_path=None):
+        self._original_frame = original_frame
+        self.verify_url = verify_url
+        self.screenshot_path = screenshot_path
+
+    def __getattr__(self, name):
+        return getattr(self._original_frame, name)
+
+
+class AsyncXianyuSliderStealth(XianyuSliderStealth):
+    """滑块验证/密码登录（异步实现，公共部分继承自 XianyuSliderStealth）
+
+    用法：
+        slider = AsyncXianyuSliderStealth(user_id)
+        success, cookies = await slider.run(url)
+        cookies = await slider.login_with_password_playwright(account, password)
+
+    run / login_with_password_playwright 开始时异步排队获取并发槽位，结束时关闭浏览器并归还；
+    复用调用方已有的页面时，使用 acquire_slot(use_governor=False) + solve_slider + close_browser。
+    """
+
+    def __init__(self, user_id: str = "default", enable_learning: bool = True, headless: bool = True,
+                 purpose: str = 'slider', priority: int = SLIDER_PRIORITY_ROUTINE):
+        # 构造时不排队，避免在事件循环中阻塞
+        super().__init__(user_id, enable_learning, headless, purpose=purpose, priority=priority)
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._slot_acquired = False
+        self._notify_tasks = set()
+
+    # ------------------------------------------------------------------
+    # 并发槽位与资源
+    # ------------------------------------------------------------------
+    async def acquire_slot(self, timeout: int = None, use_governor: bool = True):
+        """异步等待并发槽位，超时抛出异常"""
+        if self._slot_acquired:
+            return
+        logger.info(f"【{self.pure_user_id}】检查并发限制...")
+        if not await concurrency_manager.wait_for_slot_async(self.user_id, timeout, purpose=self.purpose,
+                                                             use_governor=use_governor, priority=self.priority):
+            stats = concurrency_manager.get_stats()
+            logger.error(f"【{self.pure_user_id}】等待槽位超时，当前活跃: {stats['active_count']}/{stats['max_concurrent']}")
+            raise Exception("滑块验证等待槽位超时，请稍后重试")
+        concurrency_manager.register_instance(self.user_id, self)
+        self._slot_acquired = True
+        stats = concurrency_manager.get_stats()
+        logger.info(f"【{self.pure_user_id}】实例已注册，当前并发: {stats['active_count']}/{stats['max_concurrent']}")
+
+    def release_slot(self):
+        """归还并发槽位（可重复调用）"""
+        if not self._slot_acquired:
+            return
+        self._slot_acquired = False
+        concurrency_manager.unregister_instance(self.user_id)
+        stats = concurrency_manager.get_stats()
+        logger.info(f"【{self.pure_user_id}】实例已注销，当前并发: {stats['active_count']}/{stats['max_concurrent']}，等待队列: {stats['queue_length']}")
+
+    async def __aenter__(self):
+        await self.acquire_slot()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_browser()
+
+    async def _enter_playwright(self):
+        """租用共享的 Playwright 实例，close_browser 时归还"""
+        if self._exit_stack is None:
+            self._exit_stack = AsyncExitStack()
+        self.playwright = await self._exit_stack.enter_async_context(browser_pool.playwright_lease())
+        return self.playwright
+
+    def _prepare_profile(self) -> Dict[str, Any]:
+        """准备持久化目录并读取固定的浏览器特征（文件操作，在线程中执行）"""
+        browser_profiles.prepare(self.profile_dir)
+        return browser_profiles.load_features(self.pure_user_id, self._get_random_browser_features)
+
+    async def init_browser(self):
+        """初始化浏览器 - 增强反检测版本（启用持久化目录时复用账号的用户数据目录）"""
+        try:
+            logger.info(f"【{self.pure_user_id}】获取Playwright...")
+            await self._enter_playwright()
+
+            # 占用账号的持久化用户数据目录（未启用或正被其他流程使用时使用临时环境）
+            if browser_profiles.enabled and self.profile_dir is None:
+                self.profile_dir = browser_profiles.try_acquire(self.pure_user_id)
+            if self.profile_dir:
+                # 同一用户数据目录固定使用同一组浏览器特征，避免每次更换UA和分辨率
+                browser_features = await asyncio.to_thread(self._prepare_profile)
+            else:
+                browser_features = self._get_random_browser_features()
+
+            launch_args = self._get_launch_args(browser_features)
+            context_options = self._get_context_options(browser_features)
+
+            if self.profile_dir:
+                logger.info(f"【{self.pure_user_id}】使用持久化用户数据目录启动浏览器: {self.profile_dir}，headless模式: {self.headless}")
+                self.context = await browser_profiles.launch_persistent_async(
+                    self.playwright, self.pure_user_id, self.profile_dir,
+                    headless=self.headless, args=launch_args, **context_options
+                )
+            else:
+                logger.info(f"【{self.pure_user_id}】启动浏览器，headless模式: {self.headless}")
+                self.browser = await self.playwright.chromium.launch(headless=self.headless, args=launch_args)
+                if not self.browser or not self.browser.is_connected():
+                    raise Exception("浏览器启动失败或连接已断开")
+                self.context = await self.browser.new_context(**context_options)
+
+            if not self.context:
+                raise Exception("浏览器上下文创建失败")
+
+            # 持久化上下文启动时自带一个空白页
+            self.page = self.context.pages[0] if self.context.pages else await self.context.new_page()
+            if not self.page:
+                raise Exception("页面创建失败")
+
+            await self.page.add_init_script(self._get_stealth_script(browser_features))
+            logger.info(f"【{self.pure_user_id}】浏览器初始化完成（{'最大化窗口模式' if not self.headless else '无头模式'}）")
+            return self.page
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】初始化浏览器失败: {e}")
+            logger.error(f"【{self.pure_user_id}】详细错误堆栈: {traceback.format_exc()}")
+            await self._close_resources()
+            raise
+
+    async def _close_resources(self):
+        """关闭页面、上下文和浏览器，归还 Playwright 和持久化目录"""
+        for name in ('page', 'context', 'browser'):
+            resource = getattr(self, name, None)
+            if not resource:
+                continue
+            try:
+                await asyncio.wait_for(resource.close(), timeout=10.0)
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】关闭{name}时出错: {e}")
+            setattr(self, name, None)
+
+        if self._exit_stack is not None:
+            exit_stack, self._exit_stack = self._exit_stack, None
+            try:
+                await exit_stack.aclose()
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】归还Playwright时出错: {e}")
+        self.playwright = None
+
+        # 浏览器关闭后数据已写回磁盘，释放持久化用户数据目录
+        self._release_profile()
+
+    async def close_browser(self):
+        """安全关闭浏览器并清理资源，最后归还并发槽位"""
+        logger.info(f"【{self.pure_user_id}】开始清理资源...")
+        await self._close_resources()
+
+        if getattr(self, 'temp_dir', None):
+            temp_dir, self.temp_dir = self.temp_dir, None
+            await asyncio.to_thread(shutil.rmtree, temp_dir, True)
+
+        self.release_slot()
+        logger.info(f"【{self.pure_user_id}】资源清理完成")
+
+    def __del__(self):
+        """析构保险：浏览器资源需在事件循环中通过 close_browser 关闭，这里只归还并发槽位"""
+        try:
+            if getattr(self, '_slot_acquired', False):
+                logger.warning(f"【{self.pure_user_id}】实例未调用 close_browser，析构时归还并发槽位")
+                self.release_slot()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # 滑块处理
+    # ------------------------------------------------------------------
+    async def _query_visible(self, frame, selector: str, wait_timeout: int = None):
+        """在页面/frame中查找可见元素（无法判断可见性时也返回），未找到返回None"""
+        element = None
+        try:
+            if wait_timeout:
+                element = await frame.wait_for_selector(selector, timeout=wait_timeout)
+        except Exception:
+            element = None
+        try:
+            if element is None:
+                element = await frame.query_selector(selector)
+        except Exception:
+            return None
+        if not element:
+            return None
+        try:
+            return element if await element.is_visible() else None
+        except Exception:
+            return element
+
+    async def _find_in_frames(self, selectors: List[str], skip=(), wait_timeout: int = None):
+        """依次在所有frame中查找，返回 (元素, frame, frame序号)"""
+        for idx, frame in enumerate(self.page.frames):
+            if frame in skip:
+                continue
+            for selector in selectors:
+                element = await self._query_visible(frame, selector, wait_timeout)
+                if element:
+                    return element, frame, idx
+        return None, None, None
+
+    async def find_slider_elements(self, fast_mode=False):
+        """查找滑块元素（支持在主页面和所有frame中查找）
+
+        Args:
+            fast_mode: 快速模式，不使用wait_for_selector，减少等待时间（当已确认滑块存在时使用）
+        """
+        try:
+            if not fast_mode:
+                await asyncio.sleep(0.1)
+
+            # 优先在 frames 中快速查找最常见的滑块组合（按钮 #nc_1_n1z 和轨道 #nc_1_n1t 在同一个frame中）
+            for idx, frame in enumerate(self.page.frames):
+                try:
+                    button_element = await self._query_visible(frame, "#nc_1_n1z")
+                    if not button_element:
+                        continue
+                    track_element = await self._query_visible(frame, "#nc_1_n1t")
+                    if not track_element:
+                        continue
+                    container_element = await frame.query_selector("#baxia-dialog-content")
+                    if not container_element:
+                        container_element = await frame.query_selector(".nc-container")
+                    logger.info(f"【{self.pure_user_id}】✅ 在Frame {idx} 快速找到完整滑块组合！")
+                    self._detected_slider_frame = frame
+                    return container_element or button_element, button_element, track_element
+                except Exception as e:
+                    logger.debug(f"【{self.pure_user_id}】Frame {idx} 快速查找失败: {e}")
+
+            logger.debug(f"【{self.pure_user_id}】快速查找未成功，使用完整查找逻辑...")
+
+            # 查找滑块容器：已知位置 -> 主页面 -> 所有frame
+            slider_container = None
+            found_frame = None
+            known_frame = getattr(self, '_detected_slider_frame', _UNSET)
+            if known_frame is not _UNSET:
+                target_frame = known_frame if known_frame is not None else self.page
+                for selector in CONTAINER_SELECTORS:
+                    element = await self._query_visible(target_frame, selector,
+                                                        1000 if target_frame is self.page else None)
+                    if element:
+                        logger.info(f"【{self.pure_user_id}】在已知位置找到滑块容器: {selector}")
+                        slider_container, found_frame = element, target_frame
+                        break
+
+            if not slider_container:
+                for selector in CONTAINER_SELECTORS:
+                    element = await self._query_visible(self.page, selector, 1000)
+                    if element:
+                        logger.info(f"【{self.pure_user_id}】在主页面找到滑块容器: {selector}")
+                        slider_container, found_frame = element, self.page
+                        break
+
+            if not slider_container:
+                logger.info(f"【{self.pure_user_id}】主页面未找到滑块，开始在所有frame中查找（共{len(self.page.frames)}个frame）...")
+                slider_container, found_frame, idx = await self._find_in_frames(CONTAINER_SELECTORS)
+                if slider_container:
+                    logger.info(f"【{self.pure_user_id}】在Frame {idx} 找到滑块容器")
+
+            if not slider_container:
+                logger.error(f"【{self.pure_user_id}】未找到任何滑块容器（主页面和所有frame都已检查）")
+                return None, None, None
+
+            # 查找滑块按钮：容器所在位置 -> 其他frame -> 主页面 -> 宽松模式（不检查可见性）
+            slider_button = None
+            for selector in BUTTON_SELECTORS:
+                element = await self._query_visible(found_frame, selector, None if fast_mode else 3000)
+                if element:
+                    logger.info(f"【{self.pure_user_id}】在{'主页面' if found_frame is self.page else 'Frame'}找到滑块按钮: {selector}")
+                    slider_button = element
+                    break
+
+            if not slider_button:
+                logger.warning(f"【{self.pure_user_id}】在找到容器的位置未找到按钮，尝试在所有frame中查找...")
+                slider_button, frame, idx = await self._find_in_frames(
+                    BUTTON_SELECTORS, skip=(found_frame,), wait_timeout=None if fast_mode else 2000)
+                if slider_button:
+                    logger.info(f"【{self.pure_user_id}】在Frame {idx} 找到滑块按钮")
+                    found_frame = frame
+
+            if not slider_button and found_frame is not self.page:
+                logger.warning(f"【{self.pure_user_id}】在所有frame中未找到按钮，尝试在主页面查找...")
+                for selector in BUTTON_SELECTORS:
+                    element = await self._query_visible(self.page, selector, None if fast_mode else 2000)
+                    if element:
+                        logger.info(f"【{self.pure_user_id}】在主页面找到滑块按钮: {selector}")
+                        slider_button, found_frame = element, self.page
+                        break
+
+            if not slider_button:
+                logger.warning(f"【{self.pure_user_id}】使用宽松模式查找滑块按钮（不检查可见性）...")
+                for frame in list(self.page.frames) + [self.page]:
+                    for selector in BUTTON_SELECTORS[:3]:
+                        try:
+                            element = await frame.query_selector(selector)
+                        except Exception:
+                            continue
+                        if element:
+                            logger.info(f"【{self.pure_user_id}】找到滑块按钮（宽松模式）: {selector}")
+                            slider_button, found_frame = element, frame
+                            break
+                    if slider_button:
+                        break
+
+            if not slider_button:
+                logger.error(f"【{self.pure_user_id}】未找到任何滑块按钮（主页面和所有frame都已检查，包括宽松模式）")
+                return slider_container, None, None
+
+            # 查找滑块轨道（按钮和轨道应该在同一个位置）
+            slider_track = None
+            for selector in TRACK_SELECTORS:
+                wait_timeout = None if fast_mode or found_frame is not self.page else 3000
+                element = await self._query_visible(found_frame, selector, wait_timeout)
+                if element:
+                    logger.info(f"【{self.pure_user_id}】找到滑块轨道: {selector}")
+                    slider_track = element
+                    break
+
+            if not slider_track and found_frame is not self.page:
+                # 点击frame以激活它，让轨道出现
+                logger.warning(f"【{self.pure_user_id}】在已知Frame中未找到轨道，尝试点击frame激活后再查找...")
+                try:
+                    await (slider_container or slider_button).click(timeout=1000)
+                    await asyncio.sleep(0.3)
+                except Exception:
+                    pass
+                for selector in TRACK_SELECTORS:
+                    element = await self._query_visible(found_frame, selector)
+                    if element:
+                        logger.info(f"【{self.pure_user_id}】点击frame后找到滑块轨道: {selector}")
+                        slider_track = element
+                        break
+                if not slider_track:
+                    slider_track, _, idx = await self._find_in_frames(TRACK_SELECTORS, skip=(found_frame,))
+                    if slider_track:
+                        logger.info(f"【{self.pure_user_id}】在Frame {idx} 找到滑块轨道")
+
+            if not slider_track:
+                for selector in TRACK_SELECTORS:
+                    element = await self._query_visible(self.page, selector, 1000)
+                    if element:
+                        logger.info(f"【{self.pure_user_id}】在主页面找到滑块轨道: {selector}")
+                        slider_track = element
+                        break
+
+            if not slider_track:
+                logger.error(f"【{self.pure_user_id}】未找到任何滑块轨道（主页面和所有frame都已检查）")
+                return slider_container, slider_button, None
+
+            # 保存找到滑块的frame引用，供后续验证使用（主页面记为None）
+            self._detected_slider_frame = None if found_frame is self.page else found_frame
+            return slider_container, slider_button, slider_track
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】查找滑块元素时出错: {str(e)}")
+            return None, None, None
+
+    async def is_scratch_captcha(self):
+        """检测是否为刮刮乐类型验证码"""
+        try:
+            page_content = await self.page.content()
+            scratch_required = ['scratch-captcha', 'scratch-captcha-btn', 'scratch-captcha-slider']
+            scratch_instructions = ['Release the slider', 'pillows', 'fully appears', 'after', 'appears']
+            is_scratch = any(keyword in page_content for keyword in scratch_required) or \
+                sum(1 for keyword in scratch_instructions if keyword in page_content) >= 2
+            if is_scratch:
+                logger.info(f"【{self.pure_user_id}】🎨 检测到刮刮乐类型验证码")
+            return is_scratch
+        except Exception as e:
+            logger.debug(f"【{self.pure_user_id}】检测刮刮乐类型时出错: {e}")
+            return False
+
+    async def _query_first_visible(self, frame, selectors: List[str]):
+        """返回第一个可见的匹配元素"""
+        for selector in selectors:
+            element = await self._query_visible(frame, selector)
+            if element:
+                return element
+        return None
+
+    async def _vision_slide_distance(self, slider_button, slider_track, track_box: dict):
+        """截图识别滑动距离（识别计算在线程中执行），未启用或置信度不足返回None"""
+        if not slider_vision.enabled:
+            return None
+        try:
+            frame = getattr(self, '_detected_slider_frame', None) or self.page
+            background = await self._query_first_visible(frame, slider_vision.image_selectors)
+            if background:
+                piece = await self._query_first_visible(frame, slider_vision.piece_selectors)
+                return await asyncio.to_thread(
+                    slider_vision.gap_distance,
+                    await background.screenshot(), await background.bounding_box(),
+                    await piece.screenshot() if piece else None, await piece.bounding_box() if piece else None,
+                    self.pure_user_id
+                )
+            return await asyncio.to_thread(
+                slider_vision.slide_to_end_distance,
+                await slider_track.screenshot(), await slider_button.screenshot(), track_box, self.pure_user_id
+            )
+        except Exception as e:
+            logger.debug(f"【{self.pure_user_id}】滑块截图识别失败，使用DOM几何计算: {e}")
+            return None
+
+    async def calculate_slide_distance(self, slider_button, slider_track):
+        """计算滑动距离 - 增强精度，支持刮刮乐"""
+        self._vision_result = None
+        try:
+            button_box = await slider_button.bounding_box()
+            if not button_box:
+                logger.error(f"【{self.pure_user_id}】无法获取滑块按钮位置")
+                return 0
+            track_box = await slider_track.bounding_box()
+            if not track_box:
+                logger.error(f"【{self.pure_user_id}】无法获取滑块轨道位置")
+                return 0
+
+            is_scratch = await self.is_scratch_captcha()
+
+            # 可选：截图识别目标位置（刮刮乐需要观察图片变化，不适用）
+            if not is_scratch:
+                self._vision_result = await self._vision_slide_distance(slider_button, slider_track, track_box)
+                if self._vision_result:
+                    return self._vision_result['distance'] + random.uniform(-0.5, 0.5)
+
+            # 使用JavaScript获取更精确的尺寸（避免DPI缩放影响）
+            slide_distance = None
+            try:
+                precise_distance = await self.page.evaluate("""
+                    () => {
+                        const button = document.querySelector('#nc_1_n1z') || document.querySelector('.nc_iconfont');
+                        const track = document.querySelector('#nc_1_n1t') || document.querySelector('.nc_scale');
+                        if (button && track) {
+                            return track.getBoundingClientRect().width - button.getBoundingClientRect().width;
+                        }
+                        return null;
+                    }
+                """)
+                if precise_distance and precise_distance > 0:
+                    logger.info(f"【{self.pure_user_id}】使用JavaScript精确计算滑动距离: {precise_distance:.2f}px")
+                    slide_distance = precise_distance
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】JavaScript精确计算失败，使用后备方案: {e}")
+
+            if slide_distance is None:
+                slide_distance = track_box["width"] - button_box["width"]
+                logger.info(f"【{self.pure_user_id}】计算滑动距离: {slide_distance:.2f}px (轨道宽度: {track_box['width']}px, 滑块宽度: {button_box['width']}px)")
+
+            if is_scratch:
+                scratch_ratio = random.uniform(0.25, 0.35)
+                slide_distance *= scratch_ratio
+                logger.warning(f"【{self.pure_user_id}】🎨 刮刮乐模式：滑动{scratch_ratio*100:.1f}%距离 ({slide_distance:.2f}px)")
+                return slide_distance
+
+            # 真人操作时滑动距离会有微小偏差
+            return slide_distance + random.uniform(-0.5, 0.5)
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】计算滑动距离时出错: {str(e)}")
+            return 0
+
+    async def simulate_slide(self, slider_button, trajectory):
+        """模拟滑动 - 优化版本（基于高成功率策略）"""
+        try:
+            logger.info(f"【{self.pure_user_id}】开始优化滑动模拟...")
+            await asyncio.sleep(random.uniform(0.1, 0.3))
+
+            button_box = await slider_button.bounding_box()
+            if not button_box:
+                logger.error(f"【{self.pure_user_id}】无法获取滑块按钮位置")
+                return False
+
+            start_x = button_box["x"] + button_box["width"] / 2
+            start_y = button_box["y"] + button_box["height"] / 2
+            mouse = self.page.mouse
+
+            # 第一阶段：移动到滑块附近，再精确移动到滑块中心（模拟人类寻找滑块）
+            try:
+                await mouse.move(start_x + random.uniform(-30, -10), start_y + random.uniform(-15, 15),
+                                 steps=random.randint(5, 10))
+                await asyncio.sleep(random.uniform(0.15, 0.3))
+                await mouse.move(start_x, start_y, steps=random.randint(3, 6))
+                await asyncio.sleep(random.uniform(0.1, 0.25))
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】移动到滑块失败: {e}，继续尝试")
+
+            # 第二阶段：悬停在滑块上
+            try:
+                await slider_button.hover(timeout=2000)
+                await asyncio.sleep(random.uniform(0.1, 0.3))
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】悬停滑块失败: {e}")
+
+            # 第三阶段：按下鼠标
+            try:
+                await mouse.move(start_x, start_y)
+                await asyncio.sleep(random.uniform(0.05, 0.15))
+                await mouse.down()
+                await asyncio.sleep(random.uniform(0.05, 0.15))
+            except Exception as e:
+                logger.error(f"【{self.pure_user_id}】按下鼠标失败: {e}")
+                return False
+
+            # 第四阶段：执行滑动轨迹
+            try:
+                start_time = time.time()
+                current_x, current_y = start_x, start_y
+                for x, y, delay in trajectory:
+                    current_x = start_x + x
+                    current_y = start_y + y
+                    await mouse.move(current_x, current_y, steps=random.randint(1, 3))
+                    await asyncio.sleep(delay * random.uniform(0.9, 1.1))
+
+                # 记录最终位置
+                try:
+                    current_style = await slider_button.get_attribute("style")
+                    left_match = re.search(r'left:\s*([^;]+)', current_style or '')
+                    if left_match:
+                        left_value = left_match.group(1).strip()
+                        if hasattr(self, 'current_trajectory_data'):
+                            self.current_trajectory_data["final_left_px"] = float(left_value.replace('px', ''))
+                        logger.info(f"【{self.pure_user_id}】滑动完成: {len(trajectory)}步 - 最终位置: {left_value}")
+                except Exception:
+                    pass
+
+                # 刮刮乐特殊处理：在目标位置停顿观察
+                if await self.is_scratch_captcha():
+                    pause_duration = random.uniform(0.3, 0.5)
+                    logger.warning(f"【{self.pure_user_id}】🎨 刮刮乐模式：在目标位置停顿{pause_duration:.2f}秒观察...")
+                    await asyncio.sleep(pause_duration)
+
+                # 释放鼠标
+                await asyncio.sleep(random.uniform(0.02, 0.05))
+                await mouse.up()
+                await asyncio.sleep(random.uniform(0.01, 0.03))
+
+                # 触发click事件
+                try:
+                    await slider_button.evaluate(f"""
+                        (slider) => {{
+                            const event = new MouseEvent('click', {{
+                                bubbles: true,
+                                cancelable: true,
+                                view: window,
+                                clientX: {current_x},
+                                clientY: {current_y},
+                                button: 0
+                            }});
+                            slider.dispatchEvent(event);
+                        }}
+                    """)
+                except Exception as e:
+                    logger.debug(f"【{self.pure_user_id}】触发click事件失败（可忽略）: {e}")
+
+                logger.info(f"【{self.pure_user_id}】滑动完成: 耗时={time.time() - start_time:.2f}秒, 最终位置=({current_x:.1f}, {current_y:.1f})")
+                return True
+
+            except Exception as e:
+                logger.error(f"【{self.pure_user_id}】执行滑动轨迹失败: {e}")
+                logger.error(traceback.format_exc())
+                try:
+                    await mouse.up()
+                except Exception:
+                    pass
+                return False
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】滑动模拟异常: {e}")
+            logger.error(traceback.format_exc())
+            return False
+
+    async def _check_container_status(self, target_frame) -> Tuple[bool, bool]:
+        """检查滑块容器状态，返回(存在, 可见)；frame或元素已分离视为不存在"""
+        try:
+            container = await target_frame.query_selector(".nc-container")
+            if container is None:
+                return False, False
+            try:
+                return True, await container.is_visible()
+            except Exception as vis_error:
+                if _is_detached_error(vis_error):
+                    logger.info(f"【{self.pure_user_id}】容器元素已被分离，容器不存在")
+                    return False, False
+                return True, True
+        except Exception as e:
+            if _is_detached_error(e):
+                logger.info(f"【{self.pure_user_id}】Frame或容器已被分离，容器不存在")
+                return False, False
+            # 其他错误，保守处理，假设存在
+            logger.warning(f"【{self.pure_user_id}】检查容器状态时出错: {e}")
+            return True, True
+
+    async def check_verification_success_fast(self, slider_button):
+        """检查验证结果 - 极速模式（滑块容器消失即成功）"""
+        try:
+            logger.info(f"【{self.pure_user_id}】检查验证结果（极速模式）...")
+            target_frame = getattr(self, '_detected_slider_frame', None) or self.page
+
+            # 依次等待 0.3 / 1.2 / 0.5 秒检查容器状态，第二次仍在时先检查失败提示
+            for wait, check_failure in ((0.3, False), (1.2, True), (0.5, False)):
+                await asyncio.sleep(wait)
+                container_exists, container_visible = await self._check_container_status(target_frame)
+                if not container_exists or not container_visible:
+                    logger.info(f"【{self.pure_user_id}】✓ 滑块容器已消失，验证成功")
+                    return True
+                if check_failure and await self.check_verification_failure():
+                    logger.warning(f"【{self.pure_user_id}】检测到验证失败提示，验证失败")
+                    return False
+
+            logger.warning(f"【{self.pure_user_id}】滑块容器仍存在且可见，且未检测到失败提示，但验证可能失败")
+            return False
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】检查验证结果时出错: {str(e)}")
+            return False
+
+    async def check_verification_failure(self):
+        """检查验证失败提示"""
+        try:
+            await asyncio.sleep(1.5)
+            page_content = await self.page.content()
+            for keyword in FAILURE_KEYWORDS:
+                if keyword in page_content:
+                    logger.info(f"【{self.pure_user_id}】页面内容包含失败关键词: {keyword}")
+                    return True
+
+            for selector in FAILURE_SELECTORS:
+                try:
+                    element = await self.page.query_selector(selector)
+                    if element and await element.is_visible():
+                        logger.info(f"【{self.pure_user_id}】找到验证失败提示: {selector}")
+                        return True
+                except Exception:
+                    continue
+
+            logger.info(f"【{self.pure_user_id}】未找到验证失败提示，可能验证成功了")
+            return False
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】检查验证失败时出错: {e}")
+            return False
+
+    async def solve_slider(self, max_retries: int = 3, fast_mode: bool = False):
+        """处理滑块验证（极速模式）
+
+        Args:
+            max_retries: 最大重试次数（同一个页面连续失败3次后就不会成功了）
+            fast_mode: 快速查找模式（当已确认滑块存在时使用，减少等待时间）
+        """
+        failure_records = []
+        current_strategy = 'ultra_fast'
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                logger.info(f"【{self.pure_user_id}】开始处理滑块验证... (第{attempt}/{max_retries}次尝试)")
+                if attempt > 1:
+                    # 不刷新页面，直接在原来的frame中重试
+                    await asyncio.sleep(random.uniform(0.5, 1.0))
+
+                slider_container, slider_button, slider_track = await self.find_slider_elements(fast_mode=fast_mode)
+                if not all([slider_container, slider_button, slider_track]):
+                    logger.error(f"【{self.pure_user_id}】滑块元素查找失败")
+                    continue
+
+                slide_distance = await self.calculate_slide_distance(slider_button, slider_track)
+                if slide_distance <= 0:
+                    logger.error(f"【{self.pure_user_id}】滑动距离计算失败")
+                    continue
+
+                trajectory = self.generate_human_trajectory(slide_distance)
+                if not trajectory:
+                    logger.error(f"【{self.pure_user_id}】轨迹生成失败")
+                    continue
+
+                if not await self.simulate_slide(slider_button, trajectory):
+                    logger.error(f"【{self.pure_user_id}】滑动模拟失败")
+                    continue
+
+                if await self.check_verification_success_fast(slider_button):
+                    logger.info(f"【{self.pure_user_id}】✅ 滑块验证成功! (第{attempt}次尝试)")
+                    await asyncio.to_thread(strategy_stats.record_attempt, attempt, current_strategy, True)
+                    slider_vision.confirm_sample(getattr(self, '_vision_result', None), True)
+                    if self.enable_learning and hasattr(self, 'current_trajectory_data'):
+                        await asyncio.to_thread(self._save_success_record, self.current_trajectory_data)
+                    strategy_stats.log_summary()
+                    return True
+
+                logger.warning(f"【{self.pure_user_id}】❌ 第{attempt}次验证失败")
+                await asyncio.to_thread(strategy_stats.record_attempt, attempt, current_strategy, False)
+                slider_vision.confirm_sample(getattr(self, '_vision_result', None), False)
+                if hasattr(self, 'current_trajectory_data'):
+                    failure_records.append(self._analyze_failure(attempt, slide_distance, self.current_trajectory_data))
+
+            except Exception as e:
+                logger.error(f"【{self.pure_user_id}】第{attempt}次处理滑块验证时出错: {str(e)}")
+
+        logger.error(f"【{self.pure_user_id}】滑块验证失败，已尝试{max_retries}次")
+        for record in failure_records:
+            if record:
+                logger.info(f"  - 第{record['attempt']}次: 距离{record['slide_distance']}px, "
+                            f"步数{record['total_steps']}, 最终位置{record['final_left_px']}px")
+        strategy_stats.log_summary()
+        return False
+
+    async def _get_cookies_after_success(self):
+        """滑块验证成功后获取x5相关cookie"""
+        try:
+            logger.info(f"【{self.pure_user_id}】当前页面URL: {self.page.url}, 标题: {await self.page.title()}")
+            # 等待一下确保cookie完全更新
+            await asyncio.sleep(1)
+
+            cookies = await self.context.cookies()
+            if not cookies:
+                logger.warning(f"【{self.pure_user_id}】未获取到任何cookie")
+                return None
+
+            new_cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+            logger.info(f"【{self.pure_user_id}】获取到的所有cookie: {list(new_cookies.keys())}")
+
+            # 只提取x5相关的cookie（包括x5sec, x5step等）
+            filtered_cookies = {
+                name: value for name, value in new_cookies.items()
+                if name.lower().startswith('x5') or 'x5sec' in name.lower()
+            }
+            if filtered_cookies:
+                logger.info(f"【{self.pure_user_id}】返回过滤后的x5相关cookie: {list(filtered_cookies.keys())}")
+                return filtered_cookies
+            logger.warning(f"【{self.pure_user_id}】未找到x5相关cookie")
+            return None
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】获取滑块验证成功后的cookie失败: {str(e)}")
+            return None
+
+    async def run(self, url: str):
+        """运行主流程，返回(成功状态, cookie数据)"""
+        cookies = None
+        run_start = time.perf_counter()
+        persistent = False
+        verification = False
+        success = False
+        try:
+            if not self._check_date_validity():
+                logger.error(f"【{self.pure_user_id}】日期验证失败，无法执行")
+                return False, None
+
+            await self.acquire_slot()
+            await self.init_browser()
+            persistent = self.profile_dir is not None
+
+            logger.info(f"【{self.pure_user_id}】导航到URL: {url}")
+            try:
+                await self.page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】页面加载异常，尝试继续: {str(e)}")
+                await asyncio.sleep(2)
+
+            await asyncio.sleep(random.uniform(0.3, 0.8))
+
+            # 快速滚动
+            await self.page.mouse.move(640, 360)
+            await asyncio.sleep(random.uniform(0.02, 0.05))
+            await self.page.mouse.wheel(0, random.randint(200, 500))
+            await asyncio.sleep(random.uniform(0.02, 0.05))
+
+            logger.info(f"【{self.pure_user_id}】页面标题: {await self.page.title()}")
+            page_content = await self.page.content()
+            if not any(keyword in page_content for keyword in ["验证码", "captcha", "滑块", "slider"]):
+                logger.info(f"【{self.pure_user_id}】页面内容不包含验证码相关关键词，可能不需要验证")
+                success = True
+                return True, None
+
+            logger.info(f"【{self.pure_user_id}】页面内容包含验证码相关关键词")
+            verification = True
+            success = await self.solve_slider()
+            if not success:
+                logger.warning(f"【{self.pure_user_id}】滑块验证失败")
+                return False, None
+
+            logger.info(f"【{self.pure_user_id}】滑块验证成功")
+            # 等待页面跳转或刷新，让新的cookie生效
+            try:
+                await asyncio.sleep(1)
+                await self.page.wait_for_load_state("networkidle", timeout=10000)
+                await asyncio.sleep(0.5)
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】等待页面加载时出错: {str(e)}")
+
+            cookies = await self._get_cookies_after_success()
+            return True, cookies
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】执行过程中出错: {str(e)}")
+            return False, None
+        finally:
+            await self.close_browser()
+            browser_profiles.record_run('slider', persistent, time.perf_counter() - run_start, verification, success)
+
+    # ------------------------------------------------------------------
+    # 密码登录
+    # ------------------------------------------------------------------
+    async def _check_login_success_by_element(self, page) -> bool:
+        """通过页面元素检测登录是否成功（会话列表有内容即已登录）"""
+        try:
+            element = await page.query_selector('.rc-virtual-list-holder-inner')
+            if not element:
+                logger.debug(f"【{self.pure_user_id}】未找到会话列表元素，登录未完成")
+                return False
+            child_count = await element.evaluate('el => el.children.length')
+            if child_count > 0:
+                logger.success(f"【{self.pure_user_id}】✅ 登录成功！检测到列表有 {child_count} 个子元素")
+                return True
+            logger.debug(f"【{self.pure_user_id}】列表为空，登录未完成")
+            return False
+        except Exception as e:
+            logger.debug(f"【{self.pure_user_id}】检查登录状态时出错: {e}")
+            return False
+
+    async def _check_login_error(self, page) -> tuple:
+        """检测登录是否出现错误（如账密错误），返回 (has_error, error_message)"""
+        error_selectors = [
+            '.login-error-msg',
+            '[class*="error-msg"]',
+            'div:has-text("账密错误")',
+            'text=账密错误',
+        ]
+        try:
+            for frame in [page] + list(page.frames):
+                for selector in error_selectors:
+                    try:
+                        element = await frame.query_selector(selector)
+                        if element and await element.is_visible():
+                            error_text = await element.inner_text()
+                            logger.error(f"【{self.pure_user_id}】❌ 检测到登录错误: {error_text}")
+                            return True, error_text
+                    except Exception:
+                        continue
+                try:
+                    content = await frame.content()
+                    if '账密错误' in content or '账号密码错误' in content or '用户名或密码错误' in content:
+                        logger.error(f"【{self.pure_user_id}】❌ 页面内容中检测到账密错误")
+                        return True, "账密错误"
+                except Exception:
+                    pass
+            return False, None
+        except Exception as e:
+            logger.debug(f"【{self.pure_user_id}】检查登录错误时出错: {e}")
+            return False, None
+
+    async def _find_visible_slider(self, page, selectors: List[str], frames=None):
+        """在主页面和frame中查找可见的滑块元素，返回 (是否找到, 所在frame)；主页面的frame记为None"""
+        for selector in selectors:
+            try:
+                element = await page.query_selector(selector)
+                if element and await element.is_visible():
+                    logger.info(f"【{self.pure_user_id}】✅ 在主页面检测到滑块验证元素: {selector}")
+                    return True, None
+            except Exception:
+                continue
+        for frame in (page.frames if frames is None else frames):
+            for selector in selectors:
+                try:
+                    element = await frame.query_selector(selector)
+                    if element and await element.is_visible():
+                        logger.info(f"【{self.pure_user_id}】✅ 在Frame中检测到滑块验证元素: {selector}")
+                        return True, frame
+                except Exception:
+                    continue
+        return False, None
+
+    async def _solve_slider_with_reload(self, page, fast_mode: bool = False) -> bool:
+        """处理滑块，连续失败3次后刷新页面再试一次"""
+        if await self.solve_slider(max_retries=3, fast_mode=fast_mode):
+            logger.success(f"【{self.pure_user_id}】✅ 滑块验证成功！")
+            return True
+        logger.warning(f"【{self.pure_user_id}】⚠️ 滑块处理3次都失败，刷新页面后重试...")
+        try:
+            await page.reload(wait_until="domcontentloaded", timeout=30000)
+            await asyncio.sleep(2)
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】❌ 页面刷新失败: {e}")
+            return False
+        if await self.solve_slider(max_retries=3, fast_mode=fast_mode):
+            logger.success(f"【{self.pure_user_id}】✅ 刷新后滑块验证成功！")
+            return True
+        logger.error(f"【{self.pure_user_id}】❌ 刷新后滑块验证仍然失败")
+        return False
+
+    async def _collect_cookies(self, context) -> Optional[Dict[str, str]]:
+        """读取浏览器中的全部Cookie"""
+        try:
+            cookies_dict = {cookie.get('name', ''): cookie.get('value', '') for cookie in await context.cookies()}
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】获取Cookie失败: {e}")
+            return None
+        logger.info(f"【{self.pure_user_id}】成功获取Cookie，包含 {len(cookies_dict)} 个字段")
+        important_keys = ['unb', '_m_h5_tk', '_m_h5_tk_enc', 'cookie2', 't', 'sgcookie', 'cna']
+        for key in important_keys:
+            val = cookies_dict.get(key)
+            logger.info(f"【{self.pure_user_id}】  {'✅' if key in cookies_dict else '❌'} {key}: "
+                        f"{('存在' if val else '为空') if key in cookies_dict else '缺失'}")
+        if not cookies_dict:
+            logger.error(f"【{self.pure_user_id}】❌ Cookie为空")
+            return None
+        logger.success(f"【{self.pure_user_id}】✅ 登录成功！Cookie有效")
+        return cookies_dict
+
+    def _save_face_screenshot(self, screenshot_bytes: bytes) -> Optional[str]:
+        """保存人脸验证截图（先删除该账号的旧截图），返回相对路径"""
+        os.makedirs(FACE_SCREENSHOT_DIR, exist_ok=True)
+        self._remove_face_screenshots()
+        filename = f"face_verify_{self.pure_user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+        file_path = os.path.join(FACE_SCREENSHOT_DIR, filename)
+        try:
+            with open(file_path, 'wb') as f:
+                f.write(screenshot_bytes)
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】保存截图失败: {e}")
+            return None
+        return file_path.replace('\\', '/')
+
+    def _remove_face_screenshots(self):
+        """删除该账号的所有人脸验证截图"""
+        for screenshot_file in glob.glob(os.path.join(FACE_SCREENSHOT_DIR, f"face_verify_{self.pure_user_id}_*.jpg")):
+            try:
+                os.remove(screenshot_file)
+                logger.info(f"【{self.pure_user_id}】已删除验证截图: {screenshot_file}")
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】删除截图失败: {e}")
+
+    async def _get_face_verification_url(self, frame) -> Optional[str]:
+        """在alibaba-login-box frame中，点击'其他验证方式'，然后找到'通过拍摄脸部'的验证按钮，获取链接"""
+        try:
+            await asyncio.sleep(2)
+            try:
+                for link in await frame.query_selector_all('a'):
+                    try:
+                        text = await link.inner_text()
+                        if '其他验证方式' in text or ('其他' in text and '验证' in text):
+                            logger.info(f"【{self.pure_user_id}】找到'其他验证方式'链接，点击中...")
+                            await link.click()
+                            await asyncio.sleep(2)
+                            break
+                    except Exception:
+                        continue
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】查找'其他验证方式'链接时出错: {e}")
+
+            await asyncio.sleep(2)
+
+            face_verify_url = None
+            try:
+                # li > div.desc 包含"通过 拍摄脸部" + a.ui-button 包含"立即验证"
+                face_verify_url = await frame.evaluate("""
+                    () => {
+                        for (const li of document.querySelectorAll('li')) {
+                            const descDiv = li.querySelector('div.desc');
+                            if (!descDiv || descDiv.innerText.includes('手机')) continue;
+                            const text = descDiv.innerText;
+                            if (!(text.includes('通过 拍摄脸部') || text.includes('通过拍摄脸部') || text.includes('拍摄脸部'))) continue;
+                            const verifyButton = li.querySelector('a.ui-button, a.ui-button-small, button');
+                            if (verifyButton && verifyButton.innerText && verifyButton.innerText.includes('立即验证')) {
+                                const href = verifyButton.href || verifyButton.getAttribute('href') || null;
+                                verifyButton.click();
+                                return href;
+                            }
+                        }
+                        return null;
+                    }
+                """)
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】查找人脸验证按钮失败: {e}")
+
+            if not face_verify_url:
+                logger.warning(f"【{self.pure_user_id}】未找到人脸验证链接，返回原始frame URL")
+                return frame.url
+
+            logger.info(f"【{self.pure_user_id}】找到'通过拍摄脸部'验证按钮的href并已点击: {face_verify_url}")
+            if not face_verify_url.startswith('http'):
+                base_url = frame.url.split('/iv/')[0] if '/iv/' in frame.url else 'https://passport.goofish.com'
+                face_verify_url = base_url + ('' if face_verify_url.startswith('/') else '/') + face_verify_url
+            return face_verify_url
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】获取人脸验证链接时出错: {e}")
+            return None
+
+    async def _detect_qr_code_verification(self, page) -> tuple:
+        """检测是否存在二维码/人脸验证（检测到滑块时先处理滑块，返回 (False, None)）
+
+        Returns:
+            tuple: (has_qr, qr_frame)
+        """
+        try:
+            has_slider, slider_frame = await self._find_visible_slider(page, QR_SLIDER_SELECTORS)
+            if has_slider:
+                logger.warning(f"【{self.pure_user_id}】检测到滑块验证，开始自动处理...")
+                self._detected_slider_frame = slider_frame
+                if await self._solve_slider_with_reload(page):
+                    await asyncio.sleep(3)
+                if hasattr(self, '_detected_slider_frame'):
+                    delattr(self, '_detected_slider_frame')
+                return False, None
+
+            # alibaba-login-box iframe（人脸验证或短信验证）
+            try:
+                iframe_element = await page.query_selector('iframe#alibaba-login-box')
+                frame = await iframe_element.content_frame() if iframe_element else None
+                if frame:
+                    logger.info(f"【{self.pure_user_id}】✅ 检测到 alibaba-login-box iframe（人脸验证/短信验证）: {frame.url}")
+                    face_verify_url = await self._get_face_verification_url(frame)
+                    if not face_verify_url:
+                        return True, frame
+
+                    screenshot_path = None
+                    try:
+                        await asyncio.sleep(2)
+                        try:
+                            screenshot_bytes = await iframe_element.screenshot()
+                        except Exception as e:
+                            logger.warning(f"【{self.pure_user_id}】截取iframe失败，尝试截取整个页面: {e}")
+                            screenshot_bytes = await page.screenshot(full_page=False)
+                        if screenshot_bytes:
+                            screenshot_path = await asyncio.to_thread(self._save_face_screenshot, screenshot_bytes)
+                            logger.info(f"【{self.pure_user_id}】✅ 人脸验证截图已保存: {screenshot_path}")
+                    except Exception as e:
+                        logger.error(f"【{self.pure_user_id}】截图时出错: {e}")
+                    return True, VerificationFrame(frame, face_verify_url, screenshot_path)
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】检查alibaba-login-box iframe时出错: {e}")
+
+            for idx, frame in enumerate(page.frames):
+                try:
+                    frame_url = frame.url
+                    is_slider_frame, _ = await self._find_visible_slider(frame, QR_SLIDER_SELECTORS, frames=[])
+                    if is_slider_frame:
+                        continue
+
+                    # mini_login 页面（人脸验证或短信验证）
+                    if 'mini_login' in frame_url:
+                        logger.info(f"【{self.pure_user_id}】✅ 在Frame {idx} 检测到 mini_login 页面: {frame_url}")
+                        return True, frame
+
+                    try:
+                        frame_element = await frame.frame_element()
+                        if frame_element and await frame_element.get_attribute('id') == 'alibaba-login-box':
+                            logger.info(f"【{self.pure_user_id}】✅ 在Frame {idx} 检测到 alibaba-login-box: {frame_url}")
+                            return True, frame
+                    except Exception:
+                        pass
+
+                    for selector in QR_SELECTORS:
+                        try:
+                            element = await frame.query_selector(selector)
+                            if element and await element.is_visible():
+                                logger.info(f"【{self.pure_user_id}】✅ 在Frame {idx} 检测到二维码验证: {selector}")
+                                return True, frame
+                        except Exception:
+                            continue
+
+                    try:
+                        frame_content = await frame.content()
+                        if any(keyword in frame_content for keyword in FACE_KEYWORDS) and \
+                                not any(keyword in frame_content for keyword in ['滑块', '拖动', 'nc_', 'nc-container']):
+                            logger.info(f"【{self.pure_user_id}】✅ 在Frame {idx} 检测到人脸验证: {frame_url}")
+                            return True, frame
+                    except Exception:
+                        pass
+                except Exception as e:
+                    logger.debug(f"【{self.pure_user_id}】检查Frame {idx} 失败: {e}")
+
+            logger.info(f"【{self.pure_user_id}】未检测到二维码/人脸验证")
+            return False, None
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】检测二维码/人脸验证时出错: {e}")
+            return False, None
+
+    async def _find_login_frame(self, page):
+        """查找登录表单所在的页面或frame，返回 (login_frame, iframes)"""
+        for selector in MAIN_PAGE_LOGIN_SELECTORS:
+            try:
+                element = await page.query_selector(selector)
+                if element and await element.is_visible():
+                    logger.info(f"【{self.pure_user_id}】✓ 在主页面找到登录表单元素: {selector}")
+                    return page, []
+            except Exception:
+                continue
+
+        iframes = await page.query_selector_all('iframe')
+        logger.info(f"【{self.pure_user_id}】找到 {len(iframes)} 个 iframe")
+        for idx, iframe in enumerate(iframes):
+            try:
+                frame = await iframe.content_frame()
+                if not frame:
+                    continue
+                try:
+                    await frame.wait_for_selector('#fm-login-id', timeout=3000)
+                except Exception:
+                    pass
+                for selector in FRAME_LOGIN_SELECTORS:
+                    try:
+                        element = await frame.query_selector(selector)
+                        if element and await element.is_visible():
+                            logger.info(f"【{self.pure_user_id}】✓ 在Frame {idx} 找到登录表单: {selector}")
+                            return frame, iframes
+                    except Exception:
+                        continue
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】检查Frame {idx}时出错: {e}")
+        return None, iframes
+
+    async def _notify_face_verification(self, notification_callback, screenshot_path, frame_url):
+        """发送人脸验证通知（异步回调在后台任务中执行，不阻塞等待流程）"""
+        if not notification_callback:
+            logger.warning(f"【{self.pure_user_id}】⚠️ notification_callback 未提供，无法发送通知")
+            return
+        if not (screenshot_path or frame_url):
+            logger.warning(f"【{self.pure_user_id}】无法获取验证信息，跳过通知发送")
+            return
+
+        notification_msg = (
+            f"⚠️ 账号密码登录需要人脸验证\n\n"
+            f"账号: {self.pure_user_id}\n"
+            f"时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        )
+        if screenshot_path:
+            notification_msg += "请登录自动化网站，访问账号管理模块，进行对应账号的人脸验证在验证期间，闲鱼自动回复暂时无法使用。"
+        else:
+            notification_msg += f"请点击验证链接完成验证:\n{frame_url}\n\n在验证期间，闲鱼自动回复暂时无法使用。"
+
+        try:
+            if inspect.iscoroutinefunction(notification_callback):
+                async def run_callback():
+                    try:
+                        await notification_callback(notification_msg, screenshot_path, frame_url)
+                        logger.info(f"【{self.pure_user_id}】✅ 异步通知回调已执行")
+                    except Exception as async_err:
+                        logger.error(f"【{self.pure_user_id}】异步通知回调执行失败: {async_err}")
+
+                task = asyncio.create_task(run_callback())
+                self._notify_tasks.add(task)
+                task.add_done_callback(self._notify_tasks.discard)
+            else:
+                # 同步回调参数顺序：message, screenshot_path(旧), verification_url, screenshot_path(新)
+                notification_callback(notification_msg, None, frame_url, screenshot_path)
+                logger.info(f"【{self.pure_user_id}】✅ 同步通知回调已执行")
+        except Exception as notify_err:
+            logger.error(f"【{self.pure_user_id}】发送人脸验证通知失败: {notify_err}")
+
+    async def _wait_for_face_verification(self, page) -> bool:
+        """等待用户完成二维码/人脸验证，期间出现滑块时自动处理"""
+        waited_time = 0
+        while waited_time < FACE_VERIFY_MAX_WAIT:
+            await asyncio.sleep(FACE_VERIFY_CHECK_INTERVAL)
+            waited_time += FACE_VERIFY_CHECK_INTERVAL
+
+            try:
+                slider_detected, _ = await self._find_visible_slider(page, WAIT_SLIDER_SELECTORS)
+                if slider_detected:
+                    logger.info(f"【{self.pure_user_id}】⚡ 检测到滑块，开始自动处理...")
+                    await asyncio.sleep(3)
+                    if await self._solve_slider_with_reload(page, fast_mode=True):
+                        try:
+                            await page.reload(wait_until="domcontentloaded", timeout=30000)
+                            await asyncio.sleep(2)
+                        except Exception as reload_err:
+                            logger.warning(f"【{self.pure_user_id}】⚠️ 页面刷新失败: {reload_err}")
+            except Exception as e:
+                logger.debug(f"【{self.pure_user_id}】滑块检测时出错: {e}")
+
+            if await self._check_login_success_by_element(page):
+                logger.success(f"【{self.pure_user_id}】✅ 验证成功，登录状态已确认！")
+                return True
+            logger.info(f"【{self.pure_user_id}】等待验证中... (已等待{waited_time}秒/{FACE_VERIFY_MAX_WAIT}秒)")
+        return False
+
+    async def _launch_login_context(self, show_browser: bool):
+        """启动密码登录使用的持久化上下文（账号目录被占用时最多等待60秒，超时使用临时目录）"""
+        await self._enter_playwright()
+        launch_options = self._get_login_launch_options(show_browser)
+        self.profile_dir = await asyncio.to_thread(browser_profiles.try_acquire, self.pure_user_id, 60)
+        if self.profile_dir:
+            logger.info(f"【{self.pure_user_id}】使用用户数据目录: {self.profile_dir}")
+            await asyncio.to_thread(browser_profiles.prepare, self.profile_dir)
+            return await browser_profiles.launch_persistent_async(
+                self.playwright, self.pure_user_id, self.profile_dir, **launch_options)
+
+        user_data_dir = os.path.join(self.temp_dir, 'login_profile')
+        os.makedirs(user_data_dir, exist_ok=True)
+        logger.info(f"【{self.pure_user_id}】使用用户数据目录: {user_data_dir}")
+        return await self.playwright.chromium.launch_persistent_context(user_data_dir, **launch_options)
+
+    async def login_with_password_playwright(self, account: str, password: str, show_browser: bool = False,
+                                             notification_callback: Optional[Callable] = None) -> Optional[dict]:
+        """使用Playwright进行密码登录
+
+        Args:
+            account: 登录账号（必填）
+            password: 登录密码（必填）
+            show_browser: 是否显示浏览器窗口（默认False为无头模式）
+            notification_callback: 可选的通知回调（同步或异步），用于发送二维码/人脸验证通知
+
+        Returns:
+            dict: Cookie字典，失败返回None；账密错误时抛出异常
+        """
+        if not self._check_date_validity():
+            logger.error(f"【{self.pure_user_id}】日期验证失败，无法执行登录")
+            return None
+        if not account or not password:
+            logger.error(f"【{self.pure_user_id}】账号或密码不能为空")
+            return None
+
+        browser_mode = "有头" if show_browser else "无头"
+        logger.info(f"【{self.pure_user_id}】开始{browser_mode}模式密码登录流程（使用Playwright异步API）...")
+        logger.info(f"【{self.pure_user_id}】账号: {account}")
+
+        try:
+            await self.acquire_slot()
+            self._setup_bundled_browser_path()
+            self.context = await self._launch_login_context(show_browser)
+            self.page = page = await self.context.new_page()
+            logger.info(f"【{self.pure_user_id}】浏览器已成功启动（{browser_mode}模式）")
+
+            await page.goto(LOGIN_URL, wait_until='networkidle', timeout=60000)
+            await asyncio.sleep(2)
+            logger.info(f"【{self.pure_user_id}】当前URL: {page.url}, 页面标题: {await page.title()}")
+
+            # 【步骤1】查找登录frame（闲鱼登录通常在iframe中）
+            await asyncio.sleep(1)
+            login_frame, iframes = await self._find_login_frame(page)
+
+            if not login_frame:
+                if iframes:
+                    # 找到iframe但未找到登录表单 → 可能已登录，直接检测滑块
+                    logger.warning(f"【{self.pure_user_id}】找到iframe但未找到登录表单，可能已登录，检测滑块...")
+                    frames = [frame for frame in [await iframe.content_frame() for iframe in iframes] if frame]
+                    has_slider, slider_frame = await self._find_visible_slider(page, LOGIN_SLIDER_SELECTORS, frames)
+                    if has_slider:
+                        self._detected_slider_frame = slider_frame
+                        await asyncio.sleep(3)
+                        if not await self._solve_slider_with_reload(page):
+                            return None
+                        await asyncio.sleep(3)
+                        login_success = await self._check_login_success_by_element(page)
+                        if not login_success:
+                            await asyncio.sleep(5)
+                            login_success = await self._check_login_success_by_element(page)
+                        if not login_success:
+                            logger.warning(f"【{self.pure_user_id}】⚠️ 滑块验证后登录状态不明确，不获取Cookie")
+                            return None
+                    elif not await self._check_login_success_by_element(page):
+                        logger.warning(f"【{self.pure_user_id}】⚠️ 未检测到滑块且未登录，不获取Cookie")
+                        return None
+                else:
+                    # 未找到iframe → 检查是否已登录
+                    logger.warning(f"【{self.pure_user_id}】未找到任何iframe，检查是否已登录...")
+                    await asyncio.sleep(2)
+                    if not await self._check_login_success_by_element(page):
+                        logger.error(f"【{self.pure_user_id}】❌ 未找到登录表单且未检测到已登录")
+                        return None
+                logger.success(f"【{self.pure_user_id}】✅ 检测到已登录状态")
+                return await self._collect_cookies(self.context)
+
+            # 【步骤2】填写账号密码并提交
+            try:
+                password_tab = await login_frame.query_selector('a.password-login-tab-item')
+                if password_tab:
+                    await password_tab.click()
+                    await asyncio.sleep(1.5)
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】查找密码登录标签失败: {e}")
+
+            await asyncio.sleep(1)
+            account_input = await login_frame.query_selector('#fm-login-id')
+            if not account_input:
+                logger.error(f"【{self.pure_user_id}】✗ 未找到账号输入框")
+                return None
+            await account_input.fill(account)
+            await asyncio.sleep(random.uniform(0.5, 1.0))
+
+            password_input = await login_frame.query_selector('#fm-login-password')
+            if not password_input:
+                logger.error(f"【{self.pure_user_id}】✗ 未找到密码输入框")
+                return None
+            await password_input.fill(password)
+            await asyncio.sleep(random.uniform(0.5, 1.0))
+
+            try:
+                agreement_checkbox = await login_frame.query_selector('#fm-agreement-checkbox')
+                if agreement_checkbox and not await agreement_checkbox.evaluate('el => el.checked'):
+                    await agreement_checkbox.click()
+                    await asyncio.sleep(0.3)
+            except Exception as e:
+                logger.warning(f"【{self.pure_user_id}】勾选用户协议失败: {e}")
+
+            await asyncio.sleep(1)
+            login_button = await login_frame.query_selector('button.password-login')
+            if not login_button:
+                logger.error(f"【{self.pure_user_id}】✗ 未找到登录按钮")
+                return None
+            await login_button.click()
+            logger.info(f"【{self.pure_user_id}】✓ 登录按钮已点击")
+
+            # 【步骤3】登录后监控：滑块 → 登录状态 → 账密错误 → 二维码/人脸验证
+            await asyncio.sleep(3)
+            has_slider, _ = await self._find_visible_slider(page, LOGIN_SLIDER_SELECTORS, frames=[])
+            if has_slider and not await self._solve_slider_with_reload(page):
+                return None
+
+            await asyncio.sleep(5)
+            await asyncio.sleep(1)
+            has_slider, _ = await self._find_visible_slider(page, LOGIN_SLIDER_SELECTORS, frames=[])
+            if has_slider:
+                if not await self._solve_slider_with_reload(page):
+                    return None
+                await asyncio.sleep(3)
+
+            await asyncio.sleep(1)
+            login_success = await self._check_login_success_by_element(page)
+            if not login_success:
+                await asyncio.sleep(1)
+                has_error, error_message = await self._check_login_error(page)
+                if has_error:
+                    logger.error(f"【{self.pure_user_id}】❌ 登录失败：{error_message}")
+                    raise Exception(error_message if error_message else "登录失败，请检查账号密码是否正确")
+
+                # 注意：_detect_qr_code_verification 检测到滑块时会先处理滑块
+                await asyncio.sleep(1)
+                has_qr, qr_frame = await self._detect_qr_code_verification(page)
+                if not has_qr:
+                    await asyncio.sleep(1)
+                    login_success = await self._check_login_success_by_element(page)
+                    if not login_success:
+                        await asyncio.sleep(1)
+                        has_qr, qr_frame = await self._detect_qr_code_verification(page)
+
+                if has_qr:
+                    logger.warning(f"【{self.pure_user_id}】⚠️ 检测到二维码/人脸验证，请在浏览器中完成验证")
+                    frame_url = getattr(qr_frame, 'verify_url', None) or getattr(qr_frame, 'url', None)
+                    screenshot_path = getattr(qr_frame, 'screenshot_path', None)
+                    logger.warning(f"【{self.pure_user_id}】验证截图: {screenshot_path}, 验证链接: {frame_url}")
+                    await self._notify_face_verification(notification_callback, screenshot_path, frame_url)
+
+                    login_success = await self._wait_for_face_verification(page)
+                    if screenshot_path:
+                        await asyncio.to_thread(self._remove_face_screenshots)
+                    if not login_success:
+                        logger.error(f"【{self.pure_user_id}】❌ 等待验证超时（{FACE_VERIFY_MAX_WAIT}秒）")
+                        return None
+                elif not login_success:
+                    await asyncio.sleep(1)
+                    login_success = await self._check_login_success_by_element(page)
+
+            if not login_success:
+                logger.error(f"【{self.pure_user_id}】❌ 登录状态未确认，无法获取Cookie")
+                return None
+
+            await asyncio.sleep(1)
+            return await self._collect_cookies(self.context)
+
+        except Exception as e:
+            logger.error(f"【{self.pure_user_id}】密码登录流程异常: {e}")
+            logger.error(traceback.format_exc())
+            # 账密错误需要传给调用方展示
+            if '账密错误' in str(e) or '密码' in str(e):
+                raise
+            return None
+        finally:
+            await self.close_browser()